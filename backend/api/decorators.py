@@ -1,8 +1,9 @@
+import hmac
 from functools import wraps
 
 from flask import current_app, jsonify, request
 
-from backend.exceptions import ClientException
+from backend.exceptions import ClientException, RepositoryException
 
 
 def login_required(f):
@@ -44,3 +45,62 @@ def login_required(f):
         return f(*args, **kwargs)
 
     return decorated_function
+
+
+def ops_token_required(f):
+    """
+    运维接口鉴权：请求头 X-Ops-Token 须与配置的 OPS_TOKEN 一致；未配置 OPS_TOKEN 时运维接口不可用
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = current_app.config.get("OPS_TOKEN") or ""
+        if not expected:
+            return {"error": "Ops endpoints disabled"}, 404
+
+        token = request.headers.get("X-Ops-Token", "")
+        if not hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8")):
+            current_app.logger.warning(f"Rejected ops request: {request.path}")
+            return {"error": "Invalid ops token"}, 401
+
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+def room_etag(version: int) -> str:
+    """房间版本号对应的 ETag 值"""
+    return f"room-v{version}"
+
+
+def set_room_etag(response, version: int | None):
+    """为房间接口的响应附加 ETag（版本号未知时不附加），客户端每次轮询都需重新验证"""
+    if version is not None:
+        response.set_etag(room_etag(version), weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def room_not_modified(version: int):
+    """房间自客户端缓存的版本以来未变化时的 304 响应"""
+    return set_room_etag(current_app.response_class(status=304), version)
+
+
+def room_conditional(f):
+    """
+    房间接口的条件请求：If-None-Match 与房间当前版本号一致时直接返回 304，
+    只读取一次版本号，不加载、不渲染房间；被装饰的视图负责通过 set_room_etag 附加 ETag
+    """
+    @wraps(f)
+    def decorated_function(room_id, *args, **kwargs):
+        room_repo = current_app.config.get('room_repository')
+        if room_repo is not None and request.if_none_match:
+            try:
+                version = room_repo.get_version(room_id)
+            except RepositoryException:
+                version = None  # 按普通请求处理
+            if version is not None and request.if_none_match.contains_weak(room_etag(version)):
+                return room_not_modified(version)
+
+        return f(room_id, *args, **kwargs)
+
+    return decorated_function
@@ -1,9 +1,15 @@
+import math
+import time
+from contextlib import nullcontext
+
 from flask import jsonify, request, current_app
 
 from . import api_bp
-from .decorators import login_required
+from .decorators import login_required, room_conditional, room_etag, room_not_modified, set_room_etag
 from backend.models.room import RoomStatus
+from backend.services.room_snapshot import build_room_snapshot
 from backend.exceptions import (
+    RepositoryException,
     RoomNotFoundException,
     GameNotStartedError,
     GameAlreadyStartedError,
@@ -32,6 +38,14 @@ def start_game():
             room_id:
               type: string
               example: "8888"
+            category:
+              type: string
+              description: "词语类别（可选，不存在时不限类别）"
+              example: "默认"
+            difficulty:
+              type: integer
+              description: "词语难度（可选）"
+              example: 1
       - in: header
         name: Authorization
         type: string
@@ -61,11 +75,18 @@ def start_game():
     data = request.get_json() or {}
     room_id = data.get("room_id")
     user_id = getattr(request, 'current_user_id', None)
+    category = data.get("category") or None
+    difficulty = data.get("difficulty")
 
     if not room_id:
         return jsonify({"code": 400, "message": "Missing room_id"}), 400
     if not user_id:
         return jsonify({"code": 401, "message": "User not authenticated", "data": {}}), 401
+    if difficulty is not None:
+        try:
+            difficulty = int(difficulty)
+        except (TypeError, ValueError):
+            return jsonify({"code": 400, "message": "Invalid difficulty", "data": {}}), 400
 
     # 获取 GameService
     game_service = current_app.config.get('game_service')
@@ -74,7 +95,7 @@ def start_game():
 
     try:
         # 开始游戏
-        success, result = game_service.start_game(room_id, user_id)
+        success, result = game_service.start_game(room_id, user_id, category, difficulty)
         
         if not success:
             return jsonify({"code": 400, "message": result, "data": {}}), 400
@@ -240,6 +261,7 @@ def vote():
 
 @api_bp.route("/game/sync/<room_id>", methods=["GET"])
 @login_required
+@room_conditional
 def sync_room(room_id):
     """
     状态同步接口（增强版）
@@ -257,9 +279,14 @@ def sync_room(room_id):
         type: string
         required: false
         description: "Bearer token (可选，用于获取当前用户信息)"
+      - in: header
+        name: If-None-Match
+        type: string
+        required: false
+        description: "上次响应的 ETag，房间未变化时返回 304"
     responses:
       200:
-        description: "返回房间完整状态信息"
+        description: "返回房间完整状态信息（ETag 头为房间版本号）"
         schema:
           type: object
           properties:
@@ -312,13 +339,88 @@ def sync_room(room_id):
                       type: boolean
                     is_creator:
                       type: boolean
+      304:
+        description: "房间自 If-None-Match 指定的版本以来未变化"
       404:
         description: "房间不存在"
       403:
         description: "无权访问该房间"
     """
-    from flask import current_app
-    
+    return _sync_response(room_id)
+
+
+@api_bp.route("/game/sync/<room_id>/poll", methods=["GET"])
+@login_required
+def poll_room(room_id):
+    """
+    长轮询状态同步接口
+    If-None-Match 与房间当前版本一致时挂起请求，直到房间变化（返回 200 与完整状态）或超时（返回 304）；
+    未携带 If-None-Match 时立即返回完整状态
+    ---
+    tags:
+      - Game 模块
+    parameters:
+      - in: path
+        name: room_id
+        type: string
+        required: true
+        description: "房间ID"
+      - in: header
+        name: If-None-Match
+        type: string
+        required: false
+        description: "上次响应的 ETag"
+      - in: query
+        name: timeout
+        type: number
+        required: false
+        description: "最长挂起秒数（不超过服务端上限 LONGPOLL_MAX_SECONDS）"
+    responses:
+      200:
+        description: "房间已变化，返回与 /game/sync/<room_id> 相同的完整状态（ETag 头为新版本号）"
+      304:
+        description: "超时前房间未变化"
+      400:
+        description: "timeout 不是有限数值"
+      404:
+        description: "房间不存在"
+    """
+    room_repo = current_app.config.get('room_repository')
+    if not room_repo or not request.if_none_match:
+        return _sync_response(room_id)
+
+    max_seconds = current_app.config.get('LONGPOLL_MAX_SECONDS', 25.0)
+    timeout = request.args.get('timeout', default=max_seconds, type=float)
+    if not math.isfinite(timeout):
+        # nan 与任何数比较都为假，会绕过下面的截断使请求无限自旋
+        return jsonify({"code": 400, "message": "Invalid timeout", "data": {}}), 400
+    timeout = min(max(timeout, 0.0), max_seconds)
+    recheck = current_app.config.get('LONGPOLL_RECHECK_SECONDS', 5.0)
+    deadline = time.monotonic() + timeout
+    watcher = current_app.config.get('room_watcher')
+
+    try:
+        # 先登记等待再检查版本号，检查之后到挂起之前的变更通知不会丢失
+        with watcher.watch(room_id) if watcher is not None else nullcontext() as changed:
+            while True:
+                version = room_repo.get_version(room_id)
+                if version is None or not request.if_none_match.contains_weak(room_etag(version)):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or changed is None:
+                    # 超时，或未启用长轮询 / 等待者已满时退化为普通条件请求
+                    return room_not_modified(version)
+                changed.wait(min(remaining, recheck))
+                changed.clear()
+    except RepositoryException as e:
+        current_app.logger.exception(f"Long poll failed: {str(e)}")
+        return jsonify({"code": 500, "message": "系统繁忙，请稍后重试", "data": {}}), 500
+
+    return _sync_response(room_id)
+
+
+def _sync_response(room_id):
+    """构建房间状态同步响应（附带 ETag）"""
     # 获取依赖
     room_repo = current_app.config.get('room_repository')
     user_repo = current_app.config.get('user_repository')
@@ -330,8 +432,8 @@ def sync_room(room_id):
             "data": {}
         }), 500
     
-    # 获取房间信息
-    room = room_repo.get(room_id)
+    # 获取房间信息（与版本号一并读取）
+    room, version = room_repo.get_with_version(room_id)
     if not room:
         return jsonify({
             "code": 404,
@@ -347,30 +449,13 @@ def sync_room(room_id):
         # 暂时跳过认证，因为是 Mock 接口
         pass
     
-    # 构建玩家列表
-    players = []
-    for i, player_id in enumerate(room.players):
-        user = user_repo.get(player_id) if user_repo else None
-        players.append({
-            "openid": player_id,
-            "nickname": user.nickname if user else f"玩家{i+1}",
-            "seat": i + 1,
-            "is_eliminated": room.is_eliminated(player_id),
-            "is_creator": room.is_creator(player_id)
-        })
-    
     # 构建响应数据
-    response_data = {
-        "room_id": room_id,
-        "status": room.status.value,
-        "player_count": room.get_player_count(),
-        "updated_at": int(room.last_active.timestamp()) if hasattr(room, 'last_active') and room.last_active else 0,
-        "players": players
-    }
+    users = user_repo.get_many(room.players) if user_repo else {}
+    response_data = build_room_snapshot(room, users)
     
     # 如果有当前用户信息，添加 my_info
     if current_user_id and room.is_player(current_user_id):
-        seat = room.players.index(current_user_id) + 1 if current_user_id in room.players else 0
+        seat = room.seat_of(current_user_id)
         response_data["my_info"] = {
             "openid": current_user_id,
             "seat": seat,
@@ -378,8 +463,8 @@ def sync_room(room_id):
             "is_creator": room.is_creator(current_user_id)
         }
     
-    return jsonify({
+    return set_room_etag(jsonify({
         "code": 200,
         "message": "success",
         "data": response_data
-    })
+    }), version)
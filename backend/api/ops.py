@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+运维接口
+只供运维排查使用，所有接口要求 X-Ops-Token 请求头（见 OPS_TOKEN 配置），不返回词语、卧底等对局数据
+"""
+
+import time
+
+from flask import Blueprint, current_app, request
+
+from backend.api.decorators import ops_token_required
+from backend.models.room import RoomStatus
+from backend.utils.redis_memory import memory_report
+
+ops_bp = Blueprint("ops", __name__, url_prefix="/ops")
+
+
+@ops_bp.route("/rooms")
+@ops_token_required
+def ops_rooms():
+    """运维房间列表：全部或指定状态的活跃房间摘要，按最后活跃时间倒序，游标分页"""
+    room_repo = current_app.room_repo
+    try:
+        status = request.args.get("status")
+        status = RoomStatus(status) if status else None
+        limit = min(max(int(request.args.get("limit", 50)), 1), 200)
+        rooms, next_cursor = room_repo.list_active(status, request.args.get("cursor") or None, limit)
+    except ValueError as e:
+        return {"error": f"Invalid parameter: {e}"}, 400
+    return {
+        "rooms": [
+            {
+                "room_id": room.room_id,
+                "room_code": room.room_code,
+                "status": room.status.value,
+                "player_count": room.get_player_count(),
+            }
+            for room in rooms
+        ],
+        "next_cursor": next_cursor,
+        "counts": room_repo.index.get_stats(),
+        "timestamp": int(time.time()),
+    }
+
+
+@ops_bp.route("/memory")
+@ops_token_required
+def ops_memory():
+    """运维内存报告：按键族统计键数量与估算占用，最多扫描 OPS_MEMORY_MAX_KEYS 个键（完整报告使用命令行）"""
+    limit = current_app.config.get("OPS_MEMORY_MAX_KEYS", 10000)
+    try:
+        sample = min(max(int(request.args.get("sample", 50)), 1), 200)
+        max_keys = min(max(int(request.args.get("max_keys", limit)), 1), limit)
+    except ValueError as e:
+        return {"error": f"Invalid parameter: {e}"}, 400
+    report = memory_report(current_app.room_repo.redis, sample_size=sample, max_keys=max_keys)
+    return {**report, "timestamp": int(time.time())}
@@ -2,14 +2,23 @@ from flask import jsonify, request, current_app
 import uuid
 
 from . import api_bp
-from .decorators import login_required
+from .decorators import login_required, room_conditional, set_room_etag
+from backend.config.game_config import GameConfig
+from backend.exceptions import (
+    RoomFullError, RoomNotFoundError, RoomStateError,
+    UserAlreadyInRoomError, UserNotFoundError, UserNotInRoomError
+)
 from backend.models.room import Room, RoomStatus
 from backend.models.responses import (
     CreateRoomResponse, CreateRoomData,
     JoinRoomResponse, JoinRoomData, PlayerInfo,
-    GetRoomResponse, GetRoomData
+    GetRoomResponse, GetRoomData,
+    ListRoomsResponse, ListRoomsData, LobbyRoomInfo
 )
 
+# 房间列表每页条数上限
+MAX_PAGE_SIZE = 50
+
 
 @api_bp.route("/room/create", methods=["POST"])
 @login_required
@@ -190,36 +199,37 @@ def join_room():
     if not room_id and not room_code:
         return jsonify({"code": 400, "message": "Missing room_id or room_code parameter", "data": {}}), 400
 
-    # 获取 RoomRepository
+    # 获取 RoomRepository 和房间原子操作脚本
     room_repo = current_app.config.get('room_repository')
-    if not room_repo:
+    room_scripts = current_app.config.get('room_scripts')
+    if not room_repo or not room_scripts:
         return jsonify({"code": 500, "message": "Service not available", "data": {}}), 500
 
     try:
-        # 获取房间
-        room = None
-        if room_id:
-            room = room_repo.get(room_id)
-        elif room_code:
-            # 通过 room_code 查找房间
+        # 通过 room_code 加入时先解析出房间ID
+        if not room_id:
             room = room_repo.get_by_code(room_code)
-        
-        if not room:
+            if not room:
+                return jsonify({"code": 404, "message": "Room not found", "data": {}}), 404
+            room_id = room.room_id
+
+        # 原子地加入房间（校验用户状态、房间状态与人数上限，写入房间和用户的当前房间）
+        try:
+            room_scripts.join(room_id, user_id)
+        except RoomNotFoundError:
             return jsonify({"code": 404, "message": "Room not found", "data": {}}), 404
+        except RoomFullError:
+            return jsonify({"code": 400, "message": "Room is full", "data": {}}), 400
+        except RoomStateError:
+            return jsonify({"code": 400, "message": "Game already started", "data": {}}), 400
+        except UserAlreadyInRoomError as e:
+            # 已在本房间中时重复加入视为成功
+            if e.details.get('room_id') != room_id:
+                return jsonify({"code": 400, "message": "User already in another room", "data": {}}), 400
 
-        # 加入房间
-        if user_id not in room.players:
-            room.players.append(user_id)
-            room_repo.save(room)
-        
-        # 更新用户的当前房间
-        user_repo = current_app.config.get('user_repository')
-        if user_repo:
-            from backend.models.user import User
-            user = user_repo.get(user_id)
-            if user:
-                user.current_room = room.room_id
-                user_repo.save(user)
+        room = room_repo.get(room_id)
+        if not room:
+            return jsonify({"code": 404, "message": "Room not found", "data": {}}), 404
 
         # 使用 Pydantic 模型构建玩家信息
         players = []
@@ -254,8 +264,75 @@ def join_room():
         return jsonify({"code": 500, "message": f"Join room failed: {str(e)}", "data": {}}), 500
 
 
+@api_bp.route("/rooms", methods=["GET"])
+@login_required
+def list_rooms():
+    """
+    大厅房间列表（按最后活跃时间倒序，游标分页）
+    ---
+    tags:
+      - Room 模块
+    parameters:
+      - in: query
+        name: status
+        type: string
+        required: false
+        description: "房间状态（waiting/playing/ended），默认 waiting"
+      - in: query
+        name: cursor
+        type: string
+        required: false
+        description: "上一页返回的 next_cursor"
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: "每页条数，默认 20，最大 50"
+    responses:
+      200:
+        description: "返回房间列表及下一页游标"
+      400:
+        description: "参数无效"
+    """
+    room_repo = current_app.config.get('room_repository')
+    if not room_repo:
+        return jsonify({"code": 500, "message": "Service not available", "data": {}}), 500
+
+    try:
+        status = RoomStatus(request.args.get('status', RoomStatus.WAITING.value))
+        limit = min(max(int(request.args.get('limit', 20)), 1), MAX_PAGE_SIZE)
+        rooms, next_cursor = room_repo.list_active(status, request.args.get('cursor') or None, limit)
+    except ValueError as e:
+        return jsonify({"code": 400, "message": f"Invalid parameter: {str(e)}", "data": {}}), 400
+    except Exception as e:
+        current_app.logger.exception(f"List rooms failed: {str(e)}")
+        return jsonify({"code": 500, "message": "List rooms failed", "data": {}}), 500
+
+    response = ListRoomsResponse(
+        code=200,
+        message="success",
+        data=ListRoomsData(
+            rooms=[
+                LobbyRoomInfo(
+                    room_id=room.room_id,
+                    room_code=room.room_code,
+                    host_id=room.creator,
+                    status=room.status.value,
+                    player_count=room.get_player_count(),
+                    max_players=GameConfig.MAX_PLAYERS,
+                    last_active=room.last_active.isoformat(),
+                )
+                for room in rooms
+            ],
+            next_cursor=next_cursor,
+        )
+    )
+    return jsonify(response.model_dump())
+
+
 @api_bp.route("/room/<room_id>", methods=["GET"])
 @login_required
+@room_conditional
 def get_room(room_id):
     """
     获取房间状态
@@ -268,9 +345,16 @@ def get_room(room_id):
         type: string
         required: true
         description: "房间ID"
+      - in: header
+        name: If-None-Match
+        type: string
+        required: false
+        description: "上次响应的 ETag，房间未变化时返回 304"
     responses:
       200:
-        description: "返回房间详细信息"
+        description: "返回房间详细信息（ETag 头为房间版本号）"
+      304:
+        description: "房间自 If-None-Match 指定的版本以来未变化"
     """
     # 获取 RoomRepository
     room_repo = current_app.config.get('room_repository')
@@ -278,8 +362,8 @@ def get_room(room_id):
         return jsonify({"code": 500, "message": "Service not available", "data": {}}), 500
 
     try:
-        # 获取房间
-        room = room_repo.get(room_id)
+        # 获取房间（与版本号一并读取）
+        room, version = room_repo.get_with_version(room_id)
         if not room:
             return jsonify({"code": 404, "message": "Room not found", "data": {}}), 404
 
@@ -312,7 +396,7 @@ def get_room(room_id):
             data=get_room_data
         )
 
-        return jsonify(response.model_dump())
+        return set_room_etag(jsonify(response.model_dump()), version)
     except Exception as e:
         return jsonify({"code": 500, "message": f"Get room failed: {str(e)}", "data": {}}), 500
 
@@ -357,55 +441,29 @@ def leave_room():
     if not user_id:
         return jsonify({"code": 401, "message": "User not authenticated", "data": {}}), 401
 
-    # 获取用户和房间仓库
-    user_repo = current_app.config.get('user_repository')
-    room_repo = current_app.config.get('room_repository')
-    game_service = current_app.config.get('game_service')
-    
-    if not user_repo or not room_repo or not game_service:
+    # 获取房间原子操作脚本
+    room_scripts = current_app.config.get('room_scripts')
+    if not room_scripts:
         return jsonify({"code": 500, "message": "Service not available", "data": {}}), 500
 
     try:
-        # 获取用户信息
-        user = user_repo.get(user_id)
-        if not user:
+        # 原子地离开房间（校验状态、转移房主、移除玩家、清理用户状态、空房间解散）
+        try:
+            result = room_scripts.leave(user_id)
+        except UserNotFoundError:
             return jsonify({"code": 404, "message": "User not found", "data": {}}), 404
-        
-        # 检查用户是否在房间中
-        if not user.has_joined_room():
+        except UserNotInRoomError:
             return jsonify({"code": 404, "message": "User not in any room", "data": {}}), 404
-        
-        room_id = user.current_room
-        room = room_repo.get(room_id)
-        if not room:
-            # 如果房间不存在，直接清理用户状态
-            user.leave_room()
-            user_repo.save(user)
-            return jsonify({"code": 200, "message": "success", "data": {}}), 200
-        
-        # 检查游戏状态，游戏中不能离开
-        if room.status == RoomStatus.PLAYING:
+        except RoomStateError:
             return jsonify({"code": 400, "message": "Cannot leave room during game", "data": {}}), 400
         
-        # 检查是否为房主，如果是房主需要转移或解散房间
-        is_creator = (room.creator == user_id)
-        if is_creator and len(room.players) > 1:
-            # 房主离开且房间还有其他玩家，转移房主权限
-            room.creator = next((p for p in room.players if p != user_id), room.players[0])
-            room_repo.save(room)
-        
-        # 从房间中移除玩家
-        if user_id in room.players:
-            room.players.remove(user_id)
-            room_repo.save(room)
-        
-        # 更新用户状态
-        user.leave_room()
-        user_repo.save(user)
+        room_id = result.room_id
+        if not result.room_found:
+            # 房间已不存在，用户状态已被清理
+            return jsonify({"code": 200, "message": "success", "data": {}}), 200
         
-        # 如果房间为空，解散房间
-        if len(room.players) == 0:
-            room_repo.delete(room_id)
+        is_creator = result.is_creator
+        if result.disbanded:
             current_app.logger.info(f"Room {room_id} disbanded (no players left)")
         else:
             current_app.logger.info(f"User {user_id} left room {room_id}")
@@ -420,11 +478,11 @@ def leave_room():
                 event_data = {
                     "room_id": room_id,
                     "user_id": user_id,
-                    "user_nickname": user.nickname or "未知用户",
-                    "player_count": len(room.players),
+                    "user_nickname": result.nickname or "未知用户",
+                    "player_count": result.player_count,
                     "is_creator": is_creator,
-                    "new_creator": room.creator if len(room.players) > 0 else None,
-                    "room_disbanded": len(room.players) == 0
+                    "new_creator": result.new_creator,
+                    "room_disbanded": result.disbanded
                 }
                 
                 # 发送玩家离开通知
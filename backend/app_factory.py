@@ -9,19 +9,39 @@ from flask import Flask
 
 # Import models for migration detection
 from backend.api import api_bp
+from backend.api.decorators import ops_token_required
+from backend.api.ops import ops_bp
 from backend.extensions import db, migrate
+from backend.repositories.codec import get_codec
+from backend.repositories.room_cache import RoomCache
+from backend.repositories.room_event_log import RoomEventLog
+from backend.repositories.room_watcher import RoomWatcher
+from backend.repositories.room_code_pool import RoomCodeAllocator
 from backend.repositories.room_repository import RoomRepository
+from backend.repositories.room_scripts import RoomScripts
+from backend.repositories.unit_of_work import (
+    ScopedRoomRepository,
+    ScopedUserRepository,
+    init_unit_of_work,
+    uow_stats,
+)
+from backend.repositories.user_profile_store import UserProfileStore
 from backend.repositories.user_repository import UserRepository
 from backend.services.auth_service import AuthService
 from backend.services.exception_handler import register_global_exception_handlers
+from backend.services.game_record_writer import GameRecordWriter
 from backend.services.game_service import GameService
 from backend.services.message_service import MessageService
 from backend.services.notification_service import NotificationService
-from backend.services.push_service import PushService
+from backend.services.push_service import PushDispatcher, PushService
+from backend.services.word_catalog import WordCatalog
 from backend.services.wechat_client import WeChatClient
 from backend.utils.logger import setup_logger
+from backend.utils.redis_pool import create_redis_client, get_pool_stats
 from backend.wechat.handlers import wechat_bp
 from backend.websocket import socketio
+from backend.websocket.monitor import ws_monitor
+from backend.websocket.native_bus import NativeBroadcastBus
 
 
 class AppFactory:
@@ -117,6 +137,7 @@ class AppFactory:
         app.config['auth_service'] = auth_service
         app.config['notification_service'] = notification_service
         app.config['ws_manager'] = ws_manager
+        app.config['room_scripts'] = game_service.room_scripts
         
         # 注册蓝图
         AppFactory._register_blueprints(app)
@@ -167,24 +188,85 @@ class AppFactory:
             redis_client = fakeredis.FakeRedis(decode_responses=False)
             app.logger.info("Using fakeredis for testing")
         else:
-            redis_client = redis.Redis.from_url(app.config["REDIS_URL"])
+            redis_client = create_redis_client(app.config)
 
         # 创建仓储
-        room_repo = RoomRepository(redis_client)
-        user_repo = UserRepository(redis_client)
+        room_cache = None
+        if app.config.get("ROOM_CACHE_ENABLED"):
+            room_cache = RoomCache(
+                redis_client,
+                max_size=app.config.get("ROOM_CACHE_MAX_SIZE", 1024),
+                ttl_seconds=app.config.get("ROOM_CACHE_TTL_SECONDS", 1.0),
+            )
+            app.logger.info("Room L1 cache enabled")
+        codec = get_codec(app.config.get("REDIS_CODEC", "json"))
+        code_allocator = RoomCodeAllocator(
+            redis_client,
+            min_length=app.config.get("ROOM_CODE_MIN_LENGTH", 4),
+            max_length=app.config.get("ROOM_CODE_MAX_LENGTH", 6),
+            low_watermark=app.config.get("ROOM_CODE_LOW_WATERMARK", 0.1),
+        )
+        # 长轮询：仓储写入房间时发布变更通知，本进程的等待请求由 RoomWatcher 统一唤醒
+        long_poll = app.config.get("LONGPOLL_ENABLED", False)
+        app.config['room_watcher'] = (
+            RoomWatcher(redis_client, max_waiters=app.config.get("LONGPOLL_MAX_WAITERS", 2000)) if long_poll else None
+        )
+        room_repo = RoomRepository(
+            redis_client,
+            storage_mode=app.config.get("ROOM_STORAGE_MODE", "json"),
+            cache=room_cache,
+            codec=codec,
+            code_allocator=code_allocator,
+            notify_changes=long_poll,
+        )
+        user_repo = UserRepository(
+            redis_client,
+            codec=codec,
+            ttl_seconds=app.config.get("USER_TTL_SECONDS", 0),
+            profile_store=UserProfileStore(),
+            missing_ttl_seconds=app.config.get("USER_MISSING_TTL_SECONDS", 60),
+        )
+
+        # 请求级身份映射：同一请求内重复读取命中内存，写入在请求结束时统一提交
+        if app.config.get("IDENTITY_MAP_ENABLED", True):
+            init_unit_of_work(app, room_repo, user_repo)
+            room_repo = ScopedRoomRepository(room_repo)
+            user_repo = ScopedUserRepository(user_repo)
 
-        # 创建通知服务
-        notification_service = NotificationService(socketio)
+        room_scripts = RoomScripts(room_repo, user_repo)
+
+        # 创建通知服务（房间事件写入定长事件日志，供断线重连按 seq 补发）
+        event_log = None
+        if app.config.get("ROOM_EVENT_LOG_ENABLED", True):
+            event_log = RoomEventLog(redis_client, maxlen=app.config.get("ROOM_EVENT_LOG_MAXLEN", 100))
+        app.config['room_event_log'] = event_log
+        notification_service = NotificationService(socketio, event_log=event_log)
         
         # 初始化原生 WebSocket（用于微信小程序）
-        from backend.websocket.native_handlers import init_native_websocket, broadcast_to_room, connections, room_subscriptions
+        from backend.websocket.native_handlers import (
+            broadcast_to_room,
+            connections,
+            deliver_local,
+            has_local_subscribers,
+            init_native_websocket,
+            room_subscriptions,
+            set_broadcast_bus,
+            user_connections,
+        )
         init_native_websocket(app)
         notification_service.set_native_ws_broadcast(broadcast_to_room)
+        # 跨 worker 广播：各 worker 只订阅本地有连接的房间频道
+        native_bus = None
+        if app.config.get("WS_NATIVE_BUS_ENABLED", True):
+            native_bus = NativeBroadcastBus(redis_client, deliver=deliver_local, has_local=has_local_subscribers)
+        set_broadcast_bus(native_bus)
+        app.config['native_ws_bus'] = native_bus
         
         # 初始化 WebSocket 管理器
         from backend.websocket.websocket_manager import ws_manager
         ws_manager.set_connections(connections)
         ws_manager.set_room_subscriptions(room_subscriptions)
+        ws_manager.set_user_connections(user_connections)
 
         # 创建服务
         client = None
@@ -196,8 +278,42 @@ class AppFactory:
             client = WeChatClient(
                 app.config["WECHAT_APP_ID"], app.config["WECHAT_APP_SECRET"], redis_client=redis_client
             )
-            push_service = PushService(client)
-        game_service = GameService(room_repo, user_repo, push_service, notification_service)
+            dispatcher = None
+            if app.config.get("PUSH_ASYNC_ENABLED", True):
+                dispatcher = PushDispatcher(
+                    redis_client,
+                    client,
+                    workers=app.config.get("PUSH_WORKERS", 4),
+                    max_pending=app.config.get("PUSH_MAX_PENDING", 10000),
+                    max_attempts=app.config.get("PUSH_MAX_ATTEMPTS", 5),
+                    retry_base_seconds=app.config.get("PUSH_RETRY_BASE_SECONDS", 1.0),
+                    retry_max_seconds=app.config.get("PUSH_RETRY_MAX_SECONDS", 60.0),
+                    dead_letter_max=app.config.get("PUSH_DEAD_LETTER_MAX", 1000),
+                )
+                dispatcher.start()
+            push_service = PushService(client, dispatcher)
+        word_catalog = WordCatalog(
+            redis_client,
+            refresh_seconds=app.config.get("WORD_CATALOG_REFRESH_SECONDS", 600.0),
+            check_seconds=app.config.get("WORD_CATALOG_CHECK_SECONDS", 5.0),
+        )
+        record_writer = None
+        if app.config.get("GAME_RECORD_WRITE_BEHIND", True):
+            record_writer = GameRecordWriter(
+                redis_client,
+                app,
+                batch_size=app.config.get("GAME_RECORD_BATCH_SIZE", 100),
+                flush_ms=app.config.get("GAME_RECORD_FLUSH_MS", 500),
+                maxlen=app.config.get("GAME_RECORD_STREAM_MAXLEN", 100000),
+                claim_idle_ms=app.config.get("GAME_RECORD_CLAIM_IDLE_MS", 60000),
+                max_attempts=app.config.get("GAME_RECORD_MAX_ATTEMPTS", 5),
+                dead_letter_max=app.config.get("GAME_RECORD_DEAD_LETTER_MAX", 1000),
+            )
+            record_writer.start()
+        game_service = GameService(
+            room_repo, user_repo, push_service, notification_service, room_scripts,
+            word_catalog=word_catalog, record_writer=record_writer,
+        )
         message_service = MessageService(
             game_service,
             app.config["WECHAT_TOKEN"],
@@ -224,6 +340,7 @@ class AppFactory:
         # 注册功能蓝图
         app.register_blueprint(wechat_bp)
         app.register_blueprint(api_bp)
+        app.register_blueprint(ops_bp)
 
         # 注册应用级路由（如健康检查）
         @app.route("/health")
@@ -231,6 +348,43 @@ class AppFactory:
             """健康检查接口，可用于kube-probe"""
             return {"status": "healthy", "timestamp": int(time.time())}
 
+        @app.route("/metrics")
+        @ops_token_required
+        def metrics():
+            """
+            运行指标（当前 worker 的身份映射、房间缓存、长轮询、WebSocket、连接池、短码、推送、词库、对局记录）
+            含内部状态，与 /ops/* 一样要求 X-Ops-Token 请求头
+            """
+            stats = {"identity_map": uow_stats.get_stats(), "timestamp": int(time.time())}
+            room_cache = app.room_repo.cache
+            if room_cache is not None:
+                stats["room_cache"] = room_cache.get_stats()
+            room_watcher = app.config.get('room_watcher')
+            if room_watcher is not None:
+                stats["long_poll"] = room_watcher.get_stats()
+            stats["websocket"] = ws_monitor.get_stats()
+            native_bus = app.config.get('native_ws_bus')
+            if native_bus is not None:
+                stats["websocket"]["native_bus"] = native_bus.get_stats()
+            redis_pool = get_pool_stats(app.room_repo.redis)
+            if redis_pool is not None:
+                stats["redis_pool"] = redis_pool
+            try:
+                stats["room_codes"] = app.room_repo.code_allocator.get_stats()
+            except redis.RedisError as e:
+                stats["room_codes"] = {"error": str(e)}
+            try:
+                stats["active_rooms"] = app.room_repo.index.get_stats()
+            except redis.RedisError as e:
+                stats["active_rooms"] = {"error": str(e)}
+            stats["words"] = app.game_service.word_catalog.get_stats()
+            if app.game_service.record_writer is not None:
+                stats["game_records"] = app.game_service.record_writer.get_stats()
+            push_stats = app.game_service.push.get_stats() if app.game_service.push is not None else None
+            if push_stats is not None:
+                stats["push"] = push_stats
+            return stats
+
     @staticmethod
     def _register_websocket_handlers(app: Flask) -> None:
         """注册 WebSocket 处理器"""
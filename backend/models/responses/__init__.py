@@ -3,7 +3,8 @@ from .room import (
     RoomInfo, PlayerInfo, RoomConfig,
     CreateRoomResponse, CreateRoomData,
     JoinRoomResponse, JoinRoomData,
-    GetRoomResponse, GetRoomData
+    GetRoomResponse, GetRoomData,
+    ListRoomsResponse, ListRoomsData, LobbyRoomInfo
 )
 from .common import ApiResponse
 
@@ -21,4 +22,7 @@ __all__ = [
     "JoinRoomData",
     "GetRoomResponse",
     "GetRoomData",
+    "ListRoomsResponse",
+    "ListRoomsData",
+    "LobbyRoomInfo",
 ]
@@ -76,3 +76,27 @@ class GetRoomResponse(BaseModel):
     code: int = Field(default=200, description="响应码")
     message: str = Field(default="success", description="响应消息")
     data: GetRoomData = Field(..., description="响应数据")
+
+
+class LobbyRoomInfo(BaseModel):
+    """大厅房间条目"""
+    room_id: str = Field(..., description="房间ID")
+    room_code: str = Field(..., description="房间短码")
+    host_id: str = Field(..., description="房主ID")
+    status: str = Field(..., description="房间状态")
+    player_count: int = Field(..., description="玩家数量")
+    max_players: int = Field(..., description="最大玩家数量")
+    last_active: str = Field(..., description="最后活跃时间")
+
+
+class ListRoomsData(BaseModel):
+    """房间列表响应数据"""
+    rooms: list[LobbyRoomInfo] = Field(default_factory=list, description="房间列表")
+    next_cursor: str | None = Field(default=None, description="下一页游标，没有更多数据时为空")
+
+
+class ListRoomsResponse(BaseModel):
+    """房间列表响应模型"""
+    code: int = Field(default=200, description="响应码")
+    message: str = Field(default="success", description="响应消息")
+    data: ListRoomsData = Field(..., description="响应数据")
@@ -2,13 +2,30 @@
 """
 房间模型类
 定义房间的数据结构和相关操作
+
+Room 使用 __slots__，时间以 UTC 微秒整数保存（访问时再构造 datetime）；
+players / eliminated / undercovers 为普通列表，players 的下标即座位。
+房间最多 12 人，成员与身份判断直接扫描列表，不额外维护索引
 """
 
-from dataclasses import dataclass, field
-from datetime import UTC, datetime
+import time
+from datetime import UTC, datetime, timedelta
 from enum import Enum
 from typing import Any
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
 
 class RoomStatus(Enum):
     """房间状态枚举"""
@@ -17,28 +34,70 @@ class RoomStatus(Enum):
     ENDED = "ended"        # 已结束
 
 
-@dataclass
 class Room:
     """房间模型"""
-    room_id: str
-    creator: str
-    room_code: str  # 房间短码，用于客户端加入
-    players: list[str] = field(default_factory=list)
-    status: RoomStatus = RoomStatus.WAITING
-    words: dict[str, str] | None = None
-    undercovers: list[str] = field(default_factory=list)
-    current_round: int = 1
-    eliminated: list[str] = field(default_factory=list)
-    created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
-    last_active: datetime = field(default_factory=lambda: datetime.now(UTC))
-    
-    def __post_init__(self):
-        """初始化后自动将创建者添加到玩家列表"""
+
+    __slots__ = ('room_id', 'creator', 'room_code', 'players', 'status', 'words', 'undercovers',
+                 'current_round', 'eliminated', '_created_us', '_last_active_us')
+
+    def __init__(self, room_id: str, creator: str, room_code: str, players: list[str] | None = None,
+                 status: RoomStatus = RoomStatus.WAITING, words: dict[str, str] | None = None,
+                 undercovers: list[str] | None = None, current_round: int = 1,
+                 eliminated: list[str] | None = None, created_at: datetime | None = None,
+                 last_active: datetime | None = None):
+        self.room_id = room_id
+        self.creator = creator
+        self.room_code = room_code  # 房间短码，用于客户端加入
+        self.players = players
+        self.status = status
+        self.words = words
+        self.undercovers = undercovers if undercovers is not None else []
+        self.current_round = current_round
+        self.eliminated = eliminated if eliminated is not None else []
+        now_us = time.time_ns() // 1000
+        self._created_us = _to_micros(created_at) if created_at is not None else now_us
+        self._last_active_us = _to_micros(last_active) if last_active is not None else now_us
+
+        # 自动将创建者添加到玩家列表
         if not self.players:
             self.players = [self.creator]
         elif self.creator not in self.players:
             self.players.insert(0, self.creator)
-    
+
+    # ------------------------------------------------------------------
+    # 时间字段
+    # ------------------------------------------------------------------
+
+    @property
+    def created_at(self) -> datetime:
+        return _from_micros(self._created_us)
+
+    @created_at.setter
+    def created_at(self, value: datetime) -> None:
+        self._created_us = _to_micros(value)
+
+    @property
+    def last_active(self) -> datetime:
+        return _from_micros(self._last_active_us)
+
+    @last_active.setter
+    def last_active(self, value: datetime) -> None:
+        self._last_active_us = _to_micros(value)
+
+    @property
+    def last_active_ms(self) -> int:
+        """最后活跃时间（epoch 毫秒）"""
+        return self._last_active_us // 1000
+
+    @property
+    def created_at_ms(self) -> int:
+        """创建时间（epoch 毫秒）"""
+        return self._created_us // 1000
+
+    # ------------------------------------------------------------------
+    # 序列化
+    # ------------------------------------------------------------------
+
     def to_dict(self) -> dict[str, Any]:
         """转换为字典格式，用于存储到Redis"""
         return {
@@ -54,17 +113,17 @@ class Room:
             'created_at': self.created_at.isoformat(),
             'last_active': self.last_active.isoformat()
         }
-    
+
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> 'Room':
         """从字典数据创建房间实例"""
         # 处理枚举类型
         status = RoomStatus(data.get('status', 'waiting'))
-        
+
         # 处理时间戳
         created_at = datetime.fromisoformat(data.get('created_at', datetime.now(UTC).isoformat()))
         last_active = datetime.fromisoformat(data.get('last_active', datetime.now(UTC).isoformat()))
-        
+
         return cls(
             room_id=data.get('room_id', ''),
             creator=data.get('creator', ''),
@@ -78,27 +137,92 @@ class Room:
             created_at=created_at,
             last_active=last_active
         )
-    
+
+    def copy(self) -> 'Room':
+        """复制房间，列表等可变字段互不共享"""
+        room = Room.__new__(Room)
+        room.room_id = self.room_id
+        room.creator = self.creator
+        room.room_code = self.room_code
+        room.status = self.status
+        room.words = dict(self.words) if self.words is not None else None
+        room.current_round = self.current_round
+        room._created_us = self._created_us
+        room._last_active_us = self._last_active_us
+        room.players = list(self.players)
+        room.undercovers = list(self.undercovers)
+        room.eliminated = list(self.eliminated)
+        return room
+
+    def _fields(self) -> tuple:
+        return (self.room_id, self.creator, self.room_code, self.players, self.status, self.words,
+                self.undercovers, self.current_round, self.eliminated, self._created_us, self._last_active_us)
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not Room:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"Room(room_id={self.room_id!r}, creator={self.creator!r}, room_code={self.room_code!r}, "
+            f"players={self.players!r}, status={self.status!r}, words={self.words!r}, "
+            f"undercovers={self.undercovers!r}, current_round={self.current_round!r}, "
+            f"eliminated={self.eliminated!r}, created_at={self.created_at!r}, "
+            f"last_active={self.last_active!r})"
+        )
+
+    # ------------------------------------------------------------------
+    # 成员与身份
+    # ------------------------------------------------------------------
+
     def is_creator(self, user_id: str) -> bool:
         """检查用户是否为房主"""
         return self.creator == user_id
-    
+
     def is_player(self, user_id: str) -> bool:
         """检查用户是否在房间中"""
         return user_id in self.players
-    
+
+    def seat_of(self, user_id: str) -> int:
+        """玩家的座位号（从 1 开始），不在房间中时返回 0"""
+        try:
+            return self.players.index(user_id) + 1
+        except ValueError:
+            return 0
+
     def is_eliminated(self, user_id: str) -> bool:
         """检查玩家是否已被淘汰"""
         return user_id in self.eliminated
-    
+
+    def is_undercover(self, user_id: str) -> bool:
+        """检查玩家是否为卧底"""
+        return user_id in self.undercovers
+
     def get_player_count(self) -> int:
         """获取房间玩家数量"""
         return len(self.players)
-    
+
     def get_remaining_players(self) -> list[str]:
         """获取剩余玩家列表"""
-        return [player for player in self.players if player not in self.eliminated]
-    
+        eliminated = self.eliminated
+        if not eliminated:
+            return list(self.players)
+        return [player for player in self.players if player not in eliminated]
+
+    def count_remaining(self) -> tuple[int, int]:
+        """
+        统计剩余（未淘汰）玩家中的卧底与平民人数
+
+        Returns:
+            (剩余卧底人数, 剩余平民人数)
+        """
+        remaining = self.get_remaining_players()
+        remaining_undercovers = len([player for player in self.undercovers if player in remaining])
+        return remaining_undercovers, len(remaining) - remaining_undercovers
+
     def update_last_active(self) -> None:
         """更新最后活跃时间"""
-        self.last_active = datetime.now(UTC)
\ No newline at end of file
+        self.last_active = datetime.now(UTC)
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+asyncio 房间仓储
+基于 redis.asyncio，与 RoomRepository 使用相同的存储布局、编解码器与异常，
+等待 Redis 时让出事件循环，不再占用线程
+"""
+
+import asyncio
+
+import redis
+import redis.asyncio
+
+from backend.config.game_config import GameConfig
+from backend.exceptions import DataAccessError, RedisConnectionError, SerializationError
+from backend.models.room import Room
+from backend.repositories.codec import Codec
+from backend.repositories.room_cache import RoomCache
+from backend.repositories.room_code_pool import RoomCodeAllocator
+from backend.repositories.room_index import ActiveRoomIndex
+from backend.repositories.room_repository import RoomRepositoryBase
+from backend.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+# 创建同步客户端时沿用的 redis.asyncio 连接参数
+_SYNC_CONNECTION_KWARGS = (
+    "host", "port", "db", "username", "password", "client_name",
+    "socket_timeout", "socket_connect_timeout", "socket_keepalive", "health_check_interval",
+)
+
+
+def _sync_client(redis_client: redis.asyncio.Redis) -> redis.Redis:
+    """按 redis.asyncio 客户端的连接参数创建同步客户端（供默认的短码分配器使用）"""
+    kwargs = redis_client.connection_pool.connection_kwargs
+    params = {name: kwargs[name] for name in _SYNC_CONNECTION_KWARGS if name in kwargs}
+    if "path" in kwargs:
+        params["unix_socket_path"] = kwargs["path"]
+    return redis.Redis(**params)
+
+
+class AsyncRoomRepository(RoomRepositoryBase):
+    """
+    asyncio 房间仓储类
+
+    - 短码分配会在码池不足时同步生成码池（批量写入），交给线程池执行，
+      code_allocator 需使用同步 Redis 客户端，未指定时按 redis_client 的连接参数创建；
+      删除房间时在同一事务中归还短码
+    - L1 缓存（RoomCache）的读写都在本进程内存中完成，可与同步仓储共用同一实例
+    """
+
+    def __init__(self, redis_client: redis.asyncio.Redis, storage_mode: str = RoomRepositoryBase.STORAGE_JSON,
+                 cache: RoomCache | None = None, codec: Codec | None = None,
+                 code_allocator: RoomCodeAllocator | None = None,
+                 index: ActiveRoomIndex | None = None, notify_changes: bool = False):
+        super().__init__(redis_client, storage_mode, cache, codec, code_allocator, index, notify_changes)
+        if self.code_allocator is None:
+            self.code_allocator = RoomCodeAllocator(_sync_client(redis_client), self.code_prefix)
+        self._release_code = self.code_allocator.register_release(redis_client)
+
+    async def save(self, room: Room) -> None:
+        """
+        保存房间信息
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            room.update_last_active()
+
+            pipe = self.redis.pipeline(transaction=True)
+            if self.storage_mode == self.STORAGE_HASH:
+                self._write_hash(pipe, room)
+            else:
+                room_data = self.codec.encode_room(room)
+                pipe.setex(self._get_key(room.room_id), GameConfig.ROOM_TIMEOUT_SECONDS, room_data)
+                pipe.setex(f"{self.code_prefix}{room.room_code}", GameConfig.ROOM_TIMEOUT_SECONDS, room.room_id)
+            self._bump_version(pipe, room.room_id)
+            self.index.add(pipe, room)
+            if self.cache is not None:
+                self.cache.publish(pipe, room.room_id)
+            self._publish_change(pipe, room.room_id)
+            await pipe.execute()
+
+            logger.debug("房间保存成功", extra={'room_id': room.room_id, 'room_code': room.room_code})
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("保存房间", cause=e)
+            log_exception(logger, error, {'room_id': room.room_id})
+            raise error from e
+
+        except (TypeError, ValueError) as e:
+            error = SerializationError(
+                message="房间数据序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'room_id': room.room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="保存房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room.room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def get(self, room_id: str, use_cache: bool = True) -> Room | None:
+        """
+        获取房间信息，不存在时返回 None；读出后要修改并写回的调用方传 use_cache=False 绕过 L1 缓存
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            token = None
+            if self.cache is not None:
+                if use_cache:
+                    cached = self.cache.get(room_id)
+                    if cached is not None:
+                        return cached
+                token = self.cache.token()
+
+            if self.storage_mode == self.STORAGE_HASH:
+                room = await self._get_hash(room_id)
+            else:
+                room = await self._get_json(room_id)
+
+            if room is None:
+                logger.debug("房间不存在", extra={'room_id': room_id})
+                return None
+
+            if token is not None:
+                self.cache.put(room, token)
+
+            logger.debug("房间获取成功", extra={'room_id': room_id})
+            return room
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("获取房间", cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="房间数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="获取房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def _get_json(self, room_id: str) -> Room | None:
+        room_data = await self.redis.get(self._get_key(room_id))
+        if room_data is None:
+            return None
+        return self.codec.decode_room(room_data)
+
+    async def _get_hash(self, room_id: str) -> Room | None:
+        key = self._get_key(room_id)
+        players_key, eliminated_key, undercovers_key = self._get_list_keys(room_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(key)
+        pipe.lrange(players_key, 0, -1)
+        pipe.lrange(eliminated_key, 0, -1)
+        pipe.smembers(undercovers_key)
+        data, players, eliminated, undercovers = await pipe.execute(raise_on_error=False)
+
+        if isinstance(data, redis.ResponseError):
+            # WRONGTYPE：该房间仍是 json 字符串，按旧格式读取
+            return await self._get_json(room_id)
+        if not data:
+            return None
+        return self._from_hash(data, players, eliminated, undercovers)
+
+    async def get_many(self, room_ids: list[str]) -> dict[str, Room]:
+        """
+        批量获取房间信息，不存在的房间不会出现在结果中
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        if not room_ids:
+            return {}
+
+        try:
+            rooms = {}
+            if self.storage_mode == self.STORAGE_HASH:
+                pipe = self.redis.pipeline(transaction=False)
+                for room_id in room_ids:
+                    players_key, eliminated_key, undercovers_key = self._get_list_keys(room_id)
+                    pipe.hgetall(self._get_key(room_id))
+                    pipe.lrange(players_key, 0, -1)
+                    pipe.lrange(eliminated_key, 0, -1)
+                    pipe.smembers(undercovers_key)
+                results = await pipe.execute(raise_on_error=False)
+                for i, room_id in enumerate(room_ids):
+                    data, players, eliminated, undercovers = results[i * 4:i * 4 + 4]
+                    if isinstance(data, redis.ResponseError):
+                        room = await self._get_json(room_id)
+                        if room is not None:
+                            rooms[room_id] = room
+                    elif data:
+                        rooms[room_id] = self._from_hash(data, players, eliminated, undercovers)
+            else:
+                values = await self.redis.mget([self._get_key(room_id) for room_id in room_ids])
+                for room_id, room_data in zip(room_ids, values, strict=True):
+                    if room_data is not None:
+                        rooms[room_id] = self.codec.decode_room(room_data)
+
+            logger.debug("房间批量获取成功", extra={'requested': len(room_ids), 'found': len(rooms)})
+            return rooms
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量获取房间", cause=e)
+            log_exception(logger, error, {'room_ids': room_ids})
+            raise error from e
+
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="房间数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'room_ids': room_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="批量获取房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_ids': room_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def get_by_code(self, room_code: str) -> Room | None:
+        """
+        通过room_code获取房间信息，不存在时返回 None
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            if self.cache is not None:
+                cached_id = self.cache.get_room_id(room_code)
+                if cached_id is not None:
+                    room = self.cache.get(cached_id)
+                    if room is not None:
+                        return room
+
+            room_id = self._decode(await self.redis.get(f"{self.code_prefix}{room_code}"))
+            if room_id is None:
+                logger.debug("房间短码不存在", extra={'room_code': room_code})
+                return None
+            return await self.get(room_id)
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("通过短码获取房间", cause=e)
+            log_exception(logger, error, {'room_code': room_code})
+            raise error from e
+
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="房间数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'room_code': room_code},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="通过短码获取房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_code': room_code},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def _get_room_code(self, room_id: str) -> str | None:
+        key = self._get_key(room_id)
+        if self.storage_mode == self.STORAGE_HASH:
+            try:
+                return self._decode(await self.redis.hget(key, 'room_code'))
+            except redis.ResponseError:
+                pass
+        room_data = await self.redis.get(key)
+        if room_data is None:
+            return None
+        return self.codec.room_code_of(room_data)
+
+    async def delete(self, room_id: str) -> None:
+        """
+        删除房间
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            room_code = await self._get_room_code(room_id)
+
+            pipe = self.redis.pipeline(transaction=True)
+            if room_code:
+                pipe.delete(f"{self.code_prefix}{room_code}")
+                await self._release_code(
+                    keys=[self.code_allocator.leases_key],
+                    args=[self.code_allocator.pool_prefix, room_code],
+                    client=pipe,
+                )
+            pipe.delete(self._get_key(room_id), *self._get_list_keys(room_id), self._version_key(room_id))
+            self.index.remove(pipe, room_id)
+            if self.cache is not None:
+                self.cache.publish(pipe, room_id)
+            self._publish_change(pipe, room_id)
+            await pipe.execute()
+            logger.debug("房间删除成功", extra={'room_id': room_id})
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("删除房间", cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="删除房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def bump_version(self, room_id: str) -> None:
+        """递增房间版本号（房间数据未变、但接口响应中的关联数据（如玩家昵称）变化时调用）"""
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            self._bump_version(pipe, room_id)
+            self._publish_change(pipe, room_id)
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("房间版本号递增失败", extra={'room_id': room_id, 'error': str(e)})
+
+    async def allocate_code(self) -> str:
+        """
+        为新房间分配短码（在线程池中执行，码池扩容不会阻塞事件循环）
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 短码已耗尽或其他数据访问错误
+        """
+        return await asyncio.to_thread(self.code_allocator.allocate)
+
+    async def release_code(self, room_code: str) -> None:
+        """归还短码（房间被脚本直接删除时使用），失败时只记录警告"""
+        try:
+            await self._release_code(
+                keys=[self.code_allocator.leases_key],
+                args=[self.code_allocator.pool_prefix, room_code],
+            )
+        except redis.RedisError as e:
+            # 归还失败不影响业务，租约到期后会被自动回收
+            logger.warning("房间短码归还失败", extra={'room_code': room_code, 'error': str(e)})
+
+    async def invalidate(self, room_id: str) -> None:
+        """通知各进程房间已被修改：丢弃房间缓存并发布变更通知（供绕过仓储直接修改房间的 Lua 脚本使用）"""
+        if self.cache is None and not self.notify_changes:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        if self.cache is not None:
+            self.cache.publish(pipe, room_id)
+        self._publish_change(pipe, room_id)
+        await pipe.execute()
+
+    async def exists(self, room_id: str) -> bool:
+        """
+        检查房间是否存在
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            return await self.redis.exists(self._get_key(room_id)) > 0
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("检查房间存在性", cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="检查房间存在性失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def exists_by_code(self, room_code: str) -> bool:
+        """
+        通过room_code检查房间是否存在
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            return await self.redis.exists(f"{self.code_prefix}{room_code}") > 0
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("检查房间短码存在性", cause=e)
+            log_exception(logger, error, {'room_code': room_code})
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="检查房间短码存在性失败",
+                error_code="REPO-DATA-001",
+                details={'room_code': room_code},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    # ------------------------------------------------------------------
+    # 局部更新：与 RoomRepository 相同，hash 模式下只写入变化的字段
+    # ------------------------------------------------------------------
+
+    async def update_fields(self, room: Room, *fields: str) -> None:
+        def write(pipe):
+            mapping = self._to_hash(room)
+            scalars = {name: mapping[name] for name in fields if name in self.SCALAR_FIELDS}
+            if scalars:
+                pipe.hset(self._get_key(room.room_id), mapping=scalars)
+            if 'undercovers' in fields:
+                _, _, undercovers_key = self._get_list_keys(room.room_id)
+                pipe.delete(undercovers_key)
+                if room.undercovers:
+                    pipe.sadd(undercovers_key, *room.undercovers)
+
+        await self._save_partial(room, "更新房间字段", write)
+
+    async def _save_partial(self, room: Room, operation: str, write) -> None:
+        if self.storage_mode != self.STORAGE_HASH:
+            await self.save(room)
+            return
+
+        try:
+            room.update_last_active()
+            pipe = self.redis.pipeline(transaction=True)
+            write(pipe)
+            pipe.hset(self._get_key(room.room_id), 'last_active', room.last_active.isoformat())
+            self._expire_room(pipe, room)
+            self._bump_version(pipe, room.room_id)
+            self.index.add(pipe, room)
+            if self.cache is not None:
+                self.cache.publish(pipe, room.room_id)
+            self._publish_change(pipe, room.room_id)
+            await pipe.execute()
+
+            logger.debug(f"房间{operation}成功", extra={'room_id': room.room_id})
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError(operation, cause=e)
+            log_exception(logger, error, {'room_id': room.room_id})
+            raise error from e
+
+        except redis.ResponseError:
+            # WRONGTYPE：房间仍是切换前的 json 字符串，整体重写为 hash 格式
+            await self.save(room)
+
+        except Exception as e:
+            error = DataAccessError(
+                message=f"房间{operation}失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room.room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+asyncio 房间原子操作脚本
+与 RoomScripts 执行相同的 Lua 脚本、返回相同的结果与异常
+"""
+
+import redis
+
+from backend.exceptions import DataAccessError, RedisConnectionError, UserNotInRoomError
+from backend.models.room import Room
+from backend.repositories.async_room_repository import AsyncRoomRepository
+from backend.repositories.room_scripts import (
+    JoinResult,
+    LeaveResult,
+    RoomScriptsBase,
+    ScriptResult,
+    VoteResult,
+)
+from backend.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+
+class AsyncRoomScripts(RoomScriptsBase):
+    """
+    asyncio 房间原子操作脚本层
+
+    asyncio 路径没有请求级身份映射，脚本执行前无需写回脏对象
+    """
+
+    async def join(self, room_id: str, user_id: str) -> JoinResult:
+        """
+        原子地加入房间
+
+        Raises:
+            UserAlreadyInRoomError / RoomNotFoundError / RoomStateError / RoomFullError
+        """
+        keys, args = self._join_call(room_id, user_id)
+        result = await self._run(self._join, "加入房间", room_id, keys, args)
+        return self._join_result(result, room_id, user_id)
+
+    async def leave(self, user_id: str, max_attempts: int = 3) -> LeaveResult:
+        """
+        原子地离开当前房间：必要时转移房主，房间为空时解散
+
+        Raises:
+            UserNotFoundError / UserNotInRoomError / RoomStateError
+        """
+        for _ in range(max_attempts):
+            room_id = self._user_room(await self.user_repo.get(user_id), user_id)
+            keys, args = self._leave_call(room_id, user_id)
+            result = await self._run(self._leave, "离开房间", room_id, keys, args)
+            leave_result = self._leave_result(result, room_id, user_id)
+            if leave_result is None:
+                continue
+            if leave_result.disbanded:
+                await self.room_repo.release_code(self._decode(result[6]))
+            return leave_result
+
+        raise UserNotInRoomError(user_id)
+
+    async def start(self, room: Room, user_id: str) -> bool:
+        """
+        原子地开始游戏，期间有玩家加入或离开时返回 False
+
+        Raises:
+            RoomNotFoundError / RoomPermissionError / GameAlreadyStartedError / GameEndedError
+        """
+        keys, args = self._start_call(room, user_id)
+        result = await self._run(self._start, "开始游戏", room.room_id, keys, args)
+        return self._start_result(result, room.room_id, user_id)
+
+    async def vote(self, room_id: str, voter_id: str, target_index: int) -> VoteResult:
+        """
+        原子地投票淘汰
+
+        Raises:
+            RoomNotFoundError / GameNotStartedError / RoomPermissionError /
+            InvalidPlayerIndexError / PlayerEliminatedError
+        """
+        keys, args = self._vote_call(room_id, voter_id, target_index)
+        result = await self._run(self._vote, "投票淘汰", room_id, keys, args)
+        return self._vote_result(result, room_id, voter_id, target_index)
+
+    async def _run(self, script, operation: str, room_id: str, keys: list[str], args: list) -> list:
+        """执行脚本，hash 模式下遇到切换前遗留的 json 房间（WRONGTYPE）先整体重写再重试一次"""
+        args = self._script_args(args)
+        try:
+            try:
+                result = await script(keys=keys, args=args)
+            except redis.ResponseError as e:
+                if "WRONGTYPE" not in str(e) or self.room_repo.storage_mode != AsyncRoomRepository.STORAGE_HASH:
+                    raise
+                room = await self.room_repo.get(room_id, use_cache=False)
+                if room:
+                    await self.room_repo.save(room)
+                result = await script(keys=keys, args=args)
+            if result[0] == ScriptResult.OK:
+                await self.room_repo.invalidate(room_id)
+            return result
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError(operation, cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+
+        except redis.RedisError as e:
+            error = DataAccessError(
+                message=f"{operation}脚本执行失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+asyncio 用户仓储
+基于 redis.asyncio，与 UserRepository 使用相同的键、编解码器、过期时间与异常
+（不从 MySQL 回填已降级的用户）
+"""
+
+import redis
+
+from backend.exceptions import DataAccessError, RedisConnectionError, SerializationError
+from backend.models.user import User
+from backend.repositories.user_repository import UserRepositoryBase
+from backend.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+
+class AsyncUserRepository(UserRepositoryBase):
+    """asyncio 用户仓储类"""
+
+    async def save(self, user: User) -> None:
+        """
+        保存用户信息
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            await self.redis.set(self._get_key(user.openid), self.codec.encode_user(user), ex=self._ex)
+            logger.debug("用户保存成功", extra={'user_id': user.openid})
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("保存用户", cause=e)
+            log_exception(logger, error, {'user_id': user.openid})
+            raise error from e
+
+        except (TypeError, ValueError) as e:
+            error = SerializationError(
+                message="用户数据序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_id': user.openid},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="保存用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_id': user.openid},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def get(self, user_id: str) -> User | None:
+        """
+        获取用户信息，不存在时返回 None
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            key = self._get_key(user_id)
+            user_data = await (self.redis.getex(key, ex=self.ttl_seconds) if self.ttl_seconds else self.redis.get(key))
+            if user_data is None:
+                logger.debug("用户不存在", extra={'user_id': user_id})
+                return None
+            return self.codec.decode_user(user_data)
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("获取用户", cause=e)
+            log_exception(logger, error, {'user_id': user_id})
+            raise error from e
+
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="用户数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_id': user_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="获取用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_id': user_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def delete(self, user_id: str) -> None:
+        """
+        删除用户
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            await self.redis.delete(self._get_key(user_id))
+            logger.debug("用户删除成功", extra={'user_id': user_id})
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("删除用户", cause=e)
+            log_exception(logger, error, {'user_id': user_id})
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="删除用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_id': user_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def get_many(self, user_ids: list[str]) -> dict[str, User]:
+        """
+        批量获取用户信息（单次 MGET 往返），不存在的用户不会出现在结果中
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        if not user_ids:
+            return {}
+
+        try:
+            values = await self.redis.mget([self._get_key(user_id) for user_id in user_ids])
+            return {
+                user_id: self.codec.decode_user(user_data)
+                for user_id, user_data in zip(user_ids, values, strict=True)
+                if user_data is not None
+            }
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量获取用户", cause=e)
+            log_exception(logger, error, {'user_ids': user_ids})
+            raise error from e
+
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="用户数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="批量获取用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    async def save_many(self, users: list[User]) -> None:
+        """
+        批量保存用户信息（单次管道往返）
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        if not users:
+            return
+
+        user_ids = [user.openid for user in users]
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            for user in users:
+                pipe.set(self._get_key(user.openid), self.codec.encode_user(user), ex=self._ex)
+            await pipe.execute()
+
+            logger.debug("用户批量保存成功", extra={'count': len(users)})
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量保存用户", cause=e)
+            log_exception(logger, error, {'user_ids': user_ids})
+            raise error from e
+
+        except (TypeError, ValueError) as e:
+            error = SerializationError(
+                message="用户数据序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message="批量保存用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+仓储序列化编解码
+负责房间（json 存储模式）与用户在 Redis 中的字节表示
+
+- json: 原有格式，UTF-8 JSON 文本，时间为 ISO 字符串
+- msgpack: 紧凑二进制格式，MAGIC + 版本号 + msgpack 数组（按字段顺序），
+           时间为 epoch 毫秒整数，房间状态为枚举序号，空值统一存为空字符串/空数组
+
+两种编解码器都能读取对方的格式，切换 REDIS_CODEC 后旧键在下一次整体保存时自然迁移
+"""
+
+import json
+from datetime import UTC, datetime
+
+from backend.models.room import Room, RoomStatus
+from backend.models.user import User
+
+# 0xC1 在 msgpack 规范中永不使用，也不可能是 JSON 文本的首字节
+MAGIC = b'\xc1'
+VERSION = 1
+
+# 字段顺序即二进制格式（版本 1）的数组下标，Lua 脚本中的字段表需与此保持一致
+ROOM_FIELDS = (
+    'room_id', 'creator', 'room_code', 'players', 'status', 'words',
+    'undercovers', 'current_round', 'eliminated', 'created_at', 'last_active',
+)
+USER_FIELDS = ('openid', 'nickname', 'avatar', 'current_room', 'total_games', 'wins')
+STATUS_ORDINALS = tuple(RoomStatus)
+
+
+def is_binary(raw: bytes | str) -> bool:
+    """判断是否为二进制格式"""
+    return isinstance(raw, bytes) and raw[:1] == MAGIC
+
+
+def _from_millis(value: int) -> datetime:
+    return datetime.fromtimestamp(value / 1000, UTC)
+
+
+class Codec:
+    """编解码器基类：写入使用自身格式，读取时按首字节识别格式"""
+
+    name = ""
+
+    def encode_room(self, room: Room) -> bytes | str:
+        raise NotImplementedError
+
+    def encode_user(self, user: User) -> bytes | str:
+        raise NotImplementedError
+
+    def decode_room(self, raw: bytes | str) -> Room:
+        if is_binary(raw):
+            return _binary_codec().decode_binary_room(raw)
+        return Room.from_dict(json.loads(raw))
+
+    def decode_user(self, raw: bytes | str) -> User:
+        if is_binary(raw):
+            return _binary_codec().decode_binary_user(raw)
+        return User.from_dict(json.loads(raw))
+
+    def room_code_of(self, raw: bytes | str) -> str | None:
+        """只取出房间短码（删除房间时使用）"""
+        if is_binary(raw):
+            return self.decode_room(raw).room_code
+        return json.loads(raw).get('room_code')
+
+
+class JsonCodec(Codec):
+    """原有的 JSON 文本格式"""
+
+    name = "json"
+
+    def encode_room(self, room: Room) -> str:
+        return json.dumps(room.to_dict(), ensure_ascii=False)
+
+    def encode_user(self, user: User) -> str:
+        return json.dumps(user.to_dict(), ensure_ascii=False)
+
+
+class MsgpackCodec(Codec):
+    """紧凑二进制格式（需要安装 msgpack）"""
+
+    name = "msgpack"
+
+    def __init__(self):
+        import msgpack
+
+        self._packb = msgpack.packb
+        self._unpackb = msgpack.unpackb
+
+    def _pack(self, values: list) -> bytes:
+        return MAGIC + bytes((VERSION,)) + self._packb(values, use_bin_type=True)
+
+    def _unpack(self, raw: bytes) -> list:
+        version = raw[1]
+        if version != VERSION:
+            raise ValueError(f"不支持的二进制格式版本: {version}")
+        return self._unpackb(raw[2:], raw=False)
+
+    def encode_room(self, room: Room) -> bytes:
+        words = [room.words['civilian'], room.words['undercover']] if room.words else []
+        return self._pack([
+            room.room_id,
+            room.creator,
+            room.room_code,
+            room.players,
+            STATUS_ORDINALS.index(room.status),
+            words,
+            room.undercovers,
+            room.current_round,
+            room.eliminated,
+            room.created_at_ms,
+            room.last_active_ms,
+        ])
+
+    def encode_user(self, user: User) -> bytes:
+        return self._pack([
+            user.openid,
+            user.nickname,
+            user.avatar,
+            user.current_room or "",
+            user.total_games,
+            user.wins,
+        ])
+
+    def decode_binary_room(self, raw: bytes) -> Room:
+        (room_id, creator, room_code, players, status, words,
+         undercovers, current_round, eliminated, created_at, last_active) = self._unpack(raw)
+        return Room(
+            room_id=room_id,
+            creator=creator,
+            room_code=room_code,
+            players=players,
+            status=STATUS_ORDINALS[status],
+            words={'civilian': words[0], 'undercover': words[1]} if words else None,
+            undercovers=undercovers,
+            current_round=current_round,
+            eliminated=eliminated,
+            created_at=_from_millis(created_at),
+            last_active=_from_millis(last_active),
+        )
+
+    def decode_binary_user(self, raw: bytes) -> User:
+        openid, nickname, avatar, current_room, total_games, wins = self._unpack(raw)
+        return User(
+            openid=openid,
+            nickname=nickname,
+            avatar=avatar,
+            current_room=current_room or None,
+            total_games=total_games,
+            wins=wins,
+        )
+
+
+_CODECS = {JsonCodec.name: JsonCodec, MsgpackCodec.name: MsgpackCodec}
+_binary = None
+
+
+def _binary_codec() -> MsgpackCodec:
+    """读取二进制格式时使用的解码器（按需创建）"""
+    global _binary
+    if _binary is None:
+        _binary = MsgpackCodec()
+    return _binary
+
+
+def get_codec(name: str) -> Codec:
+    """
+    根据名称创建编解码器
+
+    Raises:
+        ValueError: 不支持的编解码器名称
+    """
+    codec_cls = _CODECS.get(name)
+    if codec_cls is None:
+        raise ValueError(f"不支持的编解码器: {name}")
+    return codec_cls()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+对局记录存储
+把对局结果批量写入 MySQL：game_records 批量插入 + users 战绩集合式累加，一个批次一个事务（需要应用上下文）
+
+以 room_id 为幂等键（一个房间只有一局）：已写入过的房间直接跳过，重复投递不会重复累加战绩
+"""
+
+import json
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+from sqlalchemy import case, func, insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend.exceptions import DataAccessError
+from backend.extensions import db
+from backend.models.room import Room
+from backend.models.sql import GameRecord, User as SQLUser
+from backend.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class GameResult:
+    """对局结果"""
+    room_id: str
+    creator: str
+    winner_team: str
+    players: list[str] = field(default_factory=list)
+    winners: list[str] = field(default_factory=list)
+    undercover_count: int = 0
+    civilian_word: str | None = None
+    undercover_word: str | None = None
+    ended_at: datetime = field(default_factory=datetime.utcnow)
+
+    @classmethod
+    def from_room(cls, room: Room, winner_team: str) -> 'GameResult':
+        """从结束的房间生成对局结果"""
+        undercover_won = winner_team == "undercover"
+        words = room.words or {}
+        return cls(
+            room_id=room.room_id,
+            creator=room.creator,
+            winner_team=winner_team,
+            players=list(room.players),
+            winners=[player_id for player_id in room.players if room.is_undercover(player_id) == undercover_won],
+            undercover_count=len(room.undercovers),
+            civilian_word=words.get("civilian"),
+            undercover_word=words.get("undercover"),
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data['ended_at'] = self.ended_at.isoformat()
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> 'GameResult':
+        data = json.loads(raw)
+        data['ended_at'] = datetime.fromisoformat(data['ended_at'])
+        return cls(**data)
+
+
+class GameRecordStore:
+    """MySQL 对局记录存储"""
+
+    def save_many(self, results: list[GameResult]) -> int:
+        """
+        批量保存对局结果：一次查询已写入的房间、一次 IN 查询参与者用户 ID、一条批量 INSERT、
+        一条集合式 UPDATE（按 openid 用 CASE 累加 total_games 与 wins）
+
+        Returns:
+            新写入的对局数（已写入过的房间不计）
+
+        Raises:
+            DataAccessError: 写入失败（整批回滚）
+        """
+        by_room = {}
+        for result in results:
+            by_room.setdefault(result.room_id, result)
+        if not by_room:
+            return 0
+        try:
+            existing = {
+                room_id for (room_id,) in
+                db.session.query(GameRecord.room_id).filter(GameRecord.room_id.in_(list(by_room))).all()
+            }
+            fresh = [result for room_id, result in by_room.items() if room_id not in existing]
+            if not fresh:
+                return 0
+
+            openids = list(dict.fromkeys(openid for result in fresh for openid in (result.creator, *result.players)))
+            user_ids = dict(db.session.query(SQLUser.openid, SQLUser.id).filter(SQLUser.openid.in_(openids)).all())
+            db.session.execute(insert(GameRecord), [
+                {
+                    'room_id': result.room_id,
+                    'creator_id': user_ids.get(result.creator),
+                    'winner_team': result.winner_team,
+                    'player_count': len(result.players),
+                    'undercover_count': result.undercover_count,
+                    'civilian_word': result.civilian_word,
+                    'undercover_word': result.undercover_word,
+                    'ended_at': result.ended_at,
+                }
+                for result in fresh
+            ])
+
+            # 只更新 MySQL 中已有的用户
+            games = Counter(player_id for result in fresh for player_id in result.players if player_id in user_ids)
+            wins = Counter(player_id for result in fresh for player_id in result.winners if player_id in user_ids)
+            if games:
+                db.session.query(SQLUser).filter(SQLUser.openid.in_(list(games))).update(
+                    {
+                        SQLUser.total_games: func.coalesce(SQLUser.total_games, 0)
+                        + case(dict(games), value=SQLUser.openid, else_=0),
+                        SQLUser.wins: func.coalesce(SQLUser.wins, 0)
+                        + (case(dict(wins), value=SQLUser.openid, else_=0) if wins else 0),
+                    },
+                    synchronize_session=False,
+                )
+
+            db.session.commit()
+            logger.debug("对局记录写入成功", extra={'count': len(fresh), 'skipped': len(by_room) - len(fresh)})
+            return len(fresh)
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            db.session.rollback()
+            error = DataAccessError(
+                message="写入对局记录失败",
+                error_code="REPO-DATA-001",
+                details={'count': len(by_room)},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+进程内房间缓存（L1）
+热点房间的读取直接命中本进程内存，省去 Redis 往返与反序列化；
+各 worker 通过 Redis pub/sub 失效频道互相通知，TTL 兜底限制最大陈旧时间
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+
+from backend.models.room import Room
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class RoomCache:
+    """
+    有界 LRU + TTL 房间缓存
+
+    - 写入方在写房间的同一管道中 PUBLISH 房间ID，所有进程收到后丢弃本地副本
+    - 读取前记下失效代数，读取期间若该房间被失效则不回填，避免把旧数据写回缓存
+    - 订阅连接异常时清空整个缓存，重连前后漏收的失效由 TTL 兜底
+    - 缓存中保存房间副本，返回的也是副本，调用方修改不会影响缓存
+    """
+
+    CHANNEL = "room_cache:invalidate"
+
+    def __init__(self, redis_client: redis.Redis, max_size: int = 1024, ttl_seconds: float = 1.0):
+        if max_size <= 0:
+            raise ValueError("房间缓存容量必须大于 0")
+        self.redis = redis_client
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Room, float]] = OrderedDict()
+        self._codes: dict[str, str] = {}
+        # 失效日志：room_id -> 最近一次失效时的代数，超出容量时丢弃最旧的记录并抬高下限
+        self._generation = 0
+        self._invalidations: OrderedDict[str, int] = OrderedDict()
+        self._invalidation_floor = 0
+        self._listener = None
+        self._listener_pid = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.resets = 0
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def token(self) -> int:
+        """读取 Redis 前获取当前代数，回填时用于判断期间是否发生过失效"""
+        self._ensure_listener()
+        with self._lock:
+            return self._generation
+
+    def get(self, room_id: str) -> Room | None:
+        """获取缓存的房间副本，未命中或已过期时返回 None"""
+        self._ensure_listener()
+        with self._lock:
+            entry = self._entries.get(room_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            room, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._drop(room_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(room_id)
+            self.hits += 1
+        return room.copy()
+
+    def get_room_id(self, room_code: str) -> str | None:
+        """通过短码查找已缓存房间的ID"""
+        with self._lock:
+            return self._codes.get(room_code)
+
+    def put(self, room: Room, token: int) -> None:
+        """
+        回填缓存
+
+        Args:
+            room: 从 Redis 读取的房间
+            token: 读取前通过 token() 获得的代数
+        """
+        with self._lock:
+            if token < self._invalidation_floor or self._invalidations.get(room.room_id, -1) > token:
+                return
+            self._entries[room.room_id] = (room.copy(), time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(room.room_id)
+            self._codes[room.room_code] = room.room_id
+            while len(self._entries) > self.max_size:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._codes.pop(evicted.room_code, None)
+                self.evictions += 1
+
+    def invalidate(self, room_id: str) -> None:
+        """丢弃本进程内的房间副本"""
+        with self._lock:
+            self._generation += 1
+            self._invalidations[room_id] = self._generation
+            self._invalidations.move_to_end(room_id)
+            while len(self._invalidations) > self.max_size * 4:
+                _, generation = self._invalidations.popitem(last=False)
+                self._invalidation_floor = generation
+            self._drop(room_id)
+            self.invalidations += 1
+
+    def publish(self, pipe, room_id: str) -> None:
+        """在写入房间的管道中追加失效通知，并立即失效本进程副本"""
+        self.invalidate(room_id)
+        pipe.publish(self.CHANNEL, room_id)
+
+    def clear(self) -> None:
+        """清空缓存，并使清空前开始的读取不再回填"""
+        with self._lock:
+            self._generation += 1
+            self._invalidation_floor = self._generation
+            self._invalidations.clear()
+            self._entries.clear()
+            self._codes.clear()
+            self.resets += 1
+
+    def _drop(self, room_id: str) -> None:
+        entry = self._entries.pop(room_id, None)
+        if entry is not None:
+            self._codes.pop(entry[0].room_code, None)
+
+    # ------------------------------------------------------------------
+    # 失效订阅
+    # ------------------------------------------------------------------
+
+    def _ensure_listener(self) -> None:
+        """按需启动订阅线程；gunicorn fork 出的子进程会重新订阅"""
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            # fork 前的缓存内容在子进程中无人维护失效，直接丢弃
+            self._entries.clear()
+            self._codes.clear()
+            self._generation += 1
+            self._invalidation_floor = self._generation
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.CHANNEL: self._on_message})
+            self._listener = pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=self._on_error
+            )
+            self._listener_pid = pid
+        logger.info("房间缓存失效订阅已启动", extra={'channel': self.CHANNEL, 'pid': pid})
+
+    def _on_message(self, message: dict) -> None:
+        room_id = message['data']
+        if isinstance(room_id, bytes):
+            room_id = room_id.decode('utf-8')
+        self.invalidate(room_id)
+
+    def _on_error(self, error: Exception, pubsub, thread) -> None:
+        # 订阅连接异常时清空缓存，稍后由 pubsub 自动重连并重新订阅
+        logger.warning("房间缓存失效订阅异常，已清空缓存", extra={'error': str(error)})
+        self.clear()
+        time.sleep(1.0)
+
+    def get_stats(self) -> dict:
+        """获取统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'resets': self.resets,
+            }
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+房间短码分配器
+从预先生成的 Redis 空闲码池中 SPOP 分配短码（SPOP 本身即均匀随机），
+房间删除或过期后短码回到码池；码池余量不足时自动启用更长一位的短码
+"""
+
+import threading
+import time
+
+import redis
+
+from backend.config.game_config import GameConfig
+from backend.exceptions import DataAccessError, RedisConnectionError
+from backend.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+
+# KEYS: leases, length
+# ARGV: pool_prefix, code_prefix, min_length, now, lease_seconds, reclaim_batch
+# 先回收一批租约到期且房间已不存在的短码，再从最短的非空码池中弹出一个
+_ALLOCATE = """
+local now = tonumber(ARGV[4])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, tonumber(ARGV[6]))
+for _, code in ipairs(expired) do
+    local ttl = redis.call('PTTL', ARGV[2] .. code)
+    if ttl == -2 then
+        redis.call('ZREM', KEYS[1], code)
+        redis.call('SADD', ARGV[1] .. string.len(code), code)
+    elseif ttl > 0 then
+        redis.call('ZADD', KEYS[1], now + ttl / 1000, code)
+    else
+        redis.call('ZADD', KEYS[1], now + tonumber(ARGV[5]), code)
+    end
+end
+local length = tonumber(redis.call('GET', KEYS[2]) or ARGV[3])
+for len = tonumber(ARGV[3]), length do
+    local code = redis.call('SPOP', ARGV[1] .. len)
+    if code then
+        redis.call('ZADD', KEYS[1], now + tonumber(ARGV[5]), code)
+        return {code, redis.call('SCARD', ARGV[1] .. length), length}
+    end
+end
+return {false, 0, length}
+"""
+
+# KEYS: leases
+# ARGV: pool_prefix, code
+# 只归还仍处于租约中的短码，避免重复归还导致同一短码被分配两次
+_RELEASE = """
+if redis.call('ZREM', KEYS[1], ARGV[2]) == 1 then
+    redis.call('SADD', ARGV[1] .. string.len(ARGV[2]), ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class RoomCodeAllocator:
+    """
+    房间短码分配器
+
+    Redis 键：
+    - room_code:pool:<长度>: 该长度的空闲短码集合
+    - room_code:leases: 已分配短码的租约（ZSET，分数为租约到期时间），用于回收过期房间的短码
+    - room_code:length: 当前启用的最大短码长度
+    - room_code:seeded: 已生成码池的长度集合
+    """
+
+    SEED_CHUNK = 1000
+    RECLAIM_BATCH = 16
+
+    def __init__(self, redis_client: redis.Redis, code_prefix: str = "room_code:",
+                 min_length: int = 4, max_length: int = 6, low_watermark: float = 0.1):
+        if not 1 <= min_length <= max_length:
+            raise ValueError(f"短码长度范围无效: {min_length}-{max_length}")
+        self.redis = redis_client
+        self.code_prefix = code_prefix
+        self.min_length = min_length
+        self.max_length = max_length
+        self.low_watermark = low_watermark
+        self.pool_prefix = f"{code_prefix}pool:"
+        self.leases_key = f"{code_prefix}leases"
+        self.length_key = f"{code_prefix}length"
+        self.seeded_key = f"{code_prefix}seeded"
+        self.lease_seconds = GameConfig.ROOM_TIMEOUT_SECONDS
+        self._allocate = redis_client.register_script(_ALLOCATE)
+        self._release = redis_client.register_script(_RELEASE)
+        self._growing = threading.Lock()
+
+    @staticmethod
+    def capacity(length: int) -> int:
+        """指定长度的短码总数（首位非 0）"""
+        return 9 * 10 ** (length - 1)
+
+    def allocate(self) -> str:
+        """
+        分配一个短码
+
+        Returns:
+            房间短码
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 短码已耗尽或其他数据访问错误
+        """
+        try:
+            code, free, length = self._pop()
+            if code is None:
+                # 码池尚未生成，或当前长度已全部分配：同步生成后重试
+                self._grow(int(length), synchronous=True)
+                code, free, length = self._pop()
+                if code is None:
+                    raise DataAccessError(
+                        message="房间短码已耗尽",
+                        error_code="REPO-DATA-002",
+                        details={'length': int(length)},
+                    )
+
+            length = int(length)
+            if length < self.max_length and int(free) < self.capacity(length) * self.low_watermark:
+                self._grow(length, synchronous=False)
+
+            code = code.decode('utf-8') if isinstance(code, bytes) else code
+            logger.debug("房间短码分配成功", extra={'room_code': code, 'free': int(free)})
+            return code
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("分配房间短码", cause=e)
+            log_exception(logger, error)
+            raise error from e
+
+        except DataAccessError as e:
+            log_exception(logger, e)
+            raise
+
+        except Exception as e:
+            error = DataAccessError(
+                message="分配房间短码失败",
+                error_code="REPO-DATA-001",
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+
+    def release(self, room_code: str, client=None) -> None:
+        """
+        归还短码（房间删除时调用）
+
+        Args:
+            room_code: 房间短码
+            client: 可选的管道，与删除房间在同一事务中执行
+        """
+        self._release(keys=[self.leases_key], args=[self.pool_prefix, room_code], client=client)
+
+    def register_release(self, client):
+        """
+        在另一个客户端（如 redis.asyncio）上注册归还脚本
+
+        返回的脚本以 keys=[leases_key], args=[pool_prefix, room_code] 调用
+        """
+        return client.register_script(_RELEASE)
+
+    def _pop(self) -> list:
+        return self._allocate(
+            keys=[self.leases_key, self.length_key],
+            args=[self.pool_prefix, self.code_prefix, self.min_length, time.time(),
+                  self.lease_seconds, self.RECLAIM_BATCH],
+        )
+
+    def _grow(self, length: int, synchronous: bool) -> None:
+        """
+        生成码池：尚未生成当前长度时生成当前长度，否则生成下一长度并启用
+
+        异步模式在后台线程中执行，同一进程内同时只有一个生成任务；
+        跨进程通过 Redis 锁互斥
+        """
+        if not self._growing.acquire(blocking=synchronous):
+            return
+
+        def run():
+            try:
+                target = length if not self.redis.sismember(self.seeded_key, length) else length + 1
+                if target > self.max_length:
+                    return
+                self._seed(target)
+                if target > int(self.redis.get(self.length_key) or 0):
+                    self.redis.set(self.length_key, target)
+                logger.info("房间短码码池已扩容", extra={'length': target})
+            except redis.RedisError as e:
+                logger.warning("房间短码码池扩容失败", extra={'length': length, 'error': str(e)})
+            finally:
+                self._growing.release()
+
+        if synchronous:
+            run()
+        else:
+            threading.Thread(target=run, name="room-code-grow", daemon=True).start()
+
+    def _seed(self, length: int) -> None:
+        """生成指定长度的码池，跳过仍被旧房间占用的短码（改为登记租约，过期后自动回收）"""
+        if self.redis.sismember(self.seeded_key, length):
+            return
+        lock_key = f"{self.pool_prefix}lock:{length}"
+        if not self.redis.set(lock_key, 1, nx=True, ex=300):
+            # 其他进程正在生成，等待其完成
+            for _ in range(300):
+                if self.redis.sismember(self.seeded_key, length):
+                    return
+                time.sleep(0.1)
+            return
+
+        try:
+            pool_key = f"{self.pool_prefix}{length}"
+            expires_at = time.time() + self.lease_seconds
+            start = 10 ** (length - 1)
+            for chunk_start in range(start, 10 ** length, self.SEED_CHUNK):
+                codes = [str(code) for code in range(chunk_start, min(chunk_start + self.SEED_CHUNK, 10 ** length))]
+                pipe = self.redis.pipeline(transaction=False)
+                for code in codes:
+                    pipe.exists(f"{self.code_prefix}{code}")
+                in_use = pipe.execute()
+
+                free = [code for code, used in zip(codes, in_use, strict=True) if not used]
+                leased = {code: expires_at for code, used in zip(codes, in_use, strict=True) if used}
+                pipe = self.redis.pipeline(transaction=False)
+                if free:
+                    pipe.sadd(pool_key, *free)
+                if leased:
+                    pipe.zadd(self.leases_key, leased)
+                pipe.execute()
+
+            self.redis.sadd(self.seeded_key, length)
+        finally:
+            self.redis.delete(lock_key)
+
+    def get_stats(self) -> dict:
+        """码池使用情况"""
+        length = int(self.redis.get(self.length_key) or self.min_length)
+        pipe = self.redis.pipeline(transaction=False)
+        lengths = list(range(self.min_length, length + 1))
+        for code_length in lengths:
+            pipe.scard(f"{self.pool_prefix}{code_length}")
+        pipe.zcard(self.leases_key)
+        *free_counts, leased = pipe.execute()
+
+        pools = {
+            code_length: {'capacity': self.capacity(code_length), 'free': free}
+            for code_length, free in zip(lengths, free_counts, strict=True)
+        }
+        capacity = sum(pool['capacity'] for pool in pools.values())
+        return {
+            'current_length': length,
+            'max_length': self.max_length,
+            'leased': leased,
+            'capacity': capacity,
+            'utilization': leased / capacity if capacity else 0,
+            'pools': pools,
+        }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+房间事件日志
+每个房间一个定长 Redis 流（room:<room_id>:events），记录推送给客户端的每条房间事件；
+事件序号（seq）由 room:<room_id>:event_seq 递增生成并直接用作流条目 ID（0-<seq>），两个键与房间键同路由
+
+断线重连的客户端带上最后收到的 seq 重新订阅，只补发缺失的事件；
+缺口超出保留范围（已被裁剪）或日志已过期时返回 None，由调用方改发房间快照
+"""
+
+import json
+
+from backend.config.game_config import GameConfig
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# KEYS: events, event_seq
+# ARGV: message, maxlen, ttl
+_APPEND = """
+local seq = redis.call('INCR', KEYS[2])
+redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '0-' .. seq, 'm', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return seq
+"""
+
+
+def _entry_seq(entry_id: str | bytes) -> int:
+    """流条目 ID（0-<seq>）中的事件序号"""
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode('utf-8')
+    return int(entry_id.rsplit('-', 1)[1])
+
+
+class RoomEventLog:
+    """房间事件日志"""
+
+    def __init__(self, redis_client, maxlen: int = 100, ttl_seconds: int = GameConfig.ROOM_TIMEOUT_SECONDS):
+        """
+        Args:
+            redis_client: Redis 客户端
+            maxlen: 每个房间保留的事件数（近似裁剪，实际可能略多）
+            ttl_seconds: 日志过期时间，每次追加时刷新
+        """
+        self.redis = redis_client
+        self.maxlen = maxlen
+        self.ttl_seconds = ttl_seconds
+        self._append = redis_client.register_script(_APPEND)
+
+    @staticmethod
+    def _keys(room_id: str) -> list[str]:
+        return [f"room:{room_id}:events", f"room:{room_id}:event_seq"]
+
+    def append(self, room_id: str, message: dict) -> int:
+        """
+        追加一条事件
+
+        Returns:
+            事件序号
+
+        Raises:
+            redis.RedisError: 写入失败
+        """
+        raw = json.dumps(message, ensure_ascii=False, separators=(',', ':'))
+        return int(self._append(keys=self._keys(room_id), args=[raw, self.maxlen, self.ttl_seconds]))
+
+    def latest_seq(self, room_id: str) -> int:
+        """当前最新的事件序号（没有事件时为 0）"""
+        seq = self.redis.get(self._keys(room_id)[1])
+        return int(seq) if seq is not None else 0
+
+    def since(self, room_id: str, last_seq: int) -> list[dict] | None:
+        """
+        读取 last_seq 之后的事件（每条附带 seq）
+
+        Returns:
+            缺失的事件列表（可能为空）；缺口超出保留范围、日志已过期或序号已重置时返回 None
+        """
+        events_key = self._keys(room_id)[0]
+        entries = self.redis.xrange(events_key, min=f"0-{last_seq + 1}", max="+")
+        if entries:
+            if _entry_seq(entries[0][0]) > last_seq + 1:
+                return None
+            events = []
+            for entry_id, fields in entries:
+                message = json.loads(fields.get(b'm') or fields.get('m'))
+                message['seq'] = _entry_seq(entry_id)
+                events.append(message)
+            return events
+        latest = self.latest_seq(room_id)
+        if last_seq > latest:
+            return None
+        return []
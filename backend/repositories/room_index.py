@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+活跃房间索引
+用 Redis 有序集合按最后活跃时间索引所有活跃房间，另按房间状态各维护一个有序集合，
+大厅与运维列表按游标分页读取，每页耗时 O(log n + 页大小)，与 Redis 中的键总数无关
+"""
+
+import time
+
+import redis
+
+from backend.config.game_config import GameConfig
+from backend.models.room import Room, RoomStatus
+
+
+class ActiveRoomIndex:
+    """
+    活跃房间索引
+
+    Redis 键：
+    - rooms:active: 全部活跃房间（ZSET，分数为最后活跃时间的 epoch 毫秒）
+    - rooms:active:<状态>: 对应状态的活跃房间
+
+    房间随 TTL 过期时不会经过仓储删除，列表时先清理超过房间超时时间的条目；
+    Lua 脚本中的 index_room / unindex_room 与此处使用相同的键
+    """
+
+    def __init__(self, redis_client: redis.Redis, prefix: str = "rooms:active"):
+        self.redis = redis_client
+        self.prefix = prefix
+
+    def key(self, status: RoomStatus | None = None) -> str:
+        """索引键，不指定状态时为全部活跃房间"""
+        return f"{self.prefix}:{status.value}" if status is not None else self.prefix
+
+    @staticmethod
+    def score(room: Room) -> int:
+        return room.last_active_ms
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> tuple[int, str]:
+        """
+        解析游标
+
+        Raises:
+            ValueError: 游标格式无效
+        """
+        score, _, room_id = cursor.partition(":")
+        if not room_id:
+            raise ValueError(f"无效的游标: {cursor}")
+        return int(score), room_id
+
+    def add(self, pipe, room: Room) -> None:
+        """在写入房间的管道中登记索引，并从其他状态的索引中移除"""
+        score = self.score(room)
+        pipe.zadd(self.key(), {room.room_id: score})
+        for status in RoomStatus:
+            if status == room.status:
+                pipe.zadd(self.key(status), {room.room_id: score})
+            else:
+                pipe.zrem(self.key(status), room.room_id)
+
+    def touch(self, pipe, room_id: str, score: int) -> None:
+        """在管道中刷新已登记房间的活跃时间（不改变所在的状态索引）"""
+        pipe.zadd(self.key(), {room_id: score}, xx=True)
+        for status in RoomStatus:
+            pipe.zadd(self.key(status), {room_id: score}, xx=True)
+
+    def remove(self, pipe, room_id: str) -> None:
+        """在删除房间的管道中移除索引"""
+        pipe.zrem(self.key(), room_id)
+        for status in RoomStatus:
+            pipe.zrem(self.key(status), room_id)
+
+    def discard(self, room_ids: list[str]) -> None:
+        """移除已不存在的房间（列表回表时发现）"""
+        if not room_ids:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem(self.key(), *room_ids)
+        for status in RoomStatus:
+            pipe.zrem(self.key(status), *room_ids)
+        pipe.execute()
+
+    def prune(self) -> None:
+        """清理超过房间超时时间仍未更新的条目（对应的房间键已过期）"""
+        deadline = int((time.time() - GameConfig.ROOM_TIMEOUT_SECONDS) * 1000)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(self.key(), "-inf", deadline)
+        for status in RoomStatus:
+            pipe.zremrangebyscore(self.key(status), "-inf", deadline)
+        pipe.execute()
+
+    def page(self, status: RoomStatus | None = None, cursor: str | None = None,
+             limit: int = 20) -> tuple[list[str], str | None]:
+        """
+        按最后活跃时间倒序读取一页房间ID
+
+        游标为上一页最后一条的 "分数:房间ID"；分数相同的条目按房间ID倒序排列，
+        从游标位置继续时跳过其中已返回过的部分
+
+        Args:
+            status: 房间状态，None 表示全部
+            cursor: 上一页返回的游标，None 表示第一页
+            limit: 每页条数
+
+        Returns:
+            (房间ID列表, 下一页游标)，没有更多数据时游标为 None
+
+        Raises:
+            ValueError: 游标格式无效
+        """
+        key = self.key(status)
+        max_score, after_id = ("+inf", None) if cursor is None else self.parse_cursor(cursor)
+
+        room_ids: list[str] = []
+        last_score = None
+        offset = 0
+        while True:
+            # 多取一条用于判断是否还有下一页
+            batch = self.redis.zrevrangebyscore(
+                key, max_score, "-inf", start=offset, num=limit + 1, withscores=True
+            )
+            for member, score in batch:
+                room_id = member.decode("utf-8") if isinstance(member, bytes) else member
+                score = int(score)
+                if after_id is not None and score == max_score and room_id >= after_id:
+                    continue
+                if len(room_ids) == limit:
+                    return room_ids, f"{last_score}:{room_ids[-1]}"
+                room_ids.append(room_id)
+                last_score = score
+            if len(batch) <= limit:
+                return room_ids, None
+            offset += len(batch)
+
+    def count(self, status: RoomStatus | None = None) -> int:
+        return self.redis.zcard(self.key(status))
+
+    def get_stats(self) -> dict:
+        """各状态的活跃房间数"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zcard(self.key())
+        for status in RoomStatus:
+            pipe.zcard(self.key(status))
+        total, *counts = pipe.execute()
+        return {
+            'total': total,
+            'by_status': {status.value: count for status, count in zip(RoomStatus, counts, strict=True)},
+        }
@@ -5,29 +5,162 @@
 """
 
 import json
+import time
+from datetime import datetime
 
 import redis
+import redis.asyncio
 
 from backend.config.game_config import GameConfig
 from backend.exceptions import DataAccessError, RedisConnectionError, SerializationError
-from backend.models.room import Room
+from backend.models.room import Room, RoomStatus
+from backend.repositories.codec import Codec, JsonCodec
+from backend.repositories.room_cache import RoomCache
+from backend.repositories.room_code_pool import RoomCodeAllocator
+from backend.repositories.room_index import ActiveRoomIndex
+from backend.repositories.room_watcher import RoomWatcher
 from backend.utils.logger import log_exception, setup_logger
 
 logger = setup_logger(__name__)
 
 
-class RoomRepository:
-    """房间仓储类"""
+class RoomRepositoryBase:
+    """
+    房间仓储公共部分：存储布局、键名与序列化，不做任何 I/O
+    
+    同步仓储（RoomRepository）与 asyncio 仓储（AsyncRoomRepository）共用，
+    _write_hash / _expire_room 等只向管道追加命令，两种管道都适用
+    
+    支持两种存储模式：
+    - json: 整个房间序列化为一个字符串（默认），具体格式由编解码器决定（JSON 文本或紧凑二进制）
+    - hash: 标量字段存为 Redis Hash，players/eliminated 存为 List，undercovers 存为 Set，
+            加入、离开、投票等操作只写入变化的字段
+    
+    可选挂载进程内 L1 缓存（RoomCache），写入时在同一管道中发布失效通知；
+    房间短码由 RoomCodeAllocator 分配，删除房间时在同一事务中归还；
+    活跃房间索引（ActiveRoomIndex）在写入/删除房间的同一事务中维护；
+    每次写入房间都在同一事务中递增房间版本号（room:<room_id>:version），接口据此生成 ETag；
+    notify_changes 开启时同时向 room_changed:<room_id> 发布变更通知，唤醒长轮询（RoomWatcher）
+    """
     
-    def __init__(self, redis_client: redis.Redis):
+    STORAGE_JSON = "json"
+    STORAGE_HASH = "hash"
+    
+    # hash 模式下直接存储在 Hash 中的标量字段
+    SCALAR_FIELDS = ('room_id', 'creator', 'room_code', 'status', 'words', 'current_round', 'created_at', 'last_active')
+    
+    def __init__(self, redis_client: redis.Redis | redis.asyncio.Redis, storage_mode: str = STORAGE_JSON,
+                 cache: RoomCache | None = None, codec: Codec | None = None,
+                 code_allocator: RoomCodeAllocator | None = None,
+                 index: ActiveRoomIndex | None = None, notify_changes: bool = False):
+        if storage_mode not in (self.STORAGE_JSON, self.STORAGE_HASH):
+            raise ValueError(f"不支持的房间存储模式: {storage_mode}")
         self.redis = redis_client
+        self.storage_mode = storage_mode
+        self.cache = cache
+        self.codec = codec or JsonCodec()
         self.prefix = "room:"
         self.code_prefix = "room_code:"  # room_code到room_id的映射
+        self.code_allocator = code_allocator
+        self.index = index or ActiveRoomIndex(redis_client)
+        self.notify_changes = notify_changes
     
     def _get_key(self, room_id: str) -> str:
         """获取房间在Redis中的键"""
         return f"{self.prefix}{room_id}"
     
+    def _get_list_keys(self, room_id: str) -> tuple[str, str, str]:
+        """获取 hash 模式下 players / eliminated / undercovers 集合的键"""
+        key = self._get_key(room_id)
+        return f"{key}:players", f"{key}:eliminated", f"{key}:undercovers"
+    
+    def _version_key(self, room_id: str) -> str:
+        """获取房间版本号的键（与房间键位于同一分片节点）"""
+        return f"{self._get_key(room_id)}:version"
+    
+    def _bump_version(self, pipe, room_id: str) -> None:
+        """在管道中递增房间版本号并刷新其过期时间"""
+        key = self._version_key(room_id)
+        pipe.incr(key)
+        pipe.expire(key, GameConfig.ROOM_TIMEOUT_SECONDS)
+    
+    def _publish_change(self, pipe, room_id: str) -> None:
+        """在管道中追加房间变更通知（未开启时不发布）"""
+        if self.notify_changes:
+            pipe.publish(RoomWatcher.channel(room_id), '')
+    
+    @staticmethod
+    def _decode(value):
+        """处理 bytes 类型的 Redis 返回值"""
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+    
+    @staticmethod
+    def _to_hash(room: Room) -> dict[str, str]:
+        """将房间的标量字段转换为 Hash 映射"""
+        return {
+            'room_id': room.room_id,
+            'creator': room.creator,
+            'room_code': room.room_code,
+            'status': room.status.value,
+            'words': json.dumps(room.words, ensure_ascii=False) if room.words is not None else '',
+            'current_round': str(room.current_round),
+            'created_at': room.created_at.isoformat(),
+            'last_active': room.last_active.isoformat(),
+        }
+    
+    def _from_hash(self, data: dict, players: list, eliminated: list, undercovers: set) -> Room:
+        """从 Hash 及列表数据还原房间对象"""
+        data = {self._decode(k): self._decode(v) for k, v in data.items()}
+        words = data.get('words')
+        return Room(
+            room_id=data['room_id'],
+            creator=data['creator'],
+            room_code=data['room_code'],
+            players=[self._decode(p) for p in players],
+            status=RoomStatus(data.get('status', 'waiting')),
+            words=json.loads(words) if words else None,
+            undercovers=[self._decode(u) for u in undercovers],
+            current_round=int(data.get('current_round', 1)),
+            eliminated=[self._decode(e) for e in eliminated],
+            created_at=datetime.fromisoformat(data['created_at']),
+            last_active=datetime.fromisoformat(data['last_active'])
+        )
+    
+    def _expire_room(self, pipe, room: Room) -> None:
+        """在管道中刷新房间所有键的过期时间"""
+        ttl = GameConfig.ROOM_TIMEOUT_SECONDS
+        pipe.expire(self._get_key(room.room_id), ttl)
+        for list_key in self._get_list_keys(room.room_id):
+            pipe.expire(list_key, ttl)
+        pipe.expire(f"{self.code_prefix}{room.room_code}", ttl)
+    
+    def _write_hash(self, pipe, room: Room) -> None:
+        """在管道中完整写入 hash 模式的房间数据"""
+        key = self._get_key(room.room_id)
+        players_key, eliminated_key, undercovers_key = self._get_list_keys(room.room_id)
+        pipe.delete(key, players_key, eliminated_key, undercovers_key)
+        pipe.hset(key, mapping=self._to_hash(room))
+        if room.players:
+            pipe.rpush(players_key, *room.players)
+        if room.eliminated:
+            pipe.rpush(eliminated_key, *room.eliminated)
+        if room.undercovers:
+            pipe.sadd(undercovers_key, *room.undercovers)
+        pipe.set(f"{self.code_prefix}{room.room_code}", room.room_id)
+        self._expire_room(pipe, room)
+
+
+class RoomRepository(RoomRepositoryBase):
+    """房间仓储类"""
+    
+    def __init__(self, redis_client: redis.Redis, storage_mode: str = RoomRepositoryBase.STORAGE_JSON,
+                 cache: RoomCache | None = None, codec: Codec | None = None,
+                 code_allocator: RoomCodeAllocator | None = None,
+                 index: ActiveRoomIndex | None = None, notify_changes: bool = False):
+        super().__init__(redis_client, storage_mode, cache, codec, code_allocator, index, notify_changes)
+        if self.code_allocator is None:
+            self.code_allocator = RoomCodeAllocator(redis_client, self.code_prefix)
+    
     def save(self, room: Room) -> None:
         """
         保存房间信息
@@ -44,25 +177,20 @@ class RoomRepository:
             # 更新最后活跃时间
             room.update_last_active()
             
-            # 转换为字典并序列化
-            room_data = room.to_dict()
-            room_json = json.dumps(room_data, ensure_ascii=False)
-            
-            # 保存房间数据
-            key = self._get_key(room.room_id)
-            self.redis.setex(
-                key, 
-                GameConfig.ROOM_TIMEOUT_SECONDS, 
-                room_json
-            )
-            
-            # 保存room_code到room_id的映射
-            code_key = f"{self.code_prefix}{room.room_code}"
-            self.redis.setex(
-                code_key,
-                GameConfig.ROOM_TIMEOUT_SECONDS,
-                room.room_id
-            )
+            pipe = self.redis.pipeline(transaction=True)
+            if self.storage_mode == self.STORAGE_HASH:
+                self._write_hash(pipe, room)
+            else:
+                # 房间数据与 room_code 映射在同一事务管道中写入，只需一次往返
+                room_data = self.codec.encode_room(room)
+                pipe.setex(self._get_key(room.room_id), GameConfig.ROOM_TIMEOUT_SECONDS, room_data)
+                pipe.setex(f"{self.code_prefix}{room.room_code}", GameConfig.ROOM_TIMEOUT_SECONDS, room.room_id)
+            self._bump_version(pipe, room.room_id)
+            self.index.add(pipe, room)
+            if self.cache is not None:
+                self.cache.publish(pipe, room.room_id)
+            self._publish_change(pipe, room.room_id)
+            pipe.execute()
             
             logger.debug("房间保存成功", extra={'room_id': room.room_id, 'room_code': room.room_code})
             
@@ -91,12 +219,14 @@ class RoomRepository:
             log_exception(logger, error)
             raise error from e
     
-    def get(self, room_id: str) -> Room | None:
+    def get(self, room_id: str, use_cache: bool = True) -> Room | None:
         """
         获取房间信息
         
         Args:
             room_id: 房间号
+            use_cache: 是否允许命中 L1 缓存；读出后要修改并写回的调用方传 False，
+                避免把其他进程刚写入、本进程缓存尚未失效的旧副本写回
             
         Returns:
             房间对象，不存在时返回 None
@@ -107,19 +237,25 @@ class RoomRepository:
             DataAccessError: 其他数据访问错误
         """
         try:
-            key = self._get_key(room_id)
-            room_json = self.redis.get(key)
-            
-            if room_json is None:
+            token = None
+            if self.cache is not None:
+                if use_cache:
+                    cached = self.cache.get(room_id)
+                    if cached is not None:
+                        return cached
+                token = self.cache.token()
+            
+            if self.storage_mode == self.STORAGE_HASH:
+                room = self._get_hash(room_id)
+            else:
+                room = self._get_json(room_id)
+            
+            if room is None:
                 logger.debug("房间不存在", extra={'room_id': room_id})
                 return None
             
-            # 处理bytes类型的JSON数据
-            if isinstance(room_json, bytes):
-                room_json = room_json.decode('utf-8')
-            
-            room_data = json.loads(room_json)
-            room = Room.from_dict(room_data)
+            if token is not None:
+                self.cache.put(room, token)
             
             logger.debug("房间获取成功", extra={'room_id': room_id})
             return room
@@ -149,6 +285,161 @@ class RoomRepository:
             log_exception(logger, error)
             raise error from e
     
+    def _get_json(self, room_id: str) -> Room | None:
+        """读取 json 模式的房间数据"""
+        room_data = self.redis.get(self._get_key(room_id))
+        if room_data is None:
+            return None
+        return self.codec.decode_room(room_data)
+    
+    def _get_hash(self, room_id: str) -> Room | None:
+        """读取 hash 模式的房间数据，兼容切换前遗留的 json 键"""
+        key = self._get_key(room_id)
+        players_key, eliminated_key, undercovers_key = self._get_list_keys(room_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(key)
+        pipe.lrange(players_key, 0, -1)
+        pipe.lrange(eliminated_key, 0, -1)
+        pipe.smembers(undercovers_key)
+        data, players, eliminated, undercovers = pipe.execute(raise_on_error=False)
+        
+        if isinstance(data, redis.ResponseError):
+            # WRONGTYPE：该房间仍是 json 字符串，按旧格式读取
+            return self._get_json(room_id)
+        if not data:
+            return None
+        return self._from_hash(data, players, eliminated, undercovers)
+    
+    def get_version(self, room_id: str) -> int | None:
+        """
+        读取房间版本号（只有一次 GET，不读取、不反序列化房间数据），用于条件请求
+        
+        Args:
+            room_id: 房间号
+            
+        Returns:
+            版本号，房间不存在时返回 None
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            version = self.redis.get(self._version_key(room_id))
+            return int(version) if version is not None else None
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("获取房间版本", cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="获取房间版本失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def get_with_version(self, room_id: str) -> tuple[Room | None, int | None]:
+        """
+        在同一事务中读取房间与版本号（不经过 L1 缓存），返回的版本号与房间数据一致，可直接作为 ETag
+        
+        Args:
+            room_id: 房间号
+            
+        Returns:
+            (房间对象, 版本号)；房间不存在时为 (None, None)，升级前写入、尚无版本号的房间版本号为 None
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            key = self._get_key(room_id)
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.get(self._version_key(room_id))
+            if self.storage_mode == self.STORAGE_HASH:
+                players_key, eliminated_key, undercovers_key = self._get_list_keys(room_id)
+                pipe.hgetall(key)
+                pipe.lrange(players_key, 0, -1)
+                pipe.lrange(eliminated_key, 0, -1)
+                pipe.smembers(undercovers_key)
+            else:
+                pipe.get(key)
+            version, *values = pipe.execute(raise_on_error=False)
+            
+            if self.storage_mode == self.STORAGE_HASH:
+                data, players, eliminated, undercovers = values
+                if isinstance(data, redis.ResponseError):
+                    # WRONGTYPE：该房间仍是 json 字符串；在版本号之后读取，数据只会比版本号新
+                    room = self._get_json(room_id)
+                else:
+                    room = self._from_hash(data, players, eliminated, undercovers) if data else None
+            else:
+                room = self.codec.decode_room(values[0]) if values[0] is not None else None
+            
+            if room is None:
+                return None, None
+            return room, int(version) if version is not None else None
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("获取房间", cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+            
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="房间数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="获取房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def bump_version(self, room_id: str) -> None:
+        """
+        递增房间版本号（房间数据未变、但接口响应中的关联数据（如玩家昵称）变化时调用）
+        
+        Args:
+            room_id: 房间号
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            self._bump_version(pipe, room_id)
+            self._publish_change(pipe, room_id)
+            pipe.execute()
+        except redis.RedisError as e:
+            # 失败时客户端可能继续使用旧的响应，直到房间下一次写入
+            logger.warning("房间版本号递增失败", extra={'room_id': room_id, 'error': str(e)})
+    
+    def _get_room_code(self, room_id: str) -> str | None:
+        """读取房间短码（不构造完整房间对象）"""
+        key = self._get_key(room_id)
+        if self.storage_mode == self.STORAGE_HASH:
+            try:
+                return self._decode(self.redis.hget(key, 'room_code'))
+            except redis.ResponseError:
+                pass
+        room_data = self.redis.get(key)
+        if room_data is None:
+            return None
+        return self.codec.room_code_of(room_data)
+    
     def delete(self, room_id: str) -> None:
         """
         删除房间
@@ -161,16 +452,19 @@ class RoomRepository:
             DataAccessError: 其他数据访问错误
         """
         try:
-            # 先获取房间信息，以便删除room_code映射
-            room = self.get(room_id)
-            if room:
-                # 删除room_code映射
-                code_key = f"{self.code_prefix}{room.room_code}"
-                self.redis.delete(code_key)
-            
-            # 删除房间数据
-            key = self._get_key(room_id)
-            self.redis.delete(key)
+            # 只读取 room_code，无需构造完整的房间对象
+            room_code = self._get_room_code(room_id)
+            
+            pipe = self.redis.pipeline(transaction=True)
+            if room_code:
+                pipe.delete(f"{self.code_prefix}{room_code}")
+                self.code_allocator.release(room_code, client=pipe)
+            pipe.delete(self._get_key(room_id), *self._get_list_keys(room_id), self._version_key(room_id))
+            self.index.remove(pipe, room_id)
+            if self.cache is not None:
+                self.cache.publish(pipe, room_id)
+            self._publish_change(pipe, room_id)
+            pipe.execute()
             logger.debug("房间删除成功", extra={'room_id': room_id})
             
         except redis.ConnectionError as e:
@@ -188,6 +482,84 @@ class RoomRepository:
             log_exception(logger, error)
             raise error from e
     
+    def allocate_code(self) -> str:
+        """
+        为新房间分配短码
+        
+        Returns:
+            房间短码
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 短码已耗尽或其他数据访问错误
+        """
+        return self.code_allocator.allocate()
+    
+    def release_code(self, room_code: str) -> None:
+        """
+        归还短码（房间被脚本直接删除时使用）
+        
+        Args:
+            room_code: 房间短码
+        """
+        try:
+            self.code_allocator.release(room_code)
+        except redis.RedisError as e:
+            # 归还失败不影响业务，租约到期后会被自动回收
+            logger.warning("房间短码归还失败", extra={'room_code': room_code, 'error': str(e)})
+    
+    def invalidate(self, room_id: str) -> None:
+        """
+        通知各进程房间已被修改：丢弃房间缓存并发布变更通知（供绕过仓储直接修改房间的 Lua 脚本使用）
+        
+        Args:
+            room_id: 房间号
+        """
+        if self.cache is None and not self.notify_changes:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        if self.cache is not None:
+            self.cache.publish(pipe, room_id)
+        self._publish_change(pipe, room_id)
+        pipe.execute()
+    
+    def refresh_directory(self, room_id: str) -> None:
+        """
+        刷新房间在短码目录与活跃索引中的条目（分片模式下脚本只能访问房间所在节点的键，
+        由脚本成功后调用）
+        
+        Args:
+            room_id: 房间号
+        """
+        try:
+            room_code = self._get_room_code(room_id)
+            pipe = self.redis.pipeline(transaction=False)
+            if room_code:
+                pipe.expire(f"{self.code_prefix}{room_code}", GameConfig.ROOM_TIMEOUT_SECONDS)
+            self.index.touch(pipe, room_id, int(time.time() * 1000))
+            pipe.execute()
+        except redis.RedisError as e:
+            # 刷新失败不影响本次操作，下次写入房间时会重新刷新
+            logger.warning("房间目录刷新失败", extra={'room_id': room_id, 'error': str(e)})
+    
+    def remove_directory(self, room_id: str, room_code: str) -> None:
+        """
+        移除已解散房间的短码映射与活跃索引条目并归还短码（分片模式下由离开脚本解散房间后调用）
+        
+        Args:
+            room_id: 房间号
+            room_code: 房间短码
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(f"{self.code_prefix}{room_code}")
+            self.code_allocator.release(room_code, client=pipe)
+            self.index.remove(pipe, room_id)
+            pipe.execute()
+        except redis.RedisError as e:
+            # 短码映射随 TTL 过期、租约到期后短码会被自动回收，索引条目在列表时清理
+            logger.warning("房间目录移除失败", extra={'room_id': room_id, 'room_code': room_code, 'error': str(e)})
+    
     def exists(self, room_id: str) -> bool:
         """
         检查房间是否存在
@@ -274,6 +646,13 @@ class RoomRepository:
             DataAccessError: 其他数据访问错误
         """
         try:
+            if self.cache is not None:
+                cached_id = self.cache.get_room_id(room_code)
+                if cached_id is not None:
+                    room = self.cache.get(cached_id)
+                    if room is not None:
+                        return room
+            
             # 先通过room_code获取room_id
             code_key = f"{self.code_prefix}{room_code}"
             room_id = self.redis.get(code_key)
@@ -312,4 +691,202 @@ class RoomRepository:
                 cause=e
             )
             log_exception(logger, error)
-            raise error from e
\ No newline at end of file
+            raise error from e
+    
+    def get_many(self, room_ids: list[str]) -> dict[str, Room]:
+        """
+        批量获取房间信息（json 模式单次 MGET，hash 模式单次管道往返）
+        
+        Args:
+            room_ids: 房间ID列表
+            
+        Returns:
+            {room_id: 房间对象}，不存在的房间不会出现在结果中
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        if not room_ids:
+            return {}
+        
+        try:
+            rooms = {}
+            if self.storage_mode == self.STORAGE_HASH:
+                pipe = self.redis.pipeline(transaction=False)
+                for room_id in room_ids:
+                    players_key, eliminated_key, undercovers_key = self._get_list_keys(room_id)
+                    pipe.hgetall(self._get_key(room_id))
+                    pipe.lrange(players_key, 0, -1)
+                    pipe.lrange(eliminated_key, 0, -1)
+                    pipe.smembers(undercovers_key)
+                results = pipe.execute(raise_on_error=False)
+                for i, room_id in enumerate(room_ids):
+                    data, players, eliminated, undercovers = results[i * 4:i * 4 + 4]
+                    if isinstance(data, redis.ResponseError):
+                        # WRONGTYPE：切换前遗留的 json 键，单独读取
+                        room = self._get_json(room_id)
+                        if room is not None:
+                            rooms[room_id] = room
+                    elif data:
+                        rooms[room_id] = self._from_hash(data, players, eliminated, undercovers)
+            else:
+                values = self.redis.mget([self._get_key(room_id) for room_id in room_ids])
+                for room_id, room_data in zip(room_ids, values, strict=True):
+                    if room_data is not None:
+                        rooms[room_id] = self.codec.decode_room(room_data)
+            
+            logger.debug("房间批量获取成功", extra={'requested': len(room_ids), 'found': len(rooms)})
+            return rooms
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量获取房间", cause=e)
+            log_exception(logger, error, {'room_ids': room_ids})
+            raise error from e
+            
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="房间数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'room_ids': room_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量获取房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_ids': room_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def list_active(self, status: RoomStatus | None = None, cursor: str | None = None,
+                    limit: int = 20) -> tuple[list[Room], str | None]:
+        """
+        按最后活跃时间倒序分页列出活跃房间
+        
+        Args:
+            status: 房间状态，None 表示全部
+            cursor: 上一页返回的游标，None 表示第一页
+            limit: 每页条数
+            
+        Returns:
+            (房间列表, 下一页游标)，没有更多数据时游标为 None
+            
+        Raises:
+            ValueError: 游标格式无效
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            self.index.prune()
+            room_ids, next_cursor = self.index.page(status, cursor, limit)
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("列出活跃房间", cause=e)
+            log_exception(logger, error, {'status': status.value if status else None})
+            raise error from e
+            
+        except redis.RedisError as e:
+            error = DataAccessError(
+                message="列出活跃房间失败",
+                error_code="REPO-DATA-001",
+                details={'status': status.value if status else None, 'cursor': cursor},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+        
+        rooms = self.get_many(room_ids)
+        missing = [room_id for room_id in room_ids if room_id not in rooms]
+        if missing:
+            # 房间已被脚本删除或过期，顺手清理索引
+            try:
+                self.index.discard(missing)
+            except redis.RedisError as e:
+                logger.warning("活跃房间索引清理失败", extra={'room_ids': missing, 'error': str(e)})
+        return [rooms[room_id] for room_id in room_ids if room_id in rooms], next_cursor
+    
+    # ------------------------------------------------------------------
+    # 局部更新：hash 模式下只写入变化的字段，json 模式下退化为整体保存
+    # ------------------------------------------------------------------
+    
+    def update_fields(self, room: Room, *fields: str) -> None:
+        """
+        只持久化房间的指定字段
+        
+        Args:
+            room: 房间对象（调用方已修改好对应字段）
+            fields: 字段名，支持标量字段及 undercovers
+        """
+        def write(pipe):
+            mapping = self._to_hash(room)
+            scalars = {name: mapping[name] for name in fields if name in self.SCALAR_FIELDS}
+            if scalars:
+                pipe.hset(self._get_key(room.room_id), mapping=scalars)
+            if 'undercovers' in fields:
+                _, _, undercovers_key = self._get_list_keys(room.room_id)
+                pipe.delete(undercovers_key)
+                if room.undercovers:
+                    pipe.sadd(undercovers_key, *room.undercovers)
+        
+        self._save_partial(room, "更新房间字段", write)
+    
+    def _save_partial(self, room: Room, operation: str, write) -> None:
+        """
+        执行局部更新
+        
+        json 模式下整体保存 room，调用方须以 get(room_id, use_cache=False) 读取房间
+        
+        Args:
+            room: 房间对象
+            operation: 操作名称（用于日志）
+            write: 向管道写入变更命令的函数（仅 hash 模式使用）
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        if self.storage_mode != self.STORAGE_HASH:
+            self.save(room)
+            return
+        
+        try:
+            room.update_last_active()
+            pipe = self.redis.pipeline(transaction=True)
+            write(pipe)
+            pipe.hset(self._get_key(room.room_id), 'last_active', room.last_active.isoformat())
+            self._expire_room(pipe, room)
+            self._bump_version(pipe, room.room_id)
+            self.index.add(pipe, room)
+            if self.cache is not None:
+                self.cache.publish(pipe, room.room_id)
+            self._publish_change(pipe, room.room_id)
+            pipe.execute()
+            
+            logger.debug(f"房间{operation}成功", extra={'room_id': room.room_id})
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError(operation, cause=e)
+            log_exception(logger, error, {'room_id': room.room_id})
+            raise error from e
+            
+        except redis.ResponseError:
+            # WRONGTYPE：房间仍是切换前的 json 字符串，整体重写为 hash 格式
+            self.save(room)
+            
+        except Exception as e:
+            error = DataAccessError(
+                message=f"房间{operation}失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room.room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
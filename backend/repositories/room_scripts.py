@@ -0,0 +1,846 @@
+#!/usr/bin/env python3
+"""
+房间原子操作脚本
+通过 Redis Lua 脚本（EVALSHA）在一次往返内完成加入、离开、开始游戏、投票的校验与写入，
+避免多个请求并发读-改-写时互相覆盖 players / eliminated 列表
+"""
+
+import json
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from enum import IntEnum
+
+import redis
+
+from backend.config.game_config import GameConfig
+from backend.exceptions import (
+    DataAccessError,
+    GameAlreadyStartedError,
+    GameEndedError,
+    GameNotStartedError,
+    InvalidPlayerIndexError,
+    PlayerEliminatedError,
+    RedisConnectionError,
+    RoomFullError,
+    RoomNotFoundError,
+    RoomPermissionError,
+    RoomStateError,
+    UserAlreadyInRoomError,
+    UserNotFoundError,
+    UserNotInRoomError,
+)
+from backend.models.room import Room, RoomStatus
+from backend.repositories.room_repository import RoomRepository, RoomRepositoryBase
+from backend.repositories.unit_of_work import unwrap, write_through
+from backend.repositories.user_repository import UserRepositoryBase
+from backend.utils.logger import log_exception, setup_logger
+from backend.utils.redis_shard import is_sharded
+
+logger = setup_logger(__name__)
+
+
+class ScriptResult(IntEnum):
+    """脚本返回的结果码"""
+    OK = 0
+    ROOM_NOT_FOUND = 1
+    ROOM_NOT_WAITING = 2
+    ALREADY_IN_ROOM = 3
+    ROOM_FULL = 4
+    USER_IN_OTHER_ROOM = 5
+    USER_NOT_IN_ROOM = 6
+    GAME_NOT_STARTED = 7
+    NOT_CREATOR = 8
+    INVALID_INDEX = 9
+    PLAYER_ELIMINATED = 10
+    GAME_IN_PROGRESS = 11
+    ROOM_GONE = 12
+    USER_NOT_FOUND = 13
+    STALE_ROOM = 14
+
+
+@dataclass
+class JoinResult:
+    """加入房间结果"""
+    player_count: int
+    nickname: str
+
+
+@dataclass
+class LeaveResult:
+    """离开房间结果"""
+    room_id: str
+    nickname: str
+    room_found: bool = True
+    player_count: int = 0
+    new_creator: str | None = None
+    is_creator: bool = False
+    disbanded: bool = False
+
+
+@dataclass
+class VoteResult:
+    """投票结果"""
+    target_player: str
+    eliminated_count: int
+
+
+# ----------------------------------------------------------------------
+# 编解码（两种存储模式共用）：房间字符串与用户按首字节识别 JSON / 二进制格式，
+# 写回时保持读取时的格式，由 Python 侧的整体保存完成格式迁移；新建用户使用当前编解码器。
+# 字段顺序与 backend.repositories.codec 的 ROOM_FIELDS / USER_FIELDS 一致。
+# cjson 会把空数组编码为 {}，写回前统一修正为 []
+# 所有脚本的最后四个 ARGV 固定为：user_ttl, index_prefix, codec, now_ms（user_ttl 为 0 时用户键不过期）；
+# 活跃房间索引的分数为 now_ms，键与 backend.repositories.room_index 一致
+# 分片模式（backend.utils.redis_shard）下脚本只能访问房间所在节点的键：
+# index_prefix 与 code_prefix 传空串、不传用户键，这三部分由 RoomScripts 在脚本前后单独完成
+# 房间版本号键由脚本按 <房间键>:version 拼出，与房间键按同一 room_id 路由，分片模式下同样可以访问
+# ----------------------------------------------------------------------
+_CODEC_PRELUDE = """
+local USER_TTL = tonumber(ARGV[#ARGV - 3])
+local INDEX = ARGV[#ARGV - 2]
+local CODEC = ARGV[#ARGV - 1]
+local NOW_MS = tonumber(ARGV[#ARGV])
+local ROOM_FIELDS = {'room_id', 'creator', 'room_code', 'players', 'status', 'words',
+    'undercovers', 'current_round', 'eliminated', 'created_at', 'last_active'}
+local USER_FIELDS = {'openid', 'nickname', 'avatar', 'current_room', 'total_games', 'wins'}
+local STATUS = {'waiting', 'playing', 'ended'}
+local STATUS_ORDINAL = {waiting = 0, playing = 1, ended = 2}
+
+local function is_binary(raw)
+    return string.byte(raw, 1) == 193
+end
+local function unpack_fields(raw, fields)
+    if string.byte(raw, 2) ~= 1 then error('unsupported codec version') end
+    local values = cmsgpack.unpack(string.sub(raw, 3))
+    local obj = {_binary = true}
+    for i, name in ipairs(fields) do obj[name] = values[i] end
+    return obj
+end
+local function pack_fields(obj, fields)
+    local values = {}
+    for i, name in ipairs(fields) do values[i] = obj[name] end
+    return '\\193\\1' .. cmsgpack.pack(values)
+end
+
+local function decode_room(raw)
+    if not is_binary(raw) then return cjson.decode(raw) end
+    local room = unpack_fields(raw, ROOM_FIELDS)
+    room.status = STATUS[room.status + 1]
+    return room
+end
+local function encode_room(room)
+    if not room._binary then
+        return (string.gsub(cjson.encode(room), '"(%w+)":{}', '"%1":[]'))
+    end
+    local status = room.status
+    room.status = STATUS_ORDINAL[status]
+    local raw = pack_fields(room, ROOM_FIELDS)
+    room.status = status
+    return raw
+end
+local function touch(room, now)
+    if room._binary then room.last_active = NOW_MS else room.last_active = now end
+end
+
+local function decode_user(raw)
+    local user
+    if is_binary(raw) then
+        user = unpack_fields(raw, USER_FIELDS)
+    else
+        user = cjson.decode(raw)
+    end
+    if user.current_room == cjson.null or user.current_room == '' then user.current_room = nil end
+    return user
+end
+local function encode_user(user)
+    if not user._binary then return cjson.encode(user) end
+    local current_room = user.current_room
+    user.current_room = current_room or ''
+    local raw = pack_fields(user, USER_FIELDS)
+    user.current_room = current_room
+    return raw
+end
+local function save_user(key, user)
+    if USER_TTL > 0 then
+        redis.call('SET', key, encode_user(user), 'EX', USER_TTL)
+    else
+        redis.call('SET', key, encode_user(user))
+    end
+end
+local function new_user(openid)
+    local user = {openid = openid, nickname = '', avatar = '', total_games = 0, wins = 0}
+    if CODEC == 'msgpack' then user._binary = true end
+    return user
+end
+local function has_room(user)
+    return user.current_room ~= nil
+end
+
+local function index_room(room_id, status)
+    if INDEX == '' then return end
+    redis.call('ZADD', INDEX, NOW_MS, room_id)
+    for _, s in ipairs(STATUS) do
+        if s == status then
+            redis.call('ZADD', INDEX .. ':' .. s, NOW_MS, room_id)
+        else
+            redis.call('ZREM', INDEX .. ':' .. s, room_id)
+        end
+    end
+end
+local function unindex_room(room_id)
+    if INDEX == '' then return end
+    redis.call('ZREM', INDEX, room_id)
+    for _, status in ipairs(STATUS) do redis.call('ZREM', INDEX .. ':' .. status, room_id) end
+end
+
+local function bump_version(room_key, ttl)
+    local key = room_key .. ':version'
+    redis.call('INCR', key)
+    redis.call('EXPIRE', key, ttl)
+end
+
+local function expire_code(code_prefix, code, ttl)
+    if code_prefix ~= '' then redis.call('EXPIRE', code_prefix .. code, ttl) end
+end
+local function delete_code(code_prefix, code)
+    if code_prefix ~= '' then redis.call('DEL', code_prefix .. code) end
+end
+"""
+
+# ----------------------------------------------------------------------
+# json 存储模式：房间为单个字符串
+# ----------------------------------------------------------------------
+_JSON_PRELUDE = _CODEC_PRELUDE
+
+_JOIN_JSON = _JSON_PRELUDE + """
+-- KEYS: room, user（分片模式下无用户键）
+-- ARGV: user_id, max_players, now, ttl, nickname_prefix, code_prefix
+local user_raw = KEYS[2] and redis.call('GET', KEYS[2])
+local user
+if user_raw then
+    user = decode_user(user_raw)
+    if has_room(user) then return {5, user.current_room} end
+end
+local raw = redis.call('GET', KEYS[1])
+if not raw then return {1} end
+local room = decode_room(raw)
+if room.status ~= 'waiting' then return {2, room.status} end
+for _, p in ipairs(room.players) do
+    if p == ARGV[1] then return {3} end
+end
+local count = #room.players
+if count >= tonumber(ARGV[2]) then return {4} end
+table.insert(room.players, ARGV[1])
+count = count + 1
+touch(room, ARGV[3])
+redis.call('SET', KEYS[1], encode_room(room), 'EX', ARGV[4])
+bump_version(KEYS[1], ARGV[4])
+expire_code(ARGV[6], room.room_code, ARGV[4])
+index_room(room.room_id, room.status)
+if not KEYS[2] then return {0, count, ARGV[5] .. count} end
+if not user then user = new_user(ARGV[1]) end
+user.nickname = ARGV[5] .. count
+user.current_room = room.room_id
+save_user(KEYS[2], user)
+return {0, count, user.nickname}
+"""
+
+_LEAVE_JSON = _JSON_PRELUDE + """
+-- KEYS: room, user（分片模式下无用户键，返回的昵称为空串）
+-- ARGV: user_id, room_id, now, ttl, code_prefix
+local user
+local nickname = ''
+if KEYS[2] then
+    local user_raw = redis.call('GET', KEYS[2])
+    if not user_raw then return {13} end
+    user = decode_user(user_raw)
+    if not has_room(user) then return {6} end
+    if user.current_room ~= ARGV[2] then return {14} end
+    nickname = user.nickname or ''
+    user.current_room = nil
+end
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+    if user then save_user(KEYS[2], user) end
+    return {12, nickname}
+end
+local room = decode_room(raw)
+if room.status == 'playing' then return {11} end
+local players = {}
+for _, p in ipairs(room.players) do
+    if p ~= ARGV[1] then table.insert(players, p) end
+end
+local is_creator = room.creator == ARGV[1]
+if is_creator and #players > 0 then room.creator = players[1] end
+if user then save_user(KEYS[2], user) end
+if #players == 0 then
+    redis.call('DEL', KEYS[1], KEYS[1] .. ':version')
+    delete_code(ARGV[5], room.room_code)
+    unindex_room(ARGV[2])
+    return {0, 0, '', is_creator and 1 or 0, 1, nickname, room.room_code}
+end
+room.players = players
+touch(room, ARGV[3])
+redis.call('SET', KEYS[1], encode_room(room), 'EX', ARGV[4])
+bump_version(KEYS[1], ARGV[4])
+expire_code(ARGV[5], room.room_code, ARGV[4])
+index_room(room.room_id, room.status)
+return {0, #players, room.creator, is_creator and 1 or 0, 0, nickname}
+"""
+
+_START_JSON = _JSON_PRELUDE + """
+-- KEYS: room
+-- ARGV: user_id, players（JSON，分配身份时读到的玩家列表）, undercovers（JSON）, words（JSON）, now, ttl, code_prefix
+local raw = redis.call('GET', KEYS[1])
+if not raw then return {1} end
+local room = decode_room(raw)
+if room.creator ~= ARGV[1] then return {8} end
+if room.status ~= 'waiting' then return {2, room.status} end
+local expected = cjson.decode(ARGV[2])
+if #room.players ~= #expected then return {14} end
+for i, p in ipairs(room.players) do
+    if p ~= expected[i] then return {14} end
+end
+room.undercovers = cjson.decode(ARGV[3])
+room.words = cjson.decode(ARGV[4])
+room.status = 'playing'
+room.current_round = 1
+touch(room, ARGV[5])
+redis.call('SET', KEYS[1], encode_room(room), 'EX', ARGV[6])
+bump_version(KEYS[1], ARGV[6])
+expire_code(ARGV[7], room.room_code, ARGV[6])
+index_room(room.room_id, room.status)
+return {0}
+"""
+
+_VOTE_JSON = _JSON_PRELUDE + """
+-- KEYS: room
+-- ARGV: voter_id, target_index, now, ttl, code_prefix
+local raw = redis.call('GET', KEYS[1])
+if not raw then return {1} end
+local room = decode_room(raw)
+if room.status ~= 'playing' then return {7} end
+if room.creator ~= ARGV[1] then return {8} end
+local index = tonumber(ARGV[2])
+local count = #room.players
+if index < 1 or index > count then return {9, count} end
+local target = room.players[index]
+for _, e in ipairs(room.eliminated) do
+    if e == target then return {10, target} end
+end
+table.insert(room.eliminated, target)
+touch(room, ARGV[3])
+redis.call('SET', KEYS[1], encode_room(room), 'EX', ARGV[4])
+bump_version(KEYS[1], ARGV[4])
+expire_code(ARGV[5], room.room_code, ARGV[4])
+index_room(room.room_id, room.status)
+return {0, target, #room.eliminated}
+"""
+
+# ----------------------------------------------------------------------
+# hash 存储模式：标量字段在 Hash 中，players/eliminated 为 List
+# ----------------------------------------------------------------------
+_HASH_PRELUDE = _CODEC_PRELUDE + """
+local function touch_room(room_keys, now, ttl, code_prefix)
+    redis.call('HSET', room_keys[1], 'last_active', now)
+    for i = 1, 4 do redis.call('EXPIRE', room_keys[i], ttl) end
+    bump_version(room_keys[1], ttl)
+    local fields = redis.call('HMGET', room_keys[1], 'room_id', 'room_code', 'status')
+    expire_code(code_prefix, fields[2], ttl)
+    index_room(fields[1], fields[3])
+end
+"""
+
+_JOIN_HASH = _HASH_PRELUDE + """
+-- KEYS: room, players, eliminated, undercovers, user（分片模式下无用户键）
+-- ARGV: user_id, max_players, now, ttl, nickname_prefix, code_prefix
+local user_raw = KEYS[5] and redis.call('GET', KEYS[5])
+local user
+if user_raw then
+    user = decode_user(user_raw)
+    if has_room(user) then return {5, user.current_room} end
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then return {1} end
+local status = redis.call('HGET', KEYS[1], 'status')
+if status ~= 'waiting' then return {2, status} end
+if redis.call('LPOS', KEYS[2], ARGV[1]) then return {3} end
+if redis.call('LLEN', KEYS[2]) >= tonumber(ARGV[2]) then return {4} end
+local count = redis.call('RPUSH', KEYS[2], ARGV[1])
+touch_room(KEYS, ARGV[3], ARGV[4], ARGV[6])
+if not KEYS[5] then return {0, count, ARGV[5] .. count} end
+if not user then user = new_user(ARGV[1]) end
+user.nickname = ARGV[5] .. count
+user.current_room = redis.call('HGET', KEYS[1], 'room_id')
+save_user(KEYS[5], user)
+return {0, count, user.nickname}
+"""
+
+_LEAVE_HASH = _HASH_PRELUDE + """
+-- KEYS: room, players, eliminated, undercovers, user（分片模式下无用户键，返回的昵称为空串）
+-- ARGV: user_id, room_id, now, ttl, code_prefix
+local user
+local nickname = ''
+if KEYS[5] then
+    local user_raw = redis.call('GET', KEYS[5])
+    if not user_raw then return {13} end
+    user = decode_user(user_raw)
+    if not has_room(user) then return {6} end
+    if user.current_room ~= ARGV[2] then return {14} end
+    nickname = user.nickname or ''
+    user.current_room = nil
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    if user then save_user(KEYS[5], user) end
+    return {12, nickname}
+end
+if redis.call('HGET', KEYS[1], 'status') == 'playing' then return {11} end
+if user then save_user(KEYS[5], user) end
+redis.call('LREM', KEYS[2], 0, ARGV[1])
+local remaining = redis.call('LLEN', KEYS[2])
+local creator = redis.call('HGET', KEYS[1], 'creator')
+local is_creator = creator == ARGV[1]
+if remaining == 0 then
+    local code = redis.call('HGET', KEYS[1], 'room_code')
+    redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[1] .. ':version')
+    delete_code(ARGV[5], code)
+    unindex_room(ARGV[2])
+    return {0, 0, '', is_creator and 1 or 0, 1, nickname, code}
+end
+if is_creator then
+    creator = redis.call('LINDEX', KEYS[2], 0)
+    redis.call('HSET', KEYS[1], 'creator', creator)
+end
+touch_room(KEYS, ARGV[3], ARGV[4], ARGV[5])
+return {0, remaining, creator, is_creator and 1 or 0, 0, nickname}
+"""
+
+_START_HASH = _HASH_PRELUDE + """
+-- KEYS: room, players, eliminated, undercovers
+-- ARGV: user_id, players（JSON，分配身份时读到的玩家列表）, undercovers（JSON）, words（JSON）, now, ttl, code_prefix
+if redis.call('EXISTS', KEYS[1]) == 0 then return {1} end
+local fields = redis.call('HMGET', KEYS[1], 'status', 'creator')
+if fields[2] ~= ARGV[1] then return {8} end
+if fields[1] ~= 'waiting' then return {2, fields[1]} end
+local expected = cjson.decode(ARGV[2])
+local players = redis.call('LRANGE', KEYS[2], 0, -1)
+if #players ~= #expected then return {14} end
+for i, p in ipairs(players) do
+    if p ~= expected[i] then return {14} end
+end
+redis.call('DEL', KEYS[4])
+local undercovers = cjson.decode(ARGV[3])
+for _, u in ipairs(undercovers) do redis.call('SADD', KEYS[4], u) end
+redis.call('HSET', KEYS[1], 'status', 'playing', 'words', ARGV[4], 'current_round', '1')
+touch_room(KEYS, ARGV[5], ARGV[6], ARGV[7])
+return {0}
+"""
+
+_VOTE_HASH = _HASH_PRELUDE + """
+-- KEYS: room, players, eliminated, undercovers
+-- ARGV: voter_id, target_index, now, ttl, code_prefix
+if redis.call('EXISTS', KEYS[1]) == 0 then return {1} end
+local fields = redis.call('HMGET', KEYS[1], 'status', 'creator')
+if fields[1] ~= 'playing' then return {7} end
+if fields[2] ~= ARGV[1] then return {8} end
+local index = tonumber(ARGV[2])
+local count = redis.call('LLEN', KEYS[2])
+if index < 1 or index > count then return {9, count} end
+local target = redis.call('LINDEX', KEYS[2], index - 1)
+if redis.call('LPOS', KEYS[3], target) then return {10, target} end
+local eliminated = redis.call('RPUSH', KEYS[3], target)
+touch_room(KEYS, ARGV[3], ARGV[4], ARGV[5])
+return {0, target, eliminated}
+"""
+
+# ----------------------------------------------------------------------
+# 分片模式：用户键与房间键可能不在同一节点，加入/离开拆成用户节点与房间节点上的两步。
+# 加入时先占用用户（写入 current_room），房间侧失败时释放，成功后写入昵称；
+# 离开时房间侧成功后再释放用户。释放只在 current_room 仍为该房间时生效
+# ----------------------------------------------------------------------
+_CLAIM_USER = _CODEC_PRELUDE + """
+-- KEYS: user
+-- ARGV: user_id, room_id
+local raw = redis.call('GET', KEYS[1])
+local user
+if raw then
+    user = decode_user(raw)
+    if has_room(user) then return {5, user.current_room} end
+else
+    user = new_user(ARGV[1])
+end
+user.current_room = ARGV[2]
+save_user(KEYS[1], user)
+return {0}
+"""
+
+_NAME_USER = _CODEC_PRELUDE + """
+-- KEYS: user
+-- ARGV: room_id, nickname
+local raw = redis.call('GET', KEYS[1])
+if not raw then return {13} end
+local user = decode_user(raw)
+if user.current_room ~= ARGV[1] then return {14} end
+user.nickname = ARGV[2]
+save_user(KEYS[1], user)
+return {0}
+"""
+
+_RELEASE_USER = _CODEC_PRELUDE + """
+-- KEYS: user
+-- ARGV: room_id
+local raw = redis.call('GET', KEYS[1])
+if not raw then return {13} end
+local user = decode_user(raw)
+if not has_room(user) then return {6} end
+if user.current_room ~= ARGV[1] then return {14} end
+user.current_room = nil
+save_user(KEYS[1], user)
+return {0, user.nickname or ''}
+"""
+
+
+class RoomScriptsBase:
+    """
+    房间原子操作脚本公共部分：脚本选择、参数拼装与结果码翻译，不做任何 I/O
+
+    同步（RoomScripts）与 asyncio（AsyncRoomScripts）两种实现共用，
+    结果码在这里统一翻译为 backend.exceptions 中的业务异常
+    """
+
+    NICKNAME_PREFIX = "玩家"
+
+    def __init__(self, room_repo: RoomRepositoryBase, user_repo: UserRepositoryBase):
+        self.room_repo = room_repo
+        self.user_repo = user_repo
+        client = room_repo.redis
+        self.sharded = is_sharded(client)
+        if self.sharded:
+            self._claim_user = client.register_script(_CLAIM_USER)
+            self._name_user = client.register_script(_NAME_USER)
+            self._release_user = client.register_script(_RELEASE_USER)
+        if room_repo.storage_mode == RoomRepositoryBase.STORAGE_HASH:
+            self._join = client.register_script(_JOIN_HASH)
+            self._leave = client.register_script(_LEAVE_HASH)
+            self._start = client.register_script(_START_HASH)
+            self._vote = client.register_script(_VOTE_HASH)
+        else:
+            self._join = client.register_script(_JOIN_JSON)
+            self._leave = client.register_script(_LEAVE_JSON)
+            self._start = client.register_script(_START_JSON)
+            self._vote = client.register_script(_VOTE_JSON)
+
+    def _room_keys(self, room_id: str) -> list[str]:
+        """脚本需要的房间键（json 模式只有一个键）"""
+        key = self.room_repo._get_key(room_id)
+        if self.room_repo.storage_mode == RoomRepositoryBase.STORAGE_HASH:
+            return [key, *self.room_repo._get_list_keys(room_id)]
+        return [key]
+
+    def _user_keys(self, user_id: str) -> list[str]:
+        """脚本需要的用户键（分片模式下用户由单独的脚本处理）"""
+        return [] if self.sharded else [self.user_repo._get_key(user_id)]
+
+    @property
+    def _code_prefix(self) -> str:
+        return "" if self.sharded else self.room_repo.code_prefix
+
+    def _join_call(self, room_id: str, user_id: str) -> tuple[list[str], list]:
+        keys = [*self._room_keys(room_id), *self._user_keys(user_id)]
+        args = [
+            user_id, GameConfig.MAX_PLAYERS, self._now(), GameConfig.ROOM_TIMEOUT_SECONDS,
+            self.NICKNAME_PREFIX, self._code_prefix,
+        ]
+        return keys, args
+
+    def _leave_call(self, room_id: str, user_id: str) -> tuple[list[str], list]:
+        keys = [*self._room_keys(room_id), *self._user_keys(user_id)]
+        args = [user_id, room_id, self._now(), GameConfig.ROOM_TIMEOUT_SECONDS, self._code_prefix]
+        return keys, args
+
+    def _start_call(self, room: Room, user_id: str) -> tuple[list[str], list]:
+        keys = self._room_keys(room.room_id)
+        args = [
+            user_id, json.dumps(room.players), json.dumps(room.undercovers),
+            json.dumps(room.words, ensure_ascii=False), self._now(), GameConfig.ROOM_TIMEOUT_SECONDS,
+            self._code_prefix,
+        ]
+        return keys, args
+
+    def _vote_call(self, room_id: str, voter_id: str, target_index: int) -> tuple[list[str], list]:
+        keys = self._room_keys(room_id)
+        args = [voter_id, target_index, self._now(), GameConfig.ROOM_TIMEOUT_SECONDS, self._code_prefix]
+        return keys, args
+
+    def _script_args(self, args: list) -> list:
+        """追加所有脚本共用的最后四个参数"""
+        index_prefix = "" if self.sharded else self.room_repo.index.prefix
+        return [
+            *args, self.user_repo.ttl_seconds, index_prefix, self.user_repo.codec.name, int(time.time() * 1000),
+        ]
+
+    def _join_result(self, result: list, room_id: str, user_id: str) -> JoinResult:
+        code = ScriptResult(result[0])
+
+        if code == ScriptResult.USER_IN_OTHER_ROOM:
+            raise UserAlreadyInRoomError(user_id, self._decode(result[1]))
+        if code == ScriptResult.ROOM_NOT_FOUND:
+            raise RoomNotFoundError(room_id)
+        if code == ScriptResult.ROOM_NOT_WAITING:
+            raise RoomStateError(
+                message="游戏已经开始，无法加入房间",
+                error_code="ROOM-STATE-003",
+                details={"room_id": room_id, "status": self._decode(result[1])},
+            )
+        if code == ScriptResult.ALREADY_IN_ROOM:
+            raise UserAlreadyInRoomError(user_id, room_id)
+        if code == ScriptResult.ROOM_FULL:
+            raise RoomFullError(room_id, GameConfig.MAX_PLAYERS)
+
+        return JoinResult(player_count=int(result[1]), nickname=self._decode(result[2]))
+
+    def _leave_result(self, result: list, room_id: str, user_id: str) -> LeaveResult | None:
+        """翻译离开结果，读取用户后其所在房间已变化（需要重试）时返回 None"""
+        code = ScriptResult(result[0])
+
+        if code == ScriptResult.STALE_ROOM:
+            return None
+        if code == ScriptResult.USER_NOT_FOUND:
+            raise UserNotFoundError(user_id)
+        if code == ScriptResult.USER_NOT_IN_ROOM:
+            raise UserNotInRoomError(user_id)
+        if code == ScriptResult.GAME_IN_PROGRESS:
+            raise RoomStateError(
+                message="游戏进行中，无法离开房间",
+                error_code="ROOM-STATE-004",
+                details={"room_id": room_id, "user_id": user_id},
+            )
+        if code == ScriptResult.ROOM_GONE:
+            return LeaveResult(room_id=room_id, nickname=self._decode(result[1]), room_found=False)
+
+        return LeaveResult(
+            room_id=room_id,
+            nickname=self._decode(result[5]),
+            player_count=int(result[1]),
+            new_creator=self._decode(result[2]) or None,
+            is_creator=bool(result[3]),
+            disbanded=bool(result[4]),
+        )
+
+    def _start_result(self, result: list, room_id: str, user_id: str) -> bool:
+        """翻译开始游戏结果，分配身份后玩家列表已变化（需要重试）时返回 False"""
+        code = ScriptResult(result[0])
+
+        if code == ScriptResult.STALE_ROOM:
+            return False
+        if code == ScriptResult.ROOM_NOT_FOUND:
+            raise RoomNotFoundError(room_id)
+        if code == ScriptResult.NOT_CREATOR:
+            raise RoomPermissionError(user_id, "开始游戏")
+        if code == ScriptResult.ROOM_NOT_WAITING:
+            if self._decode(result[1]) == RoomStatus.PLAYING.value:
+                raise GameAlreadyStartedError()
+            raise GameEndedError()
+
+        return True
+
+    def _vote_result(self, result: list, room_id: str, voter_id: str, target_index: int) -> VoteResult:
+        code = ScriptResult(result[0])
+
+        if code == ScriptResult.ROOM_NOT_FOUND:
+            raise RoomNotFoundError(room_id)
+        if code == ScriptResult.GAME_NOT_STARTED:
+            raise GameNotStartedError()
+        if code == ScriptResult.NOT_CREATOR:
+            raise RoomPermissionError(voter_id, "投票")
+        if code == ScriptResult.INVALID_INDEX:
+            raise InvalidPlayerIndexError(target_index, int(result[1]))
+        if code == ScriptResult.PLAYER_ELIMINATED:
+            raise PlayerEliminatedError(self._decode(result[1]))
+
+        return VoteResult(target_player=self._decode(result[1]), eliminated_count=int(result[2]))
+
+    @staticmethod
+    def _user_room(user, user_id: str) -> str:
+        if not user:
+            raise UserNotFoundError(user_id)
+        if not user.has_joined_room():
+            raise UserNotInRoomError(user_id)
+        return user.current_room
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(UTC).isoformat()
+
+    @staticmethod
+    def _decode(value):
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class RoomScripts(RoomScriptsBase):
+    """
+    房间原子操作脚本层
+
+    脚本通过 register_script 注册，调用时走 EVALSHA（脚本缓存丢失时自动回退到 EVAL），
+    根据 RoomRepository 的存储模式选择对应的脚本。
+    """
+
+    def join(self, room_id: str, user_id: str) -> JoinResult:
+        """
+        原子地加入房间：校验用户状态、房间状态、成员关系与人数上限，并写入房间和用户
+
+        Raises:
+            UserAlreadyInRoomError / RoomNotFoundError / RoomStateError / RoomFullError
+        """
+        # 脚本直接读取用户键，已降级到 MySQL 的用户先回填，避免被当作新用户覆盖战绩
+        self.user_repo.ensure_loaded(user_id)
+        keys, args = self._join_call(room_id, user_id)
+        if self.sharded:
+            return self._join_sharded(room_id, user_id, keys, args)
+        result = self._run(self._join, "加入房间", room_id, keys, args, user_id=user_id)
+        return self._join_result(result, room_id, user_id)
+
+    def _join_sharded(self, room_id: str, user_id: str, keys: list[str], args: list) -> JoinResult:
+        """分片模式的加入：先占用用户，再加入房间，房间侧失败时释放用户"""
+        user_keys = [self.user_repo._get_key(user_id)]
+        claim = self._run(self._claim_user, "加入房间", room_id, user_keys, [user_id, room_id],
+                          user_id=user_id, room_write=False)
+        if claim[0] != ScriptResult.OK:
+            return self._join_result(claim, room_id, user_id)
+
+        try:
+            result = self._run(self._join, "加入房间", room_id, keys, args, user_id=user_id)
+            join_result = self._join_result(result, room_id, user_id)
+        except Exception:
+            self._run(self._release_user, "加入房间", room_id, user_keys, [room_id],
+                      user_id=user_id, room_write=False)
+            raise
+
+        self._run(self._name_user, "加入房间", room_id, user_keys, [room_id, join_result.nickname],
+                  user_id=user_id, room_write=False)
+        self.room_repo.refresh_directory(room_id)
+        return join_result
+
+    def leave(self, user_id: str, max_attempts: int = 3) -> LeaveResult:
+        """
+        原子地离开当前房间：必要时转移房主，房间为空时解散
+
+        Raises:
+            UserNotFoundError / UserNotInRoomError / RoomStateError
+        """
+        for _ in range(max_attempts):
+            room_id = self._user_room(self.user_repo.get(user_id), user_id)
+            keys, args = self._leave_call(room_id, user_id)
+            result = self._run(self._leave, "离开房间", room_id, keys, args, user_id=user_id)
+            if self.sharded:
+                result = self._release_sharded(result, room_id, user_id)
+            leave_result = self._leave_result(result, room_id, user_id)
+            if leave_result is None:
+                # 读取用户后其所在房间已变化，重新读取后重试
+                continue
+            if leave_result.disbanded:
+                # 房间已解散，立即归还短码
+                if self.sharded:
+                    self.room_repo.remove_directory(room_id, self._decode(result[6]))
+                else:
+                    self.room_repo.release_code(self._decode(result[6]))
+            elif self.sharded and leave_result.room_found:
+                self.room_repo.refresh_directory(room_id)
+            return leave_result
+
+        raise UserNotInRoomError(user_id)
+
+    def start(self, room: Room, user_id: str) -> bool:
+        """
+        原子地开始游戏：房间仍为等待状态、玩家列表与分配身份时读到的一致时，写入卧底、词语与游戏状态
+
+        Args:
+            room: 已由调用方分配好身份的房间（以 get(room_id, use_cache=False) 读取）
+            user_id: 发起开始的用户（须为房主）
+
+        Returns:
+            是否已开始；期间有玩家加入或离开时返回 False，调用方重新读取房间后重试
+
+        Raises:
+            RoomNotFoundError / RoomPermissionError / GameAlreadyStartedError / GameEndedError
+        """
+        keys, args = self._start_call(room, user_id)
+        result = self._run(self._start, "开始游戏", room.room_id, keys, args)
+        started = self._start_result(result, room.room_id, user_id)
+        if started and self.sharded:
+            self.room_repo.refresh_directory(room.room_id)
+        return started
+
+    def vote(self, room_id: str, voter_id: str, target_index: int) -> VoteResult:
+        """
+        原子地投票淘汰：校验游戏状态、房主权限、序号范围与重复淘汰，并追加淘汰记录
+
+        Raises:
+            RoomNotFoundError / GameNotStartedError / RoomPermissionError /
+            InvalidPlayerIndexError / PlayerEliminatedError
+        """
+        keys, args = self._vote_call(room_id, voter_id, target_index)
+        result = self._run(self._vote, "投票淘汰", room_id, keys, args)
+        vote_result = self._vote_result(result, room_id, voter_id, target_index)
+        if self.sharded:
+            self.room_repo.refresh_directory(room_id)
+        return vote_result
+
+    def _release_sharded(self, result: list, room_id: str, user_id: str) -> list:
+        """分片模式的离开：房间侧成功（或房间已不存在）后释放用户，并补上用户昵称"""
+        code = ScriptResult(result[0])
+        if code not in (ScriptResult.OK, ScriptResult.ROOM_GONE):
+            return result
+
+        released = self._run(self._release_user, "离开房间", room_id, [self.user_repo._get_key(user_id)],
+                             [room_id], user_id=user_id, room_write=False)
+        if code == ScriptResult.ROOM_GONE:
+            return released if released[0] != ScriptResult.OK else [code, released[1]]
+        nickname = released[1] if released[0] == ScriptResult.OK else ''
+        return [*result[:5], nickname, *result[6:]]
+
+    def _run(self, script, operation: str, room_id: str, keys: list[str], args: list,
+             user_id: str | None = None, room_write: bool = True) -> list:
+        """
+        执行脚本
+
+        脚本直接读写 Redis：执行前写回请求身份映射中相关的脏对象，执行后丢弃其缓存，
+        修改房间成功时通知各进程失效 L1 房间缓存（活跃房间索引由脚本自身维护）。
+        hash 模式下若房间仍是切换前的 json 字符串（WRONGTYPE），先整体重写为 hash 再重试一次。
+        分片扩容迁移期间，脚本内部拼出的房间版本号键不经过路由，先随房间键一并迁移，
+        避免版本号在新节点上从头计数、与客户端缓存的旧 ETag 重合
+        """
+        user_ids = [user_id] if user_id else []
+        args = self._script_args(args)
+        try:
+            if self.sharded and room_write:
+                self.room_repo.redis.ensure_migrated([self.room_repo._version_key(room_id)])
+            with write_through(self.room_repo, self.user_repo, room_ids=[room_id], user_ids=user_ids):
+                try:
+                    result = script(keys=keys, args=args)
+                except redis.ResponseError as e:
+                    if "WRONGTYPE" not in str(e) or self.room_repo.storage_mode != RoomRepository.STORAGE_HASH:
+                        raise
+                    store = unwrap(self.room_repo)
+                    room = store.get(room_id, use_cache=False)
+                    if room:
+                        store.save(room)
+                    result = script(keys=keys, args=args)
+                if room_write and result[0] == ScriptResult.OK:
+                    self.room_repo.invalidate(room_id)
+                return result
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError(operation, cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+
+        except redis.RedisError as e:
+            error = DataAccessError(
+                message=f"{operation}脚本执行失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
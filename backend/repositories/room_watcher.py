@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+房间变更订阅（长轮询）
+房间仓储每次写入房间都向 room_changed:<room_id> 频道发布通知；
+每个进程只有一条 PSUBSCRIBE room_changed:* 连接和一个分发线程，按房间唤醒本进程内等待的请求
+
+等待者不额外占用线程：请求在自己的线程里等待一个 Event（eventlet / gevent 打过补丁后为协程，
+单个 worker 可挂起数千个请求；threading 模式下每个等待的请求占用一个服务器线程，由 max_waiters 限制）
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import redis
+
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class RoomWatcher:
+    """进程内房间变更订阅中心"""
+
+    CHANNEL_PREFIX = "room_changed:"
+
+    def __init__(self, redis_client: redis.Redis, max_waiters: int = 2000):
+        """
+        Args:
+            redis_client: Redis 客户端（分片模式下订阅元数据节点）
+            max_waiters: 本进程同时等待的请求上限，超过时 watch 返回 None
+        """
+        self.redis = redis_client
+        self.max_waiters = max_waiters
+        self._lock = threading.Lock()
+        self._waiters: dict[str, set[threading.Event]] = defaultdict(set)
+        self._count = 0
+        self._listener = None
+        self._listener_pid = None
+        self.notifications = 0
+        self.wakeups = 0
+        self.rejected = 0
+        self.resets = 0
+
+    @classmethod
+    def channel(cls, room_id: str) -> str:
+        """房间变更通知频道"""
+        return f"{cls.CHANNEL_PREFIX}{room_id}"
+
+    @contextmanager
+    def watch(self, room_id: str):
+        """
+        登记对房间变更的等待；应在检查房间版本号之前登记，避免检查与等待之间的通知丢失
+
+        Yields:
+            threading.Event：房间变更（或订阅连接重置）时被置位，调用方检查后自行 clear；
+            等待者已达上限时为 None
+        """
+        self._ensure_listener()
+        with self._lock:
+            if self._count >= self.max_waiters:
+                self.rejected += 1
+                event = None
+            else:
+                event = threading.Event()
+                self._waiters[room_id].add(event)
+                self._count += 1
+        try:
+            yield event
+        finally:
+            if event is not None:
+                with self._lock:
+                    waiters = self._waiters.get(room_id)
+                    if waiters is not None:
+                        waiters.discard(event)
+                        if not waiters:
+                            del self._waiters[room_id]
+                    self._count -= 1
+
+    # ------------------------------------------------------------------
+    # 订阅
+    # ------------------------------------------------------------------
+
+    def _ensure_listener(self) -> None:
+        """按需启动订阅线程；gunicorn fork 出的子进程会重新订阅"""
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(**{f"{self.CHANNEL_PREFIX}*": self._on_message})
+            self._listener = pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=self._on_error
+            )
+            self._listener_pid = pid
+        logger.info("房间变更订阅已启动", extra={'pattern': f"{self.CHANNEL_PREFIX}*", 'pid': pid})
+
+    def _on_message(self, message: dict) -> None:
+        channel = message['channel']
+        if isinstance(channel, bytes):
+            channel = channel.decode('utf-8')
+        room_id = channel[len(self.CHANNEL_PREFIX):]
+        with self._lock:
+            self.notifications += 1
+            waiters = list(self._waiters.get(room_id, ()))
+            self.wakeups += len(waiters)
+        for event in waiters:
+            event.set()
+
+    def _on_error(self, error: Exception, pubsub, thread) -> None:
+        # 订阅连接异常期间可能漏收通知，唤醒所有等待者重新检查版本号
+        logger.warning("房间变更订阅异常，唤醒全部等待者", extra={'error': str(error)})
+        with self._lock:
+            waiters = [event for events in self._waiters.values() for event in events]
+            self.resets += 1
+        for event in waiters:
+            event.set()
+        time.sleep(1.0)
+
+    def get_stats(self) -> dict:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                'waiters': self._count,
+                'rooms': len(self._waiters),
+                'max_waiters': self.max_waiters,
+                'notifications': self.notifications,
+                'wakeups': self.wakeups,
+                'rejected': self.rejected,
+                'resets': self.resets,
+            }
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+请求级身份映射（Identity Map / Unit of Work）
+同一请求内对同一房间、同一用户的重复读取直接命中内存，
+save 产生的脏对象在请求结束时统一写回一次；推送房间通知前先行写回（flush_unit_of_work），
+保证其他玩家收到通知时修改已经落库
+"""
+
+import threading
+from contextlib import contextmanager
+
+from flask import Flask, current_app, g, has_app_context, jsonify, request
+
+from backend.exceptions import RepositoryException
+from backend.models.room import Room
+from backend.models.user import User
+from backend.repositories.room_repository import RoomRepository
+from backend.repositories.user_repository import UserRepository
+from backend.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+# 缓存“不存在”的标记，避免同一请求内重复查询不存在的键
+_MISSING = object()
+
+
+class UnitOfWorkStats:
+    """身份映射命中统计（进程级累计）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+        self.flushed_rooms = 0
+        self.flushed_users = 0
+        self.coalesced_writes = 0
+
+    def record(self, identity_map: "IdentityMap") -> None:
+        """累计一次请求的统计"""
+        with self._lock:
+            self.requests += 1
+            self.hits += identity_map.hits
+            self.misses += identity_map.misses
+            self.flushed_rooms += identity_map.flushed_rooms
+            self.flushed_users += identity_map.flushed_users
+            self.coalesced_writes += identity_map.coalesced_writes
+
+    def get_stats(self) -> dict:
+        """获取统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "requests": self.requests,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0,
+                "flushed_rooms": self.flushed_rooms,
+                "flushed_users": self.flushed_users,
+                "coalesced_writes": self.coalesced_writes,
+            }
+
+
+uow_stats = UnitOfWorkStats()
+
+
+class IdentityMap:
+    """单个请求内的房间/用户身份映射"""
+
+    def __init__(self):
+        self.rooms: dict[str, Room | object] = {}
+        self.room_codes: dict[str, str] = {}
+        self.users: dict[str, User | object] = {}
+        self.dirty_rooms: set[str] = set()
+        self.dirty_users: set[str] = set()
+        # 绕过 L1 缓存读到的房间，可直接用于读改写
+        self.fresh_rooms: set[str] = set()
+        # 需要在写回用户后递增版本号的房间（响应中的关联数据变化）
+        self.stale_rooms: set[str] = set()
+        # 请求中途写回失败：未写回的修改已放弃，响应改为 500
+        self.failed = False
+        self.hits = 0
+        self.misses = 0
+        self.flushed_rooms = 0
+        self.flushed_users = 0
+        self.coalesced_writes = 0
+
+    def put_room(self, room: Room) -> None:
+        self.rooms[room.room_id] = room
+        self.room_codes[room.room_code] = room.room_id
+
+    def forget_room(self, room_id: str) -> None:
+        self.rooms.pop(room_id, None)
+        self.dirty_rooms.discard(room_id)
+        self.fresh_rooms.discard(room_id)
+
+    def forget_user(self, user_id: str) -> None:
+        self.users.pop(user_id, None)
+        self.dirty_users.discard(user_id)
+
+    def flush(self, room_repo: RoomRepository, user_repo: UserRepository,
+              room_ids=None, user_ids=None) -> None:
+        """
+        将脏对象写回 Redis
+
+        Args:
+            room_repo / user_repo: 底层仓储
+            room_ids / user_ids: 只写回指定对象，None 表示全部
+        """
+        rooms = self.dirty_rooms if room_ids is None else self.dirty_rooms & set(room_ids)
+        users = self.dirty_users if user_ids is None else self.dirty_users & set(user_ids)
+        stale = self.stale_rooms if room_ids is None else self.stale_rooms & set(room_ids)
+
+        for room_id in list(rooms):
+            room = self.rooms.get(room_id)
+            if isinstance(room, Room):
+                room_repo.save(room)
+                self.flushed_rooms += 1
+            self.dirty_rooms.discard(room_id)
+
+        pending = [self.users[user_id] for user_id in users if isinstance(self.users.get(user_id), User)]
+        if pending:
+            user_repo.save_many(pending)
+            self.flushed_users += len(pending)
+        self.dirty_users -= users
+
+        for room_id in list(stale):
+            room_repo.bump_version(room_id)
+        self.stale_rooms -= stale
+
+
+def current_identity_map() -> IdentityMap | None:
+    """获取当前请求的身份映射，未启用时返回 None"""
+    if not has_app_context():
+        return None
+    return g.get("_identity_map")
+
+
+def flush_unit_of_work() -> None:
+    """
+    立即写回当前请求的脏对象，推送通知前调用
+
+    写回失败时放弃本请求其余未写回的修改并将响应改为 500，调用方不应再发送通知
+
+    Raises:
+        RepositoryException: 写回失败
+    """
+    identity_map = current_identity_map()
+    if identity_map is None:
+        return
+
+    room_repo, user_repo = current_app.extensions["unit_of_work"]
+    try:
+        identity_map.flush(room_repo, user_repo)
+    except RepositoryException as e:
+        log_exception(logger, e, {"path": request.path})
+        identity_map.failed = True
+        identity_map.dirty_rooms.clear()
+        identity_map.dirty_users.clear()
+        identity_map.stale_rooms.clear()
+        raise
+
+
+class ScopedRoomRepository:
+    """
+    带请求级身份映射的房间仓储
+
+    请求内无身份映射（后台线程、Socket.IO 事件、原生 WebSocket 长连接）时直接透传给底层仓储
+    """
+
+    def __init__(self, repo: RoomRepository):
+        self.repo = repo
+
+    def __getattr__(self, name):
+        return getattr(self.repo, name)
+
+    def get(self, room_id: str, use_cache: bool = True) -> Room | None:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            return self.repo.get(room_id, use_cache=use_cache)
+
+        cached = identity_map.rooms.get(room_id)
+        # 绕过缓存的读取只复用同样绕过缓存读到、或本请求已修改的房间
+        if cached is not None and (use_cache or room_id in identity_map.fresh_rooms
+                                   or room_id in identity_map.dirty_rooms):
+            identity_map.hits += 1
+            return cached if cached is not _MISSING else None
+
+        identity_map.misses += 1
+        room = self.repo.get(room_id, use_cache=use_cache)
+        if not use_cache:
+            identity_map.fresh_rooms.add(room_id)
+        if room is None:
+            identity_map.rooms[room_id] = _MISSING
+        else:
+            identity_map.put_room(room)
+        return room
+
+    def get_by_code(self, room_code: str) -> Room | None:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            return self.repo.get_by_code(room_code)
+
+        room_id = identity_map.room_codes.get(room_code)
+        if room_id is not None and isinstance(identity_map.rooms.get(room_id), Room):
+            identity_map.hits += 1
+            return identity_map.rooms[room_id]
+
+        identity_map.misses += 1
+        room = self.repo.get_by_code(room_code)
+        if room is not None:
+            identity_map.put_room(room)
+        return room
+
+    def save(self, room: Room) -> None:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            self.repo.save(room)
+            return
+
+        if room.room_id in identity_map.dirty_rooms:
+            identity_map.coalesced_writes += 1
+        identity_map.put_room(room)
+        identity_map.dirty_rooms.add(room.room_id)
+
+    def delete(self, room_id: str) -> None:
+        identity_map = current_identity_map()
+        if identity_map is not None:
+            identity_map.dirty_rooms.discard(room_id)
+            identity_map.rooms[room_id] = _MISSING
+        self.repo.delete(room_id)
+
+    # 局部更新本身只写入变化字段，直接透传，仅同步身份映射中的对象
+    def update_fields(self, room: Room, *fields: str) -> None:
+        self.repo.update_fields(room, *fields)
+        self._track(room)
+
+    def bump_version(self, room_id: str) -> None:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            self.repo.bump_version(room_id)
+            return
+        # 推迟到请求结束写回用户之后，避免客户端先拿到新版本号、再读到旧的关联数据
+        identity_map.stale_rooms.add(room_id)
+
+    def _track(self, room: Room) -> None:
+        identity_map = current_identity_map()
+        if identity_map is not None:
+            identity_map.put_room(room)
+
+
+class ScopedUserRepository:
+    """带请求级身份映射的用户仓储"""
+
+    def __init__(self, repo: UserRepository):
+        self.repo = repo
+
+    def __getattr__(self, name):
+        return getattr(self.repo, name)
+
+    def get(self, user_id: str) -> User | None:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            return self.repo.get(user_id)
+
+        cached = identity_map.users.get(user_id)
+        if cached is not None:
+            identity_map.hits += 1
+            return cached if cached is not _MISSING else None
+
+        identity_map.misses += 1
+        user = self.repo.get(user_id)
+        identity_map.users[user_id] = user if user is not None else _MISSING
+        return user
+
+    def get_many(self, user_ids: list[str]) -> dict[str, User]:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            return self.repo.get_many(user_ids)
+
+        missing = [user_id for user_id in user_ids if user_id not in identity_map.users]
+        identity_map.hits += len(user_ids) - len(missing)
+        if missing:
+            identity_map.misses += len(missing)
+            fetched = self.repo.get_many(missing)
+            for user_id in missing:
+                identity_map.users[user_id] = fetched.get(user_id, _MISSING)
+
+        users = {}
+        for user_id in user_ids:
+            user = identity_map.users.get(user_id)
+            if isinstance(user, User):
+                users[user_id] = user
+        return users
+
+    def save(self, user: User) -> None:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            self.repo.save(user)
+            return
+
+        if user.openid in identity_map.dirty_users:
+            identity_map.coalesced_writes += 1
+        identity_map.users[user.openid] = user
+        identity_map.dirty_users.add(user.openid)
+
+    def save_many(self, users: list[User]) -> None:
+        for user in users:
+            self.save(user)
+
+    def delete(self, user_id: str) -> None:
+        identity_map = current_identity_map()
+        if identity_map is not None:
+            identity_map.dirty_users.discard(user_id)
+            identity_map.users[user_id] = _MISSING
+        self.repo.delete(user_id)
+
+
+@contextmanager
+def write_through(room_repo, user_repo, room_ids=(), user_ids=()):
+    """
+    绕过身份映射直接写 Redis 的操作（如 Lua 脚本）前后使用：
+    先写回相关的脏对象，操作结束后丢弃其缓存，后续读取重新从 Redis 加载
+    """
+    identity_map = current_identity_map()
+    if identity_map is None:
+        yield
+        return
+
+    identity_map.flush(unwrap(room_repo), unwrap(user_repo), room_ids=room_ids, user_ids=user_ids)
+    try:
+        yield
+    finally:
+        for room_id in room_ids:
+            identity_map.forget_room(room_id)
+        for user_id in user_ids:
+            identity_map.forget_user(user_id)
+
+
+def unwrap(repo):
+    """取得身份映射包装下的底层仓储"""
+    return repo.repo if isinstance(repo, ScopedRoomRepository | ScopedUserRepository) else repo
+
+
+def init_unit_of_work(app: Flask, room_repo: RoomRepository, user_repo: UserRepository) -> None:
+    """
+    注册请求钩子：请求开始时创建身份映射，返回响应前写回脏对象
+
+    原生 WebSocket 的升级请求会持续整个连接生命周期，不启用身份映射
+    """
+    app.extensions["unit_of_work"] = (room_repo, user_repo)
+
+    @app.before_request
+    def _begin_unit_of_work():
+        if request.headers.get("Upgrade", "").lower() == "websocket":
+            return
+        g._identity_map = IdentityMap()
+
+    @app.after_request
+    def _commit_unit_of_work(response):
+        identity_map = g.pop("_identity_map", None)
+        if identity_map is None:
+            return response
+
+        try:
+            if identity_map.failed:
+                response = jsonify({"code": 500, "message": "数据保存失败，请稍后重试", "data": {}})
+                response.status_code = 500
+            else:
+                identity_map.flush(room_repo, user_repo)
+        except RepositoryException as e:
+            log_exception(logger, e, {"path": request.path})
+            response = jsonify({"code": 500, "message": "数据保存失败，请稍后重试", "data": {}})
+            response.status_code = 500
+        finally:
+            uow_stats.record(identity_map)
+            logger.debug(
+                "身份映射统计",
+                extra={
+                    "path": request.path,
+                    "hits": identity_map.hits,
+                    "misses": identity_map.misses,
+                    "coalesced_writes": identity_map.coalesced_writes,
+                },
+            )
+        return response
+
+    @app.teardown_request
+    def _discard_unit_of_work(exc):
+        # 未经过 after_request（未处理的异常）时，丢弃未提交的修改
+        identity_map = g.pop("_identity_map", None)
+        if identity_map is not None and (identity_map.dirty_rooms or identity_map.dirty_users):
+            logger.warning(
+                "请求异常结束，丢弃未写回的修改",
+                extra={"rooms": list(identity_map.dirty_rooms), "users": list(identity_map.dirty_users)},
+            )
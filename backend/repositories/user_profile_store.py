@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+用户档案冷存储
+长期不活跃的用户从 Redis 降级到 MySQL users 表，下次读取时由 UserRepository 按需回填 Redis
+（需要应用上下文）
+"""
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend.exceptions import DataAccessError
+from backend.extensions import db
+from backend.models.sql import User as SQLUser
+from backend.models.user import User
+from backend.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+
+class UserProfileStore:
+    """MySQL 用户档案存储"""
+
+    def load_many(self, openids: list[str]) -> dict[str, User] | None:
+        """
+        批量读取用户档案（单次 IN 查询）
+
+        Args:
+            openids: 用户ID列表
+
+        Returns:
+            {openid: 用户对象}，current_room 为空；读取失败时返回 None（调用方按用户不存在处理，
+            但不能据此认定用户不存在）
+        """
+        if not openids:
+            return {}
+        try:
+            rows = SQLUser.query.filter(SQLUser.openid.in_(openids)).all()
+        except (SQLAlchemyError, RuntimeError) as e:
+            # RuntimeError: 没有应用上下文；冷数据读取失败不影响热路径
+            logger.warning("用户档案读取失败", extra={'count': len(openids), 'error': str(e)})
+            return None
+        return {
+            row.openid: User(
+                openid=row.openid,
+                nickname=row.nickname or "",
+                avatar=row.avatar or "",
+                total_games=row.total_games or 0,
+                wins=row.wins or 0,
+            )
+            for row in rows
+        }
+
+    def store_many(self, users: list[User]) -> None:
+        """
+        批量写入用户档案：已有记录只更新昵称与头像（战绩以 MySQL 为准，由对局结算累加），
+        没有记录时新建
+
+        Raises:
+            DataAccessError: 写入失败
+        """
+        if not users:
+            return
+        try:
+            existing = {
+                row.openid: row
+                for row in SQLUser.query.filter(SQLUser.openid.in_([user.openid for user in users])).all()
+            }
+            for user in users:
+                row = existing.get(user.openid)
+                if row is None:
+                    db.session.add(SQLUser(
+                        openid=user.openid,
+                        nickname=user.nickname,
+                        avatar=user.avatar,
+                        total_games=user.total_games,
+                        wins=user.wins,
+                    ))
+                else:
+                    row.nickname = user.nickname
+                    row.avatar = user.avatar
+            db.session.commit()
+            logger.debug("用户档案写入成功", extra={'count': len(users)})
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            db.session.rollback()
+            error = DataAccessError(
+                message="写入用户档案失败",
+                error_code="REPO-DATA-001",
+                details={'count': len(users)},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
@@ -2,30 +2,67 @@
 """
 用户仓储类
 负责用户数据的持久化操作
-"""
 
-import json
+用户键带滑动过期时间（写入与读取时续期），长期不活跃的用户由 demote_cold 降级到 MySQL，
+之后读取未命中时从 MySQL 回填；MySQL 中也没有的用户记一个短期墓碑，期间不再查询 MySQL
+"""
 
 import redis
+import redis.asyncio
 
 from backend.exceptions import DataAccessError, RedisConnectionError, SerializationError
 from backend.models.user import User
+from backend.repositories.codec import Codec, JsonCodec
+from backend.repositories.user_profile_store import UserProfileStore
 from backend.utils.logger import log_exception, setup_logger
 
 logger = setup_logger(__name__)
 
 
-class UserRepository:
-    """用户仓储类"""
+# 降级时仅当用户键仍是读取时的值才删除，避免删掉期间被重新激活的用户
+_DELETE_IF_UNCHANGED = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+class UserRepositoryBase:
+    """用户仓储公共部分：键名、编解码器与过期时间（同步与 asyncio 仓储共用）"""
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis | redis.asyncio.Redis, codec: Codec | None = None,
+                 ttl_seconds: int = 0):
         self.redis = redis_client
         self.prefix = "user:"
+        # 不存在用户的墓碑键前缀（不以 user: 开头，降级扫描不会扫到）
+        self.missing_prefix = "user_missing:"
+        self.codec = codec or JsonCodec()
+        # 用户键的滑动过期时间，0 表示不过期
+        self.ttl_seconds = ttl_seconds
     
     def _get_key(self, user_id: str) -> str:
         """获取用户在Redis中的键"""
         return f"{self.prefix}{user_id}"
     
+    def _missing_key(self, user_id: str) -> str:
+        """获取不存在用户的墓碑键"""
+        return f"{self.missing_prefix}{user_id}"
+    
+    @property
+    def _ex(self) -> int | None:
+        return self.ttl_seconds or None
+
+
+class UserRepository(UserRepositoryBase):
+    """用户仓储类"""
+    
+    def __init__(self, redis_client: redis.Redis, codec: Codec | None = None, ttl_seconds: int = 0,
+                 profile_store: UserProfileStore | None = None, missing_ttl_seconds: int = 60):
+        super().__init__(redis_client, codec, ttl_seconds)
+        self.profile_store = profile_store
+        # 档案存储中也不存在的用户的墓碑过期时间，0 表示不记墓碑
+        self.missing_ttl_seconds = missing_ttl_seconds
+        self._delete_if_unchanged = redis_client.register_script(_DELETE_IF_UNCHANGED)
+    
     def save(self, user: User) -> None:
         """
         保存用户信息
@@ -39,13 +76,12 @@ class UserRepository:
             DataAccessError: 其他数据访问错误
         """
         try:
-            # 转换为字典并序列化
-            user_data = user.to_dict()
-            user_json = json.dumps(user_data, ensure_ascii=False)
+            # 序列化
+            user_data = self.codec.encode_user(user)
             
-            # 保存到Redis
+            # 保存到Redis（刷新过期时间）
             key = self._get_key(user.openid)
-            self.redis.set(key, user_json)
+            self.redis.set(key, user_data, ex=self._ex)
             
             logger.debug("用户保存成功", extra={'user_id': user.openid})
             
@@ -91,18 +127,17 @@ class UserRepository:
         """
         try:
             key = self._get_key(user_id)
-            user_json = self.redis.get(key)
+            # 读取即续期
+            user_data = self.redis.getex(key, ex=self.ttl_seconds) if self.ttl_seconds else self.redis.get(key)
             
-            if user_json is None:
-                logger.debug("用户不存在", extra={'user_id': user_id})
-                return None
+            if user_data is None:
+                user = self._rehydrate([user_id]).get(user_id)
+                if user is None:
+                    logger.debug("用户不存在", extra={'user_id': user_id})
+                return user
             
-            # 处理bytes类型的JSON数据
-            if isinstance(user_json, bytes):
-                user_json = user_json.decode('utf-8')
-            
-            user_data = json.loads(user_json)
-            user = User.from_dict(user_data)
+            # 编解码器按首字节识别 JSON / 二进制格式
+            user = self.codec.decode_user(user_data)
             
             logger.debug("用户获取成功", extra={'user_id': user_id})
             return user
@@ -161,4 +196,227 @@ class UserRepository:
                 cause=e
             )
             log_exception(logger, error)
-            raise error from e
\ No newline at end of file
+            raise error from e
+    
+    def get_many(self, user_ids: list[str]) -> dict[str, User]:
+        """
+        批量获取用户信息（单次 MGET 往返）
+        
+        Args:
+            user_ids: 用户ID列表
+            
+        Returns:
+            {user_id: 用户对象}，不存在的用户不会出现在结果中
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        if not user_ids:
+            return {}
+        
+        try:
+            keys = [self._get_key(user_id) for user_id in user_ids]
+            values = self.redis.mget(keys)
+            
+            users = {}
+            missing = []
+            for user_id, user_data in zip(user_ids, values, strict=True):
+                if user_data is None:
+                    missing.append(user_id)
+                    continue
+                users[user_id] = self.codec.decode_user(user_data)
+            if missing:
+                users.update(self._rehydrate(missing))
+            
+            logger.debug("用户批量获取成功", extra={'requested': len(user_ids), 'found': len(users)})
+            return users
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量获取用户", cause=e)
+            log_exception(logger, error, {'user_ids': user_ids})
+            raise error from e
+            
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="用户数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量获取用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def save_many(self, users: list[User]) -> None:
+        """
+        批量保存用户信息（单次管道往返）
+        
+        Args:
+            users: 用户对象列表
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        if not users:
+            return
+        
+        user_ids = [user.openid for user in users]
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            for user in users:
+                pipe.set(self._get_key(user.openid), self.codec.encode_user(user), ex=self._ex)
+            pipe.execute()
+            
+            logger.debug("用户批量保存成功", extra={'count': len(users)})
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量保存用户", cause=e)
+            log_exception(logger, error, {'user_ids': user_ids})
+            raise error from e
+            
+        except (TypeError, ValueError) as e:
+            error = SerializationError(
+                message="用户数据序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量保存用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def ensure_loaded(self, user_id: str) -> None:
+        """
+        确保已降级的用户回填到 Redis（Lua 脚本直接读写用户键，执行前调用）
+        
+        Raises:
+            RedisConnectionError: Redis连接失败
+        """
+        if self.profile_store is None:
+            return
+        try:
+            if not self.redis.exists(self._get_key(user_id)):
+                self._rehydrate([user_id])
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("回填用户", cause=e)
+            log_exception(logger, error, {'user_id': user_id})
+            raise error from e
+    
+    def _rehydrate(self, user_ids: list[str]) -> dict[str, User]:
+        """
+        从 MySQL 读取已降级的用户并写回 Redis（未配置档案存储时不回填）
+        
+        MySQL 中也没有的用户写入短期墓碑，墓碑过期前的未命中直接按不存在处理；
+        MySQL 读取失败时不写墓碑
+        """
+        if self.profile_store is None:
+            return {}
+        if self.missing_ttl_seconds:
+            tombstones = self.redis.mget([self._missing_key(user_id) for user_id in user_ids])
+            user_ids = [user_id for user_id, tombstone in zip(user_ids, tombstones, strict=True) if tombstone is None]
+            if not user_ids:
+                return {}
+        
+        users = self.profile_store.load_many(user_ids)
+        if users is None:
+            return {}
+        unknown = [user_id for user_id in user_ids if user_id not in users] if self.missing_ttl_seconds else []
+        if users or unknown:
+            pipe = self.redis.pipeline(transaction=False)
+            for user in users.values():
+                pipe.set(self._get_key(user.openid), self.codec.encode_user(user), ex=self._ex, nx=True)
+            for user_id in unknown:
+                pipe.set(self._missing_key(user_id), 1, ex=self.missing_ttl_seconds)
+            pipe.execute()
+            logger.debug("用户从档案存储回填", extra={'count': len(users), 'unknown': len(unknown)})
+        return users
+    
+    def demote_cold(self, idle_seconds: int, batch_size: int = 500) -> int:
+        """
+        把超过 idle_seconds 未活跃的用户降级到 MySQL 并从 Redis 删除
+        
+        活跃时间由剩余过期时间推算（每次读写都会续期），因此只在设置了过期时间时生效；
+        仍在房间中的用户不会降级
+        
+        Args:
+            idle_seconds: 未活跃多久后降级（应小于过期时间，留出降级窗口）
+            batch_size: 每批处理的键数量
+            
+        Returns:
+            降级的用户数量
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 写入档案存储失败或其他数据访问错误
+        """
+        if self.profile_store is None or not self.ttl_seconds or idle_seconds >= self.ttl_seconds:
+            return 0
+        
+        # 剩余过期时间低于该值的用户已超过 idle_seconds 未活跃
+        threshold_ms = (self.ttl_seconds - idle_seconds) * 1000
+        demoted = 0
+        batch = []
+        try:
+            for key in self.redis.scan_iter(match=f"{self.prefix}*", count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    demoted += self._demote_batch(batch, threshold_ms)
+                    batch = []
+            if batch:
+                demoted += self._demote_batch(batch, threshold_ms)
+            
+            logger.info("冷用户降级完成", extra={'demoted': demoted, 'idle_seconds': idle_seconds})
+            return demoted
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("降级冷用户", cause=e)
+            log_exception(logger, error, {'demoted': demoted})
+            raise error from e
+    
+    def _demote_batch(self, keys: list, threshold_ms: int) -> int:
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.pttl(key)
+        cold_keys = [key for key, ttl in zip(keys, pipe.execute(), strict=True) if 0 <= ttl < threshold_ms]
+        if not cold_keys:
+            return 0
+        
+        cold = []
+        for key, user_data in zip(cold_keys, self.redis.mget(cold_keys), strict=True):
+            if user_data is None:
+                continue
+            user = self.codec.decode_user(user_data)
+            if not user.has_joined_room():
+                cold.append((key, user_data, user))
+        if not cold:
+            return 0
+        
+        # 先写 MySQL，成功后再删除 Redis 中未被改动的键，并清掉可能残留的墓碑
+        self.profile_store.store_many([user for _, _, user in cold])
+        pipe = self.redis.pipeline(transaction=False)
+        for key, user_data, _ in cold:
+            self._delete_if_unchanged(keys=[key], args=[user_data], client=pipe)
+        pipe.delete(*(self._missing_key(user.openid) for _, _, user in cold))
+        return sum(pipe.execute()[:len(cold)])
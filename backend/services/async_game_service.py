@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+asyncio 游戏服务
+与 GameService 语义、返回值与异常一致，Redis 访问全部走 asyncio 仓储；
+推送（HTTP）、WebSocket 通知与 MySQL 仍是阻塞调用，放到线程池中执行
+"""
+
+import asyncio
+
+from flask import Flask, current_app, has_app_context
+
+from backend.exceptions import (
+    ClientException,
+    DomainException,
+    GameNotStartedError,
+    PlayerEliminatedError,
+    RepositoryException,
+    RoomNotFoundError,
+    RoomStateError,
+    UserNotInRoomError,
+)
+from backend.fsm.game_state_machine import GameEvent, GameState
+from backend.models.room import Room, RoomStatus
+from backend.models.user import User
+from backend.repositories.async_room_repository import AsyncRoomRepository
+from backend.repositories.async_room_scripts import AsyncRoomScripts
+from backend.repositories.async_user_repository import AsyncUserRepository
+from backend.repositories.game_record_store import GameResult
+from backend.services.game_record_writer import GameRecordWriter
+from backend.services.game_service import GameServiceBase
+from backend.services.push_service import PushService
+from backend.services.word_catalog import WordCatalog
+from backend.utils.logger import log_business_event, log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+
+class AsyncGameService(GameServiceBase):
+    """
+    asyncio 游戏服务类
+
+    Args:
+        app: 访问 MySQL（词库、对局记录）时需要的 Flask 应用，在线程池中推入其应用上下文；
+            未指定时取创建服务时所在应用上下文的应用
+        word_catalog: 进程内词库，可与同步服务共用一个实例
+        record_writer: 对局记录 write-behind 写入器，为空时在线程池中同步写 MySQL
+    """
+
+    def __init__(
+        self,
+        room_repo: AsyncRoomRepository,
+        user_repo: AsyncUserRepository,
+        push_service: PushService | None = None,
+        notification_service=None,
+        room_scripts: AsyncRoomScripts | None = None,
+        app: Flask | None = None,
+        word_catalog: WordCatalog | None = None,
+        record_writer: GameRecordWriter | None = None,
+    ):
+        super().__init__(word_catalog, record_writer)
+        self.room_repo = room_repo
+        self.user_repo = user_repo
+        self.room_scripts = room_scripts or AsyncRoomScripts(room_repo, user_repo)
+        self.push = push_service
+        self.notification = notification_service
+        if app is None and has_app_context():
+            app = current_app._get_current_object()
+        self.app = app
+
+    # ------------------------------------------------------------------
+    # 阻塞调用
+    # ------------------------------------------------------------------
+
+    async def _with_app_context(self, func, *args):
+        """在线程池中执行需要应用上下文的阻塞调用（MySQL）；未配置应用时沿用调用方的上下文"""
+        def run():
+            if self.app is None or has_app_context():
+                return func(*args)
+            with self.app.app_context():
+                return func(*args)
+        return await asyncio.to_thread(run)
+
+    async def _notify_room(self, room_id: str, event: str, data: dict) -> None:
+        if self.notification:
+            await asyncio.to_thread(self.notification.notify_room, room_id=room_id, event=event, data=data)
+
+    def _push_enabled(self) -> bool:
+        return bool(self.push and self.push.enabled())
+
+    # ------------------------------------------------------------------
+    # 业务方法
+    # ------------------------------------------------------------------
+
+    async def create_room(self, user_id: str) -> tuple[bool, str]:
+        """创建房间"""
+        try:
+            from backend.utils.snowflake import generate_snowflake_id
+
+            room_id = generate_snowflake_id()
+            room_code = await self.room_repo.allocate_code()
+            room = Room(room_id=room_id, creator=user_id, room_code=room_code, players=[user_id])
+            user = User(openid=user_id, nickname="玩家1", current_room=room_id)
+
+            await self.room_repo.save(room)
+            await self.user_repo.save(user)
+
+            if self._push_enabled():
+                nickname = await asyncio.to_thread(self.push.get_user_nickname, user_id)
+                if nickname:
+                    user.nickname = nickname
+                    await self.user_repo.save(user)
+                    # 昵称出现在房间接口的响应中，递增房间版本号使客户端缓存的 ETag 失效
+                    await self.room_repo.bump_version(room_id)
+            else:
+                logger.warning("推送服务未启用，无法获取用户昵称")
+
+            log_business_event(logger, "房间创建成功", user_id=user_id, room_id=room_id)
+            return True, room_id
+
+        except RepositoryException as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "创建房间失败，请稍后重试"
+
+        except Exception as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "创建房间时发生错误"
+
+    async def join_room(self, user_id: str, room_id: str) -> tuple[bool, str]:
+        """加入房间"""
+        try:
+            result = await self.room_scripts.join(room_id, user_id)
+            nickname = result.nickname
+
+            if self._push_enabled():
+                wechat_nickname = await asyncio.to_thread(self.push.get_user_nickname, user_id)
+                if wechat_nickname:
+                    user = await self.user_repo.get(user_id)
+                    if user:
+                        user.nickname = wechat_nickname
+                        await self.user_repo.save(user)
+                        # 昵称出现在房间接口的响应中，递增房间版本号使客户端缓存的 ETag 失效
+                        await self.room_repo.bump_version(room_id)
+                        nickname = wechat_nickname
+
+            from backend.websocket.events import RoomEvent
+            await self._notify_room(
+                room_id,
+                RoomEvent.PLAYER_JOINED.value,
+                {"player_count": result.player_count, "hint": f"{nickname} 加入了房间"},
+            )
+
+            log_business_event(
+                logger, "用户加入房间", user_id=user_id, room_id=room_id, player_count=result.player_count
+            )
+            return True, f"成功加入房间，当前房间人数：{result.player_count}"
+
+        except (DomainException, ClientException) as e:
+            logger.warning(f"用户/业务异常: {e.error_code} - {e.message}", extra={"details": e.details})
+            return False, e.message
+
+        except RepositoryException as e:
+            log_exception(logger, e, {"user_id": user_id, "room_id": room_id})
+            return False, "加入房间失败，请稍后重试"
+
+        except Exception as e:
+            log_exception(logger, e, {"user_id": user_id, "room_id": room_id})
+            return False, "加入房间时发生错误"
+
+    async def start_game(self, room_id: str, user_id: str, category: str | None = None,
+                         difficulty: int | None = None) -> tuple[bool, str]:
+        """开始游戏（可指定词语类别与难度）"""
+        try:
+            user = await self.user_repo.get(user_id)
+            if not user or not user.has_joined_room():
+                raise UserNotInRoomError(user_id)
+
+            for _ in range(self.START_ATTEMPTS):
+                room = await self.room_repo.get(room_id, use_cache=False)
+                if not room:
+                    raise RoomNotFoundError(room_id)
+
+                undercover_count = self._check_can_start(room, user_id)
+                player_count = room.get_player_count()
+
+                word_pair = await self._with_app_context(self._pick_word_pair, category, difficulty)
+                self._assign_roles(room, undercover_count, word_pair)
+                if await self.room_scripts.start(room, user_id):
+                    break
+            else:
+                raise RoomStateError(
+                    message="房间玩家正在变化，请稍后重试",
+                    error_code="ROOM-STATE-006",
+                    details={"room_id": room_id},
+                )
+
+            if self._push_enabled():
+                messages = []
+                for pid in room.players:
+                    word = room.words["undercover"] if room.is_undercover(pid) else room.words["civilian"]
+                    messages.append((pid, f"您的词语：{word}"))
+                await asyncio.to_thread(self.push.send_text_many, messages)
+
+            from backend.websocket.events import GameEvent as WSGameEvent
+            await self._notify_room(
+                room.room_id,
+                WSGameEvent.STARTED.value,
+                {
+                    "player_count": player_count,
+                    "undercover_count": undercover_count,
+                    "hint": "游戏已开始，请查看您的词语",
+                },
+            )
+
+            log_business_event(
+                logger,
+                "游戏开始",
+                user_id=user_id,
+                room_id=room.room_id,
+                player_count=player_count,
+                undercover_count=undercover_count,
+            )
+            return True, "游戏开始成功"
+
+        except (DomainException, ClientException) as e:
+            logger.warning(f"用户/业务异常: {e.error_code} - {e.message}", extra={"details": e.details})
+            return False, e.message
+
+        except RepositoryException as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "开始游戏失败，请稍后重试"
+
+        except Exception as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "开始游戏时发生错误"
+
+    async def show_word(self, user_id: str) -> tuple[bool, str]:
+        """显示词语"""
+        try:
+            user = await self.user_repo.get(user_id)
+            if not user or not user.has_joined_room():
+                raise UserNotInRoomError(user_id)
+
+            room = await self.room_repo.get(user.current_room)
+            if not room:
+                raise RoomNotFoundError(user.current_room)
+            if room.status != RoomStatus.PLAYING:
+                raise GameNotStartedError()
+            if not room.is_player(user_id):
+                raise UserNotInRoomError(user_id)
+            if room.is_eliminated(user_id):
+                raise PlayerEliminatedError(user_id)
+
+            word = room.words["undercover"] if room.is_undercover(user_id) else room.words["civilian"]
+            return True, f"您的词语：{word}"
+
+        except (DomainException, ClientException) as e:
+            logger.warning(f"用户/业务异常: {e.error_code} - {e.message}", extra={"details": e.details})
+            return False, e.message
+
+        except RepositoryException as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "显示词语失败，请稍后重试"
+
+        except Exception as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "显示词语时发生错误"
+
+    async def vote_player(self, user_id: str, target_index: int) -> tuple[bool, str]:
+        """投票淘汰玩家（通过索引）"""
+        try:
+            user = await self.user_repo.get(user_id)
+            if not user or not user.has_joined_room():
+                raise UserNotInRoomError(user_id)
+
+            result = await self.room_scripts.vote(user.current_room, user_id, target_index)
+            target_player = result.target_player
+
+            room = await self.room_repo.get(user.current_room, use_cache=False)
+            if not room:
+                raise RoomNotFoundError(user.current_room)
+
+            if not self.fsm.can_transition(GameState.PLAYING, GameEvent.VOTE):
+                raise RoomStateError(
+                    message="当前状态无法投票",
+                    error_code="ROOM-STATE-003",
+                    details={"room_id": room.room_id, "status": room.status.value},
+                )
+
+            if self.notification:
+                from backend.websocket.events import VoteEvent
+                target_user = await self.user_repo.get(target_player)
+                target_nickname = target_user.nickname if target_user else f"玩家{target_index}"
+                await self._notify_room(
+                    room.room_id,
+                    VoteEvent.SUBMITTED.value,
+                    {
+                        "target_index": target_index,
+                        "eliminated_count": len(room.eliminated),
+                        "hint": f"{target_nickname} 被投票淘汰",
+                    },
+                )
+
+            game_ended, result_message = await self._check_game_end(room)
+
+            log_business_event(
+                logger,
+                "投票淘汰",
+                user_id=user_id,
+                room_id=room.room_id,
+                target_index=target_index,
+                target_player=target_player,
+                game_ended=game_ended,
+            )
+
+            if self._push_enabled():
+                await self._push_room_status(room)
+            return True, result_message if game_ended else "投票成功"
+
+        except (DomainException, ClientException) as e:
+            logger.warning(f"用户/业务异常: {e.error_code} - {e.message}", extra={"details": e.details})
+            return False, e.message
+
+        except RepositoryException as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "投票失败，请稍后重试"
+
+        except Exception as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "投票时发生错误"
+
+    async def submit_vote(self, room_id: str, user_id: str, target_uid: str) -> tuple[bool, str]:
+        """提交投票（通过房间ID和目标用户ID）"""
+        try:
+            room = await self.room_repo.get(room_id)
+            if not room:
+                raise RoomNotFoundError(room_id)
+            target_index = room.seat_of(target_uid)
+            if not target_index:
+                return False, "目标玩家不在房间中"
+            return await self.vote_player(user_id, target_index)
+
+        except (DomainException, ClientException) as e:
+            logger.warning(f"用户/业务异常: {e.error_code} - {e.message}", extra={"details": e.details})
+            return False, e.message
+
+        except RepositoryException as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "投票失败，请稍后重试"
+
+        except Exception as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "投票时发生错误"
+
+    async def get_player_word(self, room_id: str, user_id: str) -> dict:
+        """获取玩家词语，异常直接抛出"""
+        try:
+            room = await self.room_repo.get(room_id)
+            if not room:
+                raise RoomNotFoundError(room_id)
+            if not room.is_player(user_id):
+                raise UserNotInRoomError(user_id)
+            if room.status != RoomStatus.PLAYING:
+                raise GameNotStartedError()
+            if room.is_eliminated(user_id):
+                raise PlayerEliminatedError(user_id)
+            if not room.words:
+                raise GameNotStartedError()
+
+            if room.is_undercover(user_id):
+                return {"word": room.words.get("undercover", ""), "role": 2}
+            return {"word": room.words.get("civilian", ""), "role": 1}
+
+        except (DomainException, ClientException) as e:
+            logger.warning(f"用户/业务异常: {e.error_code} - {e.message}", extra={"details": e.details})
+            raise
+
+        except Exception as e:
+            log_exception(logger, e, {"user_id": user_id})
+            raise
+
+    async def show_status(self, user_id: str) -> tuple[bool, str]:
+        """显示状态"""
+        try:
+            user = await self.user_repo.get(user_id)
+            if not user or not user.has_joined_room():
+                raise UserNotInRoomError(user_id)
+
+            room = await self.room_repo.get(user.current_room)
+            if not room:
+                raise RoomNotFoundError(user.current_room)
+
+            player_objs = await self.user_repo.get_many(room.players)
+            return True, self._status_text(room, user, user_id, player_objs)
+
+        except (DomainException, ClientException) as e:
+            logger.warning(f"用户/业务异常: {e.error_code} - {e.message}", extra={"details": e.details})
+            return False, e.message
+
+        except RepositoryException as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "显示状态失败，请稍后重试"
+
+        except Exception as e:
+            log_exception(logger, e, {"user_id": user_id})
+            return False, "显示状态时发生错误"
+
+    # ------------------------------------------------------------------
+    # 内部流程
+    # ------------------------------------------------------------------
+
+    async def _check_game_end(self, room: Room) -> tuple[bool, str]:
+        judged = self._judge_game_end(room)
+        if judged is None:
+            return False, ""
+
+        winner_team, result_message = judged
+        await self._finish_game(room, winner_team)
+
+        from backend.websocket.events import GameEvent as WSGameEvent
+        await self._notify_room(
+            room.room_id, WSGameEvent.ENDED.value, {"winner_team": winner_team, "hint": result_message}
+        )
+        return True, result_message
+
+    async def _finish_game(self, room: Room, winner_team: str) -> None:
+        self._mark_ended(room)
+        await self.room_repo.update_fields(room, "status")
+        result = GameResult.from_room(room, winner_team)
+        if self.record_writer is None or not await asyncio.to_thread(self.record_writer.publish, result):
+            await self._with_app_context(self._record_game, result)
+        await self._auto_leave_room(room)
+
+    async def _auto_leave_room(self, room: Room) -> None:
+        users = await self.user_repo.get_many(room.players)
+        leaving = []
+        for user in users.values():
+            if user.current_room == room.room_id:
+                user.leave_room()
+                leaving.append(user)
+        await self.user_repo.save_many(leaving)
+
+    async def _push_room_status(self, room: Room) -> None:
+        content = self._room_status_text(room, await self.user_repo.get_many(room.players))
+        await asyncio.to_thread(self.push.send_text_many, [(pid, content) for pid in room.players])
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+对局记录异步写入（write-behind）
+对局结束时只把结果 XADD 到 Redis 流 game_results，投票请求不再等待 MySQL；
+每个进程一个后台线程以消费组 game-record-writers 读取，攒满 batch_size 条或距首条超过 flush_ms 毫秒后
+调用 GameRecordStore 批量写入，成功后 XACK
+
+- 幂等：GameRecordStore 以 room_id 去重，重复投递（写入后 XACK 前崩溃、被其他进程接管）不会重复累加战绩
+- 接管：消费者崩溃留下的未确认条目在空闲 claim_idle_ms 后由其他消费者 XAUTOCLAIM 接管
+- 写入失败时整批保留在待确认列表中，退避后重试；连续失败 max_attempts 次后对半拆分重试，
+  最终仍写不进去的单条结果确认后转入死信列表 game_results:dead（只保留最近 dead_letter_max 条），
+  避免一条坏数据永久阻塞消费者及接管它的其他消费者
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+import redis
+from flask import Flask
+
+from backend.exceptions import DataAccessError
+from backend.repositories.game_record_store import GameRecordStore, GameResult
+from backend.utils.logger import setup_logger
+from backend.utils.redis_shard import is_sharded
+
+logger = setup_logger(__name__)
+
+
+def _id_millis(entry_id: str | bytes) -> int:
+    """流条目 ID 中的毫秒时间戳"""
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode('utf-8')
+    return int(entry_id.split('-', 1)[0])
+
+
+class GameRecordWriter:
+    """对局记录 write-behind 写入器"""
+
+    STREAM = "game_results"
+    GROUP = "game-record-writers"
+    DEAD_LETTER = "game_results:dead"
+
+    def __init__(self, redis_client, app: Flask, store: GameRecordStore | None = None, batch_size: int = 100,
+                 flush_ms: int = 500, maxlen: int = 100000, claim_idle_ms: int = 60000, max_attempts: int = 5,
+                 retry_base_seconds: float = 1.0, retry_max_seconds: float = 30.0, dead_letter_max: int = 1000):
+        """
+        Args:
+            redis_client: Redis 客户端（分片模式下使用流所在的节点）
+            app: 写入 MySQL 时推入其应用上下文
+            store: 对局记录存储
+            batch_size: 单批最多写入的条数
+            flush_ms: 批次从收到第一条起最长等待的毫秒数
+            maxlen: 流的近似最大长度（已确认的旧条目被裁剪）
+            claim_idle_ms: 未确认条目空闲超过该毫秒数后可被其他消费者接管
+            max_attempts: 一批（或拆分后的半批）最多写入次数，超过后拆分，单条超过后进入死信
+            retry_base_seconds: 第一次重试的等待时间（秒），之后每次翻倍
+            retry_max_seconds: 重试等待时间上限（秒）
+            dead_letter_max: 死信列表保留的条数
+        """
+        self.redis = redis_client.client_for(self.STREAM) if is_sharded(redis_client) else redis_client
+        self.app = app
+        self.store = store or GameRecordStore()
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.maxlen = maxlen
+        self.claim_idle_ms = claim_idle_ms
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.dead_letter_max = dead_letter_max
+
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid = None
+        self._group_ready = False
+        self.consumer = ""
+        self.published = 0
+        self.written = 0
+        self.duplicates = 0
+        self.discarded = 0
+        self.batches = 0
+        self.failures = 0
+        self.reclaimed = 0
+        self.dead_lettered = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # 生产
+    # ------------------------------------------------------------------
+
+    def publish(self, result: GameResult) -> bool:
+        """
+        写入对局结果到流
+
+        Returns:
+            是否写入成功；失败时由调用方同步写入 MySQL
+        """
+        self._ensure_worker()
+        try:
+            self.redis.xadd(
+                self.STREAM, {'room_id': result.room_id, 'data': result.to_json()},
+                maxlen=self.maxlen, approximate=True,
+            )
+        except redis.RedisError as e:
+            logger.warning("对局结果写入流失败", extra={'room_id': result.room_id, 'error': str(e)})
+            return False
+        with self._lock:
+            self.published += 1
+        return True
+
+    # ------------------------------------------------------------------
+    # 消费
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """启动当前进程的消费线程（重复调用无副作用）"""
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        """按需启动消费线程；gunicorn fork 出的子进程会重新启动"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self.consumer = f"{socket.gethostname()}-{pid}"
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="game-record-writer", daemon=True)
+            self._thread.start()
+            self._pid = pid
+        logger.info("对局记录写入线程已启动", extra={'consumer': self.consumer})
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止当前进程的消费线程（正在写入的批次会先完成）"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+    def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            self.redis.xgroup_create(self.STREAM, self.GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def _run(self) -> None:
+        next_claim = 0.0
+        while not self._stopping.is_set():
+            try:
+                self._ensure_group()
+                if time.monotonic() >= next_claim:
+                    next_claim = time.monotonic() + self.claim_idle_ms / 1000 / 2
+                    self._reclaim()
+                entries = self._read_batch()
+                if entries:
+                    self._flush(entries)
+            except redis.RedisError as e:
+                if isinstance(e, redis.ResponseError) and 'NOGROUP' in str(e):
+                    self._group_ready = False
+                logger.warning("对局记录写入线程访问 Redis 失败", extra={'error': str(e)})
+                self._stopping.wait(1.0)
+
+    def _read_batch(self) -> list:
+        """读取一批新条目：阻塞等待第一条，之后在 flush_ms 内继续凑满 batch_size"""
+        entries = []
+        deadline = None
+        while len(entries) < self.batch_size and not self._stopping.is_set():
+            if deadline is None:
+                block = 1000
+            else:
+                block = int((deadline - time.monotonic()) * 1000)
+                if block <= 0:
+                    break
+            response = self.redis.xreadgroup(
+                self.GROUP, self.consumer, {self.STREAM: '>'}, count=self.batch_size - len(entries), block=block
+            )
+            if not response:
+                if deadline is None:
+                    return entries
+                break
+            entries.extend(response[0][1])
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_ms / 1000
+        return entries
+
+    def _reclaim(self) -> None:
+        """接管其他（已崩溃）消费者长时间未确认的条目"""
+        start = '0-0'
+        while not self._stopping.is_set():
+            response = self.redis.xautoclaim(
+                self.STREAM, self.GROUP, self.consumer, self.claim_idle_ms, start_id=start, count=self.batch_size
+            )
+            start, entries = response[0], response[1]
+            # Redis 6.2 对已被裁剪的条目返回空字段，直接确认
+            trimmed = [entry_id for entry_id, fields in entries if not fields]
+            if trimmed:
+                self.redis.xack(self.STREAM, self.GROUP, *trimmed)
+            entries = [entry for entry in entries if entry[1]]
+            if entries:
+                with self._lock:
+                    self.reclaimed += len(entries)
+                self._flush(entries)
+            if start in ('0-0', b'0-0'):
+                return
+
+    def _flush(self, entries: list) -> None:
+        """批量写入 MySQL，成功（或转入死信）后确认；停止时未写完的批次不确认"""
+        ids = [entry_id for entry_id, _ in entries]
+        parsed = []
+        for entry_id, fields in entries:
+            try:
+                parsed.append((entry_id, GameResult.from_json(fields.get(b'data') or fields.get('data'))))
+            except (TypeError, ValueError, KeyError) as e:
+                # 无法解析的条目不会因重试而恢复，记录后直接确认
+                logger.error("对局结果无法解析，已丢弃", extra={'entry_id': str(entry_id), 'error': str(e)})
+                with self._lock:
+                    self.discarded += 1
+
+        started = time.perf_counter()
+        saved = self._save(parsed)
+        if saved is None:
+            return  # 未确认，由其他消费者或重启后接管
+        written, dead = saved
+
+        self.redis.xack(self.STREAM, self.GROUP, *ids)
+        with self._lock:
+            self.batches += 1
+            self.written += written
+            self.duplicates += len(parsed) - written - dead
+            self.last_batch_size = len(entries)
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def _save(self, parsed: list) -> tuple[int, int] | None:
+        """
+        写入 [(条目 ID, 对局结果)]：退避重试至多 max_attempts 次，仍失败时对半拆分分别写入，
+        拆到单条仍失败则转入死信
+
+        Returns:
+            (新写入的对局数, 转入死信的条数)；停止时返回 None
+        """
+        if not parsed:
+            return 0, 0
+        delay = self.retry_base_seconds
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with self.app.app_context():
+                    return self.store.save_many([result for _, result in parsed]), 0
+            except DataAccessError:
+                with self._lock:
+                    self.failures += 1
+            if attempt < self.max_attempts:
+                if self._stopping.wait(delay):
+                    return None
+                delay = min(delay * 2, self.retry_max_seconds)
+
+        if len(parsed) == 1:
+            self._dead_letter(*parsed[0])
+            return 0, 1
+        middle = len(parsed) // 2
+        left = self._save(parsed[:middle])
+        right = self._save(parsed[middle:]) if left is not None else None
+        if right is None:
+            return None
+        return left[0] + right[0], left[1] + right[1]
+
+    def _dead_letter(self, entry_id, result: GameResult) -> None:
+        entry = {
+            'entry_id': entry_id.decode('utf-8') if isinstance(entry_id, bytes) else entry_id,
+            'data': result.to_json(),
+            'failed_at': int(time.time() * 1000),
+        }
+        pipe = self.redis.pipeline()
+        pipe.lpush(self.DEAD_LETTER, json.dumps(entry, ensure_ascii=False))
+        pipe.ltrim(self.DEAD_LETTER, 0, self.dead_letter_max - 1)
+        pipe.execute()
+        with self._lock:
+            self.dead_lettered += 1
+        logger.error(
+            "对局结果超过最大写入次数，已转入死信",
+            extra={'room_id': result.room_id, 'entry_id': entry['entry_id'], 'attempts': self.max_attempts},
+        )
+
+    def dead_letters(self, limit: int = 50) -> list[dict]:
+        """最近的死信（新的在前）"""
+        return [json.loads(raw) for raw in self.redis.lrange(self.DEAD_LETTER, 0, limit - 1)]
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> dict:
+        """
+        获取统计信息（计数为当前进程，流与消费组为全局）
+
+        lag 为尚未投递给消费者的条目数；lag_ms 为最早一条未确认（含未投递）结果距今的毫秒数
+        """
+        with self._lock:
+            stats = {
+                'consumer': self.consumer,
+                'published': self.published,
+                'written': self.written,
+                'duplicates': self.duplicates,
+                'discarded': self.discarded,
+                'reclaimed': self.reclaimed,
+                'dead_lettered': self.dead_lettered,
+                'batches': self.batches,
+                'failures': self.failures,
+                'last_batch_size': self.last_batch_size,
+                'last_flush_ms': self.last_flush_ms,
+            }
+        try:
+            stats.update(self._lag())
+        except redis.RedisError as e:
+            stats['error'] = str(e)
+        return stats
+
+    def _lag(self) -> dict:
+        length = self.redis.xlen(self.STREAM)
+        groups = self.redis.xinfo_groups(self.STREAM) if length else []
+        group = next((g for g in groups if g['name'] in (self.GROUP, self.GROUP.encode())), None)
+
+        oldest = None
+        if group is not None and group['pending']:
+            oldest = self.redis.xpending(self.STREAM, self.GROUP)['min']
+        elif length:
+            last = group['last-delivered-id'] if group is not None else b'0-0'
+            if isinstance(last, bytes):
+                last = last.decode('utf-8')
+            undelivered = self.redis.xrange(self.STREAM, min=f"({last}", count=1)
+            if undelivered:
+                oldest = undelivered[0][0]
+        return {
+            'length': length,
+            'pending': group['pending'] if group is not None else 0,
+            'lag': group.get('lag') if group is not None else length,
+            'lag_ms': max(int(time.time() * 1000) - _id_millis(oldest), 0) if oldest is not None else 0,
+            'dead': self.redis.llen(self.DEAD_LETTER),
+        }
@@ -5,42 +5,211 @@
 """
 
 import random
-from datetime import datetime
-
-from sqlalchemy.sql.expression import func
 
 from backend.config.game_config import GameConfig
 from backend.exceptions import (
     ClientException,
+    DataAccessError,
     DomainException,
     GameAlreadyStartedError,
     GameEndedError,
     GameNotStartedError,
     InsufficientPlayersError,
-    InvalidPlayerIndexError,
     PlayerEliminatedError,
     RepositoryException,
-    RoomFullError,
     RoomNotFoundError,
     RoomPermissionError,
     RoomStateError,
-    UserAlreadyInRoomError,
     UserNotInRoomError,
 )
-from backend.extensions import db
 from backend.fsm.game_state_machine import GameEvent, GameState, GameStateMachine
 from backend.models.room import Room, RoomStatus
-from backend.models.sql import GameRecord, User as SQLUser, WordPair
 from backend.models.user import User
+from backend.repositories.game_record_store import GameRecordStore, GameResult
 from backend.repositories.room_repository import RoomRepository
+from backend.repositories.room_scripts import RoomScripts
 from backend.repositories.user_repository import UserRepository
+from backend.services.game_record_writer import GameRecordWriter
 from backend.services.push_service import PushService
+from backend.services.word_catalog import WordCatalog
 from backend.utils.logger import log_business_event, log_exception, setup_logger
 
 logger = setup_logger(__name__)
 
 
-class GameService:
+class GameServiceBase:
+    """
+    游戏服务公共部分：规则校验、角色分配、胜负判定、对局记录与状态文案
+
+    同步（GameService）与 asyncio（AsyncGameService）两种实现共用，不访问 Redis
+    """
+
+    START_ATTEMPTS = 3  # 开始游戏时玩家列表被并发修改的最多重试次数
+
+    def __init__(self, word_catalog: WordCatalog | None = None, record_writer: GameRecordWriter | None = None):
+        self.fsm = GameStateMachine()
+        self.word_catalog = word_catalog or WordCatalog()
+        self.record_writer = record_writer
+
+    def _check_can_start(self, room: Room, user_id: str) -> int:
+        """
+        校验房间能否开始游戏
+
+        Returns:
+            卧底数量
+        """
+        # 检查是否为房主
+        if not room.is_creator(user_id):
+            raise RoomPermissionError(user_id, "开始游戏")
+
+        # 检查房间人数
+        if room.get_player_count() < GameConfig.MIN_PLAYERS:
+            raise InsufficientPlayersError(room.get_player_count(), GameConfig.MIN_PLAYERS)
+
+        # 检查房间状态
+        if room.status == RoomStatus.PLAYING:
+            raise GameAlreadyStartedError()
+        elif room.status == RoomStatus.ENDED:
+            raise GameEndedError()
+
+        # 状态机校验
+        can_start = self.fsm.can_transition(GameState.WAITING, GameEvent.START)
+        if not can_start:
+            raise RoomStateError(
+                message="当前状态无法开始游戏",
+                error_code="ROOM-STATE-003",
+                details={"room_id": room.room_id, "status": room.status.value},
+            )
+
+        # 根据人数确定卧底数量
+        player_count = room.get_player_count()
+        undercover_count = GameConfig.get_undercover_count(player_count)
+        if undercover_count == 0:
+            raise InsufficientPlayersError(player_count, GameConfig.MIN_PLAYERS)
+        return undercover_count
+
+    def _pick_word_pair(self, category: str | None = None, difficulty: int | None = None) -> tuple[str, str]:
+        """随机选择词语对（进程内词库；词库需要刷新时查询 MySQL，需要应用上下文）"""
+        return self.word_catalog.sample(category, difficulty)
+
+    def _assign_roles(self, room: Room, undercover_count: int, word_pair: tuple[str, str]) -> None:
+        """随机选择卧底、分配词语并进入游戏状态"""
+        room.undercovers = random.sample(room.players, undercover_count)
+        room.words = {"civilian": word_pair[0], "undercover": word_pair[1]}
+        next_state = self.fsm.next_state(GameState.WAITING, GameEvent.START)
+        room.status = RoomStatus(next_state.value)
+        room.current_round = 1
+
+    @staticmethod
+    def _judge_game_end(room: Room) -> tuple[str, str] | None:
+        """
+        判定游戏是否结束
+
+        Returns:
+            (获胜阵营, 结果文案)，未结束时返回 None
+        """
+        # 剩余卧底：卧底列表中仍在剩余玩家列表里的人数，其余剩余玩家为平民
+        remaining_undercovers, remaining_civilians = room.count_remaining()
+
+        # 如果所有卧底都被淘汰，平民获胜
+        if remaining_undercovers == 0:
+            return "civilian", "游戏结束！平民获胜，成功找出了所有卧底！"
+
+        # 如果剩余玩家少于3人，游戏结束
+        if remaining_undercovers + remaining_civilians < 3:
+            return "undercover", "游戏结束！卧底获胜！"
+
+        # 检查卧底数量是否大于等于平民数量
+        if remaining_undercovers >= remaining_civilians:
+            return "undercover", "游戏结束！卧底获胜！"
+
+        return None
+
+    def _mark_ended(self, room: Room) -> None:
+        next_state = self.fsm.next_state(GameState.PLAYING, GameEvent.END)
+        room.status = RoomStatus(next_state.value)
+
+    @staticmethod
+    def _record_game(result: GameResult) -> None:
+        """同步保存对局记录并更新参与者战绩（写 MySQL，需要应用上下文），失败只记录日志"""
+        try:
+            GameRecordStore().save_many([result])
+        except DataAccessError:
+            pass  # 存储层已记录异常日志
+        except RuntimeError as e:
+            # 没有应用上下文（如在事件循环的线程池中调用且未配置应用）
+            logger.error("对局记录保存失败", extra={'room_id': result.room_id, 'error': str(e)})
+
+    @staticmethod
+    def _status_text(room: Room, user: User, user_id: str, player_objs: dict[str, User]) -> str:
+        """show_status 的文案"""
+        status_lines = []
+
+        # 用户信息
+        user_index = -1
+        for i, player in enumerate(room.players):
+            if player == user_id:
+                user_index = i + 1
+                break
+
+        status_lines.append(f"您的信息：{user.nickname} (序号: {user_index})")
+        status_lines.append("")
+
+        # 房间信息
+        status_lines.append(f"房间号：{room.room_id}")
+        status_lines.append(f"房间状态：{room.status.value}")
+        status_lines.append("房间成员：")
+
+        # 玩家列表
+        for i, player in enumerate(room.players):
+            player_obj = player_objs.get(player)
+            nickname = player_obj.nickname if player_obj else f"玩家{i + 1}"
+
+            # 添加角色标识
+            if player == room.creator:
+                nickname += "(房主)"
+            if room.is_eliminated(player):
+                nickname += "(已淘汰)"
+
+            status_lines.append(f"{i + 1}. {nickname}")
+
+        # 游戏信息
+        if room.status == RoomStatus.PLAYING:
+            status_lines.append("")
+            status_lines.append(f"当前轮次：第{room.current_round}轮")
+            status_lines.append(f"已淘汰：{len(room.eliminated)}人")
+
+            # 如果是房主，提示投票方式
+            if room.is_creator(user_id):
+                status_lines.append("")
+                status_lines.append("您是房主，可通过't+序号'投票淘汰玩家")
+
+        return "\n".join(status_lines)
+
+    @staticmethod
+    def _room_status_text(room: Room, users: dict[str, User]) -> str:
+        """推送给房间成员的状态文案"""
+        lines = [
+            f"房间号：{room.room_id}",
+            f"房间状态：{room.status.value}",
+            "房间成员：",
+        ]
+        for i, player in enumerate(room.players):
+            u = users.get(player)
+            n = u.nickname if u else f"玩家{i + 1}"
+            if player == room.creator:
+                n += "(房主)"
+            if room.is_eliminated(player):
+                n += "(已淘汰)"
+            lines.append(f"{i + 1}. {n}")
+        if room.status == RoomStatus.PLAYING:
+            lines.append("")
+            lines.append(f"当前轮次：第{room.current_round}轮")
+            lines.append(f"已淘汰：{len(room.eliminated)}人")
+        return "\n".join(lines)
+
+
+class GameService(GameServiceBase):
     """游戏服务类"""
 
     def __init__(
@@ -48,12 +217,15 @@ class GameService:
         room_repo: RoomRepository, 
         user_repo: UserRepository, 
         push_service: PushService | None = None,
-        notification_service = None  # 添加 notification_service 参数
+        notification_service = None,  # 添加 notification_service 参数
+        room_scripts: RoomScripts | None = None,
+        word_catalog: WordCatalog | None = None,
+        record_writer: GameRecordWriter | None = None,
     ):
+        super().__init__(word_catalog, record_writer)
         self.room_repo = room_repo
         self.user_repo = user_repo
-        # self.word_generator = WordGenerator(GameConfig.WORD_PAIRS)
-        self.fsm = GameStateMachine()
+        self.room_scripts = room_scripts or RoomScripts(room_repo, user_repo)
         self.push = push_service
         self.notification = notification_service  # 存储 notification_service
         self.push = push_service
@@ -84,6 +256,8 @@ class GameService:
                 if nickname:
                     user.nickname = nickname
                     self.user_repo.save(user)
+                    # 昵称出现在房间接口的响应中，递增房间版本号使客户端缓存的 ETag 失效
+                    self.room_repo.bump_version(room_id)
             else:
                 logger.warning("推送服务未启用，无法获取用户昵称")
 
@@ -101,52 +275,20 @@ class GameService:
     def join_room(self, user_id: str, room_id: str) -> tuple[bool, str]:
         """加入房间"""
         try:
-            # 获取用户信息
-            user = self.user_repo.get(user_id)
-            if user and user.has_joined_room():
-                # 用户已经在其他房间中
-                raise UserAlreadyInRoomError(user_id, user.current_room)
-
-            # 检查房间是否存在
-            room = self.room_repo.get(room_id)
-            if not room:
-                raise RoomNotFoundError(room_id)
-
-            # 检查房间状态
-            if room.status != RoomStatus.WAITING:
-                raise RoomStateError(
-                    message="游戏已经开始，无法加入房间",
-                    error_code="ROOM-STATE-003",
-                    details={"room_id": room_id, "status": room.status.value},
-                )
-
-            # 检查是否已在房间中
-            if room.is_player(user_id):
-                raise UserAlreadyInRoomError(user_id, room_id)
-
-            # 检查房间人数
-            if room.get_player_count() >= GameConfig.MAX_PLAYERS:
-                raise RoomFullError(room_id, GameConfig.MAX_PLAYERS)
-
-            # 加入房间
-            room.players.append(user_id)
-
-            # 创建或更新用户对象
-            if not user:
-                user = User(openid=user_id, nickname=f"玩家{room.get_player_count()}", current_room=room_id)
-            else:
-                user.current_room = room_id
-                user.nickname = f"玩家{room.get_player_count()}"
-
-            # 保存房间和用户信息
-            self.room_repo.save(room)
-            self.user_repo.save(user)
+            # 原子地校验并写入房间与用户（单次往返，避免并发加入互相覆盖）
+            result = self.room_scripts.join(room_id, user_id)
+            nickname = result.nickname
 
             if self.push and self.push.enabled():
-                nickname = self.push.get_user_nickname(user_id)
-                if nickname:
-                    user.nickname = nickname
-                    self.user_repo.save(user)
+                wechat_nickname = self.push.get_user_nickname(user_id)
+                if wechat_nickname:
+                    user = self.user_repo.get(user_id)
+                    if user:
+                        user.nickname = wechat_nickname
+                        self.user_repo.save(user)
+                        # 昵称出现在房间接口的响应中，递增房间版本号使客户端缓存的 ETag 失效
+                        self.room_repo.bump_version(room_id)
+                        nickname = wechat_nickname
 
             # 发送 WebSocket 通知
             if self.notification:
@@ -155,15 +297,15 @@ class GameService:
                     room_id=room_id,
                     event=RoomEvent.PLAYER_JOINED.value,
                     data={
-                        "player_count": room.get_player_count(),
-                        "hint": f"{user.nickname} 加入了房间"
+                        "player_count": result.player_count,
+                        "hint": f"{nickname} 加入了房间"
                     }
                 )
 
             log_business_event(
-                logger, "用户加入房间", user_id=user_id, room_id=room_id, player_count=room.get_player_count()
+                logger, "用户加入房间", user_id=user_id, room_id=room_id, player_count=result.player_count
             )
-            return True, f"成功加入房间，当前房间人数：{room.get_player_count()}"
+            return True, f"成功加入房间，当前房间人数：{result.player_count}"
 
         except (DomainException, ClientException) as e:
             logger.warning(f"用户/业务异常: {e.error_code} - {e.message}", extra={"details": e.details})
@@ -177,79 +319,44 @@ class GameService:
             log_exception(logger, e, {"user_id": user_id, "room_id": room_id})
             return False, "加入房间时发生错误"
 
-    def start_game(self, room_id: str, user_id: str) -> tuple[bool, str]:
-        """开始游戏"""
+    def start_game(self, room_id: str, user_id: str, category: str | None = None,
+                   difficulty: int | None = None) -> tuple[bool, str]:
+        """开始游戏（可指定词语类别与难度）"""
         try:
             # 获取用户信息
             user = self.user_repo.get(user_id)
             if not user or not user.has_joined_room():
                 raise UserNotInRoomError(user_id)
 
-            # 获取房间信息
-            room = self.room_repo.get(room_id)
-            if not room:
-                raise RoomNotFoundError(room_id)
-
-            # 检查是否为房主
-            if not room.is_creator(user_id):
-                raise RoomPermissionError(user_id, "开始游戏")
-
-            # 检查房间人数
-            if room.get_player_count() < GameConfig.MIN_PLAYERS:
-                raise InsufficientPlayersError(room.get_player_count(), GameConfig.MIN_PLAYERS)
+            for _ in range(self.START_ATTEMPTS):
+                # 获取房间信息（绕过 L1 缓存，按读到的玩家列表分配身份）
+                room = self.room_repo.get(room_id, use_cache=False)
+                if not room:
+                    raise RoomNotFoundError(room_id)
 
-            # 检查房间状态
-            if room.status == RoomStatus.PLAYING:
-                raise GameAlreadyStartedError()
-            elif room.status == RoomStatus.ENDED:
-                raise GameEndedError()
+                undercover_count = self._check_can_start(room, user_id)
+                player_count = room.get_player_count()
 
-            # 状态机校验
-            can_start = self.fsm.can_transition(GameState.WAITING, GameEvent.START)
-            if not can_start:
+                # 随机选择卧底、分配词语，由脚本在玩家列表未变化时原子写入
+                self._assign_roles(room, undercover_count, self._pick_word_pair(category, difficulty))
+                if self.room_scripts.start(room, user_id):
+                    break
+            else:
                 raise RoomStateError(
-                    message="当前状态无法开始游戏",
-                    error_code="ROOM-STATE-003",
-                    details={"room_id": room.room_id, "status": room.status.value},
+                    message="房间玩家正在变化，请稍后重试",
+                    error_code="ROOM-STATE-006",
+                    details={"room_id": room_id},
                 )
 
-            # 根据人数确定卧底数量
-            player_count = room.get_player_count()
-            undercover_count = GameConfig.get_undercover_count(player_count)
-            if undercover_count == 0:
-                raise InsufficientPlayersError(player_count, GameConfig.MIN_PLAYERS)
-
-            # 随机选择卧底
-            room.undercovers = random.sample(room.players, undercover_count)
-
-            # 随机选择词语对
-            # word_pair = self.word_generator.get_random_word_pair()
-            word_pair_obj = WordPair.query.order_by(func.rand()).first()
-            if not word_pair_obj:
-                # Fallback if DB is empty (should not happen in prod if seeded)
-                word_pair = ("苹果", "香蕉")
-                logger.warning("Database empty, using fallback word pair")
-            else:
-                word_pair = (word_pair_obj.word_civilian, word_pair_obj.word_undercover)
-
-            # 分配词语
-            room.words = {"civilian": word_pair[0], "undercover": word_pair[1]}
-
-            # 更新房间状态
-            next_state = self.fsm.next_state(GameState.WAITING, GameEvent.START)
-            room.status = RoomStatus(next_state.value)
-            room.current_round = 1
-
-            # 保存房间信息
-            self.room_repo.save(room)
-
             if self.push and self.push.enabled():
+                messages = []
                 for pid in room.players:
-                    if pid in room.undercovers:
+                    if room.is_undercover(pid):
                         w = room.words["undercover"]
                     else:
                         w = room.words["civilian"]
-                    self.push.send_text(pid, f"您的词语：{w}")
+                    messages.append((pid, f"您的词语：{w}"))
+                self.push.send_text_many(messages)
 
             # 发送 WebSocket 通知
             if self.notification:
@@ -312,7 +419,7 @@ class GameService:
                 raise PlayerEliminatedError(user_id)
 
             # 根据用户身份返回对应词语
-            if user_id in room.undercovers:
+            if room.is_undercover(user_id):
                 word = room.words["undercover"]
             else:
                 word = room.words["civilian"]
@@ -339,36 +446,15 @@ class GameService:
             if not user or not user.has_joined_room():
                 raise UserNotInRoomError(user_id)
 
-            # 获取房间信息
-            room = self.room_repo.get(user.current_room)
+            # 原子地校验游戏状态、房主权限、序号与重复淘汰，并追加淘汰记录
+            result = self.room_scripts.vote(user.current_room, user_id, target_index)
+            target_player = result.target_player
+
+            # 重新读取房间用于判断游戏是否结束（结束时会写回状态，绕过 L1 缓存）
+            room = self.room_repo.get(user.current_room, use_cache=False)
             if not room:
                 raise RoomNotFoundError(user.current_room)
 
-            # 检查游戏状态
-            if room.status != RoomStatus.PLAYING:
-                raise GameNotStartedError()
-
-            # 检查是否为房主
-            if not room.is_creator(user_id):
-                raise RoomPermissionError(user_id, "投票")
-
-            # 检查序号是否有效
-            if target_index < 1 or target_index > room.get_player_count():
-                raise InvalidPlayerIndexError(target_index, room.get_player_count())
-
-            # 获取目标玩家
-            target_player = room.players[target_index - 1]
-
-            # 检查目标玩家是否已被淘汰
-            if room.is_eliminated(target_player):
-                raise PlayerEliminatedError(target_player)
-
-            # 记录被淘汰的玩家
-            room.eliminated.append(target_player)
-
-            # 保存房间信息
-            self.room_repo.save(room)
-
             # 状态机：投票事件保持在 PLAYING
             if not self.fsm.can_transition(GameState.PLAYING, GameEvent.VOTE):
                 raise RoomStateError(
@@ -434,11 +520,10 @@ class GameService:
                 raise RoomNotFoundError(room_id)
 
             # 查找目标玩家的索引
-            if target_uid not in room.players:
+            target_index = room.seat_of(target_uid)
+            if not target_index:
                 return False, "目标玩家不在房间中"
 
-            target_index = room.players.index(target_uid) + 1
-
             # 调用 vote_player 方法
             return self.vote_player(user_id, target_index)
 
@@ -479,7 +564,7 @@ class GameService:
                 raise GameNotStartedError()
 
             # 判断用户角色
-            if user_id in room.undercovers:
+            if room.is_undercover(user_id):
                 word = room.words.get("undercover", "")
                 role = 2  # 卧底
             else:
@@ -516,49 +601,9 @@ class GameService:
             if not room:
                 raise RoomNotFoundError(user.current_room)
 
-            # 构建状态信息
-            status_lines = []
-
-            # 用户信息
-            user_index = -1
-            for i, player in enumerate(room.players):
-                if player == user_id:
-                    user_index = i + 1
-                    break
-
-            status_lines.append(f"您的信息：{user.nickname} (序号: {user_index})")
-            status_lines.append("")
-
-            # 房间信息
-            status_lines.append(f"房间号：{room.room_id}")
-            status_lines.append(f"房间状态：{room.status.value}")
-            status_lines.append("房间成员：")
-
-            # 玩家列表
-            for i, player in enumerate(room.players):
-                player_obj = self.user_repo.get(player)
-                nickname = player_obj.nickname if player_obj else f"玩家{i + 1}"
-
-                # 添加角色标识
-                if player == room.creator:
-                    nickname += "(房主)"
-                if room.is_eliminated(player):
-                    nickname += "(已淘汰)"
-
-                status_lines.append(f"{i + 1}. {nickname}")
-
-            # 游戏信息
-            if room.status == RoomStatus.PLAYING:
-                status_lines.append("")
-                status_lines.append(f"当前轮次：第{room.current_round}轮")
-                status_lines.append(f"已淘汰：{len(room.eliminated)}人")
-
-                # 如果是房主，提示投票方式
-                if room.is_creator(user_id):
-                    status_lines.append("")
-                    status_lines.append("您是房主，可通过't+序号'投票淘汰玩家")
-
-            return True, "\n".join(status_lines)
+            # 批量获取玩家信息，避免逐个往返
+            player_objs = self.user_repo.get_many(room.players)
+            return True, self._status_text(room, user, user_id, player_objs)
 
         except (DomainException, ClientException) as e:
             logger.warning(f"用户/业务异常: {e.error_code} - {e.message}", extra={"details": e.details})
@@ -573,156 +618,57 @@ class GameService:
             return False, "显示状态时发生错误"
 
     def _generate_unique_room_code(self) -> str:
-        """生成唯一的房间短码（4位数字）"""
-        while True:
-            room_code = str(random.randint(1000, 9999))
-            # 检查roomCode是否已存在
-            if not self.room_repo.exists_by_code(room_code):
-                return room_code
+        """从码池分配唯一的房间短码（默认4位数字，余量不足时自动加长）"""
+        return self.room_repo.allocate_code()
 
     def _check_game_end(self, room: Room) -> tuple[bool, str]:
         """检查游戏是否结束"""
-        # 检查是否有卧底被淘汰
-        eliminated_undercovers = set(room.undercovers) & set(room.eliminated)
+        judged = self._judge_game_end(room)
+        if judged is None:
+            return False, ""
 
-        # 如果所有卧底都被淘汰，平民获胜
-        if len(eliminated_undercovers) == len(room.undercovers):
-            winner_team = "civilian"
-            result_message = "游戏结束！平民获胜，成功找出了所有卧底！"
-            self._finish_game(room, winner_team=winner_team)
-            
-            # 发送 WebSocket 通知 - 游戏结束
-            if self.notification:
-                from backend.websocket.events import GameEvent as WSGameEvent
-                self.notification.notify_room(
-                    room_id=room.room_id,
-                    event=WSGameEvent.ENDED.value,
-                    data={
-                        "winner_team": winner_team,
-                        "hint": result_message
-                    }
-                )
-            
-            return True, result_message
+        winner_team, result_message = judged
+        self._finish_game(room, winner_team=winner_team)
 
-        # 检查剩余玩家数量
-        remaining_players = room.get_remaining_players()
-
-        # 如果剩余玩家少于3人，游戏结束
-        if len(remaining_players) < 3:
-            winner_team = "undercover"
-            result_message = "游戏结束！卧底获胜！"
-            self._finish_game(room, winner_team=winner_team)
-            
-            # 发送 WebSocket 通知 - 游戏结束
-            if self.notification:
-                from backend.websocket.events import GameEvent as WSGameEvent
-                self.notification.notify_room(
-                    room_id=room.room_id,
-                    event=WSGameEvent.ENDED.value,
-                    data={
-                        "winner_team": winner_team,
-                        "hint": result_message
-                    }
-                )
-            
-            return True, result_message
-
-        # 检查卧底数量是否大于等于平民数量
-        remaining_undercovers = [p for p in room.undercovers if p in remaining_players]
-        remaining_civilians = [p for p in remaining_players if p not in room.undercovers]
-
-        if len(remaining_undercovers) >= len(remaining_civilians):
-            winner_team = "undercover"
-            result_message = "游戏结束！卧底获胜！"
-            self._finish_game(room, winner_team=winner_team)
-            
-            # 发送 WebSocket 通知 - 游戏结束
-            if self.notification:
-                from backend.websocket.events import GameEvent as WSGameEvent
-                self.notification.notify_room(
-                    room_id=room.room_id,
-                    event=WSGameEvent.ENDED.value,
-                    data={
-                        "winner_team": winner_team,
-                        "hint": result_message
-                    }
-                )
-            
-            return True, result_message
+        # 发送 WebSocket 通知 - 游戏结束
+        if self.notification:
+            from backend.websocket.events import GameEvent as WSGameEvent
+            self.notification.notify_room(
+                room_id=room.room_id,
+                event=WSGameEvent.ENDED.value,
+                data={
+                    "winner_team": winner_team,
+                    "hint": result_message
+                }
+            )
 
-        return False, ""
+        return True, result_message
 
     def _finish_game(self, room: Room, winner_team: str) -> None:
         """结束游戏逻辑：更新状态、保存记录、清理房间"""
         # 1. 更新房间状态
-        next_state = self.fsm.next_state(GameState.PLAYING, GameEvent.END)
-        room.status = RoomStatus(next_state.value)
-        self.room_repo.save(room)
+        self._mark_ended(room)
+        self.room_repo.update_fields(room, "status")
 
-        # 2. 保存对局记录到 MySQL
-        try:
-            creator_sql = SQLUser.query.filter_by(openid=room.creator).first()
-            record = GameRecord(
-                room_id=room.room_id,
-                creator_id=creator_sql.id if creator_sql else None,
-                winner_team=winner_team,
-                player_count=len(room.players),
-                undercover_count=len(room.undercovers),
-                civilian_word=room.words.get("civilian"),
-                undercover_word=room.words.get("undercover"),
-                ended_at=datetime.utcnow(),
-            )
-            db.session.add(record)
-
-            # 更新参与者的胜率
-            # 注意：目前的 User 系统是 Redis+SQL 混合。
-            # 这里简单更新一下 MySQL 中的记录（如果有）
-            for player_id in room.players:
-                p_sql = SQLUser.query.filter_by(openid=player_id).first()
-                if p_sql:
-                    p_sql.total_games += 1
-                    is_winner = (player_id in room.undercovers and winner_team == "undercover") or (
-                        player_id not in room.undercovers and winner_team == "civilian"
-                    )
-                    if is_winner:
-                        p_sql.wins += 1
-
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Failed to save game record: {e}")
+        # 2. 保存对局记录（启用 write-behind 时写入 Redis 流，由后台批量写 MySQL）
+        result = GameResult.from_room(room, winner_team)
+        if self.record_writer is None or not self.record_writer.publish(result):
+            self._record_game(result)
 
         # 3. 让所有玩家自动退出房间
         self._auto_leave_room(room)
 
     def _auto_leave_room(self, room: Room) -> None:
         """自动让玩家离开房间"""
-        for player_id in room.players:
-            user = self.user_repo.get(player_id)
-            if user and user.current_room == room.room_id:
+        users = self.user_repo.get_many(room.players)
+        leaving = []
+        for user in users.values():
+            if user.current_room == room.room_id:
                 user.leave_room()
-                self.user_repo.save(user)
+                leaving.append(user)
+        self.user_repo.save_many(leaving)
 
     def _push_room_status(self, room: Room) -> None:
-        lines = [
-            f"房间号：{room.room_id}",
-            f"房间状态：{room.status.value}",
-            "房间成员：",
-        ]
-        for i, player in enumerate(room.players):
-            u = self.user_repo.get(player)
-            n = u.nickname if u else f"玩家{i + 1}"
-            if player == room.creator:
-                n += "(房主)"
-            if room.is_eliminated(player):
-                n += "(已淘汰)"
-            lines.append(f"{i + 1}. {n}")
-        if room.status == RoomStatus.PLAYING:
-            lines.append("")
-            lines.append(f"当前轮次：第{room.current_round}轮")
-            lines.append(f"已淘汰：{len(room.eliminated)}人")
-        content = "\n".join(lines)
-        for pid in room.players:
-            if self.push and self.push.enabled():
-                self.push.send_text(pid, content)
+        content = self._room_status_text(room, self.user_repo.get_many(room.players))
+        if self.push and self.push.enabled():
+            self.push.send_text_many([(pid, content) for pid in room.players])
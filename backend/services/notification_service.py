@@ -6,14 +6,25 @@
 支持两种 WebSocket 协议：
 1. Socket.IO（用于 Web 端）
 2. 原生 WebSocket（用于微信小程序）
+
+配置事件日志（RoomEventLog）时，每条房间事件先写入房间的事件流并获得序号 seq，
+断线重连的客户端凭最后收到的 seq 补齐缺失的事件
+
+每条事件只构建一个 EventFrame，两种协议共享，各自的线上格式只编码一次
+
+HTTP 请求内发送通知前先写回请求身份映射中的修改，写回失败时不发送通知
 """
 
 import time
 from typing import Any
 
+import redis
 from flask_socketio import SocketIO
 
+from backend.repositories.room_event_log import RoomEventLog
+from backend.repositories.unit_of_work import flush_unit_of_work
 from backend.utils.logger import setup_logger
+from backend.websocket.frame import EventFrame
 
 logger = setup_logger(__name__)
 
@@ -33,18 +44,20 @@ class NotificationService:
     - 未来多实例：只需配置 message_queue，代码无需改变
     """
     
-    def __init__(self, socketio: SocketIO):
+    def __init__(self, socketio: SocketIO, event_log: RoomEventLog | None = None):
         """
         初始化通知服务
         
         Args:
             socketio: Flask-SocketIO 实例
+            event_log: 房间事件日志（可选，未配置时事件不带 seq、不可补发）
         """
         self.socketio = socketio
+        self.event_log = event_log
         self.native_ws_broadcast = None  # 将在 app_factory 中设置
     
     def set_native_ws_broadcast(self, broadcast_func):
-        """设置原生 WebSocket 广播函数"""
+        """设置原生 WebSocket 广播函数（参数为 EventFrame）"""
         self.native_ws_broadcast = broadcast_func
     
     def broadcast_room_event(
@@ -81,6 +94,9 @@ class NotificationService:
             data: 事件数据（轻量级提示信息）
             exclude_user: 排除的用户ID（可选，如操作发起者）
         
+        Raises:
+            RepositoryException: 请求内未写回的修改写回失败（此时不发送通知）
+        
         Example:
             notification_service.notify_room(
                 room_id="8888",
@@ -88,19 +104,28 @@ class NotificationService:
                 data={"player_count": 4, "hint": "新玩家加入"}
             )
         """
+        # 先落库再通知，避免其他玩家收到通知后读到旧数据、而本请求最终写回失败
+        flush_unit_of_work()
         message = self._format_message(room_id, event, data)
+        if self.event_log is not None:
+            try:
+                message["seq"] = self.event_log.append(room_id, message)
+            except redis.RedisError as e:
+                # 记录失败不影响实时推送，只是该事件无法补发
+                logger.warning("房间事件记录失败", extra={'room_id': room_id, 'event': event, 'error': str(e)})
+        frame = EventFrame.from_message(message)
         
         try:
             # 发送到 Socket.IO 客户端（Web 端）
             self.socketio.emit(
                 event,
-                message,
+                frame.socketio_payload,
                 room=room_id
             )
             
             # 发送到原生 WebSocket 客户端（小程序）
             if self.native_ws_broadcast:
-                self.native_ws_broadcast(room_id, event, message)
+                self.native_ws_broadcast(frame)
             
             logger.debug(
                 f"Notification sent to room",
@@ -147,7 +172,7 @@ class NotificationService:
         """
         格式化消息
         
-        统一的消息格式：
+        统一的消息格式（记录到事件日志后另附 "seq": 事件序号）：
         {
             "event": "room.player_joined",
             "room_id": "8888",
@@ -1,19 +1,349 @@
+#!/usr/bin/env python3
+"""
+微信推送服务
+配置了 PushDispatcher 时 send_text 只把消息写入 Redis 队列即返回，由后台工作线程调用微信接口发送，
+请求线程不再等待逐个玩家的 HTTPS 调用；未配置时直接同步发送
+
+PushDispatcher 的队列结构（键都带 {push} 路由标签，分片模式下位于同一节点）：
+- push:{push}:queue:<openid>   每个用户一个消息列表，按入队顺序发送
+- push:{push}:ready            待处理的用户
+- push:{push}:active:<openid>  用户已被某个工作线程认领（或正在等待重试），同一用户同一时刻只有一个线程发送，
+                               以此保证同一用户的消息有序；认领方崩溃时标记按 TTL 过期，该用户下次入队时恢复发送
+- push:{push}:retry            发送失败等待重试的用户（ZSET，score 为到期毫秒时间戳），指数退避
+- push:{push}:dead             超过最大尝试次数的消息（死信，只保留最近 dead_letter_max 条）
+- push:{push}:pending          待发送消息总数，达到 max_pending 时拒绝入队
+"""
+
+import json
+import os
+import threading
+import time
+
+import redis
+
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 批量入队：KEYS = pending, ready, 然后每条消息一对 (queue, active)
+# ARGV = max_pending, active_ttl_ms, 然后每条消息一对 (openid, payload)
+# 按顺序接收，队列满时停止，返回接收的条数
+_ENQUEUE = """
+local max_pending = tonumber(ARGV[1])
+local pending = tonumber(redis.call('GET', KEYS[1]) or '0')
+local accepted = 0
+for j = 1, (#KEYS - 2) / 2 do
+    if max_pending > 0 and pending >= max_pending then
+        break
+    end
+    redis.call('RPUSH', KEYS[1 + 2 * j], ARGV[2 + 2 * j])
+    if redis.call('SET', KEYS[2 + 2 * j], '1', 'NX', 'PX', ARGV[2]) then
+        redis.call('RPUSH', KEYS[2], ARGV[1 + 2 * j])
+    end
+    pending = pending + 1
+    accepted = accepted + 1
+end
+if accepted > 0 then
+    redis.call('INCRBY', KEYS[1], accepted)
+end
+return accepted
+"""
+
+# 释放用户：KEYS = queue, active, ready；ARGV = openid
+# 队列已空时清除认领标记，否则（单次处理条数已达上限）放回 ready 末尾，让其他用户先处理
+_RELEASE = """
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[2])
+    return 0
+end
+redis.call('RPUSH', KEYS[3], ARGV[1])
+return 1
+"""
+
+# 到期重试：KEYS = retry, ready；ARGV = now_ms, limit
+_PROMOTE = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, openid in ipairs(due) do
+    redis.call('ZREM', KEYS[1], openid)
+    redis.call('RPUSH', KEYS[2], openid)
+end
+return #due
+"""
+
+
+class PushDispatcher:
+    """基于 Redis 队列的异步推送分发器（每个进程一组工作线程）"""
+
+    PREFIX = "push:{push}"
+
+    def __init__(self, redis_client, client, workers: int = 4, max_pending: int = 10000,
+                 max_attempts: int = 5, retry_base_seconds: float = 1.0, retry_max_seconds: float = 60.0,
+                 dead_letter_max: int = 1000, batch_size: int = 20, active_ttl_seconds: float = 60.0):
+        """
+        Args:
+            redis_client: Redis 客户端
+            client: 微信客户端（send_text 返回是否发送成功）
+            workers: 每个进程的发送线程数
+            max_pending: 队列中最多的待发送消息数，0 表示不限制
+            max_attempts: 单条消息的最大尝试次数，超过后进入死信
+            retry_base_seconds: 第一次重试的等待时间，之后每次翻倍
+            retry_max_seconds: 重试等待时间上限
+            dead_letter_max: 死信列表保留的条数
+            batch_size: 认领一个用户后最多连续发送的条数
+            active_ttl_seconds: 用户认领标记的有效期（发送线程崩溃时的恢复时间）
+        """
+        self.redis = redis_client
+        self.client = client
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.dead_letter_max = dead_letter_max
+        self.batch_size = batch_size
+        self.active_ttl_ms = int(active_ttl_seconds * 1000)
+        self.ready_key = f"{self.PREFIX}:ready"
+        self.retry_key = f"{self.PREFIX}:retry"
+        self.dead_key = f"{self.PREFIX}:dead"
+        self.pending_key = f"{self.PREFIX}:pending"
+        self._enqueue = redis_client.register_script(_ENQUEUE)
+        self._release = redis_client.register_script(_RELEASE)
+        self._promote = redis_client.register_script(_PROMOTE)
+
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._pid = None
+        self.enqueued = 0
+        self.rejected = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+    def _queue_key(self, openid: str) -> str:
+        return f"{self.PREFIX}:queue:{openid}"
+
+    def _active_key(self, openid: str) -> str:
+        return f"{self.PREFIX}:active:{openid}"
+
+    # ------------------------------------------------------------------
+    # 入队
+    # ------------------------------------------------------------------
+
+    def enqueue(self, openid: str, content: str) -> bool:
+        """推送一条消息（入队即返回），队列已满或 Redis 不可用时返回 False"""
+        return self.enqueue_many([(openid, content)]) == 1
+
+    def enqueue_many(self, messages: list[tuple[str, str]]) -> int:
+        """
+        批量推送（一次往返），按顺序入队，队列满时后面的消息被丢弃
+
+        Args:
+            messages: [(openid, 文本内容)]
+
+        Returns:
+            入队的条数
+        """
+        if not messages:
+            return 0
+        self._ensure_workers()
+        keys = [self.pending_key, self.ready_key]
+        args = [self.max_pending, self.active_ttl_ms]
+        now_ms = int(time.time() * 1000)
+        for openid, content in messages:
+            keys += [self._queue_key(openid), self._active_key(openid)]
+            args += [openid, json.dumps({'content': content, 'attempts': 0, 'enqueued_at': now_ms}, ensure_ascii=False)]
+        try:
+            accepted = self._enqueue(keys=keys, args=args)
+        except redis.RedisError as e:
+            logger.warning("推送消息入队失败", extra={'count': len(messages), 'error': str(e)})
+            accepted = 0
+        with self._lock:
+            self.enqueued += accepted
+            self.rejected += len(messages) - accepted
+        if accepted < len(messages):
+            logger.warning("推送队列已满，部分消息被丢弃", extra={'count': len(messages), 'accepted': accepted})
+        return accepted
+
+    # ------------------------------------------------------------------
+    # 工作线程
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """启动当前进程的发送线程与重试调度线程（重复调用无副作用）"""
+        self._ensure_workers()
+
+    def _ensure_workers(self) -> None:
+        """按需启动工作线程；gunicorn fork 出的子进程会重新启动"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"push-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            self._threads.append(threading.Thread(target=self._schedule, name="push-retry", daemon=True))
+            for thread in self._threads:
+                thread.start()
+            self._pid = pid
+        logger.info("推送工作线程已启动", extra={'workers': self.workers, 'pid': pid})
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止当前进程的工作线程（正在发送的消息会先发送完）"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                item = self.redis.blpop(self.ready_key, timeout=1)
+                if item is None:
+                    continue
+                openid = item[1]
+                if isinstance(openid, bytes):
+                    openid = openid.decode('utf-8')
+                self._drain(openid)
+            except (redis.RedisError, ValueError) as e:
+                logger.warning("推送工作线程处理失败", extra={'error': str(e)})
+                self._stopping.wait(1.0)
+
+    def _schedule(self, interval: float = 0.5) -> None:
+        while not self._stopping.wait(interval):
+            try:
+                self._promote(keys=[self.retry_key, self.ready_key], args=[int(time.time() * 1000), 100])
+            except redis.RedisError as e:
+                logger.warning("推送重试调度失败", extra={'error': str(e)})
+
+    def _drain(self, openid: str) -> None:
+        """按顺序发送已认领用户的消息；失败时保留在队首等待重试，期间不发送该用户后面的消息"""
+        queue_key = self._queue_key(openid)
+        active_key = self._active_key(openid)
+        for _ in range(self.batch_size):
+            raw = self.redis.lindex(queue_key, 0)
+            if raw is None:
+                break
+            self.redis.pexpire(active_key, self.active_ttl_ms)
+            message = json.loads(raw)
+            if self._deliver(openid, message['content']):
+                pipe = self.redis.pipeline()
+                pipe.lpop(queue_key)
+                pipe.decr(self.pending_key)
+                pipe.execute()
+                with self._lock:
+                    self.sent += 1
+                continue
+
+            message['attempts'] += 1
+            if message['attempts'] >= self.max_attempts:
+                self._dead_letter(openid, queue_key, message)
+                continue
+
+            delay = min(self.retry_base_seconds * 2 ** (message['attempts'] - 1), self.retry_max_seconds)
+            pipe = self.redis.pipeline()
+            pipe.lset(queue_key, 0, json.dumps(message, ensure_ascii=False))
+            pipe.zadd(self.retry_key, {openid: int((time.time() + delay) * 1000)})
+            pipe.pexpire(active_key, int(delay * 1000) + self.active_ttl_ms)
+            pipe.execute()
+            with self._lock:
+                self.retried += 1
+            return
+
+        self._release(keys=[queue_key, active_key, self.ready_key], args=[openid])
+
+    def _deliver(self, openid: str, content: str) -> bool:
+        try:
+            ok = bool(self.client.send_text(openid, content))
+        except Exception as e:
+            logger.warning("微信推送异常", extra={'openid': openid, 'error': str(e)})
+            ok = False
+        if not ok:
+            with self._lock:
+                self.failed += 1
+        return ok
+
+    def _dead_letter(self, openid: str, queue_key: str, message: dict) -> None:
+        entry = {**message, 'openid': openid, 'failed_at': int(time.time() * 1000)}
+        pipe = self.redis.pipeline()
+        pipe.lpop(queue_key)
+        pipe.decr(self.pending_key)
+        pipe.lpush(self.dead_key, json.dumps(entry, ensure_ascii=False))
+        pipe.ltrim(self.dead_key, 0, self.dead_letter_max - 1)
+        pipe.execute()
+        with self._lock:
+            self.dead_lettered += 1
+        logger.warning(
+            "推送消息超过最大重试次数，已转入死信", extra={'openid': openid, 'attempts': message['attempts']}
+        )
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def dead_letters(self, limit: int = 50) -> list[dict]:
+        """最近的死信（新的在前）"""
+        return [json.loads(raw) for raw in self.redis.lrange(self.dead_key, 0, limit - 1)]
+
+    def get_stats(self) -> dict:
+        """获取统计信息（计数为当前进程，队列长度为全局）"""
+        with self._lock:
+            stats = {
+                'workers': len(self._threads) - 1 if self._threads else 0,
+                'enqueued': self.enqueued,
+                'rejected': self.rejected,
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried,
+                'dead_lettered': self.dead_lettered,
+            }
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(self.pending_key)
+            pipe.llen(self.ready_key)
+            pipe.zcard(self.retry_key)
+            pipe.llen(self.dead_key)
+            pending, ready, retrying, dead = pipe.execute()
+            stats.update(pending=int(pending or 0), ready=ready, retrying=retrying, dead=dead)
+        except redis.RedisError as e:
+            stats['error'] = str(e)
+        return stats
 
 
 class PushService:
-    def __init__(self, client):
+    def __init__(self, client, dispatcher: PushDispatcher | None = None):
         self.client = client
+        self.dispatcher = dispatcher
 
     def enabled(self) -> bool:
         return self.client is not None
 
     def send_text(self, openid: str, content: str) -> bool:
+        """发送文本消息；异步模式下只入队，返回是否入队成功"""
         if not self.enabled():
             return False
+        if self.dispatcher is not None:
+            return self.dispatcher.enqueue(openid, content)
         return bool(self.client.send_text(openid, content))
 
+    def send_text_many(self, messages: list[tuple[str, str]]) -> int:
+        """批量发送文本消息 [(openid, 内容)]，返回发送（或入队）成功的条数"""
+        if not self.enabled():
+            return 0
+        if self.dispatcher is not None:
+            return self.dispatcher.enqueue_many(messages)
+        return sum(1 for openid, content in messages if self.client.send_text(openid, content))
+
     def get_user_nickname(self, openid: str) -> str:
         if not self.enabled():
             return ""
         return self.client.get_user_nickname(openid)
 
+    def get_stats(self) -> dict | None:
+        return self.dispatcher.get_stats() if self.dispatcher is not None else None
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+房间快照
+构建房间完整状态（玩家列表、座位、淘汰情况），供状态同步接口与断线重连补发共用
+"""
+
+from typing import Any
+
+from backend.models.room import Room
+from backend.models.user import User
+
+
+def build_room_snapshot(room: Room, users: dict[str, User]) -> dict[str, Any]:
+    """
+    构建房间快照
+
+    Args:
+        room: 房间对象
+        users: 玩家ID -> 用户（缺失的玩家使用默认昵称）
+    """
+    players = []
+    for i, player_id in enumerate(room.players):
+        user = users.get(player_id)
+        players.append({
+            "openid": player_id,
+            "nickname": user.nickname if user else f"玩家{i+1}",
+            "seat": i + 1,
+            "is_eliminated": room.is_eliminated(player_id),
+            "is_creator": room.is_creator(player_id)
+        })
+
+    return {
+        "room_id": room.room_id,
+        "status": room.status.value,
+        "player_count": room.get_player_count(),
+        "updated_at": int(room.last_active.timestamp()) if room.last_active else 0,
+        "players": players
+    }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+词库目录服务
+把 MySQL word_pairs 表（不含已删除的词语对）加载为进程内的 WordGenerator，开局抽词不再查询数据库
+
+刷新：每隔 check_seconds 读取一次 Redis 版本键 words:version，版本变化（词库被修改后调用 bump_version）
+或距上次加载超过 refresh_seconds 时重新加载；加载需要应用上下文，失败时继续使用已加载的词库
+"""
+
+import threading
+import time
+
+import redis
+from sqlalchemy import or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend.config.game_config import GameConfig
+from backend.extensions import db
+from backend.models.sql import WordPair
+from backend.utils.logger import setup_logger
+from backend.utils.word_generator import WordGenerator
+
+logger = setup_logger(__name__)
+
+DEFAULT_CATEGORY = "默认"
+DEFAULT_DIFFICULTY = 1
+
+
+class WordCatalog:
+    """进程内词库目录"""
+
+    VERSION_KEY = "words:version"
+
+    def __init__(self, redis_client: redis.Redis | None = None, refresh_seconds: float = 600.0,
+                 check_seconds: float = 5.0):
+        """
+        Args:
+            redis_client: Redis 客户端（用于读取版本键），为空时只按 refresh_seconds 定期刷新
+            refresh_seconds: 词库最长使用时间（秒）
+            check_seconds: 读取版本键的最小间隔（秒）
+        """
+        self.redis = redis_client
+        self.refresh_seconds = refresh_seconds
+        self.check_seconds = check_seconds
+        self._generator: WordGenerator | None = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._next_check = 0.0
+        self._from_database = False
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def sample(self, category: str | None = None, difficulty: int | None = None) -> tuple[str, str]:
+        """
+        随机抽取词语对（O(1)），可按类别、难度筛选；没有符合条件的词语对时不限条件抽取
+
+        Returns:
+            (平民词, 卧底词)
+        """
+        self._maybe_refresh()
+        return self._generator.get_random_word_pair(category, difficulty)
+
+    def bump_version(self) -> None:
+        """词库修改后调用，各进程在 check_seconds 内重新加载"""
+        if self.redis is not None:
+            self.redis.incr(self.VERSION_KEY)
+        self._next_check = 0.0
+
+    def _maybe_refresh(self) -> None:
+        now = time.monotonic()
+        if self._generator is not None and now < self._next_check:
+            return
+        # 已有词库时不等待其他线程的刷新
+        if not self._lock.acquire(blocking=self._generator is None):
+            return
+        try:
+            if self._generator is not None and now < self._next_check:
+                return
+            self._next_check = now + self.check_seconds
+            version = self._read_version()
+            if (self._generator is None or version != self._version
+                    or not self._from_database or now - self._loaded_at >= self.refresh_seconds):
+                self._load(version, now)
+        finally:
+            self._lock.release()
+
+    def _read_version(self):
+        if self.redis is None:
+            return None
+        try:
+            return self.redis.get(self.VERSION_KEY)
+        except redis.RedisError as e:
+            logger.warning("读取词库版本失败", extra={'error': str(e)})
+            return self._version
+
+    def _load(self, version, now: float) -> None:
+        try:
+            rows = (
+                db.session.query(WordPair.word_civilian, WordPair.word_undercover, WordPair.category,
+                                 WordPair.difficulty)
+                .filter(or_(WordPair.is_deleted.is_(False), WordPair.is_deleted.is_(None)))
+                .all()
+            )
+        except (SQLAlchemyError, RuntimeError) as e:
+            # RuntimeError: 没有应用上下文
+            logger.warning("词库加载失败，继续使用已加载的词库", extra={'error': str(e)})
+            if self._generator is None:
+                self._use_builtin()
+            return
+
+        if not rows:
+            logger.warning("数据库词库为空，使用内置词库")
+            self._use_builtin()
+            self._version = version
+            return
+
+        generator = WordGenerator(
+            [(row.word_civilian, row.word_undercover) for row in rows],
+            categories=[row.category or DEFAULT_CATEGORY for row in rows],
+            difficulties=[row.difficulty or DEFAULT_DIFFICULTY for row in rows],
+        )
+        generator.warm()
+        self._generator = generator
+        self._version = version
+        self._loaded_at = now
+        self._from_database = True
+        self.refreshes += 1
+        logger.info("词库已加载", extra={'pairs': len(rows), 'version': version})
+
+    def _use_builtin(self) -> None:
+        pairs = GameConfig.WORD_PAIRS
+        self._generator = WordGenerator(
+            pairs, categories=[DEFAULT_CATEGORY] * len(pairs), difficulties=[DEFAULT_DIFFICULTY] * len(pairs)
+        )
+        self._from_database = False
+
+    def get_stats(self) -> dict:
+        """获取统计信息"""
+        generator = self._generator
+        return {
+            'pairs': len(generator.word_pairs) if generator is not None else 0,
+            'categories': len(set(generator.categories)) if generator is not None else 0,
+            'from_database': self._from_database,
+            'version': self._version.decode('utf-8') if isinstance(self._version, bytes) else self._version,
+            'age_seconds': round(time.monotonic() - self._loaded_at, 1) if self._from_database else None,
+            'refreshes': self.refreshes,
+        }
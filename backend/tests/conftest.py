@@ -8,6 +8,10 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
+# 测试环境使用 fakeredis 与内存 SQLite，不依赖外部服务
+os.environ.setdefault("TESTING", "true")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite://")
+
 import pytest
 
 from backend.config.settings import Settings
@@ -72,3 +76,30 @@ def app_with_mock_services(app, mock_auth_service, mock_notification_service):
     app.auth_service = mock_auth_service
     app.notification_service = mock_notification_service
     return app
+
+
+@pytest.fixture
+def make_user(app):
+    """创建测试用户，返回 (user_id, 认证请求头)"""
+    import uuid
+
+    from backend.models.user import User
+
+    def _make_user(nickname: str = "测试玩家"):
+        user_id = f"test_{uuid.uuid4().hex[:12]}"
+        with app.app_context():
+            app.config['user_repository'].save(User(openid=user_id, nickname=nickname))
+        token = app.auth_service._generate_token(user_id)
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return _make_user
+
+
+@pytest.fixture(scope="session")
+def db_tables(app):
+    """在测试数据库（内存 SQLite）中建表"""
+    from backend.extensions import db
+
+    with app.app_context():
+        db.create_all()
+    return db
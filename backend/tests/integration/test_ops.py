@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+运维接口集成测试
+"""
+
+import pytest
+
+OPS_TOKEN = "test-ops-token"
+
+
+@pytest.fixture
+def ops_headers(app, monkeypatch):
+    monkeypatch.setitem(app.config, "OPS_TOKEN", OPS_TOKEN)
+    return {"X-Ops-Token": OPS_TOKEN}
+
+
+class TestOpsAuth:
+    def test_disabled_without_token_config(self, app, client, monkeypatch):
+        monkeypatch.setitem(app.config, "OPS_TOKEN", "")
+
+        assert client.get("/ops/rooms", headers={"X-Ops-Token": ""}).status_code == 404
+
+    def test_rejects_missing_or_wrong_token(self, client, ops_headers):
+        assert client.get("/ops/rooms").status_code == 401
+        assert client.get("/ops/rooms", headers={"X-Ops-Token": "wrong"}).status_code == 401
+
+
+class TestMetrics:
+    def test_requires_token(self, client, ops_headers):
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"X-Ops-Token": "wrong"}).status_code == 401
+
+    def test_returns_stats(self, client, ops_headers):
+        response = client.get("/metrics", headers=ops_headers)
+
+        assert response.status_code == 200
+        assert "identity_map" in response.get_json()
+
+
+class TestOpsRooms:
+    def test_returns_redacted_summary(self, client, make_user, ops_headers):
+        _, host = make_user()
+        created = client.post("/api/v1/room/create", headers=host).get_json()["data"]
+
+        response = client.get("/ops/rooms?limit=200", headers=ops_headers)
+
+        assert response.status_code == 200
+        rooms = {room["room_id"]: room for room in response.get_json()["rooms"]}
+        assert rooms[created["room_id"]] == {
+            "room_id": created["room_id"],
+            "room_code": created["room_code"],
+            "status": "waiting",
+            "player_count": 1,
+        }
+
+    def test_invalid_status(self, client, ops_headers):
+        assert client.get("/ops/rooms?status=unknown", headers=ops_headers).status_code == 400
+
+
+class TestOpsMemory:
+    def test_requires_token(self, client, ops_headers):
+        assert client.get("/ops/memory").status_code == 401
+
+    def test_scan_is_capped(self, app, client, make_user, ops_headers, monkeypatch):
+        for _ in range(3):
+            make_user()
+        monkeypatch.setitem(app.config, "OPS_MEMORY_MAX_KEYS", 2)
+
+        response = client.get("/ops/memory?max_keys=1000", headers=ops_headers)
+
+        assert response.status_code == 200
+        report = response.get_json()
+        assert report["scanned"] == 2
+        assert report["truncated"] is True
+        assert sum(family["keys"] for family in report["families"].values()) == 2
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+房间接口条件请求（ETag / If-None-Match）集成测试
+"""
+
+import pytest
+
+from backend.api.decorators import room_etag
+
+
+def create_room(client, headers) -> dict:
+    response = client.post("/api/v1/room/create", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+def join_room(client, headers, room_id):
+    response = client.post("/api/v1/room/join", json={"room_id": room_id}, headers=headers)
+    assert response.status_code == 200
+
+
+def fetch(client, url, headers, etag=None):
+    if etag is not None:
+        headers = {**headers, "If-None-Match": etag}
+    return client.get(url, headers=headers)
+
+
+@pytest.fixture(params=["/api/v1/room/{}", "/api/v1/game/sync/{}"])
+def room_url(request):
+    return request.param
+
+
+class TestRoomConditional:
+    def test_matching_etag_returns_304(self, app, client, make_user, room_url):
+        _, host = make_user()
+        room = create_room(client, host)
+        url = room_url.format(room["room_id"])
+
+        response = fetch(client, url, host)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        with app.app_context():
+            version = app.config["room_repository"].get_version(room["room_id"])
+        assert etag == f'W/"{room_etag(version)}"'
+        assert response.headers["Cache-Control"] == "no-cache"
+
+        not_modified = fetch(client, url, host, etag)
+        assert not_modified.status_code == 304
+        assert not_modified.headers["ETag"] == etag
+        assert not_modified.data == b""
+
+        assert fetch(client, url, host, "*").status_code == 304
+        assert fetch(client, url, host, 'W/"room-v0"').status_code == 200
+
+    def test_etag_changes_after_join_and_leave(self, client, make_user, room_url):
+        _, host = make_user()
+        _, guest = make_user()
+        room = create_room(client, host)
+        url = room_url.format(room["room_id"])
+        created = fetch(client, url, host).headers["ETag"]
+
+        join_room(client, guest, room["room_id"])
+        response = fetch(client, url, host, created)
+        assert response.status_code == 200
+        joined = response.headers["ETag"]
+        assert joined != created
+
+        assert client.post("/api/v1/room/leave", headers=guest).status_code == 200
+        response = fetch(client, url, host, joined)
+        assert response.status_code == 200
+        assert response.headers["ETag"] not in (created, joined)
+
+    def test_etag_changes_after_vote(self, app, client, make_user, room_url):
+        host_id, host = make_user()
+        guests = [make_user() for _ in range(4)]
+        room = create_room(client, host)
+        for _, headers in guests:
+            join_room(client, headers, room["room_id"])
+        response = client.post("/api/v1/game/start", json={"room_id": room["room_id"]}, headers=host)
+        assert response.status_code == 200
+
+        url = room_url.format(room["room_id"])
+        started = fetch(client, url, host).headers["ETag"]
+        with app.app_context():
+            stored = app.config["room_repository"].get(room["room_id"], use_cache=False)
+        target = next(player for player in stored.players if player != host_id and not stored.is_undercover(player))
+
+        response = client.post("/api/v1/game/vote", json={"room_id": room["room_id"], "target_uid": target},
+                               headers=host)
+        assert response.status_code == 200
+
+        response = fetch(client, url, host, started)
+        assert response.status_code == 200
+        assert response.headers["ETag"] != started
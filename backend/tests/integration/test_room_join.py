@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+加入房间接口集成测试
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.config.game_config import GameConfig
+from backend.models.room import RoomStatus
+
+
+def create_room(client, headers) -> dict:
+    response = client.post("/api/v1/room/create", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+def join_room(client, headers, **body):
+    return client.post("/api/v1/room/join", json=body, headers=headers)
+
+
+class TestJoinRoom:
+    def test_join_by_code(self, client, make_user):
+        _, host = make_user()
+        user_id, headers = make_user()
+        room = create_room(client, host)
+
+        response = join_room(client, headers, room_code=room["room_code"])
+
+        assert response.status_code == 200
+        data = response.get_json()["data"]
+        assert data["room_id"] == room["room_id"]
+        assert [p["uid"] for p in data["players"]][-1] == user_id
+
+    def test_join_twice_is_idempotent(self, client, make_user):
+        _, host = make_user()
+        _, headers = make_user()
+        room = create_room(client, host)
+
+        join_room(client, headers, room_id=room["room_id"])
+        response = join_room(client, headers, room_id=room["room_id"])
+
+        assert response.status_code == 200
+        assert len(response.get_json()["data"]["players"]) == 2
+
+    def test_join_unknown_room(self, client, make_user):
+        _, headers = make_user()
+
+        assert join_room(client, headers, room_id="no_such_room").status_code == 404
+        assert join_room(client, headers, room_code="000000").status_code == 404
+
+    def test_join_while_in_other_room(self, client, make_user):
+        _, host_a = make_user()
+        _, host_b = make_user()
+        room_b = create_room(client, host_b)
+        create_room(client, host_a)
+
+        response = join_room(client, host_a, room_id=room_b["room_id"])
+
+        assert response.status_code == 400
+        assert response.get_json()["message"] == "User already in another room"
+
+    def test_join_started_game(self, app, client, make_user):
+        _, host = make_user()
+        room = create_room(client, host)
+        room_repo = app.config["room_repository"]
+        with app.app_context():
+            stored = room_repo.get(room["room_id"])
+            stored.status = RoomStatus.PLAYING
+            room_repo.save(stored)
+
+        _, headers = make_user()
+        response = join_room(client, headers, room_id=room["room_id"])
+
+        assert response.status_code == 400
+        assert response.get_json()["message"] == "Game already started"
+
+    def test_concurrent_joins_respect_capacity(self, app, client, make_user):
+        _, host = make_user()
+        room = create_room(client, host)
+        users = [make_user() for _ in range(GameConfig.MAX_PLAYERS + 4)]
+
+        def join(user):
+            with app.test_client() as c:
+                response = join_room(c, user[1], room_id=room["room_id"])
+                return response.status_code, response.get_json()["message"]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(join, users))
+
+        joined = [r for r in results if r[0] == 200]
+        rejected = [r for r in results if r[0] != 200]
+        assert len(joined) == GameConfig.MAX_PLAYERS - 1
+        assert rejected and all(r == (400, "Room is full") for r in rejected)
+        with app.app_context():
+            assert len(app.config["room_repository"].get(room["room_id"]).players) == GameConfig.MAX_PLAYERS
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+长轮询同步接口集成测试
+"""
+
+import pytest
+
+
+def create_room(client, headers) -> dict:
+    response = client.post("/api/v1/room/create", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+class TestPollRoom:
+    def test_unchanged_room_times_out_with_304(self, client, make_user):
+        _, host = make_user()
+        room = create_room(client, host)
+        etag = client.get(f"/api/v1/room/{room['room_id']}", headers=host).headers["ETag"]
+
+        response = client.get(f"/api/v1/game/sync/{room['room_id']}/poll?timeout=0",
+                              headers={**host, "If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+    @pytest.mark.parametrize("timeout", ["nan", "inf", "-inf"])
+    def test_non_finite_timeout_is_rejected(self, client, make_user, timeout):
+        _, host = make_user()
+        room = create_room(client, host)
+        etag = client.get(f"/api/v1/room/{room['room_id']}", headers=host).headers["ETag"]
+
+        response = client.get(f"/api/v1/game/sync/{room['room_id']}/poll?timeout={timeout}",
+                              headers={**host, "If-None-Match": etag})
+
+        assert response.status_code == 400
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+对局记录批量写入单元测试：语句数不随参与者人数、对局数增长
+"""
+
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from backend.models.room import Room, RoomStatus
+from backend.models.sql import User as SQLUser
+from backend.repositories.game_record_store import GameRecordStore, GameResult
+from backend.services.game_service import GameServiceBase
+
+
+@contextmanager
+def count_statements(db):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def make_room(db, player_count: int) -> Room:
+    """结束的房间；最后一名玩家在 MySQL 中没有记录"""
+    players = [f"stats_{uuid.uuid4().hex[:12]}" for _ in range(player_count)]
+    db.session.add_all([SQLUser(openid=player_id, total_games=0, wins=0) for player_id in players[:-1]])
+    db.session.commit()
+    return Room(
+        room_id=f"room_{uuid.uuid4().hex[:12]}", creator=players[0], room_code="123456", players=players,
+        status=RoomStatus.ENDED, words={"civilian": "苹果", "undercover": "梨"}, undercovers=[players[1]],
+    )
+
+
+def stats_of(room: Room) -> dict[str, tuple[int, int]]:
+    users = SQLUser.query.filter(SQLUser.openid.in_(room.players))
+    return {user.openid: (user.total_games, user.wins) for user in users}
+
+
+class TestRecordQueryCount:
+    @pytest.mark.parametrize("player_count", [3, 6, 12])
+    def test_record_game_statement_count(self, app, db_tables, player_count):
+        with app.app_context():
+            room = make_room(db_tables, player_count)
+
+            with count_statements(db_tables) as statements:
+                GameServiceBase._record_game(GameResult.from_room(room, "civilian"))
+
+            # 查已写入房间、查用户 ID、批量插入、集合式更新战绩
+            assert len(statements) == 4, statements
+            stats = stats_of(room)
+            assert stats[room.players[0]] == (1, 1)
+            assert stats[room.players[1]] == (1, 0)
+            assert len(stats) == player_count - 1
+
+    def test_batch_statement_count(self, app, db_tables):
+        with app.app_context():
+            rooms = [make_room(db_tables, player_count) for player_count in (3, 6, 12)]
+
+            with count_statements(db_tables) as statements:
+                saved = GameRecordStore().save_many([GameResult.from_room(room, "undercover") for room in rooms])
+
+            assert saved == 3
+            assert len(statements) == 4, statements
+            for room in rooms:
+                assert stats_of(room)[room.players[1]] == (1, 1)
+
+    def test_duplicate_record_is_skipped(self, app, db_tables):
+        with app.app_context():
+            room = make_room(db_tables, 3)
+            GameServiceBase._record_game(GameResult.from_room(room, "civilian"))
+
+            with count_statements(db_tables) as statements:
+                GameServiceBase._record_game(GameResult.from_room(room, "civilian"))
+
+            assert len(statements) == 1, statements
+            assert stats_of(room)[room.players[0]] == (1, 1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+对局记录 write-behind 写入器单元测试：写入失败的重试上限与死信
+"""
+
+import fakeredis
+import pytest
+
+from backend.exceptions import DataAccessError
+from backend.repositories.game_record_store import GameResult
+from backend.services.game_record_writer import GameRecordWriter
+
+
+class FakeStore:
+    """批次中含有 bad 房间时整批失败"""
+
+    def __init__(self, bad: set[str]):
+        self.bad = bad
+        self.calls = 0
+        self.saved: list[str] = []
+
+    def save_many(self, results: list[GameResult]) -> int:
+        self.calls += 1
+        if any(result.room_id in self.bad for result in results):
+            raise DataAccessError(message="写入对局记录失败", error_code="REPO-DATA-001")
+        self.saved.extend(result.room_id for result in results)
+        return len(results)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+def make_writer(redis_client, app, store, **kwargs) -> GameRecordWriter:
+    writer = GameRecordWriter(redis_client, app, store=store, retry_base_seconds=0, **kwargs)
+    writer.consumer = "test-consumer"
+    writer._ensure_group()
+    return writer
+
+
+def publish(redis_client, room_ids):
+    for room_id in room_ids:
+        result = GameResult(room_id=room_id, creator="u1", winner_team="civilian", players=["u1", "u2", "u3"])
+        redis_client.xadd(GameRecordWriter.STREAM, {'room_id': room_id, 'data': result.to_json()})
+
+
+def flush_once(writer):
+    entries = writer._read_batch()
+    assert entries
+    writer._flush(entries)
+
+
+def pending(redis_client) -> int:
+    return redis_client.xpending(GameRecordWriter.STREAM, GameRecordWriter.GROUP)['pending']
+
+
+class TestGameRecordWriter:
+    def test_batch_is_written_and_acked(self, app, redis_client):
+        store = FakeStore(bad=set())
+        writer = make_writer(redis_client, app, store)
+        publish(redis_client, ["r1", "r2", "r3"])
+
+        flush_once(writer)
+
+        assert store.saved == ["r1", "r2", "r3"]
+        assert pending(redis_client) == 0
+        assert writer.written == 3
+
+    def test_bad_entry_is_isolated_and_dead_lettered(self, app, redis_client):
+        store = FakeStore(bad={"r3"})
+        writer = make_writer(redis_client, app, store, max_attempts=2)
+        publish(redis_client, [f"r{i}" for i in range(8)])
+
+        flush_once(writer)
+
+        assert sorted(store.saved) == sorted(f"r{i}" for i in range(8) if i != 3)
+        assert pending(redis_client) == 0
+        dead = writer.dead_letters()
+        assert [GameResult.from_json(entry['data']).room_id for entry in dead] == ["r3"]
+        assert writer.dead_lettered == 1
+        assert writer.written == 7
+        assert writer.get_stats()['dead'] == 1
+
+    def test_attempts_are_capped(self, app, redis_client):
+        store = FakeStore(bad={"r0", "r1"})
+        writer = make_writer(redis_client, app, store, max_attempts=3)
+        publish(redis_client, ["r0", "r1"])
+
+        flush_once(writer)
+
+        # 整批 3 次，拆分后每条各 3 次
+        assert store.calls == 9
+        assert writer.failures == 9
+        assert pending(redis_client) == 0
+        assert len(writer.dead_letters()) == 2
+
+    def test_stop_leaves_batch_pending(self, app, redis_client):
+        store = FakeStore(bad={"r0"})
+        writer = make_writer(redis_client, app, store, max_attempts=3)
+        writer._stopping.set()
+        publish(redis_client, ["r0"])
+
+        writer._flush(redis_client.xreadgroup(
+            GameRecordWriter.GROUP, writer.consumer, {GameRecordWriter.STREAM: '>'}, count=10
+        )[0][1])
+
+        assert store.calls == 1
+        assert pending(redis_client) == 1
+        assert writer.dead_letters() == []
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+同步 / asyncio 游戏服务契约测试
+同一组用例分别驱动 GameService 与 AsyncGameService，返回值、房间与用户状态、对局记录须一致
+"""
+
+import asyncio
+import uuid
+
+import fakeredis
+import pytest
+import redis.asyncio
+
+from backend.models.room import RoomStatus
+from backend.models.sql import GameRecord
+from backend.repositories.async_room_repository import AsyncRoomRepository
+from backend.repositories.async_user_repository import AsyncUserRepository
+from backend.repositories.room_code_pool import RoomCodeAllocator
+from backend.repositories.room_repository import RoomRepository
+from backend.repositories.user_repository import UserRepository
+from backend.services.async_game_service import AsyncGameService
+from backend.services.game_service import GameService
+from backend.services.word_catalog import WordCatalog
+
+
+def small_allocator(redis_client) -> RoomCodeAllocator:
+    """两位短码的分配器，生成码池更快"""
+    return RoomCodeAllocator(redis_client, min_length=2, max_length=3)
+
+
+class SyncDriver:
+    """在应用上下文中调用同步服务（与 HTTP 请求一致）"""
+
+    def __init__(self, app):
+        self.app = app
+        redis_client = fakeredis.FakeRedis()
+        self.room_repo = RoomRepository(redis_client, code_allocator=small_allocator(redis_client))
+        self.user_repo = UserRepository(redis_client)
+        self.service = GameService(self.room_repo, self.user_repo, word_catalog=WordCatalog())
+
+    def call(self, method: str, *args):
+        with self.app.app_context():
+            return getattr(self.service, method)(*args)
+
+    def room(self, room_id: str):
+        return self.room_repo.get(room_id)
+
+    def user(self, user_id: str):
+        return self.user_repo.get(user_id)
+
+    def close(self):
+        pass
+
+
+class AsyncDriver:
+    """在事件循环中调用 asyncio 服务；服务在应用上下文中创建，调用时不处于应用上下文"""
+
+    def __init__(self, app):
+        self.loop = asyncio.new_event_loop()
+        server = fakeredis.FakeServer()
+        redis_client = fakeredis.FakeAsyncRedis(server=server)
+        # 短码分配器需要同步客户端，测试中指向同一个 FakeServer
+        allocator = small_allocator(fakeredis.FakeRedis(server=server))
+        self.room_repo = AsyncRoomRepository(redis_client, code_allocator=allocator)
+        self.user_repo = AsyncUserRepository(redis_client)
+        with app.app_context():
+            self.service = AsyncGameService(self.room_repo, self.user_repo, word_catalog=WordCatalog())
+
+    def call(self, method: str, *args):
+        return self.loop.run_until_complete(getattr(self.service, method)(*args))
+
+    def room(self, room_id: str):
+        return self.loop.run_until_complete(self.room_repo.get(room_id))
+
+    def user(self, user_id: str):
+        return self.loop.run_until_complete(self.user_repo.get(user_id))
+
+    def close(self):
+        self.loop.close()
+
+
+@pytest.fixture(params=[SyncDriver, AsyncDriver], ids=["sync", "async"])
+def driver(request, app, db_tables):
+    driver = request.param(app)
+    yield driver
+    driver.close()
+
+
+def new_users(count: int) -> list[str]:
+    return [f"contract_{uuid.uuid4().hex[:12]}" for _ in range(count)]
+
+
+def create_room_with(driver, players: list[str]) -> str:
+    ok, room_id = driver.call("create_room", players[0])
+    assert ok, room_id
+    for player in players[1:]:
+        ok, message = driver.call("join_room", player, room_id)
+        assert ok, message
+    return room_id
+
+
+class TestGameServiceContract:
+    def test_create_room(self, driver):
+        host, = new_users(1)
+
+        ok, room_id = driver.call("create_room", host)
+
+        assert ok
+        room = driver.room(room_id)
+        assert room.creator == host
+        assert room.players == [host]
+        assert room.room_code
+        assert driver.user(host).current_room == room_id
+
+    def test_join_room(self, driver):
+        host, guest = new_users(2)
+        ok, room_id = driver.call("create_room", host)
+
+        assert driver.call("join_room", guest, room_id) == (True, "成功加入房间，当前房间人数：2")
+        assert driver.call("join_room", guest, room_id)[0] is False
+        assert driver.room(room_id).players == [host, guest]
+
+    def test_start_game_requires_creator_and_players(self, driver):
+        players = new_users(3)
+        room_id = create_room_with(driver, players[:2])
+
+        assert driver.call("start_game", room_id, players[0])[0] is False
+        driver.call("join_room", players[2], room_id)
+        assert driver.call("start_game", room_id, players[1])[0] is False
+        assert driver.call("start_game", room_id, players[0]) == (True, "游戏开始成功")
+
+        room = driver.room(room_id)
+        assert room.status == RoomStatus.PLAYING
+        assert len(room.undercovers) == 1
+
+    def test_vote_out_undercover_ends_game(self, app, driver):
+        players = new_users(4)
+        room_id = create_room_with(driver, players)
+        driver.call("start_game", room_id, players[0])
+        undercover, = driver.room(room_id).undercovers
+
+        # 房主主持投票
+        ok, message = driver.call("vote_player", players[0], players.index(undercover) + 1)
+
+        assert ok, message
+        assert "平民" in message
+        assert driver.room(room_id).status == RoomStatus.ENDED
+        assert all(not driver.user(p).has_joined_room() for p in players)
+        with app.app_context():
+            record = GameRecord.query.filter_by(room_id=room_id).one()
+        assert record.winner_team == "civilian"
+        assert record.player_count == 4
+
+
+class TestAsyncRoomRepositoryDefaults:
+    def test_default_code_allocator_uses_same_server(self):
+        repo = AsyncRoomRepository(redis.asyncio.Redis(host="redis.internal", port=6380, db=2, socket_timeout=3))
+
+        kwargs = repo.code_allocator.redis.connection_pool.connection_kwargs
+        assert kwargs["host"] == "redis.internal"
+        assert (kwargs["port"], kwargs["db"], kwargs["socket_timeout"]) == (6380, 2, 3)
+        assert repo.code_allocator.code_prefix == repo.code_prefix
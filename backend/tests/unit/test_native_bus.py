@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+原生 WebSocket 跨 worker 广播总线单元测试
+"""
+
+import json
+import threading
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from backend.websocket import native_handlers
+from backend.websocket.frame import EventFrame
+from backend.websocket.native_bus import NativeBroadcastBus
+
+
+def wait_until(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class Worker:
+    """一个 worker 进程的本地订阅者与广播总线"""
+
+    def __init__(self, server):
+        self.rooms: set[str] = set()
+        self.delivered: list[tuple[str, str, str]] = []
+        self.bus = NativeBroadcastBus(
+            fakeredis.FakeRedis(server=server),
+            deliver=lambda room_id, event, native: self.delivered.append((room_id, event, native)),
+            has_local=lambda room_id: room_id in self.rooms,
+        )
+
+    def subscribe(self, room_id: str) -> None:
+        self.rooms.add(room_id)
+        self.bus.watch(room_id)
+
+    def subscribed(self, room_id: str) -> bool:
+        pubsub = self.bus._pubsub
+        return pubsub is not None and NativeBroadcastBus.channel(room_id).encode() in pubsub.channels
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def frame(room_id: str) -> EventFrame:
+    return EventFrame("room.player_joined", room_id, 1, {"player_count": 2})
+
+
+class TestNativeBroadcastBus:
+    def test_delivers_to_other_workers_only(self, server):
+        sender, receiver = Worker(server), Worker(server)
+        sender.subscribe("room_a")
+        receiver.subscribe("room_a")
+        assert wait_until(lambda: receiver.subscribed("room_a") and sender.subscribed("room_a"))
+
+        sender.bus.publish(frame("room_a"))
+
+        assert wait_until(lambda: receiver.delivered)
+        assert receiver.delivered == [("room_a", "room.player_joined", frame("room_a").native)]
+        time.sleep(0.2)
+        assert sender.delivered == []
+
+    def test_subscribe_runs_on_listener_thread(self, server, monkeypatch):
+        worker = Worker(server)
+        worker.bus._ensure_listener()
+        threads = []
+        subscribe = worker.bus._pubsub.subscribe
+
+        def record(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return subscribe(*args, **kwargs)
+
+        monkeypatch.setattr(worker.bus._pubsub, "subscribe", record)
+        worker.subscribe("room_b")
+
+        assert wait_until(lambda: worker.subscribed("room_b"))
+        assert threads == ["native-ws-bus"]
+
+    def test_failed_subscribe_is_retried(self, server, monkeypatch):
+        worker = Worker(server)
+        worker.bus._ensure_listener()
+        subscribe = worker.bus._pubsub.subscribe
+        failures = []
+
+        def flaky(*args, **kwargs):
+            if not failures:
+                failures.append(args)
+                raise redis.ConnectionError("connection reset")
+            return subscribe(*args, **kwargs)
+
+        monkeypatch.setattr(worker.bus._pubsub, "subscribe", flaky)
+        worker.subscribe("room_c")
+
+        assert wait_until(lambda: worker.subscribed("room_c"))
+        assert worker.bus.resets == 1
+
+    def test_idle_room_is_unsubscribed(self, server):
+        sender, receiver = Worker(server), Worker(server)
+        receiver.subscribe("room_d")
+        assert wait_until(lambda: receiver.subscribed("room_d"))
+
+        receiver.rooms.discard("room_d")
+        sender.bus.publish(frame("room_d"))
+
+        assert wait_until(lambda: not receiver.subscribed("room_d"))
+        assert receiver.delivered == []
+
+
+class FailingBus:
+    def watch(self, room_id):
+        raise RuntimeError("can't start new thread")
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+class TestHandleSubscribeRollback:
+    def test_bus_failure_rolls_back_subscription(self, app, client, make_user, monkeypatch):
+        user_id, headers = make_user()
+        room_id = client.post("/api/v1/room/create", headers=headers).get_json()["data"]["room_id"]
+        ws = FakeSocket()
+        ws_id = id(ws)
+        monkeypatch.setattr(native_handlers, "_broadcast_bus", FailingBus())
+        monkeypatch.setitem(native_handlers.connections, ws_id, {"user_id": user_id, "rooms": set(), "ws": ws})
+
+        with app.test_request_context("/ws"):
+            native_handlers.handle_subscribe(ws, ws_id, user_id, {"room_id": room_id})
+
+        assert ws_id not in native_handlers.room_subscriptions.get(room_id, ())
+        assert native_handlers.connections[ws_id]["rooms"] == set()
+        reply = json.loads(ws.sent[-1])
+        assert reply["event"] == "subscribe_error"
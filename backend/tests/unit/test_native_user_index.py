@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+原生 WebSocket 用户连接索引（user_connections）单元测试
+"""
+
+import json
+import queue
+import threading
+import time
+import uuid
+
+import pytest
+
+from backend.websocket import native_handlers
+from backend.websocket.websocket_manager import ws_manager
+
+
+class FakeWebSocket:
+    """按队列收消息的假连接；close 后 receive 返回 None"""
+
+    def __init__(self):
+        self.inbox = queue.Queue()
+        self.sent = []
+        self.closed = False
+
+    def receive(self, timeout=None):
+        try:
+            return self.inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self):
+        self.closed = True
+        self.inbox.put(None)
+
+
+def wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def handler(app):
+    return next(f for name, f in app.view_functions.items() if "websocket" in name).__wrapped__
+
+
+@pytest.fixture
+def open_connection(app, handler):
+    """以指定用户认证一条连接，返回 (ws_id, 假连接)；测试结束时关闭所有连接"""
+    opened = []
+
+    def _open(user_id: str):
+        ws = FakeWebSocket()
+        token = app.auth_service._generate_token(user_id)
+        ws.inbox.put(json.dumps({"type": "auth", "data": {"token": token}}))
+
+        def run():
+            with app.test_request_context("/ws"):
+                handler(ws)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        opened.append((ws, thread))
+        ws_id = id(ws)
+        assert wait_until(lambda: ws_id in native_handlers.connections)
+        return ws_id, ws
+
+    yield _open
+
+    for ws, thread in opened:
+        ws.close()
+        thread.join(timeout=2.0)
+
+
+def new_user_id() -> str:
+    return f"ws_{uuid.uuid4().hex[:12]}"
+
+
+class TestUserConnectionIndex:
+    def test_register_on_auth(self, open_connection):
+        user_id = new_user_id()
+        ws_id, _ = open_connection(user_id)
+
+        assert native_handlers.user_connections[user_id] == {ws_id}
+        assert ws_manager.get_user_connections(user_id) == [ws_id]
+        assert ws_manager.check_consistency() == []
+
+    def test_unregister_on_disconnect(self, open_connection):
+        user_id = new_user_id()
+        ws_id, ws = open_connection(user_id)
+
+        ws.close()
+
+        assert wait_until(lambda: ws_id not in native_handlers.connections)
+        assert user_id not in native_handlers.user_connections
+        assert ws_manager.get_user_connections(user_id) == []
+        assert ws_manager.check_consistency() == []
+
+    def test_multiple_connections_per_user(self, open_connection):
+        user_id = new_user_id()
+        first, first_ws = open_connection(user_id)
+        second, _ = open_connection(user_id)
+
+        assert native_handlers.user_connections[user_id] == {first, second}
+
+        first_ws.close()
+
+        assert wait_until(lambda: native_handlers.user_connections.get(user_id) == {second})
+        assert ws_manager.check_consistency() == []
+
+    def test_disconnect_user_cleans_up_index(self, open_connection):
+        user_id = new_user_id()
+        other_id = new_user_id()
+        ws_ids = [open_connection(user_id)[0] for _ in range(2)]
+        other, _ = open_connection(other_id)
+
+        assert ws_manager.disconnect_user(user_id) == 2
+
+        assert wait_until(lambda: user_id not in native_handlers.user_connections)
+        assert all(ws_id not in native_handlers.connections for ws_id in ws_ids)
+        assert native_handlers.user_connections[other_id] == {other}
+        assert ws_manager.check_consistency() == []
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Redis 分片客户端单元测试：路由、跨节点管道、扩容迁移与房间脚本的版本号键
+"""
+
+import fakeredis
+import pytest
+import redis
+
+from backend.models.room import Room, RoomStatus
+from backend.repositories.room_code_pool import RoomCodeAllocator
+from backend.repositories.room_repository import RoomRepository
+from backend.repositories.room_scripts import RoomScripts
+from backend.repositories.user_repository import UserRepository
+from backend.utils.redis_shard import HashRing, ShardedRedis, shard_tag
+
+
+def make_node() -> fakeredis.FakeRedis:
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+@pytest.fixture
+def nodes():
+    return {"n1": make_node(), "n2": make_node()}
+
+
+@pytest.fixture
+def client(nodes):
+    return ShardedRedis(nodes)
+
+
+def moving_tag(client: ShardedRedis, prefix: str) -> str:
+    """找一个加入 n3 后归属会改变的标签"""
+    ring = HashRing([*client.nodes, "n3"], client.replicas)
+    for i in range(1000):
+        tag = f"{prefix}{i}"
+        if ring.node_for(tag) == "n3":
+            return tag
+    raise AssertionError("没有找到会迁移到新节点的标签")
+
+
+class TestRouting:
+    def test_shard_tag(self):
+        assert shard_tag("room:r1") == "r1"
+        assert shard_tag("room:r1:players") == "r1"
+        assert shard_tag(b"user:o1") == "o1"
+        assert shard_tag("token:blacklist:o1:123") == "o1"
+        assert shard_tag("stats:{o1}:daily") == "o1"
+        assert shard_tag("room_code:pool") is None
+        assert shard_tag("rooms:active:waiting") is None
+        assert shard_tag("other") == "other"
+
+    def test_room_keys_share_a_node(self, client):
+        for i in range(50):
+            node = client.node_for(f"room:r{i}")
+            assert client.node_for(f"room:r{i}:players") == node
+            assert client.node_for(f"room:r{i}:version") == node
+
+    def test_pinned_keys_use_meta_node(self, client):
+        assert client.node_for("room_code:pool") == "n1"
+        assert client.node_for("rooms:active:playing") == "n1"
+        assert client.node_for("room_cache:invalidate") == "n1"
+
+    def test_ring_is_stable_when_adding_a_node(self):
+        before = HashRing(["n1", "n2"])
+        after = HashRing(["n1", "n2", "n3"])
+        tags = [f"t{i}" for i in range(3000)]
+        moved = [tag for tag in tags if before.node_for(tag) != after.node_for(tag)]
+
+        # 只有约 1/3 的标签改变归属，且全部移到新节点
+        assert 0.2 < len(moved) / len(tags) < 0.45
+        assert all(after.node_for(tag) == "n3" for tag in moved)
+
+    def test_commands_go_to_routed_node(self, client, nodes):
+        for i in range(20):
+            client.set(f"user:o{i}", i)
+        for i in range(20):
+            key = f"user:o{i}"
+            owner = client.node_for(key)
+            assert nodes[owner].get(key) == str(i).encode()
+            other = next(name for name in nodes if name != owner)
+            assert nodes[other].get(key) is None
+        assert client.mget([f"user:o{i}" for i in range(20)]) == [str(i).encode() for i in range(20)]
+
+
+class TestPipeline:
+    def test_pipeline_spans_nodes(self, client, nodes):
+        keys = [f"user:o{i}" for i in range(20)]
+        assert len({client.node_for(key) for key in keys}) == 2
+
+        pipe = client.pipeline()
+        for i, key in enumerate(keys):
+            pipe.set(key, i)
+        for key in keys:
+            pipe.get(key)
+        pipe.delete(*keys[:10])
+        results = pipe.execute()
+
+        assert results[:20] == [True] * 20
+        assert results[20:40] == [str(i).encode() for i in range(20)]
+        assert results[40] == 10
+        for key in keys[10:]:
+            assert nodes[client.node_for(key)].exists(key)
+        assert client.exists(*keys) == 10
+
+    def test_script_keys_must_share_a_node(self, client):
+        keys = [f"user:o{i}" for i in range(20)]
+        first = keys[0]
+        other = next(key for key in keys if client.node_for(key) != client.node_for(first))
+        script = client.register_script("return #KEYS")
+
+        assert script(keys=[f"room:{first}", f"room:{first}:players"]) == 2
+        with pytest.raises(redis.ResponseError, match="CROSSSLOT"):
+            script(keys=[first, other])
+
+
+class TestMigration:
+    def test_lazy_migration_keeps_ttl(self, client, nodes):
+        tag = moving_tag(client, "o")
+        key = f"user:{tag}"
+        client.set(key, "v", ex=100)
+        source = client.node_for(key)
+
+        new_node = make_node()
+        client.add_node("n3", new_node)
+        assert client.migrating
+        assert nodes[source].exists(key)
+
+        assert client.get(key) == b"v"
+        assert new_node.get(key) == b"v"
+        assert not nodes[source].exists(key)
+        assert 0 < new_node.ttl(key) <= 100
+
+    def test_target_value_wins(self, client, nodes):
+        tag = moving_tag(client, "o")
+        key = f"user:{tag}"
+        client.set(key, "old")
+        source = client.node_for(key)
+        new_node = make_node()
+        client.add_node("n3", new_node)
+        new_node.set(key, "new")
+
+        assert client.get(key) == b"new"
+        assert not nodes[source].exists(key)
+
+    def test_rebalance_moves_remaining_keys(self, client, nodes):
+        keys = [f"user:o{i}" for i in range(200)]
+        for key in keys:
+            client.set(key, key)
+        client.set("room_code:pool", "meta")
+        new_node = make_node()
+        client.add_node("n3", new_node)
+
+        moved = client.rebalance(batch_size=50)
+
+        assert moved == sum(1 for key in keys if client.node_for(key) == "n3") > 0
+        assert not client.migrating
+        for key in keys:
+            owner = client.node_for(key)
+            assert client.nodes[owner].get(key) == key.encode()
+            assert sum(node.exists(key) for node in client.nodes.values()) == 1
+        assert nodes["n1"].get("room_code:pool") == b"meta"
+        assert client.rebalance() == 0
+
+
+class TestRoomScriptsOnShards:
+    def test_version_key_migrates_with_room(self, app, client):
+        room_repo = RoomRepository(
+            client, storage_mode=RoomRepository.STORAGE_JSON,
+            code_allocator=RoomCodeAllocator(client, min_length=2, max_length=3),
+        )
+        scripts = RoomScripts(room_repo, UserRepository(client))
+        room_id = moving_tag(client, "room_")
+        room_repo.save(Room(room_id=room_id, creator="u1", room_code="42", players=["u1", "u2", "u3"]))
+        for _ in range(5):
+            room_repo.bump_version(room_id)
+        version = room_repo.get_version(room_id)
+
+        new_node = make_node()
+        client.add_node("n3", new_node)
+        room = room_repo.get(room_id, use_cache=False)
+        room.undercovers = ["u3"]
+        room.words = {"civilian": "苹果", "undercover": "梨"}
+        room.status = RoomStatus.PLAYING
+        room.current_round = 1
+        with app.app_context():
+            assert scripts.start(room, "u1")
+
+        # 版本号在新节点上延续，不会从头计数而与旧 ETag 重合
+        assert room_repo.get_version(room_id) > version
+        assert new_node.exists(room_repo._version_key(room_id))
+        assert room_repo.get(room_id, use_cache=False).status == RoomStatus.PLAYING
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+房间模型单元测试
+"""
+
+from datetime import UTC, datetime
+
+from backend.models.room import Room, RoomStatus
+
+
+def make_room() -> Room:
+    return Room(
+        room_id="r1",
+        creator="p1",
+        room_code="1234",
+        players=["p1", "p2", "p3", "p4", "p5"],
+        status=RoomStatus.PLAYING,
+        undercovers=["p4", "p5"],
+        eliminated=["p2", "p5"],
+    )
+
+
+class TestRoom:
+    def test_creator_is_first_player(self):
+        assert Room(room_id="r1", creator="p1", room_code="1234").players == ["p1"]
+        assert Room(room_id="r1", creator="p1", room_code="1234", players=["p2"]).players == ["p1", "p2"]
+
+    def test_membership_and_roles(self):
+        room = make_room()
+
+        assert room.is_player("p3") and not room.is_player("x")
+        assert room.seat_of("p3") == 3 and room.seat_of("x") == 0
+        assert room.is_undercover("p4") and not room.is_undercover("p1")
+        assert room.is_eliminated("p2") and not room.is_eliminated("p3")
+
+    def test_remaining_follows_list_mutations(self):
+        room = make_room()
+        assert room.get_remaining_players() == ["p1", "p3", "p4"]
+        assert room.count_remaining() == (1, 2)
+
+        room.eliminated.append("p4")
+
+        assert room.count_remaining() == (0, 2)
+
+    def test_copy_is_independent(self):
+        room = make_room()
+        copied = room.copy()
+
+        copied.players.append("p6")
+        copied.eliminated.clear()
+
+        assert copied != room
+        assert room.players == ["p1", "p2", "p3", "p4", "p5"]
+        assert room.eliminated == ["p2", "p5"]
+
+    def test_dict_round_trip(self):
+        room = make_room()
+        room.created_at = datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=UTC)
+
+        assert Room.from_dict(room.to_dict()) == room
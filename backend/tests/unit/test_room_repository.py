@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+房间仓储 L1 缓存与读改写单元测试
+"""
+
+import os
+
+import fakeredis
+import pytest
+
+from backend.models.room import Room, RoomStatus
+from backend.repositories.room_cache import RoomCache
+from backend.repositories.room_repository import RoomRepository
+from backend.repositories.room_scripts import RoomScripts
+from backend.repositories.user_repository import UserRepository
+
+
+def make_repository(redis_client, storage_mode: str, lagging: bool = False) -> RoomRepository:
+    cache = RoomCache(redis_client, ttl_seconds=60)
+    if lagging:
+        # 不启动失效订阅：模拟其他进程的失效通知尚未送达
+        cache._listener_pid = os.getpid()
+    return RoomRepository(redis_client, storage_mode=storage_mode, cache=cache)
+
+
+def join(repo: RoomRepository, room_id: str, user_id: str) -> None:
+    """通过加入脚本追加玩家（模拟其他进程的并发加入）"""
+    RoomScripts(repo, UserRepository(repo.redis)).join(room_id, user_id)
+
+
+@pytest.fixture(params=[RoomRepository.STORAGE_JSON, RoomRepository.STORAGE_HASH])
+def repositories(request):
+    """共享同一个 Redis 的两个仓储实例（两个进程）"""
+    server = fakeredis.FakeServer()
+    writer = make_repository(fakeredis.FakeRedis(server=server), request.param)
+    reader = make_repository(fakeredis.FakeRedis(server=server), request.param, lagging=True)
+    return writer, reader
+
+
+@pytest.fixture
+def room(repositories):
+    writer, reader = repositories
+    room = Room(room_id="room_rmw", creator="u1", room_code="123456", players=["u1", "u2", "u3"])
+    writer.save(room)
+    # 读取方缓存一份副本
+    assert reader.get(room.room_id).players == ["u1", "u2", "u3"]
+    return room
+
+
+class TestReadModifyWrite:
+    def test_cached_read_may_be_stale(self, repositories, room):
+        writer, reader = repositories
+        join(writer, room.room_id, "u4")
+
+        assert reader.get(room.room_id).players == ["u1", "u2", "u3"]
+        assert reader.get(room.room_id, use_cache=False).players == ["u1", "u2", "u3", "u4"]
+
+    def test_update_fields_keeps_concurrent_join(self, repositories, room):
+        writer, reader = repositories
+        join(writer, room.room_id, "u4")
+
+        # 开始游戏：读出房间、修改状态后只写回状态字段（json 模式下整体保存）
+        fresh = reader.get(room.room_id, use_cache=False)
+        fresh.status = RoomStatus.PLAYING
+        reader.update_fields(fresh, "status")
+
+        stored = writer.get(room.room_id, use_cache=False)
+        assert stored.status == RoomStatus.PLAYING
+        assert stored.players == ["u1", "u2", "u3", "u4"]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+房间原子脚本单元测试：开始游戏与并发加入
+"""
+
+import fakeredis
+import pytest
+
+from backend.exceptions import GameAlreadyStartedError, RoomPermissionError
+from backend.models.room import Room, RoomStatus
+from backend.models.user import User
+from backend.repositories.room_code_pool import RoomCodeAllocator
+from backend.repositories.room_repository import RoomRepository
+from backend.repositories.room_scripts import RoomScripts
+from backend.repositories.user_repository import UserRepository
+from backend.services.game_service import GameService
+from backend.services.word_catalog import WordCatalog
+
+
+@pytest.fixture(params=[RoomRepository.STORAGE_JSON, RoomRepository.STORAGE_HASH])
+def repos(request):
+    # fakeredis 的 Lua 环境没有 cmsgpack，这里只覆盖 json 编解码
+    redis_client = fakeredis.FakeRedis()
+    allocator = RoomCodeAllocator(redis_client, min_length=2, max_length=3)
+    room_repo = RoomRepository(redis_client, storage_mode=request.param, code_allocator=allocator)
+    user_repo = UserRepository(redis_client)
+    return room_repo, user_repo
+
+
+@pytest.fixture
+def room(repos):
+    room_repo, _ = repos
+    room = Room(room_id="room_start", creator="u1", room_code="42", players=["u1", "u2", "u3"])
+    room_repo.save(room)
+    return room
+
+
+def assign_roles(room: Room) -> Room:
+    room.undercovers = [room.players[-1]]
+    room.words = {"civilian": "苹果", "undercover": "梨"}
+    room.status = RoomStatus.PLAYING
+    room.current_round = 1
+    return room
+
+
+class TestStartScript:
+    def test_start_writes_roles(self, app, repos, room):
+        room_repo, user_repo = repos
+        scripts = RoomScripts(room_repo, user_repo)
+        version = room_repo.get_version(room.room_id)
+
+        with app.app_context():
+            assert scripts.start(assign_roles(room_repo.get(room.room_id, use_cache=False)), "u1")
+
+        stored = room_repo.get(room.room_id, use_cache=False)
+        assert stored.status == RoomStatus.PLAYING
+        assert stored.undercovers == ["u3"]
+        assert stored.words == {"civilian": "苹果", "undercover": "梨"}
+        assert stored.current_round == 1
+        assert stored.players == ["u1", "u2", "u3"]
+        assert room_repo.get_version(room.room_id) > version
+        index = room_repo.index
+        assert room_repo.redis.zscore(index.key(RoomStatus.PLAYING), room.room_id) is not None
+        assert room_repo.redis.zscore(index.key(RoomStatus.WAITING), room.room_id) is None
+
+    def test_concurrent_join_is_detected(self, app, repos, room):
+        room_repo, user_repo = repos
+        scripts = RoomScripts(room_repo, user_repo)
+
+        with app.app_context():
+            read = assign_roles(room_repo.get(room.room_id, use_cache=False))
+            scripts.join(room.room_id, "u4")
+
+            assert scripts.start(read, "u1") is False
+
+        stored = room_repo.get(room.room_id, use_cache=False)
+        assert stored.status == RoomStatus.WAITING
+        assert stored.players == ["u1", "u2", "u3", "u4"]
+        assert stored.undercovers == []
+
+    def test_start_checks_creator_and_status(self, app, repos, room):
+        room_repo, user_repo = repos
+        scripts = RoomScripts(room_repo, user_repo)
+
+        with app.app_context():
+            with pytest.raises(RoomPermissionError):
+                scripts.start(assign_roles(room_repo.get(room.room_id, use_cache=False)), "u2")
+            assert scripts.start(assign_roles(room_repo.get(room.room_id, use_cache=False)), "u1")
+            with pytest.raises(GameAlreadyStartedError):
+                scripts.start(assign_roles(room_repo.get(room.room_id, use_cache=False)), "u1")
+
+
+class TestStartGameRetry:
+    def test_late_joiner_gets_a_role(self, app, repos, room, monkeypatch):
+        room_repo, user_repo = repos
+        service = GameService(room_repo, user_repo, word_catalog=WordCatalog())
+        for player in room.players:
+            user_repo.save(User(openid=player, nickname=player, current_room=room.room_id))
+        assign = service._assign_roles
+        calls = []
+
+        def assign_then_join(target, undercover_count, word_pair):
+            assign(target, undercover_count, word_pair)
+            if not calls:
+                # 分配身份之后、写回之前有玩家加入
+                service.room_scripts.join(room.room_id, "u4")
+            calls.append(list(target.players))
+
+        monkeypatch.setattr(service, "_assign_roles", assign_then_join)
+
+        with app.app_context():
+            ok, message = service.start_game(room.room_id, "u1")
+
+        assert ok, message
+        assert calls == [["u1", "u2", "u3"], ["u1", "u2", "u3", "u4"]]
+        stored = room_repo.get(room.room_id, use_cache=False)
+        assert stored.status == RoomStatus.PLAYING
+        assert stored.players == ["u1", "u2", "u3", "u4"]
+        assert user_repo.get("u4").current_room == room.room_id
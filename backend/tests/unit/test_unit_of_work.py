@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+请求级身份映射单元测试
+"""
+
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+
+from backend.exceptions import DataAccessError
+from backend.models.room import Room
+from backend.models.user import User
+from backend.repositories.unit_of_work import current_identity_map, unwrap
+from backend.services.notification_service import NotificationService
+
+
+@pytest.fixture
+def user_repos(app):
+    scoped = app.config["user_repository"]
+    return scoped, unwrap(scoped)
+
+
+def make_user() -> User:
+    return User(openid=f"uow_{uuid.uuid4().hex[:12]}", nickname="测试玩家")
+
+
+class TestUnitOfWork:
+    def test_save_is_deferred_until_response(self, app, user_repos):
+        scoped, store = user_repos
+        user = make_user()
+        with app.test_request_context("/api/v1/room/join", method="POST"):
+            app.preprocess_request()
+            scoped.save(user)
+            assert store.get(user.openid) is None
+
+            response = app.process_response(app.make_response("ok"))
+
+        assert response.status_code == 200
+        assert store.get(user.openid) == user
+
+    def test_notification_is_sent_after_flush(self, app, user_repos):
+        scoped, store = user_repos
+        user = make_user()
+        seen = []
+        socketio = MagicMock()
+        socketio.emit.side_effect = lambda *args, **kwargs: seen.append(store.get(user.openid))
+        notification = NotificationService(socketio)
+
+        with app.test_request_context("/api/v1/room/join", method="POST"):
+            app.preprocess_request()
+            scoped.save(user)
+            notification.notify_room("room_1", "room.player_joined", {"player_count": 2})
+            assert not current_identity_map().dirty_users
+
+        assert seen == [user]
+
+    def test_flush_failure_suppresses_notification(self, app, user_repos, monkeypatch):
+        scoped, store = user_repos
+        user = make_user()
+        socketio = MagicMock()
+        notification = NotificationService(socketio)
+        error = DataAccessError(message="写入失败", error_code="REPO-DATA-001")
+        monkeypatch.setattr(store, "save_many", MagicMock(side_effect=error))
+
+        with app.test_request_context("/api/v1/room/join", method="POST"):
+            app.preprocess_request()
+            scoped.save(user)
+            with pytest.raises(DataAccessError):
+                notification.notify_room("room_1", "room.player_joined", {"player_count": 2})
+
+            # 调用方吞掉异常返回成功时，响应仍改为 500，且不再重试写回
+            response = app.process_response(app.make_response("ok"))
+
+        socketio.emit.assert_not_called()
+        assert response.status_code == 500
+        assert store.save_many.call_count == 1
+
+    def test_uncached_read_reloads_room(self, app):
+        scoped = app.config["room_repository"]
+        store = unwrap(scoped)
+        room = Room(room_id=f"uow_{uuid.uuid4().hex[:12]}", creator="u1", room_code="654321", players=["u1"])
+        store.save(room)
+
+        with app.test_request_context("/api/v1/game/start", method="POST"):
+            app.preprocess_request()
+            assert scoped.get(room.room_id).players == ["u1"]
+            # 其他进程写入新玩家
+            store.save(Room(room_id=room.room_id, creator="u1", room_code="654321", players=["u1", "u2"]))
+
+            assert scoped.get(room.room_id).players == ["u1"]
+            assert scoped.get(room.room_id, use_cache=False).players == ["u1", "u2"]
+            # 绕过缓存读到的副本在本请求内复用
+            assert scoped.get(room.room_id, use_cache=False) is scoped.get(room.room_id)
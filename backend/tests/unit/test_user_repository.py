@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+用户仓储单元测试：从档案存储回填、不存在用户的墓碑与脚本执行前的回填
+"""
+
+import fakeredis
+import pytest
+
+from backend.models.room import Room
+from backend.models.user import User
+from backend.repositories.room_code_pool import RoomCodeAllocator
+from backend.repositories.room_repository import RoomRepository
+from backend.repositories.room_scripts import RoomScripts
+from backend.repositories.user_repository import UserRepository
+
+
+class FakeProfileStore:
+    """记录查询次数的内存档案存储"""
+
+    def __init__(self, users=None):
+        self.users = {user.openid: user for user in users or []}
+        self.queries: list[list[str]] = []
+        self.failing = False
+
+    def load_many(self, openids):
+        self.queries.append(list(openids))
+        if self.failing:
+            return None
+        return {openid: self.users[openid] for openid in openids if openid in self.users}
+
+    def store_many(self, users):
+        for user in users:
+            self.users[user.openid] = user
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def store():
+    return FakeProfileStore([User(openid="cold", nickname="老玩家", total_games=7, wins=3)])
+
+
+@pytest.fixture
+def repo(redis_client, store):
+    return UserRepository(redis_client, ttl_seconds=3600, profile_store=store, missing_ttl_seconds=60)
+
+
+class TestRehydrate:
+    def test_demoted_user_is_rehydrated(self, repo, store):
+        user = repo.get("cold")
+
+        assert user.total_games == 7
+        assert repo.redis.exists("user:cold")
+        assert repo.get("cold").wins == 3
+        assert store.queries == [["cold"]]
+
+    def test_unknown_user_is_tombstoned(self, repo, store):
+        assert repo.get("ghost") is None
+        assert repo.get("ghost") is None
+        assert repo.get_many(["ghost", "cold"]) == {"cold": store.users["cold"]}
+
+        assert store.queries == [["ghost"], ["cold"]]
+        assert 0 < repo.redis.ttl("user_missing:ghost") <= 60
+
+    def test_tombstone_expiry_queries_again(self, repo, store):
+        assert repo.get("ghost") is None
+        repo.redis.delete("user_missing:ghost")
+        store.users["ghost"] = User(openid="ghost", nickname="新来的")
+
+        assert repo.get("ghost").nickname == "新来的"
+        assert len(store.queries) == 2
+
+    def test_failed_read_is_not_tombstoned(self, repo, store):
+        store.failing = True
+        assert repo.get("cold") is None
+        assert not repo.redis.exists("user_missing:cold")
+
+        store.failing = False
+        assert repo.get("cold").total_games == 7
+
+    def test_tombstones_can_be_disabled(self, redis_client, store):
+        repo = UserRepository(redis_client, profile_store=store, missing_ttl_seconds=0)
+        repo.get("ghost")
+        repo.get("ghost")
+
+        assert store.queries == [["ghost"], ["ghost"]]
+        assert not redis_client.exists("user_missing:ghost")
+
+    def test_demote_clears_tombstone(self, repo, store):
+        repo.redis.set("user_missing:idle", 1, ex=60)
+        repo.save(User(openid="idle", nickname="挂机"))
+        repo.redis.expire("user:idle", 10)
+
+        assert repo.demote_cold(idle_seconds=60) == 1
+        assert not repo.redis.exists("user_missing:idle")
+        assert repo.get("idle").nickname == "挂机"
+
+
+class TestScriptRehydrate:
+    def test_join_keeps_demoted_user_stats(self, app, redis_client, repo):
+        room_repo = RoomRepository(
+            redis_client, code_allocator=RoomCodeAllocator(redis_client, min_length=2, max_length=3),
+        )
+        room_repo.save(Room(room_id="room_cold", creator="host", room_code="42", players=["host"]))
+        scripts = RoomScripts(room_repo, repo)
+
+        with app.app_context():
+            scripts.join("room_cold", "cold")
+
+        user = repo.get("cold")
+        assert user.current_room == "room_cold"
+        assert (user.total_games, user.wins) == (7, 3)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+词语生成器单元测试
+"""
+
+from backend.utils.word_generator import WordGenerator
+
+
+def make_generator() -> WordGenerator:
+    return WordGenerator(
+        [("苹果", "梨"), ("猫", "狗"), ("咖啡", "奶茶")],
+        categories=["水果", "动物", "饮品"],
+        difficulties=[1, 1, 2],
+    )
+
+
+class TestSamplerCache:
+    def test_filters_by_category_and_difficulty(self):
+        generator = make_generator()
+
+        assert generator.get_random_word_pair(category="动物") == ("猫", "狗")
+        assert generator.get_random_word_pair(difficulty=2) == ("咖啡", "奶茶")
+        assert generator.get_random_word_pair(category="水果", difficulty=1) == ("苹果", "梨")
+
+    def test_unknown_filters_are_not_cached(self):
+        generator = make_generator()
+
+        for i in range(100):
+            pair = generator.get_random_word_pair(category=f"类别{i}", difficulty=i + 10)
+            assert pair in generator.word_pairs
+
+        assert set(generator._samplers) == {(None, None)}
+
+    def test_cache_is_bounded_by_catalogue(self):
+        generator = make_generator()
+        generator.warm()
+        warmed = len(generator._samplers)
+
+        # 已知类别与难度的空组合会退回不限条件抽取，但组合数有限
+        assert generator.get_random_word_pair(category="饮品", difficulty=1) in generator.word_pairs
+        generator.get_random_word_pair(category="未知")
+        generator.get_random_word_pair(difficulty=99)
+
+        assert len(generator._samplers) <= warmed + 1
+        assert ("未知", None) not in generator._samplers
+        assert (None, 99) not in generator._samplers
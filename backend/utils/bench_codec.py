@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+编解码基准脚本
+对比 JSON 与 msgpack 两种编解码器编码/解码房间、用户的耗时与字节数
+
+用法: python -m utils.bench_codec [--rounds 20000] [--players 8]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+# 将项目根目录添加到 python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.models.room import Room, RoomStatus
+from backend.models.user import User
+from backend.repositories.codec import JsonCodec, MsgpackCodec
+
+
+def build_room(players: int) -> Room:
+    """构造一个游戏中的典型房间"""
+    player_ids = [f"oUpF8uMuAJO_M2pxb1Q9zNjWeS6{i:02d}" for i in range(players)]
+    return Room(
+        room_id="370080047261810688",
+        creator=player_ids[0],
+        room_code="7091",
+        players=player_ids,
+        status=RoomStatus.PLAYING,
+        words={"civilian": "苹果", "undercover": "梨"},
+        undercovers=player_ids[1:2],
+        current_round=2,
+        eliminated=player_ids[2:3],
+    )
+
+
+def build_user() -> User:
+    return User(
+        openid="oUpF8uMuAJO_M2pxb1Q9zNjWeS600",
+        nickname="玩家1",
+        avatar="https://thirdwx.qlogo.cn/mmopen/vi_32/avatar/132",
+        current_room="370080047261810688",
+        total_games=42,
+        wins=17,
+    )
+
+
+def bench(codec, room: Room, user: User, rounds: int) -> dict:
+    room_data = codec.encode_room(room)
+    user_data = codec.encode_user(user)
+    # 与仓储一致：Redis 返回 bytes
+    room_bytes = room_data if isinstance(room_data, bytes) else room_data.encode("utf-8")
+    user_bytes = user_data if isinstance(user_data, bytes) else user_data.encode("utf-8")
+
+    def per_op(stmt):
+        return timeit.timeit(stmt, number=rounds) / rounds * 1e6
+
+    return {
+        "room_bytes": len(room_bytes),
+        "user_bytes": len(user_bytes),
+        "room_encode_us": per_op(lambda: codec.encode_room(room)),
+        "room_decode_us": per_op(lambda: codec.decode_room(room_bytes)),
+        "user_encode_us": per_op(lambda: codec.encode_user(user)),
+        "user_decode_us": per_op(lambda: codec.decode_user(user_bytes)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="房间/用户编解码基准")
+    parser.add_argument("--rounds", type=int, default=20000, help="每项测量的循环次数")
+    parser.add_argument("--players", type=int, default=8, help="房间玩家人数")
+    args = parser.parse_args()
+
+    room = build_room(args.players)
+    user = build_user()
+    results = {codec.name: bench(codec, room, user, args.rounds) for codec in (JsonCodec(), MsgpackCodec())}
+
+    metrics = list(results["json"].keys())
+    print(f"{'metric':<16}{'json':>12}{'msgpack':>12}{'ratio':>10}")
+    for metric in metrics:
+        json_value = results["json"][metric]
+        msgpack_value = results["msgpack"][metric]
+        ratio = msgpack_value / json_value if json_value else 0
+        print(f"{metric:<16}{json_value:>12.2f}{msgpack_value:>12.2f}{ratio:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+房间事件推送基准脚本
+对比原推送链路（Socket.IO 载荷与小程序消息各自重建字典、转换键名并序列化）与共享 EventFrame 链路
+在一个房间内推送一条事件的 CPU 耗时，包括 Socket.IO 数据包编码与原生连接的逐个投递
+
+用法: python -m utils.bench_fanout [--rounds 20000] [--subscribers 12]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+# 将项目根目录添加到 python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from socketio import packet
+
+from backend.utils.naming import snake_to_camel_dict
+from backend.websocket.frame import EventFrame
+
+ROOM_ID = "370080047261810688"
+EVENT = "room.player_joined"
+DATA = {"player_count": 7, "max_players": 12, "hint": "新玩家加入", "player": {"seat": 7, "is_creator": False}}
+
+
+class Subscriber:
+    """只记录消息的原生连接（出站队列）替身"""
+
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+    def send(self, message, key=None):
+        self.count += 1
+        return True
+
+
+def format_message(seq: int) -> dict:
+    """NotificationService._format_message 的结果（已附 seq）"""
+    return {"event": EVENT, "room_id": ROOM_ID, "timestamp": int(time.time()), "data": DATA, "seq": seq}
+
+
+def encode_socketio(event: str, payload: dict) -> None:
+    """python-socketio 向房间广播时的编码（无回调时每次 emit 只编码一次）"""
+    packet.Packet(packet.EVENT, namespace="/", data=[event, payload]).encode()
+
+
+def legacy_event(subscribers: list[Subscriber], seq: int) -> None:
+    """原链路：Socket.IO 直接编码消息字典，原生广播重建字典、转换键名后再次序列化"""
+    message = format_message(seq)
+    encode_socketio(EVENT, message)
+    message_data = {
+        "type": "event",
+        "event": EVENT,
+        "room_id": ROOM_ID,
+        "timestamp": message.get("timestamp", 0),
+        "data": message.get("data", {}),
+        "seq": message["seq"],
+    }
+    encoded = json.dumps(snake_to_camel_dict(message_data))
+    for subscriber in subscribers:
+        subscriber.send(encoded)
+
+
+def frame_event(subscribers: list[Subscriber], seq: int) -> EventFrame:
+    """EventFrame 链路：每条事件一个帧，两种线上格式各编码一次"""
+    frame = EventFrame.from_message(format_message(seq))
+    encode_socketio(frame.event, frame.socketio_payload)
+    encoded = frame.native
+    key = frame.coalesce_key
+    for subscriber in subscribers:
+        subscriber.send(encoded, key)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="房间事件推送基准")
+    parser.add_argument("--rounds", type=int, default=20000, help="每项测量的事件数")
+    parser.add_argument("--subscribers", type=int, default=12, help="房间内原生连接数")
+    args = parser.parse_args()
+
+    subscribers = [Subscriber() for _ in range(args.subscribers)]
+    frame = frame_event(subscribers, 1)
+
+    def per_event(fn):
+        return timeit.timeit(fn, number=args.rounds) / args.rounds * 1e6
+
+    results = {
+        "legacy_us": per_event(lambda: legacy_event(subscribers, 1)),
+        "frame_us": per_event(lambda: frame_event(subscribers, 1)),
+        # 同一帧再次投递（如同一事件推送到另一组连接）：线上格式已缓存
+        "frame_reuse_us": per_event(lambda: [s.send(frame.native, frame.coalesce_key) for s in subscribers]),
+    }
+    legacy = results["legacy_us"]
+    print(f"{'metric':<20}{'us/event':>12}{'ratio':>10}")
+    for metric, value in results.items():
+        print(f"{metric:<20}{value:>12.2f}{value / legacy:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
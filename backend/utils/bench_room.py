@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+房间模型基准脚本
+对比原 dataclass 房间模型与 __slots__ 房间模型的单次调用耗时与单实例内存
+
+用法: python -m utils.bench_room [--rounds 200000] [--players 12] [--instances 20000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+# 将项目根目录添加到 python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.models.room import Room, RoomStatus
+
+
+@dataclass
+class LegacyRoom:
+    """原房间模型（dataclass + 列表成员判断），仅用于对照"""
+    room_id: str
+    creator: str
+    room_code: str
+    players: list[str] = field(default_factory=list)
+    status: RoomStatus = RoomStatus.WAITING
+    words: dict[str, str] | None = None
+    undercovers: list[str] = field(default_factory=list)
+    current_round: int = 1
+    eliminated: list[str] = field(default_factory=list)
+    created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+    last_active: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+    def is_player(self, user_id: str) -> bool:
+        return user_id in self.players
+
+    def is_eliminated(self, user_id: str) -> bool:
+        return user_id in self.eliminated
+
+    def is_undercover(self, user_id: str) -> bool:
+        return user_id in self.undercovers
+
+    def seat_of(self, user_id: str) -> int:
+        return self.players.index(user_id) + 1 if user_id in self.players else 0
+
+    def get_remaining_players(self) -> list[str]:
+        return [p for p in self.players if p not in self.eliminated]
+
+    def count_remaining(self) -> tuple[int, int]:
+        remaining_players = self.get_remaining_players()
+        remaining_undercovers = [p for p in self.undercovers if p in remaining_players]
+        return len(remaining_undercovers), len(remaining_players) - len(remaining_undercovers)
+
+
+def player_ids(players: int) -> list[str]:
+    return [f"oUpF8uMuAJO_M2pxb1Q9zNjWeS6{i:02d}" for i in range(players)]
+
+
+def build(cls, player_ids: list[str]):
+    """构造一个游戏中的典型房间：两名卧底，已淘汰两人"""
+    return cls(
+        room_id="370080047261810688",
+        creator=player_ids[0],
+        room_code="7091",
+        players=list(player_ids),
+        status=RoomStatus.PLAYING,
+        words={"civilian": "苹果", "undercover": "梨"},
+        undercovers=[player_ids[-1], player_ids[-3]],
+        current_round=3,
+        eliminated=player_ids[1:3],
+    )
+
+
+def per_instance_bytes(cls, players: int, instances: int) -> float:
+    """单实例内存（含列表、时间字段等全部附属对象），玩家 ID 字符串共享不计入"""
+    ids = player_ids(players)
+    build(cls, ids)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    rooms = [build(cls, ids) for _ in range(instances)]  # noqa: F841  保持存活直到快照
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return total / instances
+
+
+def bench(cls, players: int, rounds: int) -> dict:
+    ids = player_ids(players)
+    room = build(cls, ids)
+    last = room.players[-1]
+    missing = "oUpF8uMuAJO_M2pxb1Q9zNjWeS6zz"
+
+    def per_op(stmt):
+        return timeit.timeit(stmt, number=rounds) / rounds * 1e9
+
+    def eliminate_and_judge():
+        # 淘汰后立即判定
+        room.eliminated.append(last)
+        room.count_remaining()
+        room.eliminated.pop()
+
+    return {
+        "construct_ns": per_op(lambda: build(cls, ids)),
+        "is_player_ns": per_op(lambda: room.is_player(missing)),
+        "is_undercover_ns": per_op(lambda: room.is_undercover(last)),
+        "is_eliminated_ns": per_op(lambda: room.is_eliminated(last)),
+        "seat_of_ns": per_op(lambda: room.seat_of(last)),
+        "remaining_ns": per_op(room.get_remaining_players),
+        "count_remaining_ns": per_op(room.count_remaining),
+        "mutate_judge_ns": per_op(eliminate_and_judge),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="房间模型基准")
+    parser.add_argument("--rounds", type=int, default=200000, help="每项测量的循环次数")
+    parser.add_argument("--players", type=int, default=12, help="房间玩家人数")
+    parser.add_argument("--instances", type=int, default=20000, help="测量内存时构造的房间数量")
+    args = parser.parse_args()
+
+    results = {}
+    for name, cls in (("dataclass", LegacyRoom), ("slots", Room)):
+        results[name] = bench(cls, args.players, args.rounds)
+        results[name]["bytes_per_room"] = per_instance_bytes(cls, args.players, args.instances)
+
+    print(f"{'metric':<20}{'dataclass':>12}{'slots':>12}{'ratio':>10}")
+    for metric in results["dataclass"]:
+        legacy_value = results["dataclass"][metric]
+        slots_value = results["slots"][metric]
+        ratio = slots_value / legacy_value if legacy_value else 0
+        print(f"{metric:<20}{legacy_value:>12.1f}{slots_value:>12.1f}{ratio:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+冷用户降级脚本
+把超过 USER_DEMOTE_IDLE_SECONDS 未活跃的用户从 Redis 降级到 MySQL users 表（可由定时任务每小时执行）
+
+用法: python -m utils.demote_users [--idle-seconds 604800] [--batch-size 500]
+"""
+
+import argparse
+import os
+import sys
+
+# 将项目根目录添加到 python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.app_factory import AppFactory
+from backend.repositories.unit_of_work import unwrap
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷用户降级到 MySQL")
+    parser.add_argument("--idle-seconds", type=int, default=None, help="未活跃多久后降级，默认取配置")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批处理的键数量")
+    args = parser.parse_args()
+
+    app = AppFactory.create_app()
+    with app.app_context():
+        idle_seconds = args.idle_seconds or app.config.get("USER_DEMOTE_IDLE_SECONDS", 7 * 24 * 3600)
+        demoted = unwrap(app.user_repo).demote_cold(idle_seconds, batch_size=args.batch_size)
+        print(f"降级完成，共降级 {demoted} 个用户")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,10 +13,11 @@ from backend.app_factory import AppFactory
 from backend.config.game_config import GameConfig
 from backend.extensions import db
 from backend.models.sql import WordPair
+from backend.services.word_catalog import WordCatalog
 
 
 def import_words():
-    app = AppFactory.create_app()
+    app, _ = AppFactory.create_app()
 
     with app.app_context():
         print("Starting word import...")
@@ -44,6 +45,8 @@ def import_words():
 
         try:
             db.session.commit()
+            # 通知各进程重新加载进程内词库
+            WordCatalog(app.room_repo.redis).bump_version()
             print(f"Import finished! Added {count} new pairs, skipped {skipped} existing pairs.")
         except Exception as e:
             db.session.rollback()
@@ -2,14 +2,25 @@
 """
 命名风格转换工具
 用于处理 snake_case 和 camelCase 之间的转换
+
+单个键名的转换结果有界缓存；协议键名已知时可用 compile_converter 编译成平铺映射表，
+已知键直接查表，未知键回退到带缓存的逐键转换
 """
 
+from functools import lru_cache
+
+# 键名转换缓存上限（事件数据中的键名种类有限，超出时按最近最少使用淘汰）
+KEY_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def snake_to_camel(snake_str):
     """将 snake_case 转换为 camelCase"""
     parts = snake_str.split('_')
     return parts[0] + ''.join(word.capitalize() for word in parts[1:])
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def camel_to_snake(camel_str):
     """将 camelCase 转换为 snake_case"""
     snake_str = ""
@@ -38,3 +49,28 @@ def snake_to_camel_dict(data):
 def camel_to_snake_dict(data):
     """将字典的所有键从 camelCase 转换为 snake_case"""
     return convert_dict_keys(data, camel_to_snake)
+
+
+def compile_converter(keys, convert_func):
+    """
+    按已知键名集合编译递归转换函数
+
+    Args:
+        keys: 协议中出现的全部键名（任意层级）
+        convert_func: 单个键名的转换函数（snake_to_camel 或 camel_to_snake）
+
+    Returns:
+        与 snake_to_camel_dict / camel_to_snake_dict 结果相同的转换函数
+    """
+    mapping = {key: convert_func(key) for key in keys}
+    lookup = mapping.get
+
+    def convert(data):
+        if isinstance(data, dict):
+            return {lookup(key) or convert_func(key): convert(value) for key, value in data.items()}
+        elif isinstance(data, list):
+            return [convert(item) for item in data]
+        else:
+            return data
+
+    return convert
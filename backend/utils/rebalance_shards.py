@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Redis 分片扩容迁移脚本
+按当前配置（REDIS_SHARD_URLS 与 REDIS_SHARD_PREVIOUS_NODES）扫描扩容前的各节点，
+把归属已变化的键迁移到新节点。各 worker 在迁移期间会在首次访问时迁移用到的键，可与本脚本并行
+
+用法: python -m utils.rebalance_shards [--batch-size 500] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+# 将项目根目录添加到 python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.config.settings import Settings
+from backend.utils.redis_pool import create_redis_client
+from backend.utils.redis_shard import ShardedRedis, shard_tag
+
+
+def count_moves(client: ShardedRedis, batch_size: int) -> dict[str, int]:
+    """统计各节点需要迁出的键数量"""
+    counts = {}
+    for source in client.previous:
+        moves = 0
+        for raw_key in client.nodes[source].scan_iter(count=batch_size):
+            tag = shard_tag(raw_key)
+            if tag is not None and client.ring.node_for(tag) != source:
+                moves += 1
+        counts[source] = moves
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis 分片扩容迁移")
+    parser.add_argument("--batch-size", type=int, default=500, help="SCAN 每批返回的键数量")
+    parser.add_argument("--dry-run", action="store_true", help="只统计需要迁移的键，不迁移")
+    args = parser.parse_args()
+
+    client = create_redis_client(Settings.create().model_dump())
+    if not isinstance(client, ShardedRedis) or not client.migrating:
+        print("未处于迁移状态：需要配置 REDIS_SHARD_URLS 与 REDIS_SHARD_PREVIOUS_NODES")
+        sys.exit(1)
+
+    if args.dry_run:
+        for source, moves in count_moves(client, args.batch_size).items():
+            print(f"{source:<16}{moves:>10}")
+        return
+
+    moved = client.rebalance(batch_size=args.batch_size)
+    print(f"迁移完成，共迁移 {moved} 个键；请清空 REDIS_SHARD_PREVIOUS_NODES 后重新发布")
+
+
+if __name__ == "__main__":
+    main()
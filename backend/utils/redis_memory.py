@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Redis 内存报告
+按键族（room:、room_code:、user:、token:blacklist:、tester:、push:）统计键数量，
+对每族抽样 MEMORY USAGE 估算占用字节，并与活跃房间数、用户数对照
+
+用法: python -m utils.redis_memory [--sample 200] [--max-keys 0]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import redis
+
+# 将项目根目录添加到 python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.config.settings import Settings
+from backend.utils.redis_pool import create_redis_client
+from backend.utils.redis_shard import ShardedRedis
+
+# 统计的键族（键名前缀），其余键归入 other
+KEY_FAMILIES = ("room_code:", "rooms:active", "room:", "user:", "token:blacklist:", "tester:", "push:")
+OTHER_FAMILY = "other"
+
+
+def key_family(key: str | bytes) -> str:
+    """键所属的键族"""
+    if isinstance(key, bytes):
+        key = key.decode('utf-8', errors='replace')
+    for family in KEY_FAMILIES:
+        if key.startswith(family):
+            return family
+    return OTHER_FAMILY
+
+
+def memory_report(client: redis.Redis | ShardedRedis, sample_size: int = 200, batch_size: int = 1000,
+                  max_keys: int | None = None) -> dict:
+    """
+    生成内存报告（SCAN 键空间，每族最多抽样 sample_size 个键）
+
+    MEMORY USAGE 不可用时（如 fakeredis）只统计键数量，字节数为 None
+
+    Args:
+        max_keys: 最多扫描的键数量，None 表示扫描全部键；达到上限时停止扫描，
+            各族的 keys 只是已扫描部分的计数，truncated 为 True
+
+    Returns:
+        {'families': {键族: {'keys', 'sampled', 'avg_bytes', 'estimated_bytes'}}, 'scanned', 'truncated',
+         'used_memory', 'active_rooms', 'users', 'bytes_per_active_room'}
+    """
+    counts: dict[str, int] = {}
+    samples: dict[str, list] = {}
+    scanned = 0
+    truncated = False
+    for key in client.scan_iter(count=batch_size):
+        if max_keys is not None and scanned >= max_keys:
+            truncated = True
+            break
+        scanned += 1
+        family = key_family(key)
+        counts[family] = counts.get(family, 0) + 1
+        family_samples = samples.setdefault(family, [])
+        if len(family_samples) < sample_size:
+            family_samples.append(key)
+
+    sizes = _sample_sizes(client, samples)
+    families = {}
+    for family, count in sorted(counts.items()):
+        family_sizes = sizes.get(family)
+        avg_bytes = sum(family_sizes) / len(family_sizes) if family_sizes else None
+        families[family] = {
+            'keys': count,
+            'sampled': len(family_sizes) if family_sizes else 0,
+            'avg_bytes': round(avg_bytes, 1) if avg_bytes is not None else None,
+            'estimated_bytes': int(avg_bytes * count) if avg_bytes is not None else None,
+        }
+
+    used_memory = _used_memory(client)
+    active_rooms = client.zcard("rooms:active")
+    return {
+        'families': families,
+        'scanned': scanned,
+        'truncated': truncated,
+        'used_memory': used_memory,
+        'active_rooms': active_rooms,
+        'users': counts.get("user:", 0),
+        'bytes_per_active_room': used_memory // active_rooms if used_memory and active_rooms else None,
+    }
+
+
+def _sample_sizes(client, samples: dict[str, list]) -> dict[str, list[int]]:
+    pipe = client.pipeline(transaction=False)
+    order = []
+    for family, keys in samples.items():
+        for key in keys:
+            pipe.memory_usage(key)
+            order.append(family)
+    try:
+        results = pipe.execute()
+    except redis.ResponseError:
+        return {}
+    sizes: dict[str, list[int]] = {}
+    for family, size in zip(order, results, strict=True):
+        if size is not None:
+            sizes.setdefault(family, []).append(size)
+    return sizes
+
+
+def _used_memory(client) -> int | None:
+    nodes = client.nodes.values() if isinstance(client, ShardedRedis) else [client]
+    try:
+        return sum(node.info("memory").get("used_memory", 0) for node in nodes)
+    except redis.ResponseError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis 内存报告（按键族）")
+    parser.add_argument("--sample", type=int, default=200, help="每个键族抽样的键数量")
+    parser.add_argument("--max-keys", type=int, default=0, help="最多扫描的键数量，0 表示扫描全部键")
+    args = parser.parse_args()
+
+    client = create_redis_client(Settings.create().model_dump())
+    report = memory_report(client, sample_size=args.sample, max_keys=args.max_keys or None)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Redis 连接池
+按配置创建带统计的连接池（占用/空闲连接数、获取连接的等待时间），
+并在 fork 出的子进程（gunicorn --preload）中立即重建，避免父子进程共用套接字
+"""
+
+import functools
+import os
+import threading
+import time
+import weakref
+
+import redis
+import redis.asyncio
+
+from backend.utils.logger import setup_logger
+from backend.utils.redis_shard import ShardedRedis, parse_shard_urls
+
+logger = setup_logger(__name__)
+
+
+class _PoolStatsMixin:
+    """连接池统计"""
+
+    def reset(self):
+        super().reset()
+        # 父进程的统计对子进程没有意义，随连接池一起重置
+        self._stats_lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._acquired = 0
+        self._exhausted = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            connection = super().get_connection(*args, **kwargs)
+        except redis.ConnectionError as e:
+            if "No connection available" in str(e):
+                with self._stats_lock:
+                    self._exhausted += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return connection
+
+    def release(self, connection):
+        super().release(connection)
+        with self._stats_lock:
+            self._in_use = max(0, self._in_use - 1)
+
+    def _created_count(self) -> int:
+        raise NotImplementedError
+
+    def get_stats(self) -> dict:
+        """获取连接池统计信息"""
+        with self._stats_lock:
+            created = self._created_count()
+            return {
+                'pid': os.getpid(),
+                'max_connections': self.max_connections,
+                'created': created,
+                'in_use': self._in_use,
+                'idle': max(0, created - self._in_use),
+                'peak_in_use': self._peak_in_use,
+                'acquired': self._acquired,
+                'exhausted': self._exhausted,
+                'avg_wait_ms': self._wait_total / self._acquired * 1000 if self._acquired else 0,
+                'max_wait_ms': self._wait_max * 1000,
+            }
+
+
+class InstrumentedBlockingConnectionPool(_PoolStatsMixin, redis.BlockingConnectionPool):
+    """阻塞式连接池：连接耗尽时最多等待 timeout 秒，而不是无限新建连接"""
+
+    def _created_count(self) -> int:
+        return len(self._connections)
+
+
+class InstrumentedConnectionPool(_PoolStatsMixin, redis.ConnectionPool):
+    """非阻塞连接池：超过 max_connections 时立即报错"""
+
+    def _created_count(self) -> int:
+        return self._created_connections
+
+
+def _reset_after_fork(pool_ref: weakref.ref) -> None:
+    pool = pool_ref()
+    if pool is not None:
+        # 只丢弃对父进程连接的引用，不关闭套接字（父进程仍在使用）
+        pool.reset()
+
+
+def _connection_kwargs(config) -> dict:
+    return {
+        'max_connections': config.get("REDIS_MAX_CONNECTIONS", 50),
+        'socket_timeout': config.get("REDIS_SOCKET_TIMEOUT", 5.0),
+        'socket_connect_timeout': config.get("REDIS_SOCKET_CONNECT_TIMEOUT", 2.0),
+        'socket_keepalive': config.get("REDIS_SOCKET_KEEPALIVE", True),
+        'health_check_interval': config.get("REDIS_HEALTH_CHECK_INTERVAL", 30),
+    }
+
+
+def create_redis_client(config) -> redis.Redis | ShardedRedis:
+    """
+    按配置创建 Redis 客户端
+
+    Args:
+        config: Flask app.config（或同名键的映射）
+
+    Returns:
+        使用带统计连接池的 Redis 客户端；配置了 REDIS_SHARD_URLS 时为分片客户端（每个节点一个连接池）
+
+    Raises:
+        ValueError: 分片节点配置无效
+    """
+    shard_urls = parse_shard_urls(config.get("REDIS_SHARD_URLS", ""))
+    if not shard_urls:
+        return _create_client(config["REDIS_URL"], config)
+
+    nodes = {name: _create_client(url, config) for name, url in shard_urls.items()}
+    previous = [name.strip() for name in config.get("REDIS_SHARD_PREVIOUS_NODES", "").split(",") if name.strip()]
+    logger.info("Redis 分片客户端已创建", extra={'nodes': list(nodes), 'previous': previous})
+    return ShardedRedis(nodes, previous=previous or None)
+
+
+def _create_client(url: str, config) -> redis.Redis:
+    connection_kwargs = _connection_kwargs(config)
+    if config.get("REDIS_POOL_BLOCKING", True):
+        pool = InstrumentedBlockingConnectionPool.from_url(
+            url, timeout=config.get("REDIS_POOL_TIMEOUT", 5.0), **connection_kwargs
+        )
+    else:
+        pool = InstrumentedConnectionPool.from_url(url, **connection_kwargs)
+
+    os.register_at_fork(after_in_child=functools.partial(_reset_after_fork, weakref.ref(pool)))
+    logger.info(
+        "Redis 连接池已创建",
+        extra={'blocking': config.get("REDIS_POOL_BLOCKING", True), **connection_kwargs},
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def create_async_redis_client(config) -> redis.asyncio.Redis:
+    """
+    按相同配置创建 redis.asyncio 客户端（供 AsyncRoomRepository 等 asyncio 仓储使用）
+
+    连接池属于创建它的事件循环，应在事件循环启动后创建
+    """
+    connection_kwargs = _connection_kwargs(config)
+    if config.get("REDIS_POOL_BLOCKING", True):
+        pool = redis.asyncio.BlockingConnectionPool.from_url(
+            config["REDIS_URL"], timeout=config.get("REDIS_POOL_TIMEOUT", 5.0), **connection_kwargs
+        )
+    else:
+        pool = redis.asyncio.ConnectionPool.from_url(config["REDIS_URL"], **connection_kwargs)
+    return redis.asyncio.Redis(connection_pool=pool)
+
+
+def get_pool_stats(client: redis.Redis | ShardedRedis) -> dict | None:
+    """获取客户端连接池统计，非带统计的连接池（如测试用 fakeredis）返回 None，分片客户端按节点名返回"""
+    if isinstance(client, ShardedRedis):
+        stats = {name: get_pool_stats(node) for name, node in client.nodes.items()}
+        return {name: node_stats for name, node_stats in stats.items() if node_stats is not None} or None
+    pool = getattr(client, 'connection_pool', None)
+    if isinstance(pool, _PoolStatsMixin):
+        return pool.get_stats()
+    return None
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Redis 分片客户端
+按一致性哈希环把键路由到多个 Redis 节点，对仓储暴露与 redis.Redis 相同的常用接口（命令、管道、脚本）
+
+路由标签（与 Redis Cluster 的 hash tag 语义一致）：
+- 键中含 {tag} 时按 tag 路由
+- room:<room_id>、room:<room_id>:players 等房间键按 room_id 路由，同一房间的所有键位于同一节点，
+  Lua 脚本与事务管道仍可原子地访问它们
+- user:<openid>、token:blacklist:<openid>:<exp> 按 openid 路由
+- room_code:*（短码目录与码池）、rooms:active*（活跃房间索引）、room_cache:*（失效频道）
+  为全局结构，固定在元数据节点（节点列表中的第一个），不参与一致性哈希，扩容时不迁移
+- 其余键按整个键名路由
+
+限制：
+- 跨节点的管道按节点拆分执行，事务只保证单个节点内的原子性
+- Lua 脚本的所有 KEYS 必须位于同一节点，否则报 CROSSSLOT；脚本内部拼出的键不经过路由，
+  迁移期间由调用方先 ensure_migrated（如房间脚本的 <房间键>:version）
+- 只支持同步客户端
+
+扩容：新节点加入后，键按新环路由；previous 为扩容前的节点列表时，首次访问归属已变化的键前
+先从原节点迁移（DUMP/RESTORE 并保留剩余 TTL），后台再用 rebalance() 扫描迁移剩余的键
+"""
+
+import bisect
+import hashlib
+from collections.abc import Iterable
+
+import redis
+
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 固定在元数据节点的全局键前缀
+PINNED_PREFIXES = ("room_code:", "rooms:active", "room_cache:")
+# 按前缀后第一段路由的实体键前缀
+ENTITY_PREFIXES = ("room:", "user:", "token:blacklist:")
+
+# 单键命令：第一个参数为键，直接转发到键所在节点
+KEYED_COMMANDS = frozenset({
+    'get', 'getex', 'set', 'setex', 'setnx', 'getdel', 'incr', 'incrby', 'expire', 'pexpire', 'ttl', 'pttl', 'type',
+    'hget', 'hset', 'hmget', 'hgetall', 'hdel', 'hincrby',
+    'lrange', 'rpush', 'lpush', 'lrem', 'llen', 'lindex', 'lpos', 'lpop', 'blpop', 'lset', 'ltrim', 'decr',
+    'sadd', 'srem', 'spop', 'smembers', 'sismember', 'scard',
+    'zadd', 'zrem', 'zcard', 'zscore', 'zrangebyscore', 'zrevrangebyscore', 'zremrangebyscore',
+    'xadd', 'xrange', 'xlen',
+    'memory_usage',
+})
+
+
+def shard_tag(key: str | bytes) -> str | None:
+    """计算键的路由标签，固定在元数据节点的全局键返回 None"""
+    if isinstance(key, bytes):
+        key = key.decode('utf-8')
+    start = key.find('{')
+    if start != -1:
+        end = key.find('}', start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    if key.startswith(PINNED_PREFIXES):
+        return None
+    for prefix in ENTITY_PREFIXES:
+        if key.startswith(prefix):
+            return key[len(prefix):].split(':', 1)[0]
+    return key
+
+
+class HashRing:
+    """一致性哈希环：每个节点放置 replicas 个虚拟节点，增删节点时只有约 1/N 的标签改变归属"""
+
+    def __init__(self, names: Iterable[str], replicas: int = 160):
+        points = sorted((self._hash(f"{name}#{i}"), name) for name in names for i in range(replicas))
+        if not points:
+            raise ValueError("哈希环至少需要一个节点")
+        self._hashes = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+    def node_for(self, tag: str) -> str:
+        """标签所属的节点名"""
+        index = bisect.bisect(self._hashes, self._hash(tag)) % len(self._hashes)
+        return self._names[index]
+
+
+class ShardedRedis:
+    """
+    Redis 分片客户端
+
+    Args:
+        nodes: 节点名到 redis.Redis 客户端的有序映射，第一个节点为元数据节点
+        previous: 扩容前的节点名列表（正在迁移时传入），元数据节点必须保持不变
+        replicas: 每个节点的虚拟节点数
+    """
+
+    # 本进程已确认迁移完成的键数量上限，超过后清空重新确认
+    MIGRATED_CACHE_SIZE = 100_000
+
+    def __init__(self, nodes: dict[str, redis.Redis], previous: list[str] | None = None, replicas: int = 160):
+        if not nodes:
+            raise ValueError("分片客户端至少需要一个节点")
+        self.nodes = dict(nodes)
+        self.meta = next(iter(self.nodes))
+        self.replicas = replicas
+        self.ring = HashRing(self.nodes, replicas)
+        self.previous: list[str] = []
+        self.previous_ring = None
+        self._migrated: set[str] = set()
+        if previous:
+            self._begin_migration(previous)
+
+    def _begin_migration(self, previous: list[str]) -> None:
+        unknown = [name for name in previous if name not in self.nodes]
+        if unknown:
+            raise ValueError(f"扩容前的节点不在节点列表中: {unknown}")
+        if previous[0] != self.meta:
+            raise ValueError("扩容前后元数据节点必须相同")
+        self.previous = list(previous)
+        self.previous_ring = HashRing(previous, self.replicas)
+        self._migrated.clear()
+
+    @property
+    def migrating(self) -> bool:
+        return self.previous_ring is not None
+
+    # ------------------------------------------------------------------
+    # 路由
+    # ------------------------------------------------------------------
+
+    def node_for(self, key: str | bytes) -> str:
+        """键所在的节点名"""
+        tag = shard_tag(key)
+        return self.meta if tag is None else self.ring.node_for(tag)
+
+    def client_for(self, key: str | bytes) -> redis.Redis:
+        """键所在节点的客户端（迁移期间先迁移该键）"""
+        self.ensure_migrated([key])
+        return self.nodes[self.node_for(key)]
+
+    def node_for_keys(self, keys: list) -> str:
+        """
+        一组键共同所在的节点名，没有键时为元数据节点
+
+        Raises:
+            redis.ResponseError: 键分布在多个节点（CROSSSLOT）
+        """
+        names = {self.node_for(key) for key in keys}
+        if len(names) > 1:
+            raise redis.ResponseError(f"CROSSSLOT Keys in request don't hash to the same node: {sorted(names)}")
+        return names.pop() if names else self.meta
+
+    def _group(self, keys: list) -> dict[str, list[int]]:
+        groups: dict[str, list[int]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(self.node_for(key), []).append(i)
+        return groups
+
+    # ------------------------------------------------------------------
+    # 迁移
+    # ------------------------------------------------------------------
+
+    def add_node(self, name: str, client: redis.Redis) -> None:
+        """加入新节点并进入迁移状态（之后调用 rebalance() 迁移剩余的键）"""
+        if name in self.nodes:
+            raise ValueError(f"节点已存在: {name}")
+        previous = list(self.nodes)
+        self.nodes[name] = client
+        self.ring = HashRing(self.nodes, self.replicas)
+        self._begin_migration(previous)
+        logger.info("Redis 分片节点已加入", extra={'node': name, 'nodes': list(self.nodes)})
+
+    def ensure_migrated(self, keys: Iterable) -> None:
+        """迁移期间确保这些键已从扩容前的节点迁到当前节点"""
+        if self.previous_ring is None:
+            return
+        for key in keys:
+            if isinstance(key, bytes):
+                key = key.decode('utf-8')
+            if key in self._migrated:
+                continue
+            tag = shard_tag(key)
+            if tag is not None:
+                source = self.previous_ring.node_for(tag)
+                target = self.ring.node_for(tag)
+                if source != target:
+                    self.migrate_key(key, source, target)
+            if len(self._migrated) >= self.MIGRATED_CACHE_SIZE:
+                self._migrated.clear()
+            self._migrated.add(key)
+
+    def migrate_key(self, key: str, source: str, target: str) -> bool:
+        """
+        把一个键从 source 节点迁到 target 节点，保留剩余 TTL
+
+        目标节点上已有该键（其他进程已迁移或已写入新值）时以目标节点为准
+
+        Returns:
+            是否迁移了数据
+        """
+        source_client = self.nodes[source]
+        payload = source_client.dump(key)
+        if payload is None:
+            return False
+        ttl = source_client.pttl(key)
+        try:
+            self.nodes[target].restore(key, max(ttl, 0), payload)
+        except redis.ResponseError as e:
+            if "BUSYKEY" not in str(e):
+                raise
+        source_client.delete(key)
+        return True
+
+    def rebalance(self, batch_size: int = 500) -> int:
+        """
+        扫描扩容前的各节点，迁移归属已变化的全部键，完成后退出迁移状态
+
+        Returns:
+            迁移的键数量
+        """
+        if self.previous_ring is None:
+            return 0
+        moved = 0
+        for source in self.previous:
+            for raw_key in self.nodes[source].scan_iter(count=batch_size):
+                key = raw_key.decode('utf-8') if isinstance(raw_key, bytes) else raw_key
+                tag = shard_tag(key)
+                if tag is None:
+                    continue
+                target = self.ring.node_for(tag)
+                if target != source and self.migrate_key(key, source, target):
+                    moved += 1
+        self.finish_migration()
+        logger.info("Redis 分片迁移完成", extra={'moved': moved, 'nodes': list(self.nodes)})
+        return moved
+
+    def finish_migration(self) -> None:
+        """退出迁移状态（所有键已迁移完成后调用）"""
+        self.previous = []
+        self.previous_ring = None
+        self._migrated.clear()
+
+    # ------------------------------------------------------------------
+    # 命令
+    # ------------------------------------------------------------------
+
+    def __getattr__(self, name):
+        if name not in KEYED_COMMANDS:
+            raise AttributeError(f"{type(self).__name__} 不支持命令: {name}")
+
+        def command(key, *args, **kwargs):
+            return getattr(self.client_for(key), name)(key, *args, **kwargs)
+
+        return command
+
+    def mget(self, keys, *args) -> list:
+        """按节点拆分的 MGET，结果顺序与 keys 一致"""
+        keys = [keys, *args] if isinstance(keys, (str, bytes)) else [*keys, *args]
+        self.ensure_migrated(keys)
+        values = [None] * len(keys)
+        for name, indexes in self._group(keys).items():
+            for i, value in zip(indexes, self.nodes[name].mget([keys[i] for i in indexes]), strict=True):
+                values[i] = value
+        return values
+
+    def delete(self, *keys) -> int:
+        self.ensure_migrated(keys)
+        return sum(self.nodes[name].delete(*(keys[i] for i in indexes)) for name, indexes in self._group(keys).items())
+
+    def exists(self, *keys) -> int:
+        self.ensure_migrated(keys)
+        return sum(self.nodes[name].exists(*(keys[i] for i in indexes)) for name, indexes in self._group(keys).items())
+
+    def publish(self, channel, message) -> int:
+        return self.nodes[self.meta].publish(channel, message)
+
+    def pubsub(self, **kwargs):
+        return self.nodes[self.meta].pubsub(**kwargs)
+
+    def ping(self) -> bool:
+        return all(client.ping() for client in self.nodes.values())
+
+    def scan_iter(self, match=None, count=None, **kwargs):
+        """依次扫描各节点"""
+        for client in self.nodes.values():
+            yield from client.scan_iter(match=match, count=count, **kwargs)
+
+    def register_script(self, script: str) -> "ShardedScript":
+        return ShardedScript(self, script)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> "ShardedPipeline":
+        return ShardedPipeline(self, transaction)
+
+
+class ShardedScript:
+    """按 KEYS 所在节点执行的 Lua 脚本，各节点的脚本对象按需注册"""
+
+    def __init__(self, client: ShardedRedis, script: str):
+        self.client = client
+        self.script = script
+        self._scripts: dict[str, object] = {}
+
+    def for_node(self, name: str):
+        script = self._scripts.get(name)
+        if script is None:
+            script = self._scripts[name] = self.client.nodes[name].register_script(self.script)
+        return script
+
+    def __call__(self, keys=(), args=(), client=None):
+        keys = list(keys)
+        if isinstance(client, ShardedPipeline):
+            return client.script(self, keys, list(args))
+        name = self.client.node_for_keys(keys)
+        self.client.ensure_migrated(keys)
+        return self.for_node(name)(keys=keys, args=list(args))
+
+
+class ShardedPipeline:
+    """
+    分片管道：命令按节点分组，execute() 时每个节点一个管道、一次往返
+
+    transaction=True 时每个节点的管道各自是一个 MULTI/EXEC 事务，节点之间不保证原子性
+    """
+
+    def __init__(self, client: ShardedRedis, transaction: bool = True):
+        self.client = client
+        self.transaction = transaction
+        # 每条命令: ([(节点名, 键列表, 写入节点管道的函数)], 合并各节点结果的函数)
+        self._commands: list[tuple[list, object]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.reset()
+
+    def __len__(self):
+        return len(self._commands)
+
+    def reset(self) -> None:
+        self._commands = []
+
+    def _queue(self, parts: list, combine=None) -> "ShardedPipeline":
+        self._commands.append((parts, combine or (lambda results: results[0])))
+        return self
+
+    def __getattr__(self, name):
+        if name not in KEYED_COMMANDS:
+            raise AttributeError(f"{type(self).__name__} 不支持命令: {name}")
+
+        def command(key, *args, **kwargs):
+            return self._queue([
+                (self.client.node_for(key), [key], lambda pipe: getattr(pipe, name)(key, *args, **kwargs))
+            ])
+
+        return command
+
+    def _multi_key(self, name: str, keys: tuple) -> "ShardedPipeline":
+        parts = []
+        for node, indexes in self.client._group(list(keys)).items():
+            node_keys = [keys[i] for i in indexes]
+            parts.append((node, node_keys, lambda pipe, node_keys=node_keys: getattr(pipe, name)(*node_keys)))
+        return self._queue(parts, sum)
+
+    def delete(self, *keys) -> "ShardedPipeline":
+        return self._multi_key('delete', keys)
+
+    def exists(self, *keys) -> "ShardedPipeline":
+        return self._multi_key('exists', keys)
+
+    def publish(self, channel, message) -> "ShardedPipeline":
+        return self._queue([(self.client.meta, [], lambda pipe: pipe.publish(channel, message))])
+
+    def script(self, script: ShardedScript, keys: list, args: list) -> "ShardedPipeline":
+        name = self.client.node_for_keys(keys)
+        return self._queue([(name, keys, lambda pipe: script.for_node(name)(keys=keys, args=args, client=pipe))])
+
+    def execute(self, raise_on_error: bool = True) -> list:
+        """按节点执行，结果顺序与命令入队顺序一致"""
+        commands, self._commands = self._commands, []
+        self.client.ensure_migrated(key for parts, _ in commands for _, keys, _ in parts for key in keys)
+
+        node_pipes: dict[str, object] = {}
+        positions = []
+        counts: dict[str, int] = {}
+        for parts, _ in commands:
+            slots = []
+            for name, _, write in parts:
+                pipe = node_pipes.get(name)
+                if pipe is None:
+                    pipe = node_pipes[name] = self.client.nodes[name].pipeline(transaction=self.transaction)
+                write(pipe)
+                slots.append((name, counts.get(name, 0)))
+                counts[name] = counts.get(name, 0) + 1
+            positions.append(slots)
+
+        node_results = {name: pipe.execute(raise_on_error=raise_on_error) for name, pipe in node_pipes.items()}
+        return [
+            combine([node_results[name][i] for name, i in slots])
+            for (_, combine), slots in zip(commands, positions, strict=True)
+        ]
+
+
+def is_sharded(client) -> bool:
+    """客户端是否为分片客户端"""
+    return isinstance(client, ShardedRedis)
+
+
+def parse_shard_urls(value: str) -> dict[str, str]:
+    """
+    解析分片节点配置 "name=url,name=url"
+
+    Raises:
+        ValueError: 格式无效或节点名重复
+    """
+    nodes: dict[str, str] = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, sep, url = item.partition('=')
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"无效的分片节点配置: {item}")
+        if name.strip() in nodes:
+            raise ValueError(f"分片节点名重复: {name.strip()}")
+        nodes[name.strip()] = url.strip()
+    return nodes
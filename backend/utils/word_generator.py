@@ -2,35 +2,132 @@
 """
 词语生成器
 负责生成随机词语对
+
+按（类别, 难度）筛选条件惰性建立抽样表并缓存：等权时直接随机下标，带权重时使用别名表（Walker alias），
+单次抽取都是 O(1)；增删词语对后抽样表失效重建。筛选条件来自客户端，只缓存词库中存在的类别、难度，
+未知条件直接退回不限条件的抽样表，缓存大小不超过词库的（类别, 难度）组合数
 """
 
 import random
 
 
+class _AliasTable:
+    """带权重的 O(1) 抽样表（Vose 别名法）"""
+
+    __slots__ = ('indices', 'prob', 'alias')
+
+    def __init__(self, indices: list[int], weights: list[float]):
+        n = len(indices)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        self.indices = indices
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = g
+            scaled[g] -= 1.0 - scaled[s]
+            (small if scaled[g] < 1.0 else large).append(g)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def sample(self) -> int:
+        i = random.randrange(len(self.indices))
+        return self.indices[i] if random.random() < self.prob[i] else self.indices[self.alias[i]]
+
+
 class WordGenerator:
     """词语生成器"""
-    
-    def __init__(self, word_pairs: list[tuple[str, str]]):
-        self.word_pairs = word_pairs
-    
-    def get_random_word_pair(self) -> tuple[str, str]:
-        """获取随机词语对"""
-        return random.choice(self.word_pairs)
-    
+
+    def __init__(self, word_pairs: list[tuple[str, str]], categories: list[str] | None = None,
+                 difficulties: list[int] | None = None, weights: list[float] | None = None):
+        """
+        Args:
+            word_pairs: [(平民词, 卧底词)]
+            categories: 与 word_pairs 一一对应的类别（可选）
+            difficulties: 与 word_pairs 一一对应的难度（可选）
+            weights: 与 word_pairs 一一对应的抽样权重（可选，默认等权）
+        """
+        self.word_pairs = list(word_pairs)
+        self.categories = list(categories) if categories is not None else [None] * len(self.word_pairs)
+        self.difficulties = list(difficulties) if difficulties is not None else [None] * len(self.word_pairs)
+        self.weights = list(weights) if weights is not None else None
+        # (类别, 难度) -> 下标元组（等权）或别名表；None 表示不限
+        self._samplers: dict[tuple, tuple[int, ...] | _AliasTable] = {}
+
+    def _sampler(self, category: str | None, difficulty: int | None) -> tuple[int, ...] | _AliasTable:
+        key = (category, difficulty)
+        sampler = self._samplers.get(key)
+        if sampler is None:
+            if (category is not None and category not in self.categories) or \
+                    (difficulty is not None and difficulty not in self.difficulties):
+                # 词库中没有的条件不建表也不缓存，避免任意客户端输入撑大缓存
+                return self._sampler(None, None)
+            indices = [
+                i for i in range(len(self.word_pairs))
+                if (category is None or self.categories[i] == category)
+                and (difficulty is None or self.difficulties[i] == difficulty)
+            ]
+            weights = [self.weights[i] for i in indices] if self.weights is not None else None
+            if weights and len(set(weights)) > 1:
+                sampler = _AliasTable(indices, weights)
+            else:
+                sampler = tuple(indices)
+            self._samplers[key] = sampler
+        return sampler
+
+    def warm(self) -> None:
+        """预先建立所有（类别, 难度）组合的抽样表"""
+        for category, difficulty in set(zip(self.categories, self.difficulties, strict=True)):
+            for key in ((None, None), (category, None), (None, difficulty), (category, difficulty)):
+                self._sampler(*key)
+
+    def get_random_word_pair(self, category: str | None = None, difficulty: int | None = None) -> tuple[str, str]:
+        """
+        获取随机词语对，可按类别、难度筛选；没有符合条件的词语对时不限条件抽取
+
+        Raises:
+            IndexError: 词库为空
+        """
+        sampler = self._sampler(category, difficulty)
+        if not sampler:
+            sampler = self._sampler(None, None)
+            if not sampler:
+                raise IndexError("词库为空")
+        if isinstance(sampler, _AliasTable):
+            return self.word_pairs[sampler.sample()]
+        return self.word_pairs[sampler[random.randrange(len(sampler))]]
+
     def get_word_pair_by_category(self, category: str) -> tuple[str, str]:
-        """根据类别获取词语对（预留功能）"""
-        # 这里可以根据类别筛选词语对
-        # 当前版本直接返回随机词语对
-        return self.get_random_word_pair()
-    
-    def add_word_pair(self, civilian_word: str, undercover_word: str) -> None:
+        """根据类别获取词语对"""
+        return self.get_random_word_pair(category=category)
+
+    def add_word_pair(self, civilian_word: str, undercover_word: str, category: str | None = None,
+                      difficulty: int | None = None, weight: float = 1.0) -> None:
         """添加词语对"""
+        if self.weights is None and weight != 1.0:
+            self.weights = [1.0] * len(self.word_pairs)
         self.word_pairs.append((civilian_word, undercover_word))
-    
+        self.categories.append(category)
+        self.difficulties.append(difficulty)
+        if self.weights is not None:
+            self.weights.append(weight)
+        self._samplers = {}
+
     def remove_word_pair(self, civilian_word: str, undercover_word: str) -> bool:
         """移除词语对"""
         try:
-            self.word_pairs.remove((civilian_word, undercover_word))
-            return True
+            i = self.word_pairs.index((civilian_word, undercover_word))
         except ValueError:
-            return False
\ No newline at end of file
+            return False
+        del self.word_pairs[i]
+        del self.categories[i]
+        del self.difficulties[i]
+        if self.weights is not None:
+            del self.weights[i]
+        self._samplers = {}
+        return True
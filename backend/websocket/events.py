@@ -38,6 +38,7 @@ class SystemEvent(str, Enum):
     CONNECTED = "connected"
     SUBSCRIBED = "subscribed"
     SUBSCRIBE_ERROR = "subscribe_error"
+    SNAPSHOT = "snapshot"  # 重连缺口超出事件日志保留范围时补发的房间快照
     PONG = "pong"
     SERVER_SHUTDOWN = "server_shutdown"
 
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+房间事件帧
+每条房间事件只构建一个不可变的帧对象，在 Socket.IO 与原生 WebSocket 两条推送链路间共享，
+两种线上格式都在首次使用时生成并缓存：
+- socketio_payload：Socket.IO 事件载荷（snake_case），python-socketio 按房间只编码一次
+- native：发给小程序的 camelCase JSON 文本，广播给任意多个连接、重连补发都只编码一次
+"""
+
+import json
+from typing import Any
+
+from backend.utils.naming import snake_to_camel_dict
+
+
+class EventFrame:
+    """房间事件帧（创建后不可修改，data 视为只读）"""
+
+    __slots__ = ("event", "room_id", "timestamp", "data", "seq", "_socketio_payload", "_native")
+
+    def __init__(self, event: str, room_id: str, timestamp: int, data: dict[str, Any], seq: int | None = None):
+        setattr_ = object.__setattr__
+        setattr_(self, "event", event)
+        setattr_(self, "room_id", room_id)
+        setattr_(self, "timestamp", timestamp)
+        setattr_(self, "data", data)
+        setattr_(self, "seq", seq)
+        setattr_(self, "_socketio_payload", None)
+        setattr_(self, "_native", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EventFrame is immutable")
+
+    @classmethod
+    def from_message(cls, message: dict[str, Any]) -> "EventFrame":
+        """由统一消息格式（NotificationService._format_message，可附 seq）构建"""
+        return cls(
+            event=message["event"],
+            room_id=message["room_id"],
+            timestamp=message.get("timestamp", 0),
+            data=message.get("data", {}),
+            seq=message.get("seq"),
+        )
+
+    @property
+    def socketio_payload(self) -> dict[str, Any]:
+        """Socket.IO 事件载荷：{"event", "room_id", "timestamp", "data"[, "seq"]}"""
+        if self._socketio_payload is None:
+            payload = {"event": self.event, "room_id": self.room_id, "timestamp": self.timestamp, "data": self.data}
+            if self.seq is not None:
+                payload["seq"] = self.seq
+            object.__setattr__(self, "_socketio_payload", payload)
+        return self._socketio_payload
+
+    @property
+    def native(self) -> str:
+        """原生 WebSocket 消息（camelCase JSON；外层键名固定，只转换 data 的键名）"""
+        if self._native is None:
+            message = {
+                "type": "event",
+                "event": self.event,
+                "roomId": self.room_id,
+                "timestamp": self.timestamp,
+                "data": snake_to_camel_dict(self.data),
+            }
+            if self.seq is not None:
+                message["seq"] = self.seq
+            object.__setattr__(self, "_native", json.dumps(message))
+        return self._native
+
+    @property
+    def coalesce_key(self) -> tuple[str, str]:
+        """出站队列合并键：同房间同事件"""
+        return self.room_id, self.event
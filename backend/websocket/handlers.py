@@ -12,7 +12,9 @@ from backend.websocket import socketio
 from backend.websocket.auth import check_rate_limit, decode_token, socketio_auth_required
 from backend.websocket.errors import WSErrorCode, format_ws_error
 from backend.websocket.events import SystemEvent
+from backend.websocket.frame import EventFrame
 from backend.websocket.monitor import ws_monitor
+from backend.websocket.resume import resume_room
 
 logger = setup_logger(__name__)
 
@@ -127,7 +129,7 @@ def handle_subscribe(data):
     3. 返回订阅成功消息
 
     Args:
-        data: {"room_id": "8888"}
+        data: {"room_id": "8888", "last_seq": 12}（last_seq 可选，重连时为最后收到的事件序号）
     """
     try:
         room_id = data.get("room_id") if isinstance(data, dict) else None
@@ -193,13 +195,22 @@ def handle_subscribe(data):
 
         logger.info("Room subscribed", extra={"user_id": user_id, "room_id": room_id, "sid": request.sid})
 
-        # 返回订阅成功消息
+        # 返回订阅成功消息（附当前事件序号），再补发断线期间缺失的事件或房间快照
+        seq, events, snapshot = resume_room(room_id, data.get("last_seq"))
+        success_data = {"success": True} if seq is None else {"success": True, "seq": seq}
         emit(
             SystemEvent.SUBSCRIBED.value,
-            {"event": SystemEvent.SUBSCRIBED.value, "room_id": room_id, "data": {"success": True}},
+            {"event": SystemEvent.SUBSCRIBED.value, "room_id": room_id, "data": success_data},
         )
         ws_monitor.record_message_sent()
 
+        for event in events:
+            frame = EventFrame.from_message(event)
+            emit(frame.event, frame.socketio_payload)
+        if snapshot is not None:
+            emit(SystemEvent.SNAPSHOT.value, {"event": SystemEvent.SNAPSHOT.value, **snapshot})
+        ws_monitor.record_message_sent(len(events) + (snapshot is not None))
+
     except Exception as e:
         room_id = data.get("room_id") if isinstance(data, dict) else None
         logger.error(f"Subscribe error: {e}", extra={"room_id": room_id})
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 WebSocket 监控与统计模块
-在单实例模式下使用内存进行计数，负责统计连接数、消息数和错误数
+在单实例模式下使用内存进行计数，负责统计连接数、消息数、错误数以及原生连接出站队列的积压情况
 """
 
 import threading
@@ -32,6 +32,9 @@ class WSMonitor:
         self.errors_count = 0
         # 记录特定类型错误的数量
         self.errors_by_type = {}
+        # 原生连接出站队列：{ws_id: OutboundQueue}，以及溢出处理计数
+        self.outbound_queues = {}
+        self.outbound_counts = {"dropped": 0, "coalesced": 0, "overflow_disconnects": 0}
         # 为了保证线程安全
         self._counter_lock = threading.Lock()
 
@@ -58,15 +61,45 @@ class WSMonitor:
             self.errors_count += 1
             self.errors_by_type[error_type] = self.errors_by_type.get(error_type, 0) + 1
 
-    def get_stats(self) -> dict:
-        """获取统计信息"""
+    def track_queue(self, ws_id, queue):
+        """登记连接的出站队列"""
         with self._counter_lock:
+            self.outbound_queues[ws_id] = queue
+
+    def untrack_queue(self, ws_id):
+        """移除连接的出站队列"""
+        with self._counter_lock:
+            self.outbound_queues.pop(ws_id, None)
+
+    def record_outbound(self, kind):
+        """记录出站队列溢出处理（dropped / coalesced / overflow_disconnects）"""
+        with self._counter_lock:
+            self.outbound_counts[kind] = self.outbound_counts.get(kind, 0) + 1
+
+    def get_stats(self, top: int = 10) -> dict:
+        """
+        获取统计信息
+
+        Args:
+            top: 出站队列中列出积压最深的连接数
+        """
+        with self._counter_lock:
+            queues = [(ws_id, queue.get_stats()) for ws_id, queue in self.outbound_queues.items()]
+            depths = [stats["depth"] for _, stats in queues]
+            deepest = sorted(queues, key=lambda item: item[1]["depth"], reverse=True)[:top]
             return {
                 "active_connections": self.active_connections,
                 "total_connections": self.total_connections,
                 "messages_sent": self.messages_sent,
                 "errors_count": self.errors_count,
                 "errors_by_type": dict(self.errors_by_type),
+                "outbound": {
+                    "queues": len(queues),
+                    "total_depth": sum(depths),
+                    "max_depth": max(depths, default=0),
+                    **self.outbound_counts,
+                    "deepest": [{"ws_id": str(ws_id), **stats} for ws_id, stats in deepest],
+                },
             }
 
     def log_stats(self):
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+原生 WebSocket 跨 worker 广播总线
+connections / room_subscriptions 是进程内状态，多 worker / 多 Pod 部署时事件只能送达本进程的小程序连接；
+Socket.IO 一侧由 SOCKETIO_MESSAGE_QUEUE 解决，原生连接一侧由本总线解决：
+
+- 每条房间事件先投递给本进程的订阅者，再发布到 ws_room:<room_id> 频道
+- 每个进程一条订阅连接，只订阅本进程有订阅者的房间频道：连接订阅房间时登记 SUBSCRIBE 请求，
+  房间在本进程已无订阅者时，下次收到该房间消息再 UNSUBSCRIBE
+- PubSub 对象不是线程安全的，SUBSCRIBE / UNSUBSCRIBE 都只在订阅线程中执行：
+  请求线程只把房间放入队列，订阅线程每轮读取消息前先处理队列
+- 消息带发布进程标识，收到自己发布的消息直接忽略（本进程已投递过）
+
+订阅连接断开期间、以及登记订阅到订阅线程执行 SUBSCRIBE 之间（至多 POLL_SECONDS）的消息会丢失，
+客户端据 seq 缺口重新订阅即可补发
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+
+import redis
+
+from backend.utils.logger import setup_logger
+from backend.websocket.frame import EventFrame
+
+logger = setup_logger(__name__)
+
+
+class NativeBroadcastBus:
+    """原生 WebSocket 跨进程广播总线"""
+
+    CHANNEL_PREFIX = "ws_room:"
+    POLL_SECONDS = 0.1  # 订阅线程等待消息的超时，也是新订阅请求的最长处理延迟
+
+    def __init__(self, redis_client: redis.Redis, deliver, has_local):
+        """
+        Args:
+            redis_client: Redis 客户端（分片模式下发布/订阅走元数据节点）
+            deliver: 本进程投递函数 deliver(room_id, event, message)
+            has_local: 判断房间在本进程是否还有订阅者 has_local(room_id) -> bool
+        """
+        self.redis = redis_client
+        self.deliver = deliver
+        self.has_local = has_local
+        self._lock = threading.Lock()
+        self._rooms: set[str] = set()
+        self._pubsub = None
+        self._pending: queue.SimpleQueue | None = None
+        self._pid = None
+        self._origin = None
+        self.published = 0
+        self.received = 0
+        self.publish_errors = 0
+        self.resets = 0
+
+    @classmethod
+    def channel(cls, room_id: str) -> str:
+        """房间广播频道"""
+        return f"{cls.CHANNEL_PREFIX}{room_id}"
+
+    def watch(self, room_id: str) -> None:
+        """订阅房间频道（本进程出现该房间的订阅者时调用，应在登记订阅者之后调用；由订阅线程异步执行）"""
+        self._ensure_listener()
+        with self._lock:
+            if room_id in self._rooms:
+                return
+            self._rooms.add(room_id)
+            self._pending.put(room_id)
+
+    def publish(self, frame: EventFrame) -> None:
+        """发布事件给其他进程（本进程的订阅者由调用方直接投递）；发布失败只记录日志"""
+        self._ensure_listener()
+        payload = f"{self._origin}\n{frame.event}\n{frame.native}"
+        try:
+            self.redis.publish(self.channel(frame.room_id), payload)
+            self.published += 1
+        except redis.RedisError as e:
+            self.publish_errors += 1
+            logger.warning("原生 WebSocket 事件发布失败", extra={'room_id': frame.room_id, 'error': str(e)})
+
+    # ------------------------------------------------------------------
+    # 订阅
+    # ------------------------------------------------------------------
+
+    def _ensure_listener(self) -> None:
+        """按需启动订阅线程；gunicorn fork 出的子进程使用新的进程标识与订阅连接"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            self._pending = queue.SimpleQueue()
+            self._rooms = set()
+            self._origin = uuid.uuid4().hex[:12]
+            threading.Thread(
+                target=self._run, args=(self._pubsub, self._pending), name="native-ws-bus", daemon=True
+            ).start()
+            self._pid = pid
+        logger.info("原生 WebSocket 广播总线已启动", extra={'origin': self._origin, 'pid': pid})
+
+    def _run(self, pubsub, pending: queue.SimpleQueue) -> None:
+        while True:
+            try:
+                self._subscribe_pending(pubsub, pending)
+                message = pubsub.get_message(ignore_subscribe_messages=True, timeout=self.POLL_SECONDS)
+            except Exception as e:
+                # redis-py 重连时会重新订阅已有频道，期间的消息由客户端凭 seq 缺口补齐
+                logger.warning("原生 WebSocket 广播总线订阅异常", extra={'error': str(e)})
+                self.resets += 1
+                time.sleep(1.0)
+                continue
+            if message is not None and message.get('type') == 'message':
+                self._on_message(message)
+
+    @classmethod
+    def _subscribe_pending(cls, pubsub, pending: queue.SimpleQueue) -> None:
+        """执行登记的订阅请求；失败的请求放回队列，重连后重试"""
+        while True:
+            try:
+                room_id = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                pubsub.subscribe(cls.channel(room_id))
+            except Exception:
+                pending.put(room_id)
+                raise
+
+    def _on_message(self, message: dict) -> None:
+        channel = message['channel']
+        if isinstance(channel, bytes):
+            channel = channel.decode('utf-8')
+        room_id = channel[len(self.CHANNEL_PREFIX):]
+
+        if not self.has_local(room_id):
+            # 本进程已无该房间的订阅者，退订（在订阅线程中执行）；与 watch 同锁，避免与新订阅交错
+            with self._lock:
+                if not self.has_local(room_id) and room_id in self._rooms:
+                    self._pubsub.unsubscribe(channel)
+                    self._rooms.discard(room_id)
+            return
+
+        data = message['data']
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        origin, event, native = data.split("\n", 2)
+        if origin == self._origin:
+            return
+        self.received += 1
+        self.deliver(room_id, event, native)
+
+    def get_stats(self) -> dict:
+        """获取统计信息"""
+        return {
+            'rooms': len(self._rooms),
+            'published': self.published,
+            'received': self.received,
+            'publish_errors': self.publish_errors,
+            'resets': self.resets,
+        }
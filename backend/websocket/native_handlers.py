@@ -4,6 +4,9 @@
 
 与 Socket.IO 不同，这是标准的 WebSocket 协议实现
 兼容微信小程序的 wx.connectSocket API
+
+认证成功后该连接的所有发送都经过其出站队列（OutboundQueue），由独立的写线程发出
+多 worker 部署时房间事件经广播总线（NativeBroadcastBus）送达其他 worker 上的订阅者
 """
 
 import json
@@ -12,26 +15,67 @@ from flask import current_app, request
 from flask_sock import Sock
 
 from backend.utils.logger import setup_logger
-from backend.utils.naming import camel_to_snake_dict, snake_to_camel_dict
+from backend.utils.naming import camel_to_snake, compile_converter, snake_to_camel
 from backend.websocket.auth import check_rate_limit, decode_token
 from backend.websocket.errors import WSErrorCode, format_ws_error
 from backend.websocket.events import SystemEvent
+from backend.websocket.frame import EventFrame
 from backend.websocket.monitor import ws_monitor
+from backend.websocket.outbound import OVERFLOW_POLICIES, OutboundQueue
+from backend.websocket.resume import resume_room
 
 logger = setup_logger(__name__)
 
 # 创建 Sock 实例
 sock = Sock()
 
-# 存储连接映射：{ws_id: {'user_id': str, 'rooms': set}}
+# 存储连接映射：{ws_id: {'user_id': str, 'rooms': set, 'ws': OutboundQueue}}
 connections = {}
 
 # 存储房间订阅：{room_id: set(ws_id)}
 room_subscriptions = {}
 
+# 用户连接索引：{user_id: set(ws_id)}，与 connections 同步维护（认证成功时加入，连接清理时移除）
+user_connections = {}
+
+# 跨 worker 广播总线（将在 app_factory 中设置，未设置时只投递本进程的订阅者）
+_broadcast_bus = None
+
+# 协议键名（小程序上行 camelCase、下行 snake_case 写法），编译为平铺映射表；事件数据中的其他键回退到带缓存的逐键转换
+INBOUND_KEYS = ("type", "data", "token", "roomId", "lastSeq", "timestamp")
+OUTBOUND_KEYS = (
+    "type", "event", "room_id", "data", "success", "seq", "connection_id", "user_id", "error", "message",
+    "status", "player_count", "updated_at", "players", "openid", "nickname", "seat", "is_eliminated", "is_creator",
+)
+_to_snake = compile_converter(INBOUND_KEYS, camel_to_snake)
+_to_camel = compile_converter(OUTBOUND_KEYS, snake_to_camel)
+
+# 心跳快速路径：小程序心跳为 JSON.stringify({type: 'ping', ...})，按前缀识别，不解析 JSON、不转换键名
+PING_PREFIX = '{"type":"ping"'
+PONG_FRAME = json.dumps(_to_camel({"type": "system", "event": SystemEvent.PONG.value}))
+
+
+def set_broadcast_bus(bus):
+    """设置跨 worker 广播总线"""
+    global _broadcast_bus
+    _broadcast_bus = bus
+
+
+def has_local_subscribers(room_id: str) -> bool:
+    """本进程是否有该房间的订阅者"""
+    return bool(room_subscriptions.get(room_id))
+
 
 def init_native_websocket(app):
-    """初始化原生 WebSocket"""
+    """
+    初始化原生 WebSocket
+
+    Raises:
+        ValueError: 出站队列溢出策略配置无效
+    """
+    policy = app.config.get("WS_OUTBOUND_OVERFLOW_POLICY", "drop_oldest")
+    if policy not in OVERFLOW_POLICIES:
+        raise ValueError(f"Unknown outbound overflow policy: {policy}")
     sock.init_app(app)
     logger.info("Native WebSocket initialized for mini-program")
 
@@ -51,6 +95,7 @@ def websocket_handler(ws):
     """
     ws_id = id(ws)
     user_id = None
+    outbound = None
 
     try:
         remote_addr = request.remote_addr or "unknown"
@@ -61,7 +106,7 @@ def websocket_handler(ws):
             logger.warning(f"Connection rejected: rate limit exceeded for {remote_addr}")
             ws_monitor.record_error("RATE_LIMIT")
             error_msg = format_ws_error("auth_error", WSErrorCode.RATE_LIMIT_EXCEEDED, "请求过于频繁")
-            ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+            ws.send(json.dumps(_to_camel(error_msg)))
             return
 
         # 等待认证消息
@@ -70,25 +115,25 @@ def websocket_handler(ws):
         if not auth_message:
             ws_monitor.record_error("AUTH_TIMEOUT")
             error_msg = format_ws_error("auth_error", WSErrorCode.AUTH_TIMEOUT, "认证超时")
-            ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+            ws.send(json.dumps(_to_camel(error_msg)))
             return
 
         # 解析认证消息
         try:
             auth_data = json.loads(auth_message)
             # 转换为 snake_case
-            auth_data = camel_to_snake_dict(auth_data)
+            auth_data = _to_snake(auth_data)
         except json.JSONDecodeError:
             ws_monitor.record_error("INVALID_JSON")
             error_msg = format_ws_error("auth_error", WSErrorCode.INVALID_JSON, "无效的 JSON 格式")
-            ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+            ws.send(json.dumps(_to_camel(error_msg)))
             return
 
         # 验证消息类型
         if auth_data.get("type") != "auth":
             ws_monitor.record_error("AUTH_REQUIRED")
             error_msg = format_ws_error("auth_error", WSErrorCode.AUTH_REQUIRED, "需要先认证")
-            ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+            ws.send(json.dumps(_to_camel(error_msg)))
             return
 
         # 验证 token
@@ -96,7 +141,7 @@ def websocket_handler(ws):
         if not token:
             ws_monitor.record_error("MISSING_TOKEN")
             error_msg = format_ws_error("auth_error", WSErrorCode.MISSING_TOKEN, "缺少 token")
-            ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+            ws.send(json.dumps(_to_camel(error_msg)))
             return
 
         # 解析 JWT token
@@ -105,11 +150,18 @@ def websocket_handler(ws):
             error_code, error_message = error
             ws_monitor.record_error(f"AUTH_{error_code.value}")
             error_msg = format_ws_error("auth_error", error_code, error_message)
-            ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+            ws.send(json.dumps(_to_camel(error_msg)))
             return
 
-        # 认证成功，存储连接信息
-        connections[ws_id] = {"user_id": user_id, "rooms": set(), "ws": ws}
+        # 认证成功，之后的发送都经过出站队列，存储连接信息
+        outbound = OutboundQueue(
+            ws,
+            max_size=current_app.config.get("WS_OUTBOUND_QUEUE_SIZE", 64),
+            policy=current_app.config.get("WS_OUTBOUND_OVERFLOW_POLICY", "drop_oldest"),
+        )
+        ws_monitor.track_queue(ws_id, outbound)
+        connections[ws_id] = {"user_id": user_id, "rooms": set(), "ws": outbound}
+        user_connections.setdefault(user_id, set()).add(ws_id)
         ws_monitor.record_connection()
 
         logger.info(f"Native WebSocket authenticated: user_id={user_id}, ws_id={ws_id}")
@@ -120,7 +172,7 @@ def websocket_handler(ws):
             "event": SystemEvent.CONNECTED.value,
             "data": {"connection_id": str(ws_id), "user_id": user_id},
         }
-        ws.send(json.dumps(snake_to_camel_dict(success_msg)))
+        outbound.send(json.dumps(_to_camel(success_msg)))
         ws_monitor.record_message_sent()
 
         # 消息循环
@@ -128,29 +180,32 @@ def websocket_handler(ws):
             message = ws.receive()
             if message is None:
                 break
+            if isinstance(message, str) and message.startswith(PING_PREFIX):
+                handle_ping(outbound)
+                continue
 
             try:
                 data = json.loads(message)
                 # 转换为 snake_case
-                data = camel_to_snake_dict(data)
+                data = _to_snake(data)
                 message_type = data.get("type")
 
                 if message_type == "subscribe":
-                    handle_subscribe(ws, ws_id, user_id, data.get("data", {}))
+                    handle_subscribe(outbound, ws_id, user_id, data.get("data", {}))
                 elif message_type == "unsubscribe":
-                    handle_unsubscribe(ws, ws_id, data.get("data", {}))
+                    handle_unsubscribe(outbound, ws_id, data.get("data", {}))
                 elif message_type == "ping":
-                    handle_ping(ws)
+                    handle_ping(outbound)
                 else:
                     ws_monitor.record_error("UNKNOWN_TYPE")
                     error_msg = format_ws_error("unknown_type", WSErrorCode.UNKNOWN_TYPE, f"未知的消息类型: {message_type}")
-                    ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+                    outbound.send(json.dumps(_to_camel(error_msg)))
                     ws_monitor.record_message_sent()
 
             except json.JSONDecodeError:
                 ws_monitor.record_error("INVALID_JSON")
                 error_msg = format_ws_error("parse_error", WSErrorCode.INVALID_JSON, "无效的 JSON 格式")
-                ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+                outbound.send(json.dumps(_to_camel(error_msg)))
                 ws_monitor.record_message_sent()
             except Exception as e:
                 logger.error(f"Message handling error: {e}")
@@ -160,7 +215,7 @@ def websocket_handler(ws):
                     error_msg = format_ws_error("internal_error", WSErrorCode.INTERNAL_ERROR, "Redis 服务未启动，请启动 Redis 服务后重试")
                 else:
                     error_msg = format_ws_error("internal_error", WSErrorCode.INTERNAL_ERROR, "服务器内部错误")
-                ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+                outbound.send(json.dumps(_to_camel(error_msg)))
                 ws_monitor.record_message_sent()
 
     except Exception as e:
@@ -169,6 +224,9 @@ def websocket_handler(ws):
 
     finally:
         # 清理连接
+        if outbound is not None:
+            outbound.close()
+            ws_monitor.untrack_queue(ws_id)
         if ws_id in connections:
             # 从所有房间取消订阅
             for room_id in list(connections[ws_id]["rooms"]):
@@ -177,6 +235,12 @@ def websocket_handler(ws):
                     if not room_subscriptions[room_id]:
                         del room_subscriptions[room_id]
 
+            user_ws_ids = user_connections.get(user_id)
+            if user_ws_ids is not None:
+                user_ws_ids.discard(ws_id)
+                if not user_ws_ids:
+                    del user_connections[user_id]
+
             del connections[ws_id]
             ws_monitor.record_disconnection()
             logger.info(f"Native WebSocket disconnected: user_id={user_id}, ws_id={ws_id}")
@@ -193,7 +257,7 @@ def handle_subscribe(ws, ws_id, user_id, data):
             message="缺少 room_id 参数",
             room_id=None,
         )
-        ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+        ws.send(json.dumps(_to_camel(error_msg)))
         ws_monitor.record_error("INVALID_REQUEST")
         ws_monitor.record_message_sent()
         return
@@ -210,7 +274,7 @@ def handle_subscribe(ws, ws_id, user_id, data):
                 message="房间不存在",
                 room_id=room_id,
             )
-            ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+            ws.send(json.dumps(_to_camel(error_msg)))
             ws_monitor.record_error("ROOM_NOT_FOUND")
             ws_monitor.record_message_sent()
             return
@@ -222,7 +286,7 @@ def handle_subscribe(ws, ws_id, user_id, data):
                 message="您不在该房间内",
                 room_id=room_id,
             )
-            ws.send(json.dumps(snake_to_camel_dict(error_msg)))
+            ws.send(json.dumps(_to_camel(error_msg)))
             ws_monitor.record_error("PERMISSION_DENIED")
             ws_monitor.record_message_sent()
             return
@@ -232,23 +296,43 @@ def handle_subscribe(ws, ws_id, user_id, data):
         room_subscriptions[room_id] = set()
     room_subscriptions[room_id].add(ws_id)
     connections[ws_id]["rooms"].add(room_id)
+    if _broadcast_bus is not None:
+        try:
+            _broadcast_bus.watch(room_id)
+        except Exception as e:
+            # 跨 worker 订阅失败时回滚本地订阅，客户端可重试
+            _remove_subscription(ws_id, room_id)
+            logger.error(f"Broadcast bus subscribe failed: room_id={room_id}, error={e}")
+            error_msg = format_ws_error(
+                event=SystemEvent.SUBSCRIBE_ERROR.value,
+                code=WSErrorCode.INTERNAL_ERROR,
+                message="订阅失败，请稍后重试",
+                room_id=room_id,
+            )
+            ws.send(json.dumps(_to_camel(error_msg)))
+            ws_monitor.record_error("INTERNAL_ERROR")
+            ws_monitor.record_message_sent()
+            return
 
     logger.info(f"Room subscribed: user_id={user_id}, room_id={room_id}, ws_id={ws_id}")
 
-    # 发送订阅成功消息
-    success_msg = {"type": "system", "event": SystemEvent.SUBSCRIBED.value, "room_id": room_id, "data": {"success": True}}
-    ws.send(json.dumps(snake_to_camel_dict(success_msg)))
+    # 发送订阅成功消息（附当前事件序号），再补发断线期间缺失的事件或房间快照
+    seq, events, snapshot = resume_room(room_id, data.get("last_seq"))
+    success_data = {"success": True} if seq is None else {"success": True, "seq": seq}
+    success_msg = {"type": "system", "event": SystemEvent.SUBSCRIBED.value, "room_id": room_id, "data": success_data}
+    ws.send(json.dumps(_to_camel(success_msg)))
     ws_monitor.record_message_sent()
 
+    for event in events:
+        ws.send(EventFrame.from_message(event).native)
+    if snapshot is not None:
+        snapshot_msg = {"type": "system", "event": SystemEvent.SNAPSHOT.value, **snapshot}
+        ws.send(json.dumps(_to_camel(snapshot_msg)))
+    ws_monitor.record_message_sent(len(events) + (snapshot is not None))
 
-def handle_unsubscribe(ws, ws_id, data):
-    """处理取消订阅"""
-    room_id = data.get("room_id")
-
-    if not room_id:
-        return
 
-    # 移除订阅
+def _remove_subscription(ws_id, room_id):
+    """移除连接对房间的订阅"""
     if room_id in room_subscriptions:
         room_subscriptions[room_id].discard(ws_id)
         if not room_subscriptions[room_id]:
@@ -257,58 +341,67 @@ def handle_unsubscribe(ws, ws_id, data):
     if ws_id in connections:
         connections[ws_id]["rooms"].discard(room_id)
 
+
+def handle_unsubscribe(ws, ws_id, data):
+    """处理取消订阅"""
+    room_id = data.get("room_id")
+
+    if not room_id:
+        return
+
+    _remove_subscription(ws_id, room_id)
+
     logger.info(f"Room unsubscribed: room_id={room_id}, ws_id={ws_id}")
 
 
 def handle_ping(ws):
-    """处理心跳"""
-    ping_msg = {"type": "system", "event": SystemEvent.PONG.value}
-    ws.send(json.dumps(snake_to_camel_dict(ping_msg)))
+    """处理心跳（回复预编码的 pong 消息）"""
+    ws.send(PONG_FRAME)
     ws_monitor.record_message_sent()
 
 
-def broadcast_to_room(room_id: str, event: str, data: dict):
+def broadcast_to_room(frame: EventFrame):
+    """
+    向房间内所有订阅者广播消息（本进程直接投递，其他 worker 经广播总线投递）
+
+    Args:
+        frame: 房间事件帧（消息只编码一次，所有订阅者共用）
+    """
+    deliver_local(frame.room_id, frame.event, frame.native)
+    if _broadcast_bus is not None:
+        _broadcast_bus.publish(frame)
+
+
+def deliver_local(room_id: str, event: str, message: str):
     """
-    向房间内所有订阅者广播消息
+    向本进程内房间的订阅者投递已编码的事件消息
 
     Args:
         room_id: 房间ID
-        event: 事件类型
-        data: 事件数据
+        event: 事件类型（与房间ID组成出站队列合并键）
+        message: 已编码的消息
     """
-    if room_id not in room_subscriptions:
+    subscribers = room_subscriptions.get(room_id)
+    if not subscribers:
         return
 
-    message_data = {
-        "type": "event",
-        "event": event,
-        "room_id": room_id,
-        "timestamp": data.get("timestamp", 0),
-        "data": data.get("data", {}),
-    }
-    # 转换为 camelCase
-    message_data = snake_to_camel_dict(message_data)
-    message = json.dumps(message_data)
-
-    # 发送给所有订阅者
+    # 放入所有订阅者的出站队列（不等待网络发送），同房间同事件的积压消息可合并
     disconnected = set()
-    for ws_id in room_subscriptions[room_id]:
-        if ws_id in connections:
-            try:
-                connections[ws_id]["ws"].send(message)
-                ws_monitor.record_message_sent()
-            except Exception as e:
-                logger.error(f"Failed to send message to ws_id={ws_id}: {e}")
-                ws_monitor.record_error("BROADCAST_EXCEPTION")
-                disconnected.add(ws_id)
+    for ws_id in list(subscribers):
+        conn = connections.get(ws_id)
+        if conn is None:
+            continue
+        if conn["ws"].send(message, key=(room_id, event)):
+            ws_monitor.record_message_sent()
+        else:
+            conn["rooms"].discard(room_id)
+            disconnected.add(ws_id)
 
-    # 清理断开的连接
+    # 已关闭的连接不再接收该房间的广播，连接本身（含用户连接索引）由其接收循环退出时清理
     for ws_id in disconnected:
-        room_subscriptions[room_id].discard(ws_id)
-        if ws_id in connections:
-            del connections[ws_id]
+        subscribers.discard(ws_id)
 
-    if not room_subscriptions[room_id]:
+    if not subscribers and room_subscriptions.get(room_id) is subscribers:
         del room_subscriptions[room_id]
 
-    logger.debug(f"Broadcast to room {room_id}: {event}, subscribers: {len(room_subscriptions.get(room_id, []))}")
+    logger.debug(f"Broadcast to room {room_id}: {event}, subscribers: {len(subscribers)}")
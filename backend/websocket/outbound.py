@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+原生 WebSocket 出站队列
+每个连接一个有界发送队列和独立的写线程（eventlet / gevent 打过补丁后为协程）：
+广播只把消息放进队列后立即返回，网络差的连接只会积压自己的队列，不会拖慢同房间的其他玩家和触发通知的 HTTP 请求
+
+队列满时按溢出策略处理：
+- drop_oldest：丢弃最旧的一条消息
+- coalesce：替换队列中合并键相同（同房间同事件）的旧消息，没有可合并的消息时丢弃最旧的一条
+- disconnect：关闭连接，客户端重连后凭 lastSeq 补齐
+被丢弃的房间事件在客户端表现为 seq 缺口，重新订阅即可补发
+"""
+
+import threading
+from collections import deque
+
+from backend.utils.logger import setup_logger
+from backend.websocket.monitor import ws_monitor
+
+logger = setup_logger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+
+class OutboundQueue:
+    """单个连接的出站队列，提供与 ws.send 相同的 send 接口"""
+
+    def __init__(self, ws, max_size: int = 64, policy: str = "drop_oldest"):
+        """
+        Args:
+            ws: 原生 WebSocket 连接
+            max_size: 队列最多积压的消息数
+            policy: 溢出策略，取值见 OVERFLOW_POLICIES
+
+        Raises:
+            ValueError: 未知的溢出策略
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown outbound overflow policy: {policy}")
+        self.ws = ws
+        self.max_size = max_size
+        self.policy = policy
+        self._queue: deque[tuple[object, str]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.high_water = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._writer = threading.Thread(target=self._run, name=f"ws-writer-{id(ws)}", daemon=True)
+        self._writer.start()
+
+    def send(self, message: str, key=None) -> bool:
+        """
+        放入一条待发送消息，不等待网络发送
+
+        Args:
+            message: 已编码的消息
+            key: 合并键（coalesce 策略下队列满时替换相同键的旧消息），None 表示不可合并
+
+        Returns:
+            是否已放入队列；连接已关闭（或因队列溢出被断开）时为 False
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._queue) >= self.max_size:
+                if self.policy == "disconnect":
+                    self._close_locked()
+                    ws_monitor.record_outbound("overflow_disconnects")
+                    logger.warning("出站队列溢出，断开慢连接", extra={'ws_id': id(self.ws), 'depth': len(self._queue)})
+                    return False
+                if self.policy == "coalesce" and key is not None and self._coalesce(key):
+                    self.coalesced += 1
+                    ws_monitor.record_outbound("coalesced")
+                else:
+                    self._queue.popleft()
+                    self.dropped += 1
+                    ws_monitor.record_outbound("dropped")
+            self._queue.append((key, message))
+            self.high_water = max(self.high_water, len(self._queue))
+            self._cond.notify()
+        return True
+
+    def close(self) -> None:
+        """关闭连接：丢弃未发送的消息，由写线程关闭底层连接后退出"""
+        with self._cond:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        self._closed = True
+        self._queue.clear()
+        self._cond.notify()
+
+    def _coalesce(self, key) -> bool:
+        """移除队列中第一条合并键相同的消息"""
+        for i, (queued_key, _) in enumerate(self._queue):
+            if queued_key == key:
+                del self._queue[i]
+                return True
+        return False
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    break
+                _, message = self._queue.popleft()
+            try:
+                self.ws.send(message)
+            except Exception as e:
+                logger.error(f"Failed to send message to ws_id={id(self.ws)}: {e}")
+                ws_monitor.record_error("OUTBOUND_SEND_EXCEPTION")
+                with self._cond:
+                    self._close_locked()
+                break
+
+        # 在写线程里关闭，避免调用方阻塞在慢连接上；接收循环随之结束并清理订阅（连接已关闭时忽略）
+        try:
+            self.ws.close()
+        except Exception as e:
+            logger.debug(f"Failed to close ws_id={id(self.ws)}: {e}")
+
+    def get_stats(self) -> dict:
+        """获取统计信息"""
+        return {
+            'depth': len(self._queue),
+            'high_water': self.high_water,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+        }
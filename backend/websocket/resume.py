@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+断线重连补发
+客户端重新订阅房间时带上最后收到的事件序号 last_seq：缺口在事件日志保留范围内时只补发缺失的事件，
+超出范围（或日志已过期）时改发一条房间快照，客户端用快照覆盖本地状态后继续接收实时事件
+
+订阅登记先于补发，补发与实时推送可能重复同一事件，客户端按 seq 丢弃不大于已处理序号的事件
+"""
+
+from flask import current_app
+
+from backend.services.room_snapshot import build_room_snapshot
+
+
+def resume_room(room_id: str, last_seq=None) -> tuple[int | None, list[dict], dict | None]:
+    """
+    计算订阅房间时需要补发的内容
+
+    Args:
+        room_id: 房间ID
+        last_seq: 客户端最后收到的事件序号，None 表示首次订阅（不补发）
+
+    Returns:
+        (当前最新序号, 需补发的事件, 快照)；未启用事件日志时为 (None, [], None)，
+        快照为 {"room_id", "seq", "data"}，不需要快照时为 None
+    """
+    event_log = current_app.config.get("room_event_log")
+    if event_log is None:
+        return None, [], None
+    if last_seq is None:
+        return event_log.latest_seq(room_id), [], None
+
+    try:
+        last_seq = int(last_seq)
+    except (TypeError, ValueError):
+        last_seq = -1
+    if last_seq >= 0:
+        events = event_log.since(room_id, last_seq)
+        if events is not None:
+            return (events[-1]["seq"] if events else last_seq), events, None
+
+    # 先读序号再读房间：快照不会比序号旧，之后的事件照常补发/推送
+    seq = event_log.latest_seq(room_id)
+    room = current_app.config["room_repository"].get(room_id)
+    if room is None:
+        return seq, [], None
+    user_repo = current_app.config.get("user_repository")
+    users = user_repo.get_many(room.players) if user_repo else {}
+    return seq, [], {"room_id": room_id, "seq": seq, "data": build_room_snapshot(room, users)}
@@ -2,6 +2,7 @@
 """
 WebSocket 连接管理服务
 负责管理 WebSocket 连接的生命周期，包括订阅管理、连接清理等
+按用户查找连接走 user_id -> ws_id 索引，只与该用户的连接数相关，不遍历全部连接
 """
 
 from typing import TYPE_CHECKING
@@ -28,6 +29,7 @@ class WebSocketManager:
         """初始化 WebSocket 管理器"""
         self._connections = None  # 将在 app_factory 中设置
         self._room_subscriptions = None  # 将在 app_factory 中设置
+        self._user_connections = None  # 将在 app_factory 中设置
     
     def set_connections(self, connections: dict):
         """设置连接字典引用"""
@@ -37,6 +39,10 @@ class WebSocketManager:
         """设置房间订阅字典引用"""
         self._room_subscriptions = room_subscriptions
     
+    def set_user_connections(self, user_connections: dict):
+        """设置用户连接索引引用"""
+        self._user_connections = user_connections
+    
     def unsubscribe_user_from_room(self, user_id: str, room_id: str) -> int:
         """
         取消用户对房间的订阅
@@ -48,7 +54,7 @@ class WebSocketManager:
         Returns:
             取消的连接数量
         """
-        if not self._connections or not self._room_subscriptions:
+        if self._connections is None or self._room_subscriptions is None or self._user_connections is None:
             logger.warning("WebSocket connections not initialized")
             return 0
         
@@ -57,10 +63,7 @@ class WebSocketManager:
             return 0
         
         # 找到该用户的所有WebSocket连接
-        ws_ids_to_remove = []
-        for ws_id, conn_info in self._connections.items():
-            if conn_info.get("user_id") == user_id:
-                ws_ids_to_remove.append(ws_id)
+        ws_ids_to_remove = self.get_user_connections(user_id)
         
         # 从房间订阅中移除这些连接
         removed_count = 0
@@ -100,13 +103,10 @@ class WebSocketManager:
         Returns:
             WebSocket连接ID列表
         """
-        if not self._connections:
+        if not self._user_connections:
             return []
         
-        return [
-            ws_id for ws_id, conn_info in self._connections.items()
-            if conn_info.get("user_id") == user_id
-        ]
+        return list(self._user_connections.get(user_id, ()))
     
     def get_room_subscribers(self, room_id: str) -> list:
         """
@@ -165,6 +165,49 @@ class WebSocketManager:
             )
         
         return disconnected_count
+    
+    def check_consistency(self) -> list[str]:
+        """
+        检查连接、房间订阅与用户连接索引三者是否一致（供测试与排查使用）
+        
+        Returns:
+            不一致之处的描述列表，一致时为空列表
+        """
+        if self._connections is None or self._room_subscriptions is None or self._user_connections is None:
+            return ["WebSocket connections not initialized"]
+        
+        problems = []
+        connections = dict(self._connections)
+        for ws_id, conn_info in connections.items():
+            user_id = conn_info.get("user_id")
+            if ws_id not in self._user_connections.get(user_id, ()):
+                problems.append(f"connection {ws_id} of user {user_id} missing from user index")
+            for room_id in list(conn_info.get("rooms", ())):
+                if ws_id not in self._room_subscriptions.get(room_id, ()):
+                    problems.append(f"connection {ws_id} lists room {room_id} but is not subscribed")
+        
+        for user_id, ws_ids in list(self._user_connections.items()):
+            if not ws_ids:
+                problems.append(f"user {user_id} has an empty connection set")
+            for ws_id in list(ws_ids):
+                conn_info = connections.get(ws_id)
+                if conn_info is None:
+                    problems.append(f"user index lists unknown connection {ws_id} for user {user_id}")
+                elif conn_info.get("user_id") != user_id:
+                    owner = conn_info.get("user_id")
+                    problems.append(f"user index lists connection {ws_id} under {user_id}, owned by {owner}")
+        
+        for room_id, ws_ids in list(self._room_subscriptions.items()):
+            if not ws_ids:
+                problems.append(f"room {room_id} has an empty subscription set")
+            for ws_id in list(ws_ids):
+                conn_info = connections.get(ws_id)
+                if conn_info is None:
+                    problems.append(f"room {room_id} subscribed by unknown connection {ws_id}")
+                elif room_id not in conn_info.get("rooms", ()):
+                    problems.append(f"room {room_id} subscribed by {ws_id} but missing from its rooms")
+        
+        return problems
 
 
 # 创建全局实例